@@ -0,0 +1,144 @@
+"""Robust aggregation rules vs plain FedAvg: throughput and peak memory.
+
+    PYTHONPATH=src python benchmarks/bench_aggregation.py --clients 10,100 --model-mb 4
+    PYTHONPATH=src python benchmarks/bench_aggregation.py --clients 200 --model-mb 16 --spill /tmp
+
+Each client update is a random weight list of `--model-mb` MB. Rows:
+
+    mean            FedAvgAccumulator (streaming)
+    clipped_mean    ClippedFedAvgAccumulator (streaming)
+    median          RobustAccumulator, column blocks on threads
+    trimmed_mean    RobustAccumulator, same blocks
+    median_part     the same blocks reduced with np.partition at the middle kth(s) instead of a sort
+    trimmed_part    the same blocks reduced with np.partition(kth=(k, n-k-1)) instead of a sort
+    naive_median    np.median over the full np.stack of the clients, per layer
+    naive_trimmed   np.sort over the full stack, per layer
+
+The `_part` rows are the alternative RobustAccumulator does not use: on
+these blocks (one short row of client values per coordinate) numpy's sort
+is several times faster than np.partition.
+
+`mb_s` is client data aggregated per second (clients * model MB / time).
+`peak_mb` is the peak numpy allocation (tracemalloc) above the client
+weights themselves, which all rows share. For median/trimmed_mean it
+includes the rows the RobustAccumulator keeps, one float32 copy of every
+update, unless `--spill` puts them in a memory-mapped file.
+"""
+import argparse
+import json
+import sys
+import tracemalloc
+from time import perf_counter
+
+import numpy as np
+
+from federated.model_manager import (
+    FedAvgAccumulator, ClippedFedAvgAccumulator, RobustAccumulator, _flat, _reduce_blocks,
+)
+
+
+def _clients(n: int, model_mb: float, layers: int = 6) -> list[list[np.ndarray]]:
+    size = max(1, int(model_mb * 2**20 / 4 / layers))
+    rng = np.random.default_rng(0)
+    return [[rng.standard_normal(size, dtype=np.float32) for _ in range(layers)] for _ in range(n)]
+
+
+def _naive_median(ws):
+    return [np.median(np.stack([w[l] for w in ws]), axis=0) for l in range(len(ws[0]))]
+
+
+def _naive_trimmed(ws, trim=0.1):
+    k = int(trim * len(ws))
+    return [np.sort(np.stack([w[l] for w in ws]), axis=0)[k:len(ws) - k].mean(axis=0) for l in range(len(ws[0]))]
+
+
+def _partition_median(block):
+    n = block.shape[1]
+    block.partition((n // 2 - 1, n // 2) if n % 2 == 0 else n // 2, axis=1)
+    if n % 2:
+        return block[:, n // 2]
+    return (block[:, n // 2 - 1] + block[:, n // 2]) / np.float32(2)
+
+
+def _partition_trimmed(block, trim=0.1):
+    n = block.shape[1]
+    k = int(trim * n)
+    if k:
+        block.partition((k, n - k - 1), axis=1)
+    return block[:, k:n - k].mean(axis=1, dtype=np.float64)
+
+
+def _blocked(reduce, workers):
+    # RobustAccumulator's in-memory path with another block reduction
+    def run(ws):
+        rows = [_flat(w) for w in ws]
+        return _reduce_blocks(rows, len(rows[0]), reduce, workers=workers)
+    return run
+
+
+def _streamed(make):
+    def run(ws):
+        acc = make(ws)
+        for w in ws:
+            acc.add(w)
+        return acc.result()
+    return run
+
+
+def run(clients: list[int], model_mb: float, repeat: int, spill: str | None, workers: int | None) -> list[dict]:
+    rules = {
+        "mean": _streamed(lambda ws: FedAvgAccumulator()),
+        "clipped_mean": _streamed(lambda ws: ClippedFedAvgAccumulator(ws[0], 10.0)),
+        "median": _streamed(lambda ws: RobustAccumulator("median", spill_dir=spill, workers=workers)),
+        "trimmed_mean": _streamed(lambda ws: RobustAccumulator("trimmed_mean", 0.1, spill_dir=spill,
+                                                               workers=workers)),
+        "median_part": _blocked(_partition_median, workers),
+        "trimmed_part": _blocked(_partition_trimmed, workers),
+        "naive_median": _naive_median,
+        "naive_trimmed": _naive_trimmed,
+    }
+    rows = []
+    for n in clients:
+        ws = _clients(n, model_mb)
+        base = None
+        for name, fn in rules.items():
+            best = float("inf")
+            for _ in range(repeat):
+                t = perf_counter()
+                fn(ws)
+                best = min(best, perf_counter() - t)
+            tracemalloc.start()
+            fn(ws)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            base = base or best
+            rows.append({"rule": name, "clients": n, "model_mb": model_mb, "sec": round(best, 4),
+                         "mb_s": round(n * model_mb / best, 1), "vs_mean": round(best / base, 2),
+                         "peak_mb": round(peak / 2**20, 1)})
+    return rows
+
+
+def main(argv: list[str]) -> int:
+    p = argparse.ArgumentParser(description="Benchmark robust aggregation rules")
+    p.add_argument("--clients", default="10,100", help="Comma-separated client counts")
+    p.add_argument("--model-mb", type=float, default=4.0)
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--spill", default=None, help="Directory for memory-mapped client rows (median/trimmed)")
+    p.add_argument("--workers", type=int, default=None, help="Threads for column blocks (default: min(8, CPUs))")
+    p.add_argument("--json", action="store_true")
+    args = p.parse_args(argv)
+
+    rows = run([int(c) for c in args.clients.split(",") if c.strip()], args.model_mb, args.repeat, args.spill,
+               args.workers)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return 0
+    print(f"{'rule':>14} {'clients':>8} {'sec':>8} {'MB/s':>8} {'x mean':>7} {'peak_MB':>8}")
+    for r in rows:
+        print(f"{r['rule']:>14} {r['clients']:>8} {r['sec']:>8.4f} {r['mb_s']:>8.1f} {r['vs_mean']:>7.2f} "
+              f"{r['peak_mb']:>8.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
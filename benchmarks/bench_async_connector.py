@@ -0,0 +1,189 @@
+"""Per-peer fan-out over JSON-RPC: sync connector vs AsyncWeb3Connector, with artificial RPC delay.
+
+Every request goes through a local proxy that sleeps `--delay-ms` before
+answering, standing in for a remote node. With anvil (`make build` first):
+
+    anvil --port 7545 &
+    PYTHONPATH=src python benchmarks/bench_async_connector.py --upstream http://127.0.0.1:7545 --peers 10,50,100
+
+Without `--upstream` the proxy answers from a built-in stub node (fixed
+balances/reads, receipts right away), which is enough to time the round
+trips. Rows, for N peers:
+
+    reads  sync_serial     get_balance_eth + peer_get_last_round per peer, one after another
+           sync_batch      get_balances_eth + read_mint_state, one JSON-RPC batch each
+           async_gather    get_balances_eth + peer_last_rounds on AsyncWeb3Connector
+    mints  sync_serial     mint_peer_round per peer (waits for each receipt)
+           sync_pipelined  mint_round_pipelined (peer mints only: one submission after another)
+           async_gather    mint_peer_rounds (submissions and receipt waits concurrent)
+
+`round_trips` is the time divided by the delay: what the fan-out costs in
+units of one request.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+from time import perf_counter
+
+import aiohttp
+from aiohttp import web
+from eth_account import Account
+from eth_utils import keccak
+
+from federated.async_connector import AsyncWeb3Connector
+from federated.blockchain_connector import Web3Connector
+
+ABI_DIR = os.path.join(os.path.dirname(__file__), "..", "src", "abi")
+
+
+def _stub_answer(method: str, params: list):
+    if method == "eth_sendRawTransaction":
+        return "0x" + keccak(bytes.fromhex(params[0][2:])).hex()
+    if method == "eth_getTransactionReceipt":
+        return {"transactionHash": params[0], "status": "0x1", "gasUsed": "0x5208", "effectiveGasPrice": "0x1",
+                "blockNumber": "0x1", "transactionIndex": "0x0", "logs": [], "cumulativeGasUsed": "0x5208"}
+    return {"web3_clientVersion": "stub/0.1", "eth_chainId": "0x7a69", "eth_getBalance": hex(10**18),
+            "eth_call": "0x" + "00" * 31 + "01", "eth_gasPrice": hex(10**9), "eth_getTransactionCount": "0x0",
+            "eth_estimateGas": hex(100_000)}[method]
+
+
+class DelayProxy:
+    """JSON-RPC over HTTP on 127.0.0.1, answered after `delay` seconds by `upstream` or the stub.
+    Runs its own event loop in a thread, so sync and async clients can share it."""
+
+    def __init__(self, delay: float, upstream: str | None = None):
+        self.delay, self.upstream = delay, upstream
+        self.requests = 0
+        started = threading.Event()
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self._serve, args=(started,), daemon=True).start()
+        started.wait()
+
+    def _serve(self, started):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self._start())
+        started.set()
+        self.loop.run_forever()
+
+    async def _start(self):
+        self.session = aiohttp.ClientSession()
+        app = web.Application()
+        app.router.add_post("/", self._handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        self.url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/"
+
+    async def _handle(self, request):
+        body = await request.read()
+        self.requests += 1
+        await asyncio.sleep(self.delay)
+        if self.upstream:
+            async with self.session.post(self.upstream, data=body, headers={"Content-Type": "application/json"}) as r:
+                return web.Response(body=await r.read(), content_type="application/json")
+        payload = json.loads(body)
+        calls = payload if isinstance(payload, list) else [payload]
+        out = [{"jsonrpc": "2.0", "id": c["id"], "result": _stub_answer(c["method"], c["params"])} for c in calls]
+        return web.json_response(out if isinstance(payload, list) else out[0])
+
+
+def _stub_env(peers: int):
+    os.environ.update({
+        "AGGREGATOR_PRIVATE_KEY": Account.create().key.hex(),
+        "AGGREGATOR_CONTRACT_ADDRESS": "0x" + "11" * 20,
+        "AGGREGATOR_ABI_PATH": os.path.join(ABI_DIR, "Aggregator_ABI.json"),
+        "CLIENT_ABI_PATH": os.path.join(ABI_DIR, "Client_ABI.json"),
+        "CLIENT_PRIVATE_KEYS": ",".join(Account.create().key.hex() for _ in range(peers)),
+        "CLIENT_CONTRACT_ADDRESSES": ",".join("0x" + os.urandom(20).hex() for _ in range(peers)),
+    })
+
+
+def _payload(peer_idx: int, round_id: int) -> str:
+    return json.dumps({"peer_id": peer_idx + 1, "round": round_id, "weight_hash": "ab" * 32,
+                       "test_accuracy": 0.9}, separators=(",", ":"))
+
+
+def _timed(fn) -> float:
+    t = perf_counter()
+    fn()
+    return perf_counter() - t
+
+
+async def _async_rows(n: int, round_id: int, concurrency: int, mints: bool) -> dict:
+    async with AsyncWeb3Connector(max_concurrency=concurrency) as c:
+        addrs = [c.get_aggregator_account_address()] + [c.get_peer_account_address(i) for i in range(n)]
+        await c.get_current_round()  # warm the connection pool
+        t = perf_counter()
+        await c.get_balances_eth(addrs)
+        await c.peer_last_rounds(range(n))
+        out = {"reads": perf_counter() - t}
+        if mints:
+            t = perf_counter()
+            await c.mint_peer_rounds(round_id, {i: _payload(i, round_id) for i in range(n)})
+            out["mints"] = perf_counter() - t
+    return out
+
+
+def run(peer_counts: list[int], delay_ms: float, upstream: str | None, agg_key: str, concurrency: int,
+        mints: bool) -> list[dict]:
+    proxy = DelayProxy(delay_ms / 1000, upstream)
+    rows = []
+    for n in peer_counts:
+        if upstream:
+            from bench_tx_submission import deploy
+            deploy(upstream, agg_key, n)
+        else:
+            _stub_env(n)
+        os.environ["WEB3_HTTP_PROVIDER"] = proxy.url
+        w3c = Web3Connector()
+        addrs = [w3c.get_aggregator_account_address()] + [w3c.get_peer_account_address(i) for i in range(n)]
+        times = {
+            ("reads", "sync_serial"): _timed(lambda: ([w3c.get_balance_eth(a) for a in addrs],
+                                                      [w3c.peer_get_last_round(i) for i in range(n)])),
+            ("reads", "sync_batch"): _timed(lambda: (w3c.get_balances_eth(addrs), w3c.read_mint_state(range(n)))),
+        }
+        if mints:
+            times["mints", "sync_serial"] = _timed(lambda: [w3c.mint_peer_round(1, _payload(i, 1), i)
+                                                            for i in range(n)])
+            times["mints", "sync_pipelined"] = _timed(
+                lambda: w3c._wait_receipts([w3c._submit_tx(w3c.client_contracts[i]["acct"],
+                                                           w3c._peer_mint_fn(i, 2, _payload(i, 2)))
+                                            for i in range(n)]))
+        for kind, sec in asyncio.run(_async_rows(n, 3, concurrency, mints)).items():
+            times[kind, "async_gather"] = sec
+        for (kind, mode), sec in times.items():
+            rows.append({"peers": n, "kind": kind, "mode": mode, "sec": round(sec, 4),
+                         "round_trips": round(sec / (delay_ms / 1000), 1) if delay_ms else None})
+    return rows
+
+
+def main(argv: list[str]) -> int:
+    p = argparse.ArgumentParser(description="Benchmark per-peer RPC fan-out: sync vs AsyncWeb3Connector")
+    p.add_argument("--peers", default="10,50,100", help="Comma-separated peer counts")
+    p.add_argument("--delay-ms", type=float, default=20.0, help="Artificial delay per RPC request")
+    p.add_argument("--upstream", default=None, help="Node behind the delay proxy (default: built-in stub)")
+    p.add_argument("--agg-key", default="0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80",
+                   help="Funded aggregator key for deploying on --upstream (default: anvil account #0)")
+    p.add_argument("--concurrency", type=int, default=32, help="AsyncWeb3Connector max_concurrency")
+    p.add_argument("--no-mints", action="store_true", help="Only time the reads")
+    p.add_argument("--json", action="store_true")
+    args = p.parse_args(argv)
+
+    sys.path.insert(0, os.path.dirname(__file__))
+    rows = run([int(x) for x in args.peers.split(",") if x.strip()], args.delay_ms, args.upstream, args.agg_key,
+               args.concurrency, not args.no_mints)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return 0
+    print(f"{'peers':>6} {'kind':>6} {'mode':>15} {'sec':>8} {'round_trips':>12}")
+    for r in rows:
+        print(f"{r['peers']:>6} {r['kind']:>6} {r['mode']:>15} {r['sec']:>8.3f} {r['round_trips'] or 0:>12.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,106 @@
+"""Batched multi-client engine vs the per-client Keras loop, on CPU.
+
+    PYTHONPATH=src python benchmarks/bench_batched_clients.py --clients 5,50,500
+    PYTHONPATH=src python benchmarks/bench_batched_clients.py --clients 5 --mnist --rounds 3
+
+One federated round = local epoch + evaluation for every client, then FedAvg.
+`--samples` training rows (default 60000, MNIST's train split) are split
+evenly across the clients, with a sixth as many test rows, so the
+total work per round stays the same whatever N is. Only the per-client
+overhead changes. Rows:
+
+    loop      SharedModelClients: one compiled Keras model, N fit/evaluate calls
+    batched   BatchedClients: all N clients as one batched model
+
+Round times are the best of the rounds after a warm-up round (tracing,
+first-call allocations). With `--mnist`, real MNIST (IID split) is used and
+the global test accuracy after `--rounds` rounds is reported for both.
+Synthetic data is random, so its accuracies mean nothing.
+"""
+import argparse
+import json
+import os
+import sys
+from time import perf_counter
+
+import numpy as np
+
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "3")
+
+from tensorflow import keras
+from federated.batched_clients import BatchedClients
+from federated.client_executor import train_peers, peer_seed, SharedModelClients
+from federated.model_manager import FedAvgAccumulator
+
+
+def _synthetic(n: int, samples: int):
+    rng = np.random.default_rng(0)
+    per, per_test = samples // n, max(1, samples // n // 6)
+    xs = [rng.random((per, 28, 28), dtype=np.float32) for _ in range(n)]
+    ys = [rng.integers(0, 10, per) for _ in range(n)]
+    xts = [rng.random((per_test, 28, 28), dtype=np.float32) for _ in range(n)]
+    yts = [rng.integers(0, 10, per_test) for _ in range(n)]
+    return (xs, ys, xts, yts), (np.concatenate(xts), np.concatenate(yts))
+
+
+def _mnist(n: int):
+    from federated.data_handler import load_mnist_normalized, split_among_clients
+    (xtr, ytr), (xte, yte) = load_mnist_normalized()
+    xs, ys = split_among_clients(xtr, ytr, n, "iid")
+    xts, yts = split_among_clients(xte, yte, n, "iid")
+    return (xs, ys, xts, yts), (xte, yte)
+
+
+def run_engine(make, data, test, rounds: int, batch_size: int) -> dict:
+    keras.utils.set_random_seed(42)
+    clients = make()
+    xs, ys, xts, yts = data
+    times = []
+    for r in range(rounds + 1):
+        t = perf_counter()
+        acc = FedAvgAccumulator()
+        train_peers(clients, xs, ys, xts, yts, batch_size, [peer_seed(42, r, i) for i in range(len(xs))],
+                    accumulator=acc)
+        clients.set_global(acc.result())
+        times.append(perf_counter() - t)
+    _, test_acc = clients.global_model().evaluate(*test, verbose=0)
+    return {"round_sec": round(min(times[1:]), 3), "first_round_sec": round(times[0], 3),
+            "test_acc": round(float(test_acc), 4)}
+
+
+def run(clients: list[int], samples: int, rounds: int, batch_size: int, mnist: bool) -> list[dict]:
+    rows = []
+    for n in clients:
+        data, test = _mnist(n) if mnist else _synthetic(n, samples)
+        base = None
+        for name, make in (("loop", lambda: SharedModelClients(n)), ("batched", lambda: BatchedClients(n))):
+            res = run_engine(make, data, test, rounds, batch_size)
+            base = base or res["round_sec"]
+            rows.append({"engine": name, "clients": n, **res, "speedup": round(base / res["round_sec"], 2)})
+    return rows
+
+
+def main(argv: list[str]) -> int:
+    p = argparse.ArgumentParser(description="Benchmark the batched multi-client engine")
+    p.add_argument("--clients", default="5,50,500", help="Comma-separated client counts")
+    p.add_argument("--samples", type=int, default=60000, help="Synthetic training rows, split across clients")
+    p.add_argument("--rounds", type=int, default=1, help="Timed rounds after the warm-up round")
+    p.add_argument("--batch-size", type=int, default=64)
+    p.add_argument("--mnist", action="store_true", help="Use MNIST and report the global test accuracy")
+    p.add_argument("--json", action="store_true")
+    args = p.parse_args(argv)
+
+    rows = run([int(c) for c in args.clients.split(",") if c.strip()], args.samples, args.rounds,
+               args.batch_size, args.mnist)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return 0
+    print(f"{'engine':>8} {'clients':>8} {'round_s':>8} {'first_s':>8} {'speedup':>8} {'test_acc':>9}")
+    for r in rows:
+        print(f"{r['engine']:>8} {r['clients']:>8} {r['round_sec']:>8.3f} {r['first_round_sec']:>8.3f} "
+              f"{r['speedup']:>8.2f} {r['test_acc']:>9.4f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
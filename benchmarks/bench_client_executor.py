@@ -0,0 +1,90 @@
+"""Per-model clients vs one shared compiled model: startup, round time, peak RSS.
+
+    PYTHONPATH=src python benchmarks/bench_client_executor.py --clients 10,100,500
+
+Each (mode, clients) pair runs in a fresh subprocess so peak RSS is not
+shared between configurations. Data is synthetic MNIST-shaped (60k
+samples split evenly), one local round + FedAvg + global evaluation.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+from time import perf_counter
+
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "3")
+
+
+def child(mode: str, num_clients: int, samples: int) -> dict:
+    import numpy as np
+    from tensorflow import keras
+    from federated.model_manager import build_client_model, FedAvgAccumulator
+    from federated.client_executor import train_peers, peer_seed, ModelClients, SharedModelClients
+
+    rng = np.random.default_rng(0)
+    x = rng.random((samples, 28, 28), dtype=np.float32)
+    y = rng.integers(0, 10, samples)
+    chunk = samples // num_clients
+    xs = [x[i * chunk:(i + 1) * chunk] for i in range(num_clients)]
+    ys = [y[i * chunk:(i + 1) * chunk] for i in range(num_clients)]
+
+    keras.utils.set_random_seed(42)
+    t = perf_counter()
+    if mode == "shared":
+        clients = SharedModelClients(num_clients)
+    else:
+        clients = ModelClients([build_client_model() for _ in range(num_clients)])
+    startup = perf_counter() - t
+
+    t = perf_counter()
+    acc = FedAvgAccumulator()
+    seeds = [peer_seed(42, 0, i) for i in range(num_clients)]
+    _, _, hashes = train_peers(clients, xs, ys, xs, ys, 64, seeds, accumulator=acc)
+    clients.set_global(acc.result())
+    clients.global_model().evaluate(x[:10000], y[:10000], verbose=0)
+    round_sec = perf_counter() - t
+
+    return {"mode": mode, "clients": num_clients, "startup_sec": round(startup, 2),
+            "round_sec": round(round_sec, 2),
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            "first_hash": hashes[0]}
+
+
+def main(argv: list[str]) -> int:
+    p = argparse.ArgumentParser(description="Benchmark per-model vs shared-model client execution")
+    p.add_argument("--clients", default="10,100,500", help="Comma-separated client counts")
+    p.add_argument("--modes", default="per_model,shared")
+    p.add_argument("--samples", type=int, default=60000)
+    p.add_argument("--json", action="store_true")
+    p.add_argument("--child", nargs=2, metavar=("MODE", "CLIENTS"), help=argparse.SUPPRESS)
+    args = p.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(child(args.child[0], int(args.child[1]), args.samples)))
+        return 0
+
+    rows = []
+    for n in [int(c) for c in args.clients.split(",") if c.strip()]:
+        for mode in args.modes.split(","):
+            out = subprocess.run([sys.executable, __file__, "--child", mode, str(n), "--samples", str(args.samples)],
+                                 capture_output=True, text=True)
+            if out.returncode != 0:
+                rows.append({"mode": mode, "clients": n, "error": out.stderr.strip().splitlines()[-1:]})
+                continue
+            rows.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print(f"{'clients':>8} {'mode':>10} {'startup_s':>10} {'round_s':>8} {'peak_rss_MB':>12}")
+        for r in rows:
+            if "error" in r:
+                print(f"{r['clients']:>8} {r['mode']:>10}  error: {r['error']}")
+                continue
+            print(f"{r['clients']:>8} {r['mode']:>10} {r['startup_sec']:>10.2f} {r['round_sec']:>8.2f} {r['peak_rss_mb']:>12.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,70 @@
+"""Round latency vs registered peers: every client per round vs a sampled subset.
+
+    PYTHONPATH=src python benchmarks/bench_client_sampling.py --clients 10,100,300 --per-round 10
+
+Uses the shared-model client layout and synthetic MNIST-shaped data, with
+`--samples-per-client` samples per client, so each client's local update costs
+the same whatever the population. One round is local updates + FedAvg. Client
+setup is not timed. `--deadline` adds a straggler deadline (seconds) to the
+sampled rounds.
+"""
+import argparse
+import json
+import os
+import sys
+from time import perf_counter
+
+import numpy as np
+
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "3")
+
+
+def run(client_counts: list[int], per_round: int, samples: int, deadline: float | None = None) -> list[dict]:
+    from tensorflow import keras
+    from federated.model_manager import FedAvgAccumulator
+    from federated.client_executor import train_peers, peer_seed, sample_clients, SharedModelClients
+
+    rows = []
+    for n in client_counts:
+        rng = np.random.default_rng(0)
+        xs = [rng.random((samples, 28, 28), dtype=np.float32) for _ in range(n)]
+        ys = [rng.integers(0, 10, samples) for _ in range(n)]
+        keras.utils.set_random_seed(42)
+        clients = SharedModelClients(n)
+        seeds = [peer_seed(42, 0, i) for i in range(n)]
+        row = {"clients": n}
+        for mode, peers, dl in (("all", None, None), ("sampled", sample_clients(n, per_round, 42, 0), deadline)):
+            acc = FedAvgAccumulator()
+            t = perf_counter()
+            _, _, hashes = train_peers(clients, xs, ys, xs, ys, 32, seeds, accumulator=acc, peers=peers,
+                                       deadline_sec=dl)
+            acc.result()
+            row[f"{mode}_round_sec"] = round(perf_counter() - t, 3)
+            row[f"{mode}_participants"] = sum(h is not None for h in hashes)
+        rows.append(row)
+    return rows
+
+
+def main(argv: list[str]) -> int:
+    p = argparse.ArgumentParser(description="Benchmark round latency with and without client sampling")
+    p.add_argument("--clients", default="10,100,300", help="Comma-separated registered client counts")
+    p.add_argument("--per-round", type=int, default=10, help="Clients sampled per round")
+    p.add_argument("--samples-per-client", type=int, default=256)
+    p.add_argument("--deadline", type=float, default=None, help="Straggler deadline for the sampled rounds (s)")
+    p.add_argument("--json", action="store_true")
+    args = p.parse_args(argv)
+
+    rows = run([int(x) for x in args.clients.split(",") if x.strip()], args.per_round, args.samples_per_client,
+               args.deadline)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print(f"{'clients':>8} {'all_s':>8} {'sampled_s':>10} {'sampled_n':>10}")
+        for r in rows:
+            print(f"{r['clients']:>8} {r['all_round_sec']:>8.2f} {r['sampled_round_sec']:>10.2f} "
+                  f"{r['sampled_participants']:>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,136 @@
+"""Default Keras round vs the compiled fast path (`run_federated(fast=True)`), on CPU.
+
+    PYTHONPATH=src python benchmarks/bench_fast_path.py --clients 5
+    PYTHONPATH=src python benchmarks/bench_fast_path.py --clients 5,20 --mnist --rounds 3
+
+One round is what `run_federated` does per round with a shared model:
+local epoch for every client, FedAvg, then each client's test accuracy
+and the global test accuracy. `--samples` training rows (default 60000)
+are split evenly across the clients, and `--test-samples` rows (default
+10000) make up the test set, split the same way. Rows:
+
+    default   SharedModelClients: fit with validation_split, one evaluate per client, then the global evaluate
+    fast      XLA-compiled train step fed by ClientDatasets (tf.data), then one StackedEvaluator call
+              for all clients plus the global model
+
+`round_s` / `round_cpu_s` are the best wall / process CPU time of the rounds
+after a warm-up round (tracing, XLA compilation: `first_s`). With
+`--mnist`, real MNIST (IID split) is used and the global test accuracy
+after the timed rounds is reported. Synthetic data is random, so its
+accuracies mean nothing.
+"""
+import argparse
+import json
+import os
+import sys
+from functools import partial
+from time import perf_counter, process_time
+
+import numpy as np
+
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "3")
+
+from tensorflow import keras
+from federated.batched_clients import StackedEvaluator
+from federated.client_executor import train_peers, peer_seed, SharedModelClients, ClientDatasets
+from federated.model_manager import FedAvgAccumulator, build_client_model
+
+
+def _synthetic(n: int, samples: int, test_samples: int):
+    rng = np.random.default_rng(0)
+    per, per_test = samples // n, test_samples // n
+    xs = [rng.random((per, 28, 28), dtype=np.float32) for _ in range(n)]
+    ys = [rng.integers(0, 10, per) for _ in range(n)]
+    xts = [rng.random((per_test, 28, 28), dtype=np.float32) for _ in range(n)]
+    yts = [rng.integers(0, 10, per_test) for _ in range(n)]
+    return (xs, ys, xts, yts), (np.concatenate(xts), np.concatenate(yts))
+
+
+def _mnist(n: int):
+    from federated.data_handler import load_mnist_normalized, split_among_clients
+    (xtr, ytr), (xte, yte) = load_mnist_normalized()
+    xs, ys = split_among_clients(xtr, ytr, n, "iid")
+    xts, yts = split_among_clients(xte, yte, n, "iid")
+    return (xs, ys, xts, yts), (xte, yte)
+
+
+def _default_round(clients, data, test, batch_size, seeds):
+    xs, ys, xts, yts = data
+    acc = FedAvgAccumulator()
+    _, accs, _ = train_peers(clients, xs, ys, xts, yts, batch_size, seeds, accumulator=acc)
+    clients.set_global(acc.result())
+    _, test_acc = clients.global_model().evaluate(*test, verbose=0)
+    return float(test_acc)
+
+
+def _fast_round(clients, inputs, evaluator, batch_size, seeds):
+    n = len(seeds)
+    acc, kept = FedAvgAccumulator(), {}
+    train_peers(clients, None, None, None, None, batch_size, seeds, accumulator=acc,
+                on_peer=lambda i, w, h: kept.__setitem__(i, w), inputs=inputs)
+    avg_w = acc.result()
+    clients.set_global(avg_w)
+    return evaluator({**kept, n: avg_w})[n][1]
+
+
+def run_engine(fast: bool, data, test, rounds: int, batch_size: int) -> dict:
+    keras.utils.set_random_seed(42)
+    n = len(data[0])
+    if fast:
+        xs, ys, xts, yts = data
+        clients = SharedModelClients(n, build_fn=partial(build_client_model, jit_compile=True))
+        inputs = ClientDatasets(xs, ys)
+        evaluator = StackedEvaluator(build_client_model(), list(xts) + [test[0]], list(yts) + [test[1]])
+        step = lambda seeds: _fast_round(clients, inputs, evaluator, batch_size, seeds)
+    else:
+        clients = SharedModelClients(n)
+        step = lambda seeds: _default_round(clients, data, test, batch_size, seeds)
+    walls, cpus = [], []
+    for r in range(rounds + 1):
+        t, c = perf_counter(), process_time()
+        test_acc = step([peer_seed(42, r, i) for i in range(n)])
+        walls.append(perf_counter() - t)
+        cpus.append(process_time() - c)
+    return {"round_sec": round(min(walls[1:]), 3), "round_cpu_sec": round(min(cpus[1:]), 3),
+            "first_round_sec": round(walls[0], 3), "test_acc": round(float(test_acc), 4)}
+
+
+def run(clients: list[int], samples: int, test_samples: int, rounds: int, batch_size: int,
+        mnist: bool) -> list[dict]:
+    rows = []
+    for n in clients:
+        data, test = _mnist(n) if mnist else _synthetic(n, samples, test_samples)
+        base = None
+        for name, fast in (("default", False), ("fast", True)):
+            res = run_engine(fast, data, test, rounds, batch_size)
+            base = base or res["round_cpu_sec"]
+            rows.append({"engine": name, "clients": n, **res,
+                         "cpu_speedup": round(base / res["round_cpu_sec"], 2)})
+    return rows
+
+
+def main(argv: list[str]) -> int:
+    p = argparse.ArgumentParser(description="Benchmark the compiled training/evaluation fast path")
+    p.add_argument("--clients", default="5", help="Comma-separated client counts")
+    p.add_argument("--samples", type=int, default=60000, help="Synthetic training rows, split across clients")
+    p.add_argument("--test-samples", type=int, default=10000, help="Synthetic test rows, split across clients")
+    p.add_argument("--rounds", type=int, default=2, help="Timed rounds after the warm-up round")
+    p.add_argument("--batch-size", type=int, default=64)
+    p.add_argument("--mnist", action="store_true", help="Use MNIST and report the global test accuracy")
+    p.add_argument("--json", action="store_true")
+    args = p.parse_args(argv)
+
+    rows = run([int(c) for c in args.clients.split(",") if c.strip()], args.samples, args.test_samples,
+               args.rounds, args.batch_size, args.mnist)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return 0
+    print(f"{'engine':>8} {'clients':>8} {'round_s':>8} {'cpu_s':>8} {'first_s':>8} {'cpu_x':>6} {'test_acc':>9}")
+    for r in rows:
+        print(f"{r['engine']:>8} {r['clients']:>8} {r['round_sec']:>8.3f} {r['round_cpu_sec']:>8.3f} "
+              f"{r['first_round_sec']:>8.3f} {r['cpu_speedup']:>6.2f} {r['test_acc']:>9.4f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
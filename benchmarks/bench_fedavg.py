@@ -0,0 +1,82 @@
+"""FedAvg scaling: stacked `average_layerwise` vs streaming `FedAvgAccumulator`.
+
+    PYTHONPATH=src python benchmarks/bench_fedavg.py --clients 10,100,1000
+
+Client weights are synthetic and shaped like `build_client_model()` (MLP
+784-128-64-10). The legacy path needs every client's weights in memory plus
+the stacked temporary; the accumulator folds clients in one at a time.
+Peak memory is the tracemalloc peak of generate + aggregate.
+"""
+import argparse
+import json
+import sys
+import tracemalloc
+from time import perf_counter
+
+import numpy as np
+
+from federated.model_manager import average_layerwise, FedAvgAccumulator
+
+MLP_SHAPES = [(784, 128), (128,), (128, 64), (64,), (64, 10), (10,)]
+
+
+def _client_weights(rng, shapes):
+    return [rng.standard_normal(s, dtype=np.float32) for s in shapes]
+
+
+def legacy(num_clients: int, shapes, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    clients = [_client_weights(rng, shapes) for _ in range(num_clients)]
+    return average_layerwise(clients)
+
+
+def streaming(num_clients: int, shapes, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    acc = FedAvgAccumulator()
+    for _ in range(num_clients):
+        acc.add(_client_weights(rng, shapes))
+    return acc.result()
+
+
+def _measure(fn, *args):
+    tracemalloc.start()
+    t = perf_counter()
+    out = fn(*args)
+    elapsed = perf_counter() - t
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return out, elapsed, peak / 2**20
+
+
+def run(client_counts: list[int], shapes=MLP_SHAPES) -> list[dict]:
+    model_mb = sum(int(np.prod(s)) for s in shapes) * 4 / 2**20
+    rows = []
+    for n in client_counts:
+        ref, t_legacy, p_legacy = _measure(legacy, n, shapes)
+        out, t_stream, p_stream = _measure(streaming, n, shapes)
+        assert all(np.array_equal(a, b) for a, b in zip(ref, out))
+        rows.append({"clients": n, "model_mb": round(model_mb, 3),
+                     "legacy_sec": round(t_legacy, 4), "legacy_peak_mb": round(p_legacy, 1),
+                     "stream_sec": round(t_stream, 4), "stream_peak_mb": round(p_stream, 1)})
+    return rows
+
+
+def main(argv: list[str]) -> int:
+    p = argparse.ArgumentParser(description="Benchmark stacked vs streaming FedAvg")
+    p.add_argument("--clients", default="10,100,1000", help="Comma-separated client counts")
+    p.add_argument("--json", action="store_true")
+    args = p.parse_args(argv)
+
+    rows = run([int(x) for x in args.clients.split(",") if x.strip()])
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print(f"{'clients':>8} {'legacy_s':>9} {'legacy_MB':>10} {'stream_s':>9} {'stream_MB':>10}")
+        for r in rows:
+            print(f"{r['clients']:>8} {r['legacy_sec']:>9.3f} {r['legacy_peak_mb']:>10.1f} "
+                  f"{r['stream_sec']:>9.3f} {r['stream_peak_mb']:>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
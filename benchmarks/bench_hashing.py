@@ -0,0 +1,83 @@
+"""Weight hashing: concatenate + tobytes vs streaming per-layer Keccak.
+
+    PYTHONPATH=src python benchmarks/bench_hashing.py --mb 256 --layers 8
+
+Peak memory is the tracemalloc peak of the hashing call (NumPy reports its
+buffers to tracemalloc); memory-mapped pages are not counted.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+from time import perf_counter
+
+import numpy as np
+from Crypto.Hash import keccak
+
+from federated.utils import hash_weight_list
+
+
+def legacy_hash(weights) -> str:
+    # The former path: utils.hash_weights(utils.flatten_weights(weights))
+    k = keccak.new(digest_bits=256)
+    k.update(np.concatenate([w.flatten() for w in weights]).tobytes())
+    return k.hexdigest()
+
+
+def _measure(fn, *args):
+    tracemalloc.start()
+    t = perf_counter()
+    out = fn(*args)
+    elapsed = perf_counter() - t
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return out, elapsed, peak
+
+
+def make_weights(total_mb: int, layers: int) -> list[np.ndarray]:
+    n = total_mb * 2**20 // 4 // layers
+    rng = np.random.default_rng(0)
+    return [rng.standard_normal((n // 256, 256), dtype=np.float32) for _ in range(layers)]
+
+
+def run(total_mb: int, layers: int) -> list[dict]:
+    weights = make_weights(total_mb, layers)
+    rows = []
+    h_legacy, t, peak = _measure(legacy_hash, weights)
+    rows.append({"case": "list: concat+tobytes", "sec": t, "peak_mb": peak / 2**20})
+    h_stream, t, peak = _measure(hash_weight_list, weights)
+    rows.append({"case": "list: streaming", "sec": t, "peak_mb": peak / 2**20})
+    assert h_legacy == h_stream
+
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "flat.npy")
+        np.save(path, np.concatenate([w.ravel() for w in weights]))
+        del weights
+        _, t, peak = _measure(lambda: legacy_hash([np.load(path)]))
+        rows.append({"case": ".npy: load+tobytes", "sec": t, "peak_mb": peak / 2**20})
+        _, t, peak = _measure(lambda: hash_weight_list([np.load(path, mmap_mode="r")]))
+        rows.append({"case": ".npy: mmap+streaming", "sec": t, "peak_mb": peak / 2**20})
+    return rows
+
+
+def main(argv: list[str]) -> int:
+    p = argparse.ArgumentParser(description="Benchmark legacy vs streaming weight hashing")
+    p.add_argument("--mb", type=int, default=256, help="Total weight size in MB")
+    p.add_argument("--layers", type=int, default=8)
+    p.add_argument("--json", action="store_true")
+    args = p.parse_args(argv)
+
+    rows = run(args.mb, args.layers)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print(f"weights: {args.mb} MB in {args.layers} layers")
+        for r in rows:
+            print(f"{r['case']:<24} {r['sec']:8.3f} s {r['peak_mb']:10.1f} MB peak")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
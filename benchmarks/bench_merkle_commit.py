@@ -0,0 +1,80 @@
+"""Round commitment cost: per-peer mints vs one aggregator mint carrying a Merkle root.
+
+Requires a local anvil node and compiled contracts (`make build`):
+
+    anvil --port 7545 --block-time 1 &
+    PYTHONPATH=src python benchmarks/bench_merkle_commit.py --peers 5,50,500
+
+Per-peer flow: every FedPeerNFT.mint plus FedAggregatorNFT.mint, submitted
+back to back (`mint_round_pipelined`, the fastest existing path; `--serial`
+adds the one-receipt-at-a-time flow). Merkle flow: build the tree over the
+same payloads and send `mintWithPeersRoot`. Gas is the sum of `gasUsed`
+over the round's receipts; time covers submission until the last receipt.
+"""
+import argparse
+import json
+import os
+import sys
+from time import perf_counter
+
+from bench_tx_submission import DEFAULT_AGG_KEY, _payload, deploy
+from federated.merkle import build_round_proofs
+
+
+def _gas(receipts) -> int:
+    return sum(int(r["gasUsed"]) for r in receipts)
+
+
+def run(rpc_url: str, agg_key: str, peer_counts: list[int], serial: bool = False) -> list[dict]:
+    rows = []
+    for n in peer_counts:
+        w3c = deploy(rpc_url, agg_key, n)
+        round_id = w3c.get_current_round()
+
+        round_id += 1
+        payloads = {i: _payload(i, round_id) for i in range(n)}
+        t = perf_counter()
+        peer_receipts, agg_receipt = w3c.mint_round_pipelined(round_id, payloads, "cd" * 32, "{}")
+        rows.append({"peers": n, "flow": "per-peer pipelined", "txs": n + 1,
+                     "gas": _gas(peer_receipts + [agg_receipt]), "sec": round(perf_counter() - t, 3)})
+
+        if serial:
+            round_id += 1
+            t = perf_counter()
+            receipts = [w3c.mint_peer_round(round_id, _payload(i, round_id), i) for i in range(n)]
+            receipts.append(w3c.mint_aggregator_round("cd" * 32, "{}"))
+            rows.append({"peers": n, "flow": "per-peer serial", "txs": n + 1,
+                         "gas": _gas(receipts), "sec": round(perf_counter() - t, 3)})
+
+        round_id += 1
+        payloads = [_payload(i, round_id) for i in range(n)]
+        t = perf_counter()
+        root, _ = build_round_proofs(payloads)
+        tree_sec = perf_counter() - t
+        receipt = w3c.mint_aggregator_round_with_root("cd" * 32, "{}", root)
+        rows.append({"peers": n, "flow": "merkle root", "txs": 1, "gas": _gas([receipt]),
+                     "sec": round(perf_counter() - t, 3), "tree_ms": round(tree_sec * 1000, 2)})
+    return rows
+
+
+def main(argv: list[str]) -> int:
+    p = argparse.ArgumentParser(description="Benchmark per-peer mints vs Merkle-root round commitment on anvil")
+    p.add_argument("--rpc-url", default=os.getenv("RPC_URL", "http://127.0.0.1:7545"))
+    p.add_argument("--agg-key", default=DEFAULT_AGG_KEY, help="Funded aggregator key (default: anvil account #0)")
+    p.add_argument("--peers", default="5,50,500", help="Comma-separated peer counts")
+    p.add_argument("--serial", action="store_true", help="Also measure the serial per-peer flow")
+    p.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = p.parse_args(argv)
+
+    rows = run(args.rpc_url, args.agg_key, [int(x) for x in args.peers.split(",") if x.strip()], args.serial)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print(f"{'peers':>6} {'flow':>20} {'txs':>5} {'gas':>12} {'sec':>9}")
+        for r in rows:
+            print(f"{r['peers']:>6} {r['flow']:>20} {r['txs']:>5} {r['gas']:>12} {r['sec']:>9.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,75 @@
+"""Gas per round: JSON strings (`mint`) vs compact bytes32 records (`mintCompact`).
+
+Requires a local anvil node and compiled contracts (`make build`):
+
+    anvil --port 7545 &
+    PYTHONPATH=src python benchmarks/bench_onchain_encoding.py --peers 5,25 --rounds 3
+
+Each encoding gets fresh contracts and runs `--rounds` rounds through the
+connector (every peer mint + the aggregator mint, pipelined). Reported gas is
+the mean `gasUsed` of a round after the first one (the first round pays for
+zero -> non-zero writes of the counters), split into peer and aggregator txs.
+"""
+import argparse
+import json
+import os
+import sys
+
+from bench_tx_submission import DEFAULT_AGG_KEY, deploy
+from federated.compact import canonical_peer_info, canonical_round_info
+
+
+def _peer_info(peer_idx: int, round_id: int) -> str:
+    return canonical_peer_info(json.dumps({"peer_id": peer_idx + 1, "round": round_id, "weight_hash": f"{round_id:064x}",
+                                           "test_accuracy": 0.9123456}, separators=(",", ":")))
+
+
+def _round_info(round_id: int, peers: int) -> str:
+    return canonical_round_info(json.dumps({
+        "round_id": round_id, "timestamp": "2025-01-01T00:00:00Z", "duration_sec": 12.3456, "participants": peers,
+        "local_epochs": 1, "batch_size": 64, "avg_round_accuracy": 0.9123456, "lr": 0.001,
+    }, separators=(",", ":")))
+
+
+def run(rpc_url: str, agg_key: str, peer_counts: list[int], rounds: int = 3) -> list[dict]:
+    rows = []
+    for n in peer_counts:
+        for encoding in ("json", "compact"):
+            w3c = deploy(rpc_url, agg_key, n)
+            w3c.encoding = encoding
+            peer_gas, agg_gas = [], []
+            for round_id in range(1, rounds + 1):
+                peer_receipts, agg_receipt = w3c.mint_round_pipelined(
+                    round_id, {i: _peer_info(i, round_id) for i in range(n)}, "cd" * 32, _round_info(round_id, n))
+                peer_gas.append(sum(int(r["gasUsed"]) for r in peer_receipts))
+                agg_gas.append(int(agg_receipt["gasUsed"]))
+            steady = slice(1, None) if rounds > 1 else slice(None)
+            mean = lambda xs: round(sum(xs[steady]) / len(xs[steady]))
+            rows.append({"peers": n, "encoding": encoding, "peer_gas": mean(peer_gas), "agg_gas": mean(agg_gas),
+                         "round_gas": mean([p + a for p, a in zip(peer_gas, agg_gas)]),
+                         "first_round_gas": peer_gas[0] + agg_gas[0]})
+    return rows
+
+
+def main(argv: list[str]) -> int:
+    p = argparse.ArgumentParser(description="Benchmark gas per round of the JSON and compact on-chain encodings")
+    p.add_argument("--rpc-url", default=os.getenv("RPC_URL", "http://127.0.0.1:7545"))
+    p.add_argument("--agg-key", default=DEFAULT_AGG_KEY, help="Funded aggregator key (default: anvil account #0)")
+    p.add_argument("--peers", default="5,25", help="Comma-separated peer counts")
+    p.add_argument("--rounds", type=int, default=3)
+    p.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = p.parse_args(argv)
+
+    rows = run(args.rpc_url, args.agg_key, [int(x) for x in args.peers.split(",") if x.strip()], args.rounds)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print(f"{'peers':>6} {'encoding':>9} {'peer_gas':>10} {'agg_gas':>9} {'round_gas':>10} {'first_round':>12}")
+        for r in rows:
+            print(f"{r['peers']:>6} {r['encoding']:>9} {r['peer_gas']:>10} {r['agg_gas']:>9} "
+                  f"{r['round_gas']:>10} {r['first_round_gas']:>12}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
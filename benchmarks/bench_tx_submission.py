@@ -0,0 +1,134 @@
+"""On-chain phase of a round: legacy serial `_send_tx` vs pipelined submission.
+
+Requires a local anvil node and compiled contracts (`make build`):
+
+    anvil --port 7545 --block-time 1 &
+    PYTHONPATH=src python benchmarks/bench_tx_submission.py --peers 5,10,25,50,100
+
+With `--block-time 0` (automine) receipts arrive immediately and the gap
+shrinks to the saved RPC round trips; with a real block time the serial
+flow pays one confirmation wait per transaction.
+"""
+import argparse
+import json
+import os
+import sys
+from time import perf_counter
+
+from eth_account import Account
+from web3 import Web3
+
+# anvil default account #0
+DEFAULT_AGG_KEY = "0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80"
+
+
+def _artifact(name: str, contract: str):
+    with open(os.path.join("out", name, f"{contract}.json")) as f:
+        art = json.load(f)
+    return art["abi"], art["bytecode"]["object"]
+
+
+def legacy_send_tx(w3c, acct, fn):
+    # The pre-pipelining flow: 4 RPC lookups per tx + a blocking receipt wait
+    w3 = w3c.w3
+    tx = fn.build_transaction({
+        "from": acct.address,
+        "nonce": w3.eth.get_transaction_count(acct.address),
+        "gas": fn.estimate_gas({"from": acct.address}),
+        "gasPrice": w3.eth.gas_price,
+        "chainId": w3.eth.chain_id,
+    })
+    signed = w3.eth.account.sign_transaction(tx, private_key=acct.key)
+    raw = getattr(signed, "rawTransaction", None) or getattr(signed, "raw_transaction", None)
+    return w3.eth.wait_for_transaction_receipt(w3.eth.send_raw_transaction(raw))
+
+
+def deploy(rpc_url: str, agg_key: str, num_peers: int):
+    """Deploy one aggregator + `num_peers` peer contracts and export the .env layout."""
+    w3 = Web3(Web3.HTTPProvider(rpc_url))
+    agg_abi, agg_bin = _artifact("FedAggregator.sol", "FedAggregatorNFT")
+    peer_abi, peer_bin = _artifact("FedPeer.sol", "FedPeerNFT")
+    os.makedirs("logs", exist_ok=True)
+    agg_abi_path, peer_abi_path = "logs/bench_agg_abi.json", "logs/bench_peer_abi.json"
+    for path, abi in ((agg_abi_path, agg_abi), (peer_abi_path, peer_abi)):
+        with open(path, "w") as f:
+            json.dump(abi, f)
+
+    agg = Account.from_key(agg_key)
+    peers = [Account.create() for _ in range(num_peers)]
+    for p in peers:
+        w3.provider.make_request("anvil_setBalance", [p.address, hex(10**20)])
+
+    # Bootstrap a connector on the aggregator key only to reuse the submission engine
+    from federated.blockchain_connector import Web3Connector
+    boot = object.__new__(Web3Connector)
+    boot.w3 = w3
+    boot._init_tx_state()
+
+    agg_tx = boot._submit_tx(agg, w3.eth.contract(abi=agg_abi, bytecode=agg_bin).constructor(agg.address, "bench"))
+    agg_addr = boot._wait_receipts([agg_tx])[0]["contractAddress"]
+    peer_factory = w3.eth.contract(abi=peer_abi, bytecode=peer_bin)
+    hashes = [boot._submit_tx(agg, peer_factory.constructor(p.address, agg_addr)) for p in peers]
+    peer_addrs = [r["contractAddress"] for r in boot._wait_receipts(hashes)]
+
+    os.environ.update({
+        "WEB3_HTTP_PROVIDER": rpc_url,
+        "AGGREGATOR_PRIVATE_KEY": agg_key,
+        "AGGREGATOR_CONTRACT_ADDRESS": agg_addr,
+        "AGGREGATOR_ABI_PATH": agg_abi_path,
+        "CLIENT_ABI_PATH": peer_abi_path,
+        "CLIENT_PRIVATE_KEYS": ",".join(p.key.hex() for p in peers),
+        "CLIENT_CONTRACT_ADDRESSES": ",".join(peer_addrs),
+    })
+    return Web3Connector()
+
+
+def _payload(peer_idx: int, round_id: int) -> str:
+    return json.dumps({"peer_id": peer_idx + 1, "round": round_id, "weight_hash": "ab" * 32,
+                       "test_accuracy": 0.9}, separators=(",", ":"))
+
+
+def run(rpc_url: str, agg_key: str, peer_counts: list[int]) -> list[dict]:
+    results = []
+    for n in peer_counts:
+        w3c = deploy(rpc_url, agg_key, n)
+        round_id = 0
+
+        round_id += 1
+        t = perf_counter()
+        for i in range(n):
+            c = w3c.client_contracts[i]
+            legacy_send_tx(w3c, c["acct"], c["contract"].functions.mint(round_id, _payload(i, round_id)))
+        legacy_send_tx(w3c, w3c.agg_acct, w3c.agg_contract.functions.mint("cd" * 32, "{}"))
+        serial = perf_counter() - t
+
+        round_id += 1
+        t = perf_counter()
+        w3c.mint_round_pipelined(round_id, {i: _payload(i, round_id) for i in range(n)}, "cd" * 32, "{}")
+        pipelined = perf_counter() - t
+
+        results.append({"peers": n, "txs": n + 1, "serial_sec": round(serial, 3),
+                        "pipelined_sec": round(pipelined, 3), "speedup": round(serial / pipelined, 2)})
+    return results
+
+
+def main(argv: list[str]) -> int:
+    p = argparse.ArgumentParser(description="Benchmark serial vs pipelined round minting on anvil")
+    p.add_argument("--rpc-url", default=os.getenv("RPC_URL", "http://127.0.0.1:7545"))
+    p.add_argument("--agg-key", default=DEFAULT_AGG_KEY, help="Funded aggregator key (default: anvil account #0)")
+    p.add_argument("--peers", default="5,10,25,50,100", help="Comma-separated peer counts")
+    p.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = p.parse_args(argv)
+
+    results = run(args.rpc_url, args.agg_key, [int(x) for x in args.peers.split(",") if x.strip()])
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'peers':>6} {'txs':>5} {'serial_s':>9} {'pipelined_s':>12} {'speedup':>8}")
+        for r in results:
+            print(f"{r['peers']:>6} {r['txs']:>5} {r['serial_sec']:>9.3f} {r['pipelined_sec']:>12.3f} {r['speedup']:>7.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,131 @@
+"""Client update codecs: bytes per round, encode/decode throughput, accuracy impact.
+
+    PYTHONPATH=src python benchmarks/bench_update_codec.py --codecs none,fp16,int8,topk:0.01,int8+topk:0.01
+    PYTHONPATH=src python benchmarks/bench_update_codec.py --accuracy --rounds 5 --clients 5
+
+Throughput uses synthetic updates shaped like `build_client_model()` (MLP
+784-128-64-10): a reference drawn once and a small random delta per client.
+Throughput is reported in MB of float32 weights per second. `bytes_per_round`
+is the update bytes all `--clients` peers send in one round.
+
+`--accuracy` trains on MNIST exactly like `run_federated` does, minus the
+chain: shared model, IID split, `--rounds` rounds of local epoch + FedAvg
+over the decoded updates. It reports the global test accuracy after the last
+round for each codec.
+"""
+import argparse
+import json
+import os
+import sys
+from time import perf_counter
+
+import numpy as np
+
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "3")
+
+from federated.update_codec import decode_update, parse_codec
+
+MLP_SHAPES = [(784, 128), (128,), (128, 64), (64,), (64, 10), (10,)]
+
+
+def _timed(fn, repeat: int):
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t = perf_counter()
+        out = fn()
+        best = min(best, perf_counter() - t)
+    return out, best
+
+
+def throughput(specs: list[str], clients: int, repeat: int = 5, seed: int = 0) -> list[dict]:
+    rng = np.random.default_rng(seed)
+    ref = [rng.standard_normal(s, dtype=np.float32) * 0.05 for s in MLP_SHAPES]
+    w = [r + rng.standard_normal(r.shape, dtype=np.float32) * 0.01 for r in ref]
+    raw = sum(x.nbytes for x in w)
+    rows = []
+    for spec in specs:
+        codec = parse_codec(spec)
+        if codec is None:
+            rows.append({"codec": "none", "update_bytes": raw, "ratio": 1.0, "bytes_per_round": raw * clients,
+                         "encode_mb_s": None, "decode_mb_s": None, "max_abs_err": 0.0})
+            continue
+        (update, _), t_enc = _timed(lambda: codec.encode(w, ref), repeat)
+        decoded, t_dec = _timed(lambda: decode_update(update, ref), repeat)
+        rows.append({"codec": codec.spec, "update_bytes": len(update), "ratio": round(len(update) / raw, 4),
+                     "bytes_per_round": len(update) * clients,
+                     "encode_mb_s": round(raw / 2**20 / t_enc, 1), "decode_mb_s": round(raw / 2**20 / t_dec, 1),
+                     "max_abs_err": float(max(np.max(np.abs(d - x)) for d, x in zip(decoded, w)))})
+    return rows
+
+
+def accuracy(specs: list[str], clients: int, rounds: int, batch_size: int = 64) -> list[dict]:
+    from tensorflow import keras
+    from federated.data_handler import load_mnist_normalized, split_among_clients
+    from federated.model_manager import FedAvgAccumulator
+    from federated.client_executor import train_peers, peer_seed, SharedModelClients
+    from federated.instrumentation import Tracer, set_tracer
+
+    (xtr, ytr), (xte, yte) = load_mnist_normalized()
+    xs, ys = split_among_clients(xtr, ytr, clients, "iid")
+    xts, yts = split_among_clients(xte, yte, clients, "iid")
+    rows = []
+    for spec in specs:
+        codec = parse_codec(spec)
+        keras.utils.set_random_seed(42)
+        cl = SharedModelClients(clients)
+        global_w = cl.get_state(0)[0]
+        cl.set_global(global_w)  # same start for every codec
+        residuals = [None] * clients
+        tracer = Tracer()
+        prev = set_tracer(tracer)
+        total_bytes = 0
+        t = perf_counter()
+        try:
+            for r in range(rounds):
+                trace = tracer.begin(r, r + 1)
+                acc = FedAvgAccumulator()
+                train_peers(cl, xs, ys, xts, yts, batch_size, [peer_seed(42, r, i) for i in range(clients)],
+                            accumulator=acc, codec=codec, reference=global_w, residuals=residuals)
+                global_w = acc.result()
+                cl.set_global(global_w)
+                total_bytes += trace.counters.get("update_bytes", 0)
+        finally:
+            set_tracer(prev)
+        _, test_acc = cl.global_model().evaluate(xte, yte, verbose=0)
+        rows.append({"codec": "none" if codec is None else codec.spec, "rounds": rounds,
+                     "bytes_per_round": round(total_bytes / rounds), "test_acc": round(float(test_acc), 4),
+                     "train_sec": round(perf_counter() - t, 1)})
+    return rows
+
+
+def main(argv: list[str]) -> int:
+    p = argparse.ArgumentParser(description="Benchmark client update codecs")
+    p.add_argument("--codecs", default="none,fp16,int8,topk:0.01,int8+topk:0.01", help="Comma-separated codec specs")
+    p.add_argument("--clients", type=int, default=5)
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--accuracy", action="store_true", help="Also train on MNIST and report the test accuracy")
+    p.add_argument("--rounds", type=int, default=5, help="--accuracy: federated rounds")
+    p.add_argument("--json", action="store_true")
+    args = p.parse_args(argv)
+
+    specs = [s.strip() for s in args.codecs.split(",") if s.strip()]
+    rows = throughput(specs, args.clients, args.repeat)
+    acc_rows = accuracy(specs, args.clients, args.rounds) if args.accuracy else []
+    if args.json:
+        print(json.dumps({"throughput": rows, "accuracy": acc_rows}, indent=2))
+        return 0
+    print(f"{'codec':>16} {'bytes':>9} {'ratio':>7} {'bytes/round':>12} {'enc_MB/s':>9} {'dec_MB/s':>9} {'max_err':>9}")
+    for r in rows:
+        fmt = lambda v: "-" if v is None else f"{v:.1f}"
+        print(f"{r['codec']:>16} {r['update_bytes']:>9} {r['ratio']:>7.4f} {r['bytes_per_round']:>12} "
+              f"{fmt(r['encode_mb_s']):>9} {fmt(r['decode_mb_s']):>9} {r['max_abs_err']:>9.2e}")
+    if acc_rows:
+        print(f"\n{'codec':>16} {'rounds':>7} {'bytes/round':>12} {'test_acc':>9} {'train_s':>8}")
+        for r in acc_rows:
+            print(f"{r['codec']:>16} {r['rounds']:>7} {r['bytes_per_round']:>12} {r['test_acc']:>9.4f} "
+                  f"{r['train_sec']:>8.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,80 @@
+"""Weight exchange with peer workers: process pool vs socket workers (shared memory / socket frames).
+
+    PYTHONPATH=src python benchmarks/bench_worker_pool.py --sizes-mb 0.4,16,64 --repeat 5
+
+Each task sends a weight list of the given size to a worker and gets it back
+(`worker_pool._echo`), so the time is pure transfer: pickling, copies and IPC,
+no training. Rows:
+
+    process_pool   ProcessPoolExecutor (spawn), what `workers=N` uses
+    socket         WorkerPool with buffers sent as socket frames (remote hosts)
+    socket_shm     WorkerPool with buffers in /dev/shm segments (same host)
+
+0.4 MB is the MLP of `build_client_model()`.
+"""
+import argparse
+import json
+import os
+import sys
+from time import perf_counter
+
+import numpy as np
+
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "3")
+
+from federated.client_executor import make_process_pool
+from federated.worker_pool import WorkerPool, _echo
+
+
+def _weights(mb: float, layers: int = 6) -> list[np.ndarray]:
+    n = max(1, int(mb * 2**20 / 4 / layers))
+    rng = np.random.default_rng(0)
+    return [rng.random(n, dtype=np.float32) for _ in range(layers)]
+
+
+def _roundtrip(pool, weights, repeat: int) -> float:
+    list(pool.map(_echo, [weights]))  # warm-up
+    best = float("inf")
+    for _ in range(repeat):
+        t = perf_counter()
+        list(pool.map(_echo, [weights]))
+        best = min(best, perf_counter() - t)
+    return best
+
+
+def run(sizes_mb: list[float], repeat: int) -> list[dict]:
+    pools = {"process_pool": lambda: make_process_pool(1, 1),
+             "socket": lambda: WorkerPool(1, intra_op_threads=1, shm=False),
+             "socket_shm": lambda: WorkerPool(1, intra_op_threads=1)}
+    rows = []
+    for name, make in pools.items():
+        pool = make()
+        try:
+            for mb in sizes_mb:
+                t = _roundtrip(pool, _weights(mb), repeat)
+                rows.append({"transport": name, "size_mb": mb, "roundtrip_ms": round(t * 1e3, 2),
+                             "mb_s": round(2 * mb / t, 1)})
+        finally:
+            pool.shutdown()
+    return rows
+
+
+def main(argv: list[str]) -> int:
+    p = argparse.ArgumentParser(description="Benchmark weight exchange with peer workers")
+    p.add_argument("--sizes-mb", default="0.4,16,64", help="Comma-separated weight list sizes (MB)")
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--json", action="store_true")
+    args = p.parse_args(argv)
+
+    rows = run([float(s) for s in args.sizes_mb.split(",") if s.strip()], args.repeat)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return 0
+    print(f"{'transport':>13} {'size_MB':>8} {'roundtrip_ms':>13} {'MB/s':>8}")
+    for r in rows:
+        print(f"{r['transport']:>13} {r['size_mb']:>8} {r['roundtrip_ms']:>13.2f} {r['mb_s']:>8.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,329 @@
+"""Benchmark suite with JSON baselines: hashing, aggregation, partitioning, training and tx paths.
+
+    PYTHONPATH=src python benchmarks/suite.py run --out benchmarks/baselines/baseline.json
+    PYTHONPATH=src python benchmarks/suite.py run --out logs/bench_latest.json
+    PYTHONPATH=src python benchmarks/suite.py compare benchmarks/baselines/baseline.json logs/bench_latest.json
+
+Every case runs over the product of its scaling axes (model size, clients,
+rounds, transactions); `--quick` keeps the smallest value of each axis and
+`--only` selects cases by name prefix. Setup (synthetic weights/data,
+contract deployment) is not timed; each measurement is a warm-up call
+followed by `repeat` timed calls, and the median is what `compare` uses.
+
+Everything runs offline on CPU. The tx cases deploy FedAggregatorNFT from
+the Foundry artifacts (`make build`) on an in-process EVM (`pip install
+"eth-tester[py-evm]"`) or, with `--rpc-url`, on a local anvil node; without
+either they are recorded as skipped.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from time import perf_counter
+
+import numpy as np
+
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "3")
+
+# anvil default account #0 (same as bench_tx_submission.py)
+DEFAULT_AGG_KEY = "0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80"
+
+
+class Skip(Exception):
+    """Raised by a case setup when its backend is unavailable."""
+
+
+def _weights(model_mb: int, layers: int = 6, seed: int = 0) -> list[np.ndarray]:
+    n = max(256, model_mb * 2**20 // 4 // layers)
+    rng = np.random.default_rng(seed)
+    return [rng.standard_normal((n // 256, 256), dtype=np.float32) for _ in range(layers)]
+
+
+# ---------- cases: setup(**params) -> zero-argument callable to time ----------
+def hash_weight_list_case(model_mb: int):
+    from federated.utils import hash_weight_list
+    w = _weights(model_mb)
+    return lambda: hash_weight_list(w)
+
+
+def flatten_weights_case(model_mb: int):
+    from federated.utils import flatten_weights
+    w = _weights(model_mb)
+    return lambda: flatten_weights(w)
+
+
+def hash_weights_case(model_mb: int):
+    from federated.utils import flatten_weights, hash_weights
+    flat = flatten_weights(_weights(model_mb))
+    return lambda: hash_weights(flat)
+
+
+def average_layerwise_case(clients: int, model_mb: int):
+    from federated.model_manager import average_layerwise
+    ws = [_weights(model_mb, seed=i) for i in range(clients)]
+    return lambda: average_layerwise(ws)
+
+
+def fedavg_accumulator_case(clients: int, model_mb: int):
+    from federated.model_manager import FedAvgAccumulator
+    ws = [_weights(model_mb, seed=i) for i in range(clients)]
+
+    def run():
+        acc = FedAvgAccumulator()
+        for w in ws:
+            acc.add(w)
+        return acc.result()
+    return run
+
+
+def robust_aggregate_case(rule: str, clients: int, model_mb: int):
+    from federated.model_manager import parse_aggregation
+    ws = [_weights(model_mb, seed=i) for i in range(clients)]
+    agg = parse_aggregation(rule)
+
+    def run():
+        acc = agg.accumulator(reference=ws[0])
+        for w in ws:
+            acc.add(w)
+        return acc.result()
+    return run
+
+
+def _update(model_mb: int):
+    w = _weights(model_mb, seed=1)
+    return w, [x + np.float32(0.01) * y for x, y in zip(w, _weights(model_mb, seed=2))]
+
+
+def update_encode_case(codec: str, model_mb: int):
+    from federated.update_codec import parse_codec
+    ref, w = _update(model_mb)
+    enc = parse_codec(codec)
+    return lambda: enc.encode(w, ref)
+
+
+def update_decode_case(codec: str, model_mb: int):
+    from federated.update_codec import decode_update, parse_codec
+    ref, w = _update(model_mb)
+    update, _ = parse_codec(codec).encode(w, ref)
+    return lambda: decode_update(update, ref)
+
+
+def split_among_clients_case(clients: int, partitioner: str):
+    from federated.data_handler import split_among_clients
+    rng = np.random.default_rng(0)
+    x = rng.random((60000, 28, 28), dtype=np.float32)
+    y = rng.integers(0, 10, 60000)
+    return lambda: split_among_clients(x, y, clients, partitioner)
+
+
+def train_round_case(clients: int, rounds: int, samples: int = 6000):
+    from federated.client_executor import train_peers, peer_seed, SharedModelClients
+    from federated.data_handler import split_among_clients
+    from federated.model_manager import FedAvgAccumulator
+    rng = np.random.default_rng(0)
+    x = rng.random((samples, 28, 28), dtype=np.float32)
+    y = rng.integers(0, 10, samples)
+    xs, ys = split_among_clients(x, y, clients)
+    cl = SharedModelClients(clients)
+
+    def run():
+        for r in range(rounds):
+            acc = FedAvgAccumulator()
+            train_peers(cl, xs, ys, xs, ys, 64, [peer_seed(42, r, i) for i in range(clients)], accumulator=acc)
+            cl.set_global(acc.result())
+    return run
+
+
+def _chain(rpc_url: str | None):
+    """Connector bootstrapped on a fresh FedAggregatorNFT; (connector, aggregator account)."""
+    from eth_account import Account
+    from web3 import Web3
+    from federated.blockchain_connector import Web3Connector
+
+    path = os.path.join("out", "FedAggregator.sol", "FedAggregatorNFT.json")
+    if not os.path.exists(path):
+        raise Skip(f"{path} not found (run `make build`)")
+    with open(path) as f:
+        art = json.load(f)
+
+    if rpc_url:
+        w3 = Web3(Web3.HTTPProvider(rpc_url))
+        if not w3.is_connected():
+            raise Skip(f"no node at {rpc_url}")
+        key = DEFAULT_AGG_KEY
+    else:
+        try:
+            w3 = Web3(Web3.EthereumTesterProvider())
+        except Exception as e:  # eth-tester / py-evm not installed
+            raise Skip(f"eth-tester unavailable: {e}")
+        key = w3.provider.ethereum_tester.backend.account_keys[0].to_hex()
+
+    w3c = object.__new__(Web3Connector)
+    w3c.w3 = w3
+    w3c._init_tx_state()
+    acct = Account.from_key(key)
+    factory = w3.eth.contract(abi=art["abi"], bytecode=art["bytecode"]["object"])
+    addr = w3c._send_tx(acct, factory.constructor(acct.address, "bench"))["contractAddress"]
+    w3c.agg_contract = w3.eth.contract(address=addr, abi=art["abi"])
+    return w3c, acct
+
+
+def tx_serial_case(txs: int, rpc_url: str | None = None):
+    w3c, acct = _chain(rpc_url)
+    mint = w3c.agg_contract.functions.mint
+    return lambda: [w3c._send_tx(acct, mint("cd" * 32, "{}")) for _ in range(txs)]
+
+
+def tx_pipelined_case(txs: int, rpc_url: str | None = None):
+    w3c, acct = _chain(rpc_url)
+    mint = w3c.agg_contract.functions.mint
+    return lambda: w3c._wait_receipts([w3c._submit_tx(acct, mint("cd" * 32, "{}")) for _ in range(txs)])
+
+
+# name -> (setup, axes, repeat)
+CASES = {
+    "hash_weight_list": (hash_weight_list_case, {"model_mb": [1, 16, 64]}, 5),
+    "flatten_weights": (flatten_weights_case, {"model_mb": [1, 16, 64]}, 5),
+    "hash_weights": (hash_weights_case, {"model_mb": [1, 16, 64]}, 5),
+    "average_layerwise": (average_layerwise_case, {"clients": [10, 100], "model_mb": [1, 4]}, 3),
+    "fedavg_accumulator": (fedavg_accumulator_case, {"clients": [10, 100], "model_mb": [1, 4]}, 3),
+    "robust_aggregate": (robust_aggregate_case, {"rule": ["median", "trimmed_mean:0.1", "clipped_mean:10"],
+                                                 "clients": [10, 100], "model_mb": [1, 4]}, 3),
+    "update_encode": (update_encode_case, {"codec": ["int8", "fp16", "int8+topk:0.01"], "model_mb": [1, 16]}, 5),
+    "update_decode": (update_decode_case, {"codec": ["int8", "fp16", "int8+topk:0.01"], "model_mb": [1, 16]}, 5),
+    "split_among_clients": (split_among_clients_case,
+                            {"clients": [10, 100, 1000], "partitioner": ["iid", "dirichlet", "shard"]}, 5),
+    "train_round": (train_round_case, {"clients": [2, 10], "rounds": [1, 3]}, 1),
+    "tx_serial": (tx_serial_case, {"txs": [10, 50]}, 3),
+    "tx_pipelined": (tx_pipelined_case, {"txs": [10, 50]}, 3),
+}
+
+
+def case_key(name: str, params: dict) -> str:
+    return f"{name}[{','.join(f'{k}={v}' for k, v in params.items())}]"
+
+
+def measure(fn, repeat: int) -> dict:
+    fn()  # warm-up: imports, tf.function tracing, first-touch allocations
+    times = []
+    for _ in range(repeat):
+        t = perf_counter()
+        fn()
+        times.append(perf_counter() - t)
+    return {"median_sec": statistics.median(times), "min_sec": min(times), "max_sec": max(times),
+            "repeat": repeat}
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except Exception:
+        commit = None
+    return {"python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine(),
+            "processor": platform.processor(), "cpu_count": os.cpu_count(), "node": platform.node(),
+            "commit": commit}
+
+
+def run(only: list[str] | None = None, quick: bool = False, repeat: int | None = None,
+        rpc_url: str | None = None, log=print) -> dict:
+    results = {}
+    for name, (setup, axes, default_repeat) in CASES.items():
+        if only and not any(name.startswith(o) for o in only):
+            continue
+        grid = {k: v[:1] for k, v in axes.items()} if quick else axes
+        for values in itertools.product(*grid.values()):
+            params = dict(zip(grid, values))
+            key = case_key(name, params)
+            kw = {"rpc_url": rpc_url} if name.startswith("tx_") else {}
+            try:
+                fn = setup(**params, **kw)
+            except Skip as e:
+                results[key] = {"skipped": str(e)}
+                log(f"{key:<60} skipped: {e}")
+                continue
+            results[key] = measure(fn, repeat or default_repeat)
+            log(f"{key:<60} {results[key]['median_sec']:10.4f} s")
+    return {"environment": environment(), "results": results}
+
+
+def compare(baseline: dict, current: dict, threshold: float, min_sec: float = 1e-3) -> tuple[list[dict], bool]:
+    """Rows for every case in both files; a case regresses when its median is more than
+    `threshold` (relative) and `min_sec` (absolute) slower than the baseline."""
+    rows, regressed = [], False
+    base, cur = baseline["results"], current["results"]
+    for key in sorted(set(base) | set(cur)):
+        b, c = base.get(key, {}), cur.get(key, {})
+        if "median_sec" not in b or "median_sec" not in c:
+            rows.append({"case": key, "status": "missing" if key not in cur else "new" if key not in base else "skipped"})
+            continue
+        ratio = c["median_sec"] / b["median_sec"] if b["median_sec"] > 0 else float("inf")
+        slower = ratio > 1 + threshold and c["median_sec"] - b["median_sec"] > min_sec
+        faster = ratio < 1 / (1 + threshold) and b["median_sec"] - c["median_sec"] > min_sec
+        rows.append({"case": key, "baseline_sec": b["median_sec"], "current_sec": c["median_sec"],
+                     "ratio": ratio, "status": "SLOWER" if slower else "faster" if faster else "ok"})
+        regressed |= slower
+    return rows, regressed
+
+
+def main(argv: list[str]) -> int:
+    p = argparse.ArgumentParser(description="Run the benchmark suite or compare two result files")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    r = sub.add_parser("run", help="Run the cases and write a JSON result file")
+    r.add_argument("--out", help="Write results here (e.g. benchmarks/baselines/baseline.json)")
+    r.add_argument("--only", default="", help="Comma-separated case name prefixes")
+    r.add_argument("--quick", action="store_true", help="Smallest value of each scaling axis only")
+    r.add_argument("--repeat", type=int, default=None, help="Timed calls per case (default: per case)")
+    r.add_argument("--rpc-url", default=os.getenv("BENCH_RPC_URL") or None,
+                   help="Run tx cases on this node (anvil) instead of eth-tester")
+    r.add_argument("--list", action="store_true", help="List cases and their axes")
+    c = sub.add_parser("compare", help="Compare a result file against a baseline")
+    c.add_argument("baseline")
+    c.add_argument("current")
+    c.add_argument("--threshold", type=float, default=0.15, help="Allowed relative slowdown (default 0.15)")
+    c.add_argument("--min-sec", type=float, default=1e-3, help="Ignore differences below this many seconds")
+    c.add_argument("--json", action="store_true")
+    args = p.parse_args(argv)
+
+    if args.cmd == "run":
+        if args.list:
+            for name, (_, axes, repeat) in CASES.items():
+                print(f"{name:<22} repeat={repeat} " + " ".join(f"{k}={v}" for k, v in axes.items()))
+            return 0
+        only = [o.strip() for o in args.only.split(",") if o.strip()]
+        out = run(only, args.quick, args.repeat, args.rpc_url, log=lambda s: print(s, file=sys.stderr))
+        text = json.dumps(out, indent=2)
+        if args.out:
+            os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+            with open(args.out, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+        else:
+            print(text)
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    rows, regressed = compare(baseline, current, args.threshold, args.min_sec)
+    if args.json:
+        print(json.dumps({"regressed": regressed, "rows": rows}, indent=2))
+    else:
+        if baseline.get("environment", {}).get("node") != current.get("environment", {}).get("node"):
+            print("[WARN] baseline was recorded on a different machine", file=sys.stderr)
+        print(f"{'case':<60} {'baseline_s':>11} {'current_s':>10} {'ratio':>7}  status")
+        for row in rows:
+            if "ratio" in row:
+                print(f"{row['case']:<60} {row['baseline_sec']:>11.4f} {row['current_sec']:>10.4f} "
+                      f"{row['ratio']:>6.2f}x  {row['status']}")
+            else:
+                print(f"{row['case']:<60} {'':>11} {'':>10} {'':>7}  {row['status']}")
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
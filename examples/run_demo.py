@@ -3,6 +3,34 @@ from federated.training_orchestrator import run_federated
 
 if __name__ == "__main__":
     rounds = int(os.getenv("ROUNDS", "1"))
+    workers = int(os.getenv("WORKERS", "0"))
+    pipeline_tx = os.getenv("PIPELINE_TX", "0") == "1"
+    pipeline_rounds = os.getenv("PIPELINE_ROUNDS", "0") == "1"
+    shared_model = os.getenv("SHARED_MODEL", "0") == "1"
+    batched = os.getenv("BATCHED", "0") == "1"
+    fast = os.getenv("FAST", "0") == "1"
+    partitioner = os.getenv("PARTITION", "iid")
+    checkpoint_dir = os.getenv("CHECKPOINT_DIR") or None
+    trace_dir = os.getenv("TRACE_DIR") or None
+    merkle_peers = os.getenv("MERKLE_PEERS", "0") == "1"
+    proof_dir = os.getenv("PROOF_DIR") or None
+    encoding = os.getenv("ENCODING") or None
+    update_codec = os.getenv("UPDATE_CODEC") or None
+    aggregation = os.getenv("AGGREGATION") or None
+    per_round = os.getenv("CLIENTS_PER_ROUND") or None
+    # "0.1" -> fraction of the clients, "10" -> count
+    clients_per_round = None if per_round is None else (float(per_round) if "." in per_round else int(per_round))
+    round_deadline = float(os.getenv("ROUND_DEADLINE")) if os.getenv("ROUND_DEADLINE") else None
+    late_updates = os.getenv("LATE_UPDATES") or "drop"
+    worker_address = os.getenv("WORKER_ADDR") or None
+    remote_workers = int(os.getenv("REMOTE_WORKERS") or "0")
     print(f"Starting federated demo ({rounds} round{'s' if rounds != 1 else ''})…")
-    losses, accs = run_federated(rounds=rounds)
+    losses, accs = run_federated(rounds=rounds, workers=workers, pipeline_tx=pipeline_tx,
+                                 pipeline_rounds=pipeline_rounds, shared_model=shared_model,
+                                 partitioner=partitioner, checkpoint_dir=checkpoint_dir,
+                                 trace_dir=trace_dir, merkle_peers=merkle_peers, proof_dir=proof_dir,
+                                 encoding=encoding, update_codec=update_codec, aggregation=aggregation,
+                                 clients_per_round=clients_per_round, round_deadline=round_deadline,
+                                 late_updates=late_updates, worker_address=worker_address,
+                                 remote_workers=remote_workers, batched=batched, fast=fast)
     print(f"Done. Test accuracy after round {rounds}:", accs[-1])
@@ -0,0 +1,300 @@
+# src/federated/async_connector.py
+import asyncio, os
+from time import time
+import aiohttp
+import web3.providers
+from web3 import AsyncWeb3, Web3
+from web3.providers import AsyncHTTPProvider, WebsocketProviderV2
+from .blockchain_connector import ContractLayout
+from .instrumentation import get_tracer, async_rpc_counter_middleware
+
+# Requests in flight per connector (HTTP: also the size of the keep-alive pool)
+DEFAULT_CONCURRENCY = 32
+
+async def gather_limited(aws, limit: int = DEFAULT_CONCURRENCY) -> list:
+    """Await `aws` with at most `limit` running at once.
+
+    Results come back in order; an awaitable that raised gives its exception
+    as the value (like `call_batch`: one failing read does not fail the rest).
+    """
+    sem = asyncio.Semaphore(max(1, limit))
+
+    async def run(aw):
+        async with sem:
+            try:
+                return await aw
+            except Exception as e:
+                return e
+
+    return list(await asyncio.gather(*(run(aw) for aw in aws)))
+
+def _raise_first(results: list):
+    for r in results:
+        if isinstance(r, Exception):
+            raise r
+    return results
+
+def make_async_provider(uri: str, timeout: float = 30.0):
+    """AsyncWeb3 provider for an http(s)://, ws(s):// or IPC endpoint."""
+    if uri.startswith(("http://", "https://")):
+        return AsyncHTTPProvider(uri, request_kwargs={"timeout": aiohttp.ClientTimeout(total=timeout)})
+    if uri.startswith(("ws://", "wss://")):
+        return WebsocketProviderV2(uri, request_timeout=timeout)
+    ipc = getattr(web3.providers, "AsyncIPCProvider", None)  # web3 >= 7
+    if ipc is None:
+        raise ValueError(f"no async IPC provider in web3 {web3.__version__} for {uri!r}: use http(s):// or ws(s)://")
+    return ipc(uri)
+
+class AsyncWeb3Connector(ContractLayout):
+    """Web3Connector's read/write API on AsyncWeb3, for fan-out over many peers.
+
+    Every method is a coroutine. Over HTTP all requests share one aiohttp
+    session whose keep-alive pool holds `max_concurrency` connections; a
+    ws(s):// endpoint is one persistent WebSocket (`WEB3_ASYNC_PROVIDER`,
+    default `WEB3_HTTP_PROVIDER`). `call_many` and the per-peer helpers
+    (`get_balances_eth`, `peer_statuses`, `peer_last_rounds`,
+    `mint_peer_rounds`) issue one request per item with at most
+    `max_concurrency` in flight, so a fan-out costs about one round trip
+    instead of one per peer. Transactions use the
+    same local nonces, cached chain id and gas price as Web3Connector;
+    transactions of one account are signed and sent in nonce order, those of
+    different accounts concurrently.
+
+        async with AsyncWeb3Connector() as c:
+            balances = await c.get_balances_eth(addresses)
+    """
+
+    def __init__(self, encoding: str | None = None, provider_uri: str | None = None,
+                 max_concurrency: int | None = None, timeout: float = 30.0):
+        self._init_encoding(encoding)
+        self.provider_uri = provider_uri or os.getenv("WEB3_ASYNC_PROVIDER") or os.getenv("WEB3_HTTP_PROVIDER")
+        self.max_concurrency = max_concurrency or int(os.getenv("WEB3_MAX_CONCURRENCY", DEFAULT_CONCURRENCY))
+        provider = make_async_provider(self.provider_uri, timeout)
+        if isinstance(provider, AsyncHTTPProvider):
+            self.w3 = AsyncWeb3(provider)
+        else:
+            self.w3 = AsyncWeb3.persistent_websocket(provider)
+        self.w3.middleware_onion.add(async_rpc_counter_middleware, "rpc_counter")
+        self._session = None
+        self._init_contracts()
+        self._init_tx_state()
+
+    async def connect(self) -> "AsyncWeb3Connector":
+        provider = self.w3.provider
+        if isinstance(provider, AsyncHTTPProvider):
+            session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.max_concurrency),
+                                            raise_for_status=True)
+            # web3 keeps one session per (thread, endpoint): reuse one that is already open
+            if await provider.cache_async_session(session) is session:
+                self._session = session
+            else:
+                await session.close()
+        else:
+            await provider.connect()
+        assert await self.w3.is_connected(), "Web3 not connected"
+        return self
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        elif not isinstance(self.w3.provider, AsyncHTTPProvider):
+            await self.w3.provider.disconnect()
+
+    async def __aenter__(self):
+        return await self.connect()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def gather(self, aws) -> list:
+        return await gather_limited(aws, self.max_concurrency)
+
+    def _init_tx_state(self):
+        self.gas_price_ttl = float(os.getenv("GAS_PRICE_TTL_SEC", "10"))
+        self.nonce_retries = int(os.getenv("TX_NONCE_RETRIES", "3"))
+        self._chain_id = None
+        self._gas_price = None
+        self._gas_price_at = 0.0
+        self._nonces = {}
+        self._acct_locks = {}  # address -> asyncio.Lock
+        self._params_lock = asyncio.Lock()  # concurrent submissions fetch chain id / gas price once
+
+    # ---------- low-level tx helpers ----------
+    async def _get_chain_id(self) -> int:
+        async with self._params_lock:
+            if self._chain_id is None:
+                self._chain_id = int(await self.w3.eth.chain_id)
+            return self._chain_id
+
+    async def _get_gas_price(self) -> int:
+        async with self._params_lock:
+            now = time()
+            if self._gas_price is None or now - self._gas_price_at >= self.gas_price_ttl:
+                self._gas_price = int(await self.w3.eth.gas_price)
+                self._gas_price_at = now
+            return self._gas_price
+
+    async def _next_nonce(self, address: str) -> int:
+        if address not in self._nonces:
+            self._nonces[address] = int(await self.w3.eth.get_transaction_count(address, "pending"))
+        nonce = self._nonces[address]
+        self._nonces[address] = nonce + 1
+        return nonce
+
+    async def _resync_nonce(self, address: str):
+        self._nonces[address] = int(await self.w3.eth.get_transaction_count(address, "pending"))
+
+    async def _tx_step(self, name: str, *args):
+        # runs one request of ContractLayout._submit_steps
+        if name == "nonce":
+            return await self._next_nonce(args[0])
+        if name == "tx_params":
+            return await self._get_gas_price(), await self._get_chain_id()
+        if name == "build":
+            return await args[0].build_transaction(args[1])
+        if name == "send":
+            try:
+                return await self.w3.eth.send_raw_transaction(args[0])
+            except Exception as e:
+                return e
+        return await self._resync_nonce(args[0])
+
+    async def _submit_tx(self, acct, fn):
+        """Build, sign and send a tx without waiting for it; returns the tx hash."""
+        with get_tracer().phase("tx_build"):
+            gas = await fn.estimate_gas({"from": acct.address})
+        async with self._acct_locks.setdefault(acct.address, asyncio.Lock()):
+            steps, result = self._submit_steps(acct, fn, gas), None
+            try:
+                while True:
+                    result = await self._tx_step(*steps.send(result))
+            except StopIteration as done:
+                return done.value
+
+    async def _wait_receipts(self, tx_hashes: list) -> list:
+        tracer = get_tracer()
+        with tracer.phase("receipt_wait"):
+            receipts = await self.gather(self.w3.eth.wait_for_transaction_receipt(h) for h in tx_hashes)
+        if any(isinstance(r, Exception) for r in receipts):
+            # a tx may have been dropped: local nonces can no longer be trusted
+            self._nonces.clear()
+            _raise_first(receipts)
+        if tracer.enabled:
+            for r in receipts:
+                gas_used = int(r.get("gasUsed", 0))
+                tracer.count("tx")
+                tracer.count("gas_used", gas_used)
+                tracer.count("gas_cost_wei", gas_used * int(r.get("effectiveGasPrice", 0)))
+        failed = [r for r in receipts if r.get("status", 1) == 0]
+        if failed:
+            raise RuntimeError(f"{len(failed)} of {len(receipts)} transactions reverted: "
+                               + ", ".join(r["transactionHash"].hex() for r in failed))
+        return receipts
+
+    async def _send_tx(self, acct, fn):
+        return (await self._wait_receipts([await self._submit_tx(acct, fn)]))[0]
+
+    # ---------- writes ----------
+    async def mint_peer_round(self, round_id: int, info_str: str, peer_idx: int):
+        acct = self.client_contracts[peer_idx]["acct"]
+        return await self._send_tx(acct, self._peer_mint_fn(peer_idx, round_id, info_str))
+
+    async def mint_aggregator_round(self, hash_avg: str, round_info_json: str):
+        return await self._send_tx(self.agg_acct, self._agg_mint_fn(hash_avg, round_info_json))
+
+    async def mint_aggregator_round_with_root(self, hash_avg: str, round_info_json: str, peers_root: str):
+        return await self._send_tx(self.agg_acct, self._agg_mint_fn(hash_avg, round_info_json, peers_root))
+
+    async def _submit_peer_mints(self, round_id: int, peer_infos: dict[int, str]) -> list:
+        return await self.gather(
+            self._submit_tx(self.client_contracts[i]["acct"], self._peer_mint_fn(i, round_id, info))
+            for i, info in peer_infos.items())
+
+    async def mint_peer_rounds(self, round_id: int, peer_infos: dict[int, str]) -> dict:
+        """Mint every peer's payload of a round concurrently; returns peer_idx -> receipt.
+        If a submission fails, the others are still waited for before it is raised."""
+        tx_hashes = await self._submit_peer_mints(round_id, peer_infos)
+        sent = [h for h in tx_hashes if not isinstance(h, Exception)]
+        receipts = await self._wait_receipts(sent)
+        _raise_first(tx_hashes)
+        return dict(zip(peer_infos, receipts))
+
+    async def mint_round_pipelined(self, round_id: int, peer_infos: dict[int, str], hash_avg: str,
+                                   round_info_json: str):
+        """Peer mints (concurrently) and the aggregator mint, then all receipts together.
+        Returns (peer_receipts, agg_receipt)."""
+        tx_hashes = _raise_first(await self._submit_peer_mints(round_id, peer_infos))
+        tx_hashes.append(await self._submit_tx(self.agg_acct, self._agg_mint_fn(hash_avg, round_info_json)))
+        receipts = await self._wait_receipts(tx_hashes)
+        return receipts[:-1], receipts[-1]
+
+    # ---------- concurrent reads ----------
+    async def call_many(self, fns: list, block_identifier="latest") -> list:
+        """Contract reads, concurrently; the decoded value or the exception per call, in order."""
+        tracer = get_tracer()
+        with tracer.phase("read_batch"):
+            return await self.gather(fn.call(block_identifier=block_identifier) for fn in fns)
+
+    async def read_mint_state(self, peer_idxs) -> tuple[int | None, dict[int, int | None]]:
+        peer_idxs = list(peer_idxs)
+        return self._mint_state(await self.call_many(self._mint_state_fns(peer_idxs)), peer_idxs)
+
+    async def read_round_state(self, round_id: int, peer_idxs=(), peers_root: bool = False) -> dict:
+        peer_idxs = list(peer_idxs)
+        values = await self.call_many(self._round_state_fns(round_id, peer_idxs, peers_root))
+        return self._round_state(values, round_id, peer_idxs, peers_root)
+
+    async def get_balances_eth(self, addresses: list[str]) -> list[float | Exception]:
+        return await self.gather(self.get_balance_eth(a) for a in addresses)
+
+    async def peer_statuses(self, peer_idxs) -> dict[int, int | Exception]:
+        peer_idxs = list(peer_idxs)
+        return dict(zip(peer_idxs, await self.gather(self.peer_get_status(i) for i in peer_idxs)))
+
+    async def peer_last_rounds(self, peer_idxs) -> dict[int, int | Exception]:
+        peer_idxs = list(peer_idxs)
+        return dict(zip(peer_idxs, await self.gather(self.peer_get_last_round(i) for i in peer_idxs)))
+
+    # ---------- reads (aggregator) ----------
+    async def get_current_round(self) -> int:
+        return int(await self.agg_contract.functions.getCurrentRound().call())
+
+    async def get_federated_status(self) -> int:
+        return int(await self.agg_contract.functions.federatedStatus().call())
+
+    async def get_aggregator_address(self) -> str:
+        return await self.agg_contract.functions.getAggregator().call()
+
+    async def _read_round_field(self, field: str, round_id: int, peer_idx: int | None = None) -> str:
+        fns = self._round_field_fns(field, round_id, peer_idx)
+        return self._round_field(field, [await fn.call() for fn in fns], round_id)
+
+    async def get_round_details(self, round_id: int) -> str:
+        return await self._read_round_field("round_details", round_id)
+
+    async def get_round_weight(self, round_id: int) -> str:
+        return await self._read_round_field("round_weight", round_id)
+
+    async def get_round_hash(self, round_id: int) -> str:
+        return await self._read_round_field("round_hash", round_id)
+
+    # ---------- reads (peer) ----------
+    async def peer_get_status(self, peer_idx: int) -> int:
+        c = self.client_contracts[peer_idx]["contract"]
+        return int(await c.functions.getPeerStatus().call())
+
+    async def peer_get_last_round(self, peer_idx: int) -> int:
+        c = self.client_contracts[peer_idx]["contract"]
+        return int(await c.functions.getLastParticipatedRound().call())
+
+    async def peer_get_address(self, peer_idx: int) -> str:
+        c = self.client_contracts[peer_idx]["contract"]
+        return await c.functions.getPeerAddress().call()
+
+    async def peer_get_round_details(self, peer_idx: int, round_id: int) -> str:
+        return await self._read_round_field("peer_details", round_id, peer_idx)
+
+    async def get_balance_eth(self, address: str) -> float:
+        bal_wei = await self.w3.eth.get_balance(Web3.to_checksum_address(address))
+        return float(Web3.from_wei(bal_wei, "ether"))
@@ -0,0 +1,147 @@
+# src/federated/audit.py
+"""Fast read-only audit commands: `python -m federated.audit <command>`.
+
+Uses ReadOnlyConnector (plain JSON-RPC, no keys, no web3/TensorFlow import);
+numpy is imported only by the verify commands.
+"""
+import argparse, json, sys
+from .readonly_connector import ReadOnlyConnector
+
+def _payload_hash(payload: str | None) -> str | None:
+    try:
+        obj = json.loads(payload or "")
+        if isinstance(obj, str):
+            obj = json.loads(obj)
+    except ValueError:
+        return None
+    return obj.get("weight_hash") if isinstance(obj, dict) else None
+
+def _local_hash(path: str, keys_order_file: str | None) -> str:
+    from .utils import hash_weights_file
+    keys_order = None
+    if keys_order_file:
+        with open(keys_order_file, "r", encoding="utf-8") as f:
+            keys_order = [ln.strip() for ln in f if ln.strip()]
+    return hash_weights_file(path, keys_order)
+
+def _check_proofs(conn, round_id: int, proof_file: str, peer_id: int | None = None) -> tuple[str | None, list[dict]]:
+    """(on-chain root, leaves of `proof_file` with an "included" flag), optionally one peer only."""
+    from .merkle import load_round_proofs, verify_proof
+    doc = load_round_proofs(proof_file)
+    root = conn.read_round(round_id)["peers_root"]
+    leaves = doc["leaves"]
+    if peer_id is not None:
+        leaves = [lf for lf in leaves if json.loads(lf["payload"]).get("peer_id") == peer_id]
+    return root, [{**lf, "included": root is not None and verify_proof(lf["payload"], lf["proof"], root)}
+                  for lf in leaves]
+
+def _peer_ref(args) -> int | str:
+    if args.peer_addr:
+        return args.peer_addr
+    if args.peer_index is None:
+        raise SystemExit("Provide --peer-addr or --peer-index (CLIENT_CONTRACT_ADDRESSES)")
+    return args.peer_index
+
+def _emit(obj: dict, as_json: bool, lines: list[str]):
+    if as_json:
+        print(json.dumps(obj, separators=(",", ":")))
+    else:
+        print("\n".join(lines))
+
+def _verify(on_chain: str | None, local: str, obj: dict, as_json: bool, header: str) -> int:
+    match = on_chain is not None and on_chain.lower() == local.lower()
+    _emit({**obj, "on_chain": on_chain, "local": local, "match": match}, as_json,
+          [header, f"on_chain={on_chain}", f"local   ={local}", "MATCH" if match else "MISMATCH"])
+    return 0 if match else 1
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(prog="python -m federated.audit",
+                                description="Read-only audit queries and hash verification (no keys needed)")
+    p.add_argument("--rpc-url", help="JSON-RPC endpoint (default: WEB3_HTTP_PROVIDER)")
+    p.add_argument("--agg-addr", help="Aggregator contract (default: AGGREGATOR_CONTRACT_ADDRESS)")
+    p.add_argument("--json", action="store_true", help="One JSON object per line")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    sub.add_parser("current", help="Aggregator currentRound")
+    r = sub.add_parser("round", help="Aggregator round details and weight hash")
+    r.add_argument("round", type=int)
+    rs = sub.add_parser("rounds", help="Aggregator rounds in a range (one batched request)")
+    rs.add_argument("--from", dest="first", type=int, default=1)
+    rs.add_argument("--to", dest="last", type=int, help="Default: currentRound")
+
+    def peer_args(sp):
+        sp.add_argument("--peer-index", type=int)
+        sp.add_argument("--peer-addr")
+
+    q = sub.add_parser("peer", help="Peer payload for a round")
+    q.add_argument("round", type=int)
+    peer_args(q)
+
+    va = sub.add_parser("verify-agg", help="Compare a .npy/.npz file with the aggregator round hash")
+    vp = sub.add_parser("verify-peer", help="Compare a .npy/.npz file with the weight_hash of a peer payload")
+    peer_args(vp)
+    vp.add_argument("--proof-file", help="Merkle-committed round: take the payload from this proof file "
+                                         "(peer_id = --peer-index + 1) and check its inclusion proof")
+    for v in (va, vp):
+        v.add_argument("round", type=int)
+        v.add_argument("weights", help=".npy or .npz file")
+        v.add_argument("--keys-order", help="File with .npz keys in hashing order, one per line")
+
+    pr = sub.add_parser("verify-proof", help="Check a round proof file against the on-chain peers Merkle root")
+    pr.add_argument("round", type=int)
+    pr.add_argument("proof_file")
+    pr.add_argument("--peer-id", type=int, help="Only this peer (payload peer_id)")
+
+    args = p.parse_args(argv)
+    conn = ReadOnlyConnector(rpc_url=args.rpc_url, agg_address=args.agg_addr)
+
+    if args.cmd == "current":
+        cur = conn.get_current_round()
+        _emit({"current_round": cur}, args.json, [f"current_round={cur}"])
+        return 0
+
+    if args.cmd in ("round", "rounds"):
+        if args.cmd == "round":
+            ids = [args.round]
+        else:
+            last = args.last if args.last is not None else conn.get_current_round()
+            ids = range(args.first, last + 1)
+        rows = conn.read_rounds(ids)
+        for row in rows:
+            _emit({"aggregator": conn.agg.address, **row}, args.json,
+                  [f"aggregator={conn.agg.address} round={row['round']}",
+                   f"weight_hash={row['weight_hash']}", f"details={row['round_details']}"])
+        return 0 if rows and all(row["weight_hash"] for row in rows) else 1
+
+    if args.cmd == "peer":
+        row = conn.read_peer_round(_peer_ref(args), args.round)
+        _emit(row, args.json, [f"peer={row['peer']} round={row['round']}", f"{row['payload']}"])
+        return 0 if row["payload"] else 1
+
+    if args.cmd == "verify-proof":
+        root, leaves = _check_proofs(conn, args.round, args.proof_file, args.peer_id)
+        for lf in leaves:
+            _emit({"round": args.round, "root": root, "index": lf["index"], "included": lf["included"],
+                   "payload": lf["payload"]}, args.json,
+                  [f"round={args.round} leaf={lf['index']} {'INCLUDED' if lf['included'] else 'NOT INCLUDED'} {lf['payload']}"])
+        return 0 if leaves and all(lf["included"] for lf in leaves) else 1
+
+    local = _local_hash(args.weights, args.keys_order)
+    if args.cmd == "verify-agg":
+        row = conn.read_round(args.round)
+        return _verify(row["weight_hash"] or None, local, {"aggregator": conn.agg.address, "round": args.round},
+                       args.json, f"aggregator={conn.agg.address} round={args.round}")
+    if args.proof_file:
+        if args.peer_index is None:
+            raise SystemExit("--proof-file needs --peer-index")
+        root, leaves = _check_proofs(conn, args.round, args.proof_file, args.peer_index + 1)
+        included = [lf for lf in leaves if lf["included"]]
+        on_chain = _payload_hash(included[0]["payload"]) if included else None
+        return _verify(on_chain, local, {"peer_index": args.peer_index, "round": args.round, "peers_root": root},
+                       args.json, f"peer_index={args.peer_index} round={args.round} peers_root={root}")
+    row = conn.read_peer_round(_peer_ref(args), args.round)
+    return _verify(_payload_hash(row["payload"]), local, {"peer": row["peer"], "round": args.round},
+                   args.json, f"peer={row['peer']} round={args.round}")
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,178 @@
+# src/federated/audit_index.py
+import json, sqlite3
+from web3 import Web3
+from . import compact
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cursors (
+    contract TEXT PRIMARY KEY,
+    last_block INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS agg_rounds (
+    contract TEXT NOT NULL,
+    round INTEGER NOT NULL,
+    weight_hash TEXT NOT NULL,
+    round_info TEXT NOT NULL,
+    block_number INTEGER NOT NULL,
+    tx_hash TEXT NOT NULL,
+    log_index INTEGER NOT NULL,
+    PRIMARY KEY (contract, round)
+);
+CREATE TABLE IF NOT EXISTS peer_rounds (
+    contract TEXT NOT NULL,
+    round INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    weight_hash TEXT,
+    block_number INTEGER NOT NULL,
+    tx_hash TEXT NOT NULL,
+    log_index INTEGER NOT NULL,
+    PRIMARY KEY (contract, round)
+);
+CREATE INDEX IF NOT EXISTS agg_rounds_hash ON agg_rounds (weight_hash);
+CREATE INDEX IF NOT EXISTS peer_rounds_hash ON peer_rounds (weight_hash);
+"""
+
+_AGG_TOPIC = Web3.to_hex(Web3.keccak(text="AggregatorRoundMinted(uint256,string,string)"))
+_AGG_COMPACT_TOPIC = Web3.to_hex(Web3.keccak(text="AggregatorRoundMintedCompact(uint256,bytes32,bytes32)"))
+_PEER_TOPIC = Web3.to_hex(Web3.keccak(text="PeerMinted(uint256,string)"))
+_PEER_COMPACT_TOPIC = Web3.to_hex(Web3.keccak(text="PeerMintedCompact(uint256,bytes32,bytes32)"))
+
+def _payload_hash(payload: str) -> str | None:
+    # Peer payloads are the orchestrator's peer-info JSON; anything else is stored without a hash
+    try:
+        obj = json.loads(payload)
+        return obj.get("weight_hash") if isinstance(obj, dict) else None
+    except ValueError:
+        return None
+
+def fetch_logs(w3, addresses: list[str], topics: list, from_block: int, to_block: int,
+               chunk: int = 2000, max_chunk: int = 100_000):
+    """Yield (range_end, logs) for [from_block, to_block] with eth_getLogs.
+
+    The block range adapts: it is halved whenever the node rejects a query
+    (result or range limits) and doubled after each successful one, up to
+    `max_chunk`. A query that fails on a single block is re-raised.
+    """
+    start = from_block
+    while start <= to_block:
+        end = min(start + chunk - 1, to_block)
+        try:
+            logs = w3.eth.get_logs({"address": addresses, "topics": topics,
+                                    "fromBlock": start, "toBlock": end})
+        except Exception:
+            if end == start:
+                raise
+            chunk = max(1, (end - start + 1) // 2)
+            continue
+        yield end, logs
+        start = end + 1
+        chunk = min(chunk * 2, max_chunk)
+
+class AuditIndex:
+    """Local SQLite index of AggregatorRoundMinted / PeerMinted events (and their
+    compact variants, stored decoded to the same JSON rows).
+
+    `sync` pulls new events incrementally, resuming each contract from the
+    last block it was indexed at; queries are answered from the database
+    without touching the chain.
+    """
+
+    def __init__(self, path: str):
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(_SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    # ---------- indexing ----------
+    def sync(self, w3, agg_contract, peer_contracts: list, to_block: int | None = None, start_block: int = 0,
+             confirmations: int = 0, chunk: int = 2000, max_chunk: int = 100_000) -> int:
+        """Index events up to `to_block` (default: head - confirmations). Returns the number of events stored."""
+        if to_block is None:
+            to_block = int(w3.eth.block_number) - confirmations
+        contracts = [agg_contract] + list(peer_contracts)
+        addresses = [c.address for c in contracts]
+        from_block = min(self._cursor(a, start_block - 1) for a in addresses) + 1
+        if from_block > to_block:
+            return 0
+
+        agg_events = {_AGG_TOPIC: agg_contract.events.AggregatorRoundMinted(),
+                      _AGG_COMPACT_TOPIC: agg_contract.events.AggregatorRoundMintedCompact()}
+        peer_events = {c.address: {_PEER_TOPIC: c.events.PeerMinted(),
+                                   _PEER_COMPACT_TOPIC: c.events.PeerMintedCompact()} for c in peer_contracts}
+        topics = [[_AGG_TOPIC, _AGG_COMPACT_TOPIC, _PEER_TOPIC, _PEER_COMPACT_TOPIC]]
+
+        added = 0
+        for end, logs in fetch_logs(w3, addresses, topics, from_block, to_block, chunk, max_chunk):
+            with self.db:
+                for log in logs:
+                    added += self._store(log, agg_contract.address, agg_events, peer_events)
+                self.db.executemany(
+                    "INSERT INTO cursors (contract, last_block) VALUES (?, ?) "
+                    "ON CONFLICT (contract) DO UPDATE SET last_block = MAX(last_block, excluded.last_block)",
+                    [(a, end) for a in addresses],
+                )
+        return added
+
+    def _cursor(self, address: str, default: int) -> int:
+        row = self.db.execute("SELECT last_block FROM cursors WHERE contract = ?", (address,)).fetchone()
+        return default if row is None else row["last_block"]
+
+    def _store(self, log, agg_address: str, agg_events: dict, peer_events: dict) -> int:
+        address = Web3.to_checksum_address(log["address"])
+        topic = Web3.to_hex(log["topics"][0])
+        meta = (int(log["blockNumber"]), Web3.to_hex(log["transactionHash"]), int(log["logIndex"]))
+        if address == agg_address:
+            args = agg_events[topic].process_log(log)["args"]
+            r = int(args["roundNumber"])
+            if topic == _AGG_COMPACT_TOPIC:
+                weight_hash = compact.bytes32_to_hash(args["modelWeightsHash"])
+                round_info = compact.unpack_round_info(args["roundMeta"], r) or ""
+            else:
+                weight_hash, round_info = args["modelWeightsHash"], args["roundInfo"]
+            cur = self.db.execute(
+                "INSERT OR REPLACE INTO agg_rounds VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (address, r, weight_hash, round_info, *meta),
+            )
+        elif address in peer_events:
+            args = peer_events[address][topic].process_log(log)["args"]
+            r = int(args["roundNumber"])
+            if topic == _PEER_COMPACT_TOPIC:
+                payload = compact.unpack_peer_info(args["weightHash"], args["meta"], r)
+            else:
+                payload = args["payload"]
+            cur = self.db.execute(
+                "INSERT OR REPLACE INTO peer_rounds VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (address, r, payload, _payload_hash(payload), *meta),
+            )
+        else:
+            return 0
+        return cur.rowcount
+
+    # ---------- queries ----------
+    def agg_rounds(self, first: int | None = None, last: int | None = None) -> list[dict]:
+        return self._rows(
+            "SELECT * FROM agg_rounds WHERE round >= ? AND round <= ? ORDER BY round",
+            (first or 0, last if last is not None else 2**63 - 1),
+        )
+
+    def peer_rounds(self, peer_address: str, first: int | None = None, last: int | None = None) -> list[dict]:
+        return self._rows(
+            "SELECT * FROM peer_rounds WHERE contract = ? AND round >= ? AND round <= ? ORDER BY round",
+            (Web3.to_checksum_address(peer_address), first or 0, last if last is not None else 2**63 - 1),
+        )
+
+    def find_hash(self, weight_hash: str) -> list[dict]:
+        """Every aggregator round and peer participation recorded with `weight_hash`."""
+        return (
+            [{"kind": "aggregator", **r} for r in self._rows("SELECT * FROM agg_rounds WHERE weight_hash = ?", (weight_hash,))]
+            + [{"kind": "peer", **r} for r in self._rows("SELECT * FROM peer_rounds WHERE weight_hash = ?", (weight_hash,))]
+        )
+
+    def last_block(self) -> int | None:
+        row = self.db.execute("SELECT MIN(last_block) AS b FROM cursors").fetchone()
+        return row["b"]
+
+    def _rows(self, sql: str, params: tuple) -> list[dict]:
+        return [dict(r) for r in self.db.execute(sql, params)]
@@ -0,0 +1,251 @@
+# src/federated/batched_clients.py
+import math
+import random
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+from .model_manager import build_client_model
+from .client_executor import _weight_initializers, _draw_init_seeds, _initial_weights
+
+class BatchedClients:
+    """All clients trained as one batched MLP: parameters stacked as [N, in, out].
+
+    Every client model is the same Flatten + Dense stack (`build_client_model`),
+    so instead of N `fit` calls one compiled epoch runs a batched matmul
+    forward/backward step for all clients at once, each client on its own
+    data batch, with its own Adam state and step count (Keras' Adam update,
+    loss and `validation_split=0.1` hold-out, replicated). Clients whose data
+    runs out before the others are masked out of the remaining steps.
+
+    Results match the per-model path up to batch order (each client's data
+    is shuffled from its peer seed with numpy, not by Keras) and float
+    round-off. State is kept as numpy, laid out like SharedModelClients:
+    optimizer states in `get_state` use Keras' variable order, so checkpoints
+    and resume work unchanged. Initial weights are drawn from the same
+    initializer seeds as a sequence of `build_fn()` models (see
+    SharedModelClients), so they match the other clients for a seed.
+    """
+
+    batched = True  # train_peers runs these through `fit` / `evaluate` (see client_executor)
+    validation_split = 0.1
+
+    def __init__(self, num_clients: int, build_fn=build_client_model):
+        state = random.getstate()
+        self.model = build_fn()
+        inits = _weight_initializers(self.model)
+        random.setstate(state)
+        if inits is not None:
+            # draw each client's initializer seeds (as SharedModelClients does) and write its
+            # weights straight into the stacks, without building the N models
+            seeds = [_draw_init_seeds(inits) for _ in range(num_clients)]
+            _draw_init_seeds(inits)  # the RNG ends where n + 1 builds leave it
+            self._weights = [np.empty((num_clients, *var.shape), dtype=var.dtype) for _, var in inits]
+            for i, client_seeds in enumerate(seeds):
+                for w, x in zip(self._weights, _initial_weights(inits, client_seeds)):
+                    w[i] = x
+        else:
+            init = [build_fn().get_weights() for _ in range(num_clients)]
+            self.model = build_fn()
+            self._weights = [np.stack([w[l] for w in init]) for l in range(len(init[0]))]
+        self._activations = dense_activations(self.model)
+        opt = self.model.optimizer
+        self._hyper = (float(opt.learning_rate.numpy()), float(opt.beta_1), float(opt.beta_2), float(opt.epsilon))
+        self._m = [np.zeros_like(w) for w in self._weights]
+        self._v = [np.zeros_like(w) for w in self._weights]
+        self._steps = np.zeros(num_clients, dtype=np.int64)
+        self._global = None
+
+    def __len__(self):
+        return len(self._steps)
+
+    # ---------- client state ----------
+    def get_weights(self, i: int) -> list[np.ndarray]:
+        return [w[i].copy() for w in self._weights]
+
+    def get_state(self, i: int):
+        opt_state = [np.array(self._steps[i]), np.array(self._hyper[0], dtype=np.float32)]
+        for m, v in zip(self._m, self._v):
+            opt_state += [m[i].copy(), v[i].copy()]
+        return self.get_weights(i), opt_state
+
+    def set_state(self, i: int, weights, opt_state):
+        # weights=None: keep the client's weights, update the optimizer state only
+        if weights is not None:
+            for w, x in zip(self._weights, weights):
+                w[i] = x
+        self._steps[i] = int(opt_state[0])
+        for l, (m, v) in enumerate(zip(self._m, self._v)):
+            m[i], v[i] = opt_state[2 + 2 * l], opt_state[3 + 2 * l]
+
+    def set_global(self, weights):
+        self._global = weights
+        for w, x in zip(self._weights, weights):
+            w[:] = x
+
+    def global_model(self):
+        self.model.set_weights(self._global)
+        return self.model
+
+    # ---------- batched local updates ----------
+    def _gather(self, xs, ys, rows, batch_size: int, seeds=None):
+        return _gather(xs, ys, rows, batch_size, seeds)
+
+    def fit(self, peers: list[int], xs, ys, batch_size: int, seeds: list[int]):
+        """One local epoch for each client in `peers` (its own data and seed), all in one batched pass."""
+        rows = [math.floor(len(y) * (1.0 - self.validation_split)) for y in ys]
+        x, y, idx, mask = self._gather(xs, ys, rows, batch_size, seeds)
+        sel = np.asarray(peers)
+        out = _fit_epoch(tuple(tf.constant(w[sel]) for w in self._weights),
+                         tuple(tf.constant(m[sel]) for m in self._m),
+                         tuple(tf.constant(v[sel]) for v in self._v),
+                         tf.constant(self._steps[sel].astype(np.float32)),
+                         tf.constant(x), tf.constant(y), tf.constant(idx), tf.constant(mask),
+                         self._activations, *self._hyper)
+        ws, ms, vs, steps = out
+        for l in range(len(self._weights)):
+            self._weights[l][sel] = ws[l].numpy()
+            self._m[l][sel] = ms[l].numpy()
+            self._v[l][sel] = vs[l].numpy()
+        self._steps[sel] = steps.numpy().astype(np.int64)
+
+    def evaluate(self, peers: list[int], xs, ys, batch_size: int = 256) -> list[float]:
+        """Accuracy of each client in `peers` on its own test split."""
+        x, y, idx, mask = self._gather(xs, ys, None, batch_size)
+        sel = np.asarray(peers)
+        correct, _ = _eval_sums(tuple(tf.constant(w[sel]) for w in self._weights), tf.constant(x), tf.constant(y),
+                                tf.constant(idx), tf.constant(mask), self._activations)
+        totals = mask.sum(axis=(0, 2))
+        return [float(c / t) if t else 0.0 for c, t in zip(correct.numpy(), totals)]
+
+class StackedEvaluator:
+    """Loss and accuracy of several weight lists of one Flatten + Dense model, each on its own data, in one pass.
+
+    The data slots (`xs[k]`, `ys[k]`, e.g. every client's test split plus the
+    full test set) are uploaded once at construction. Each call stacks the
+    given weights like BatchedClients and evaluates all of them in one
+    XLA-compiled batched forward pass. Slots larger than the average are cut
+    into chunks of about the average size, each evaluated by its own copy of
+    the weights, so that the stack is not padded to the largest slot.
+    Matches Keras' `evaluate` (loss and accuracy) up to float round-off.
+    """
+
+    def __init__(self, model, xs, ys, batch_size: int = 1024):
+        self._activations = dense_activations(model)
+        sizes = [len(y) for y in ys]
+        chunk = max(1, math.ceil(sum(sizes) / max(1, len(sizes))))
+        self._owner, cx, cy = [], [], []
+        for k, (x, y) in enumerate(zip(xs, ys)):
+            x, y = np.asarray(x), np.asarray(y)
+            for s in range(0, max(len(y), 1), chunk):
+                self._owner.append(k)
+                cx.append(x[s:s + chunk])
+                cy.append(y[s:s + chunk])
+        self._owner = np.asarray(self._owner)
+        self.sizes = np.asarray(sizes, dtype=np.float64)
+        x, y, self._idx, self._mask = _gather(cx, cy, None, batch_size)
+        self._x, self._y = tf.constant(x), tf.constant(y)
+
+    def __call__(self, weights: dict[int, list[np.ndarray]]) -> dict[int, tuple[float, float]]:
+        """slot -> (loss, accuracy) for each slot in `weights` (slot -> weight list)."""
+        sel = np.flatnonzero(np.isin(self._owner, list(weights)))
+        owners = self._owner[sel]
+        layers = len(next(iter(weights.values())))
+        ws = tuple(tf.constant(np.stack([np.asarray(weights[k][l], dtype=np.float32) for k in owners]))
+                   for l in range(layers))
+        correct, loss = _eval_sums(ws, self._x, self._y, tf.constant(self._idx[:, sel]),
+                                   tf.constant(self._mask[:, sel]), self._activations)
+        totals = {k: np.zeros(2) for k in weights}
+        for k, c, l in zip(owners, correct.numpy(), loss.numpy()):
+            totals[k] += (l, c)
+        return {k: (float(l / self.sizes[k]), float(c / self.sizes[k])) if self.sizes[k] else (0.0, 0.0)
+                for k, (l, c) in totals.items()}
+
+def dense_activations(model) -> tuple[str, ...]:
+    """Activation names of a Flatten + Dense model, as the batched forward pass runs them."""
+    if any(not isinstance(l, (keras.layers.Dense, keras.layers.Flatten)) for l in model.layers):
+        raise ValueError("batched models support Flatten + Dense layers only")
+    activations = tuple(l.activation.__name__ for l in model.layers if isinstance(l, keras.layers.Dense))
+    if activations[-1] != "softmax" or any(a not in ("relu", "linear") for a in activations[:-1]):
+        raise ValueError(f"unsupported activations {activations}")
+    return activations
+
+def _gather(xs, ys, rows, batch_size: int, seeds=None):
+    """Concatenated samples of the clients and [steps, clients, batch] row indices + mask."""
+    xs = [np.asarray(x, dtype=np.float32) for x in xs]
+    ys = [np.asarray(y) for y in ys]
+    if rows is not None:
+        xs = [x[:r] for x, r in zip(xs, rows)]
+        ys = [y[:r] for y, r in zip(ys, rows)]
+    counts = [len(y) for y in ys]
+    offsets = np.cumsum([0] + counts[:-1])
+    steps = max(1, max(math.ceil(n / batch_size) for n in counts))
+    idx = np.zeros((steps, len(xs), batch_size), dtype=np.int32)
+    mask = np.zeros((steps, len(xs), batch_size), dtype=np.float32)
+    for c, (n, off) in enumerate(zip(counts, offsets)):
+        order = np.arange(n) if seeds is None else np.random.default_rng(seeds[c]).permutation(n)
+        pad = steps * batch_size - n
+        idx[:, c, :] = (np.concatenate([order, np.zeros(pad, dtype=order.dtype)]) + off).reshape(steps, batch_size)
+        mask[:, c, :] = np.concatenate([np.ones(n), np.zeros(pad)]).reshape(steps, batch_size)
+    x = np.concatenate([x.reshape(len(x), -1) for x in xs])
+    y = np.concatenate(ys).astype(np.int32)
+    return x, y, idx, mask
+
+def _forward(ws, x, activations):
+    # x: [clients, batch, features]; ws: kernel [clients, in, out], bias [clients, out] per layer
+    h = x
+    for l, act in enumerate(activations):
+        h = tf.matmul(h, ws[2 * l]) + ws[2 * l + 1][:, None, :]
+        if act == "relu":
+            h = tf.nn.relu(h)
+    return tf.nn.softmax(h)
+
+@tf.function(reduce_retracing=True)
+def _fit_epoch(ws, ms, vs, steps, x, y, idx, mask, activations, lr, beta_1, beta_2, epsilon):
+    eps = keras.backend.epsilon()
+
+    def step(s, ws, ms, vs, steps):
+        rows, weight = idx[s], mask[s]
+        counts = tf.reduce_sum(weight, axis=1)
+        with tf.GradientTape() as tape:
+            tape.watch(ws)
+            probs = _forward(ws, tf.gather(x, rows), activations)
+            # Keras' sparse_categorical_crossentropy on probabilities, mean over each client's batch
+            logits = tf.math.log(tf.clip_by_value(probs, eps, 1 - eps))
+            ce = tf.nn.sparse_softmax_cross_entropy_with_logits(labels=tf.gather(y, rows), logits=logits)
+            loss = tf.reduce_sum(tf.reduce_sum(ce * weight, axis=1) / tf.maximum(counts, 1.0))
+        grads = tape.gradient(loss, ws)
+        # Keras' Adam, with a step count per client; clients without data in this step are left as is
+        active = counts > 0
+        new_steps = steps + tf.cast(active, steps.dtype)
+        alpha = lr * tf.sqrt(1 - tf.pow(beta_2, new_steps)) / (1 - tf.pow(beta_1, new_steps))
+        new_ws, new_ms, new_vs = [], [], []
+        for w, g, m, v in zip(ws, grads, ms, vs):
+            bcast = [-1] + [1] * (len(w.shape) - 1)
+            on = tf.reshape(active, bcast)
+            m_t = m + (g - m) * (1 - beta_1)
+            v_t = v + (tf.square(g) - v) * (1 - beta_2)
+            w_t = w - m_t * tf.reshape(alpha, bcast) / (tf.sqrt(v_t) + epsilon)
+            new_ws.append(tf.where(on, w_t, w))
+            new_ms.append(tf.where(on, m_t, m))
+            new_vs.append(tf.where(on, v_t, v))
+        return s + 1, tuple(new_ws), tuple(new_ms), tuple(new_vs), new_steps
+
+    _, ws, ms, vs, steps = tf.while_loop(lambda s, *_: s < tf.shape(idx)[0], step,
+                                         (tf.constant(0), ws, ms, vs, steps))
+    return ws, ms, vs, steps
+
+@tf.function(reduce_retracing=True, jit_compile=True)
+def _eval_sums(ws, x, y, idx, mask, activations):
+    # per stacked model: number of correct predictions and sum of Keras' cross-entropy over its masked rows
+    eps = keras.backend.epsilon()
+    correct = tf.zeros(tf.shape(idx)[1])
+    loss = tf.zeros(tf.shape(idx)[1])
+    for s in tf.range(tf.shape(idx)[0]):
+        rows, labels = idx[s], tf.gather(y, idx[s])
+        probs = _forward(ws, tf.gather(x, rows), activations)
+        pred = tf.argmax(probs, axis=-1, output_type=tf.int32)
+        correct += tf.reduce_sum(tf.cast(pred == labels, tf.float32) * mask[s], axis=1)
+        ce = tf.nn.sparse_softmax_cross_entropy_with_logits(labels=labels,
+                                                            logits=tf.math.log(tf.clip_by_value(probs, eps, 1 - eps)))
+        loss += tf.reduce_sum(ce * mask[s], axis=1)
+    return correct, loss
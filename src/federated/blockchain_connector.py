@@ -1,30 +1,80 @@
 # src/federated/blockchain_connector.py
-import os, json
-from dotenv import load_dotenv
+import os, json, threading
+from time import time
 from web3 import Web3
+from web3._utils.abi import get_abi_output_types
+from web3._utils.request import make_post_request
+from web3.exceptions import ContractLogicError
 from eth_account import Account
+from hexbytes import HexBytes
+from .instrumentation import get_tracer, rpc_counter_middleware
+from .readonly_connector import load_env, load_abi
+from . import compact
 
-load_dotenv()
+# Substrings of node errors that mean "this nonce is not usable" (geth/anvil wording)
+_NONCE_ERRORS = ("nonce too low", "nonce too high", "replacement transaction underpriced", "invalid nonce")
+# ... and that mean "this exact signed tx is already in the pool" (geth "already known", others "known transaction")
+_KNOWN_TX_ERRORS = ("already known", "known transaction")
 
-class Web3Connector:
-    def __init__(self):
-        self.w3 = Web3(Web3.HTTPProvider(os.getenv("WEB3_HTTP_PROVIDER")))
-        assert self.w3.is_connected(), "Web3 not connected"
+def _rpc_error_message(exc: Exception) -> str | None:
+    """Lower-cased message of the JSON-RPC error carried by `exc`, or None if it is not a node error.
+
+    web3 v6 raises ValueError(error_dict); v7 raises Web3RPCError with the
+    response in `rpc_response`.
+    """
+    response = getattr(exc, "rpc_response", None)
+    error = response.get("error") if isinstance(response, dict) else (exc.args[0] if exc.args else None)
+    if isinstance(error, dict) and "message" in error:
+        return str(error["message"]).lower()
+    return None
+
+def _send_error_kind(exc: Exception) -> str | None:
+    """"known" (the signed tx is already pending), "nonce" (re-sign with a fresh nonce) or None (give up)."""
+    msg = _rpc_error_message(exc)
+    if msg is None:
+        return None
+    if any(e in msg for e in _KNOWN_TX_ERRORS):
+        return "known"
+    if any(e in msg for e in _NONCE_ERRORS):
+        return "nonce"
+    return None
+
+def _call_or_error(fn, *args, **kwargs):
+    try:
+        return fn(*args, **kwargs)
+    except Exception as e:
+        return e
+
+class ContractLayout:
+    """Accounts, contracts and on-chain record formats shared by the sync and async connectors.
+
+    Subclasses set `self.w3` (a Web3 or AsyncWeb3); the methods here only
+    build contract functions and decode read results, so they work with both.
+    """
+    # "json": payloads/round info as strings (mint, mintWithPeersRoot); "compact": bytes32 hashes
+    # and packed metadata (mintCompact), decoded back to the same JSON on reads
+    encoding = "json"
+
+    def _init_encoding(self, encoding: str | None):
+        load_env()
+        encoding = encoding or os.getenv("FL_ONCHAIN_ENCODING", "json")
+        if encoding not in compact.ENCODINGS:
+            raise ValueError(f"unknown on-chain encoding {encoding!r} (expected one of {compact.ENCODINGS})")
+        self.encoding = encoding
 
+    def _init_contracts(self):
         # Aggregator
         self.agg_key = os.getenv("AGGREGATOR_PRIVATE_KEY")
         self.agg_acct = Account.from_key(self.agg_key)
 
-        with open(os.getenv("AGGREGATOR_ABI_PATH")) as f:
-            agg_abi = json.load(f)
+        agg_abi = load_abi(os.getenv("AGGREGATOR_ABI_PATH"))
         self.agg_contract = self.w3.eth.contract(
             address=Web3.to_checksum_address(os.getenv("AGGREGATOR_CONTRACT_ADDRESS")),
             abi=agg_abi
         )
 
         # Client (peers)
-        with open(os.getenv("CLIENT_ABI_PATH")) as f:
-            client_abi = json.load(f)
+        client_abi = load_abi(os.getenv("CLIENT_ABI_PATH"))
 
         addrs = [a.strip() for a in os.getenv("CLIENT_CONTRACT_ADDRESSES").split(",") if a.strip()]
         keys  = [k.strip() for k in os.getenv("CLIENT_PRIVATE_KEYS").split(",") if k.strip()]
@@ -38,31 +88,336 @@ class Web3Connector:
                 "contract": self.w3.eth.contract(address=Web3.to_checksum_address(addr), abi=client_abi)
             })
 
-    # ---------- low-level tx helper ----------
+    # ---------- contract functions ----------
+    def _peer_mint_fn(self, peer_idx: int, round_id: int, info_str: str):
+        c = self.client_contracts[peer_idx]["contract"]
+        if self.encoding == "compact":
+            return c.functions.mintCompact(round_id, *compact.pack_peer_info(info_str))
+        return c.functions.mint(round_id, info_str)
+
+    def _agg_mint_fn(self, hash_avg: str, round_info_json: str, peers_root: str | None = None):
+        agg = self.agg_contract.functions
+        if self.encoding == "compact":
+            root = bytes(32) if peers_root is None else bytes(HexBytes(peers_root))
+            return agg.mintCompact(compact.hash_to_bytes32(hash_avg), compact.pack_round_info(round_info_json), root)
+        if peers_root is not None:
+            return agg.mintWithPeersRoot(hash_avg, round_info_json, HexBytes(peers_root))
+        return agg.mint(hash_avg, round_info_json)
+
+    def _mint_state_fns(self, peer_idxs: list[int]) -> list:
+        fns = [self.agg_contract.functions.getCurrentRound()]
+        return fns + [self.client_contracts[i]["contract"].functions.getLastParticipatedRound() for i in peer_idxs]
+
+    def _mint_state(self, values: list, peer_idxs: list[int]) -> tuple[int | None, dict[int, int | None]]:
+        values = [None if isinstance(v, Exception) else int(v) for v in values]
+        return values[0], dict(zip(peer_idxs, values[1:]))
+
+    def _round_state_fns(self, round_id: int, peer_idxs: list[int], peers_root: bool) -> list:
+        agg = self.agg_contract.functions
+        if self.encoding == "compact":
+            fns = [agg.getCurrentRound(), agg.getRoundMeta(round_id), agg.getRoundWeightDigest(round_id)]
+            for i in peer_idxs:
+                c = self.client_contracts[i]["contract"].functions
+                fns += [c.roundWeightDigests(round_id), c.roundMetas(round_id)]
+        else:
+            fns = [agg.getCurrentRound(), agg.getRoundDetails(round_id), agg.getRoundWeight(round_id),
+                   agg.getRoundHash(round_id)]
+            fns += [self.client_contracts[i]["contract"].functions.roundDetails(round_id) for i in peer_idxs]
+        if peers_root:
+            fns.append(agg.getRoundPeersRoot(round_id))
+        return fns
+
+    def _round_state(self, values: list, round_id: int, peer_idxs: list[int], peers_root: bool) -> dict:
+        # `values`: results of `_round_state_fns`, exceptions for reads that failed
+        values = [None if isinstance(v, Exception) else v for v in values]
+        if self.encoding == "compact":
+            state = self._round_state_compact(values, round_id, peer_idxs)
+        else:
+            state = {
+                "current_round": None if values[0] is None else int(values[0]),
+                "round_details": values[1],
+                "round_weight": values[2],
+                "round_hash": values[3],
+                "peer_details": dict(zip(peer_idxs, values[4:4 + len(peer_idxs)])),
+            }
+        if peers_root:
+            root = values[-1]
+            state["peers_root"] = None if root is None else "0x" + bytes(root).hex()
+        return state
+
+    def _round_state_compact(self, values: list, round_id: int, peer_idxs: list[int]) -> dict:
+        peer_details = {}
+        for k, i in enumerate(peer_idxs):
+            words = values[3 + 2 * k:5 + 2 * k]
+            peer_details[i] = None if None in words else self._round_field("peer_details", words, round_id)
+        return {
+            "current_round": None if values[0] is None else int(values[0]),
+            "round_details": None if values[1] is None else self._round_field("round_details", values[1:2], round_id),
+            "round_weight": None if values[2] is None else self._round_field("round_weight", values[2:3], round_id),
+            "round_hash": None,
+            "peer_details": peer_details,
+        }
+
+    def _round_field_fns(self, field: str, round_id: int, peer_idx: int | None = None) -> list:
+        """Reads behind one round record: "round_details", "round_weight", "round_hash" or "peer_details"."""
+        is_compact = self.encoding == "compact"
+        if field == "peer_details":
+            c = self.client_contracts[peer_idx]["contract"].functions
+            return [c.roundWeightDigests(round_id), c.roundMetas(round_id)] if is_compact else [c.roundDetails(round_id)]
+        agg = self.agg_contract.functions
+        if is_compact:
+            # roundHashes was an alias of roundWeights: compact rounds store the digest once
+            return [agg.getRoundMeta(round_id) if field == "round_details" else agg.getRoundWeightDigest(round_id)]
+        getter = {"round_details": agg.getRoundDetails, "round_weight": agg.getRoundWeight,
+                  "round_hash": agg.getRoundHash}[field]
+        return [getter(round_id)]
+
+    def _round_field(self, field: str, values: list, round_id: int) -> str:
+        # `values`: results of `_round_field_fns`; unset compact words read as "" like unset strings
+        if self.encoding != "compact":
+            return values[0]
+        if field == "round_details":
+            return compact.unpack_round_info(values[0], round_id) or ""
+        if field == "peer_details":
+            return compact.unpack_peer_info(values[0], values[1], round_id) or ""
+        return compact.bytes32_to_hash(values[0]) or ""
+
+    # ---------- helpers ----------
+    def peer_count(self) -> int:
+        return len(self.client_contracts)
+
+    def get_peer_account_address(self, peer_idx: int) -> str:
+        return self.client_contracts[peer_idx]["acct"].address
+
+    def get_aggregator_account_address(self) -> str:
+        return self.agg_acct.address
+
+    # ---------- tx submission protocol ----------
+    def _submit_steps(self, acct, fn, gas: int):
+        """Sign/send/retry protocol of `_submit_tx`, shared by the sync and async connectors.
+
+        A generator that yields the node requests it needs as (name, *args)
+        and gets their results sent back by the connector's `_tx_step`:
+            ("nonce", address)      next local nonce of `address`
+            ("tx_params",)          (gas price, chain id)
+            ("build", fn, params)   fn.build_transaction(params)
+            ("send", raw)           the tx hash, or the exception the send raised
+            ("resync", address)     reload the account's pending nonce from the node
+        Returns the tx hash. The caller holds the account's lock while it runs.
+        """
+        tracer = get_tracer()
+        for attempt in range(self.nonce_retries + 1):
+            with tracer.phase("tx_build"):
+                nonce = yield "nonce", acct.address
+                gas_price, chain_id = yield ("tx_params",)
+                tx = yield "build", fn, {"from": acct.address, "nonce": nonce, "gas": gas,
+                                         "gasPrice": gas_price, "chainId": chain_id}
+            with tracer.phase("tx_sign"):
+                signed = Account.sign_transaction(tx, acct.key)
+            raw = getattr(signed, "rawTransaction", None) or getattr(signed, "raw_transaction", None)
+            with tracer.phase("tx_send"):
+                result = yield "send", raw
+            if not isinstance(result, Exception):
+                return result
+            kind = _send_error_kind(result)
+            if kind == "known":
+                # this exact tx is already pending (e.g. an earlier send timed out after reaching
+                # the node): its hash is the hash of the raw bytes, and re-signing would mint twice
+                return Web3.keccak(raw)
+            # nonce rejected (tx sent elsewhere, dropped, or counter drift): resync and re-sign
+            if kind != "nonce" or attempt == self.nonce_retries:
+                self._nonces.pop(acct.address, None)
+                raise result
+            yield "resync", acct.address
+            self._gas_price = None
+
+class Web3Connector(ContractLayout):
+    def __init__(self, encoding: str | None = None):
+        self._init_encoding(encoding)
+        self.w3 = Web3(Web3.HTTPProvider(os.getenv("WEB3_HTTP_PROVIDER")))
+        self.w3.middleware_onion.add(rpc_counter_middleware, "rpc_counter")
+        assert self.w3.is_connected(), "Web3 not connected"
+        self._init_contracts()
+        self._init_tx_state()
+
+    def _init_tx_state(self):
+        # Submission state: local nonces per account, cached chain id, periodic gas price
+        self.gas_price_ttl = float(os.getenv("GAS_PRICE_TTL_SEC", "10"))
+        self.nonce_retries = int(os.getenv("TX_NONCE_RETRIES", "3"))
+        self._chain_id = None
+        self._gas_price = None
+        self._gas_price_at = 0.0
+        self._nonces = {}
+        self._tx_lock = threading.Lock()
+
+    # ---------- low-level tx helpers ----------
+    def _get_chain_id(self) -> int:
+        if self._chain_id is None:
+            self._chain_id = int(self.w3.eth.chain_id)
+        return self._chain_id
+
+    def _get_gas_price(self) -> int:
+        now = time()
+        if self._gas_price is None or now - self._gas_price_at >= self.gas_price_ttl:
+            self._gas_price = int(self.w3.eth.gas_price)
+            self._gas_price_at = now
+        return self._gas_price
+
+    def _next_nonce(self, address: str) -> int:
+        if address not in self._nonces:
+            self._nonces[address] = int(self.w3.eth.get_transaction_count(address, "pending"))
+        nonce = self._nonces[address]
+        self._nonces[address] = nonce + 1
+        return nonce
+
+    def _resync_nonce(self, address: str):
+        self._nonces[address] = int(self.w3.eth.get_transaction_count(address, "pending"))
+
+    def _tx_step(self, name: str, *args):
+        # runs one request of `_submit_steps`
+        if name == "nonce":
+            return self._next_nonce(args[0])
+        if name == "tx_params":
+            return self._get_gas_price(), self._get_chain_id()
+        if name == "build":
+            return args[0].build_transaction(args[1])
+        if name == "send":
+            return _call_or_error(self.w3.eth.send_raw_transaction, args[0])
+        return self._resync_nonce(args[0])
+
+    def _submit_tx(self, acct, fn):
+        """Build, sign and send a tx without waiting for it; returns the tx hash."""
+        with get_tracer().phase("tx_build"):
+            gas = fn.estimate_gas({"from": acct.address})
+        with self._tx_lock:
+            steps, result = self._submit_steps(acct, fn, gas), None
+            try:
+                while True:
+                    result = self._tx_step(*steps.send(result))
+            except StopIteration as done:
+                return done.value
+
+    def _wait_receipts(self, tx_hashes: list) -> list:
+        tracer = get_tracer()
+        try:
+            with tracer.phase("receipt_wait"):
+                receipts = [self.w3.eth.wait_for_transaction_receipt(h) for h in tx_hashes]
+        except Exception:
+            # a tx may have been dropped: local nonces can no longer be trusted
+            with self._tx_lock:
+                self._nonces.clear()
+            raise
+        if tracer.enabled:
+            for r in receipts:
+                gas_used = int(r.get("gasUsed", 0))
+                tracer.count("tx")
+                tracer.count("gas_used", gas_used)
+                tracer.count("gas_cost_wei", gas_used * int(r.get("effectiveGasPrice", 0)))
+        failed = [r for r in receipts if r.get("status", 1) == 0]
+        if failed:
+            raise RuntimeError(f"{len(failed)} of {len(receipts)} transactions reverted: "
+                               + ", ".join(r["transactionHash"].hex() for r in failed))
+        return receipts
+
     def _send_tx(self, acct, fn):
-        tx = fn.build_transaction({
-            "from": acct.address,
-            "nonce": self.w3.eth.get_transaction_count(acct.address),
-            "gas": fn.estimate_gas({"from": acct.address}),
-            "gasPrice": self.w3.eth.gas_price,
-            "chainId": self.w3.eth.chain_id,
-        })
-        signed = self.w3.eth.account.sign_transaction(tx, private_key=acct.key)
-        raw = getattr(signed, "rawTransaction", None) or getattr(signed, "raw_transaction", None)
-        tx_hash = self.w3.eth.send_raw_transaction(raw)
-        receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
-        return receipt
+        return self._wait_receipts([self._submit_tx(acct, fn)])[0]
 
     # ---------- writes ----------
     def mint_peer_round(self, round_id: int, info_str: str, peer_idx: int):
-        c = self.client_contracts[peer_idx]["contract"]
         acct = self.client_contracts[peer_idx]["acct"]
-        fn = c.functions.mint(round_id, info_str)
-        return self._send_tx(acct, fn)
+        return self._send_tx(acct, self._peer_mint_fn(peer_idx, round_id, info_str))
 
     def mint_aggregator_round(self, hash_avg: str, round_info_json: str):
-        fn = self.agg_contract.functions.mint(hash_avg, round_info_json)
-        return self._send_tx(self.agg_acct, fn)
+        return self._send_tx(self.agg_acct, self._agg_mint_fn(hash_avg, round_info_json))
+
+    def mint_aggregator_round_with_root(self, hash_avg: str, round_info_json: str, peers_root: str):
+        # Merkle commitment mode: one tx per round, peer payloads committed by their root
+        return self._send_tx(self.agg_acct, self._agg_mint_fn(hash_avg, round_info_json, peers_root))
+
+    def mint_round_pipelined(self, round_id: int, peer_infos: dict[int, str], hash_avg: str, round_info_json: str):
+        """Send every peer mint of a round plus the aggregator mint back to back,
+        then wait for all receipts together. `peer_infos` maps peer_idx -> payload.
+        Returns (peer_receipts, agg_receipt)."""
+        tx_hashes = []
+        for peer_idx, info in peer_infos.items():
+            acct = self.client_contracts[peer_idx]["acct"]
+            tx_hashes.append(self._submit_tx(acct, self._peer_mint_fn(peer_idx, round_id, info)))
+        tx_hashes.append(self._submit_tx(self.agg_acct, self._agg_mint_fn(hash_avg, round_info_json)))
+        receipts = self._wait_receipts(tx_hashes)
+        return receipts[:-1], receipts[-1]
+
+    # ---------- batched reads ----------
+    def _rpc_batch(self, payload: list[dict]) -> list[dict]:
+        # One HTTP POST carrying a JSON-RPC batch; responses are matched back by id
+        provider = self.w3.provider
+        tracer = get_tracer()
+        tracer.count("rpc.batch")
+        tracer.count("rpc.batch_calls", len(payload))
+        with tracer.phase("read_batch"):
+            raw = make_post_request(provider.endpoint_uri, json.dumps(payload).encode(),
+                                    **dict(provider.get_request_kwargs()))
+        responses = json.loads(raw)
+        if not isinstance(responses, list):
+            raise ValueError(f"provider does not support JSON-RPC batches: {responses}")
+        by_id = {r.get("id"): r for r in responses}
+        return [by_id[p["id"]] for p in payload]
+
+    def _decode_call(self, fn, result):
+        values = self.w3.codec.decode(get_abi_output_types(fn.abi), HexBytes(result))
+        return values[0] if len(values) == 1 else tuple(values)
+
+    def call_batch(self, fns: list, block_identifier="latest") -> list:
+        """Run several contract reads in a single JSON-RPC batch request.
+
+        Returns one entry per call, in order: the decoded return value, or the
+        exception raised by that call (a reverting read does not fail the
+        others). If the provider rejects batches the calls are made one by one.
+        """
+        payload = [
+            {"jsonrpc": "2.0", "id": i, "method": "eth_call",
+             "params": [{"to": fn.address, "data": fn._encode_transaction_data()}, block_identifier]}
+            for i, fn in enumerate(fns)
+        ]
+        try:
+            responses = self._rpc_batch(payload)
+        except Exception:
+            return [_call_or_error(fn.call, block_identifier=block_identifier) for fn in fns]
+        out = []
+        for fn, resp in zip(fns, responses):
+            if "error" in resp:
+                err = resp["error"]
+                out.append(ContractLogicError(err.get("message", str(err)), data=err.get("data")))
+            else:
+                out.append(_call_or_error(self._decode_call, fn, resp.get("result")))
+        return out
+
+    def read_mint_state(self, peer_idxs) -> tuple[int | None, dict[int, int | None]]:
+        """currentRound and each peer's lastParticipatedRound, in one round trip.
+        Unreadable values are None."""
+        peer_idxs = list(peer_idxs)
+        return self._mint_state(self.call_batch(self._mint_state_fns(peer_idxs)), peer_idxs)
+
+    def read_round_state(self, round_id: int, peer_idxs=(), peers_root: bool = False) -> dict:
+        """Everything the post-mint verification reads, in one round trip:
+        currentRound, roundDetails/roundWeight/roundHash of `round_id` and the
+        peers' roundDetails(round_id); with peers_root=True also the round's
+        Merkle root of peer payloads (hex). Unreadable values are None.
+        In compact mode the packed records are decoded back to their JSON form
+        (`round_hash` is then None: the hash is stored once)."""
+        peer_idxs = list(peer_idxs)
+        values = self.call_batch(self._round_state_fns(round_id, peer_idxs, peers_root))
+        return self._round_state(values, round_id, peer_idxs, peers_root)
+
+    def get_balances_eth(self, addresses: list[str]) -> list[float | Exception]:
+        """Balances of several accounts in one JSON-RPC batch (per-address errors as values)."""
+        payload = [{"jsonrpc": "2.0", "id": i, "method": "eth_getBalance",
+                    "params": [Web3.to_checksum_address(a), "latest"]} for i, a in enumerate(addresses)]
+        try:
+            responses = self._rpc_batch(payload)
+        except Exception:
+            return [_call_or_error(self.get_balance_eth, a) for a in addresses]
+        return [ValueError(r["error"]) if "error" in r else float(Web3.from_wei(int(r["result"], 16), "ether"))
+                for r in responses]
 
     # ---------- reads (aggregator) ----------
     def get_current_round(self) -> int:
@@ -75,16 +430,18 @@ class Web3Connector:
     def get_aggregator_address(self) -> str:
         return self.agg_contract.functions.getAggregator().call()
 
+    def _read_round_field(self, field: str, round_id: int, peer_idx: int | None = None) -> str:
+        fns = self._round_field_fns(field, round_id, peer_idx)
+        return self._round_field(field, [fn.call() for fn in fns], round_id)
+
     def get_round_details(self, round_id: int) -> str:
-        return self.agg_contract.functions.getRoundDetails(round_id).call()
+        return self._read_round_field("round_details", round_id)
 
     def get_round_weight(self, round_id: int) -> str:
-        # if the contract exposes getRoundWeight (per your list)
-        return self.agg_contract.functions.getRoundWeight(round_id).call()
+        return self._read_round_field("round_weight", round_id)
 
     def get_round_hash(self, round_id: int) -> str:
-        # if the contract exposes getRoundHash (per your list)
-        return self.agg_contract.functions.getRoundHash(round_id).call()
+        return self._read_round_field("round_hash", round_id)
 
     # ---------- reads (peer) ----------
     def peer_get_status(self, peer_idx: int) -> int:
@@ -100,19 +457,7 @@ class Web3Connector:
         return c.functions.getPeerAddress().call()
 
     def peer_get_round_details(self, peer_idx: int, round_id: int) -> str:
-        # FedPeer exposes the public getter "roundDetails(uint256)"
-        c = self.client_contracts[peer_idx]["contract"]
-        return c.functions.roundDetails(round_id).call()
-
-    # ---------- helpers ----------
-    def peer_count(self) -> int:
-        return len(self.client_contracts)
-
-    def get_peer_account_address(self, peer_idx: int) -> str:
-        return self.client_contracts[peer_idx]["acct"].address
-
-    def get_aggregator_account_address(self) -> str:
-        return self.agg_acct.address
+        return self._read_round_field("peer_details", round_id, peer_idx)
 
     def get_balance_eth(self, address: str) -> float:
         bal_wei = self.w3.eth.get_balance(Web3.to_checksum_address(address))
@@ -0,0 +1,117 @@
+# src/federated/checkpoint_store.py
+import json, os, threading
+import numpy as np
+from .utils import hash_weight_list
+
+class CheckpointStore:
+    """Content-addressed weight store plus a round journal, for crash-resume.
+
+    Weight lists (peer weights, aggregated weights, optimizer states) are
+    stored once under objects/<hh>/<hash>.npz, keyed by hash_weight_list, as
+    compressed .npz whose keys ("layer_000", ...) sort in layer order: the
+    file hashes to its own name with tools/weights_hash.py, so the store
+    doubles as the source of files for hash verification.
+
+    journal.jsonl records every trained round (hashes, payloads, metrics)
+    and, separately, its on-chain commit. manifest.jsonl lists each stored
+    peer/aggregate file with the hash it must match (see `weights_hash.py
+    --manifest`).
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        self._journal_path = os.path.join(root, "journal.jsonl")
+        self._manifest_path = os.path.join(root, "manifest.jsonl")
+        self._lock = threading.Lock()
+
+    # ---------- objects ----------
+    def path(self, digest: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], f"{digest}.npz")
+
+    def put(self, weights: list[np.ndarray], digest: str | None = None) -> str:
+        """Store `weights` (no-op if already present); returns its hash."""
+        if digest is None:
+            digest = hash_weight_list(weights)
+        path = self.path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                np.savez_compressed(f, **{f"layer_{i:03d}": w for i, w in enumerate(weights)})
+            os.replace(tmp, path)
+        return digest
+
+    def get(self, digest: str) -> list[np.ndarray]:
+        with np.load(self.path(digest), allow_pickle=False) as data:
+            return [data[k] for k in sorted(data.keys())]
+
+    def __contains__(self, digest: str) -> bool:
+        return os.path.exists(self.path(digest))
+
+    # ---------- journal ----------
+    def _append(self, path: str, records: list[dict]):
+        with self._lock, open(path, "a", encoding="utf-8") as f:
+            for rec in records:
+                f.write(json.dumps(rec, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def record_round(self, round_idx: int, target_round: int, peer_hashes: list[str], opt_hashes: list[str],
+                     agg_hash: str, peer_infos: list[str], round_info: str, test_loss: float, test_acc: float,
+                     residual_hashes: list[str] | None = None):
+        """Journal a trained round. All referenced objects must already be stored."""
+        rec = {
+            "event": "trained", "round_idx": round_idx, "target_round": target_round,
+            "peer_hashes": peer_hashes, "opt_hashes": opt_hashes, "agg_hash": agg_hash,
+            "peer_infos": peer_infos, "round_info": round_info,
+            "test_loss": float(test_loss), "test_acc": float(test_acc),
+        }
+        if residual_hashes is not None:
+            # update-codec error-feedback residuals (see update_codec)
+            rec["residual_hashes"] = residual_hashes
+        self._append(self._journal_path, [rec])
+        rel = lambda h: os.path.relpath(self.path(h), self.root)
+        self._append(self._manifest_path,
+                     [{"path": rel(h), "payload": info} for h, info in zip(peer_hashes, peer_infos)]
+                     + [{"path": rel(agg_hash), "expected": agg_hash}])
+
+    def mark_committed(self, target_round: int):
+        self._append(self._journal_path, [{"event": "committed", "target_round": target_round}])
+
+    def rounds(self) -> list[dict]:
+        """Trained rounds in order, each with a "committed" flag (a re-trained round replaces the earlier record)."""
+        if not os.path.exists(self._journal_path):
+            return []
+        trained, committed = {}, set()
+        with open(self._journal_path, "r", encoding="utf-8") as f:
+            for ln in f:
+                try:
+                    rec = json.loads(ln)
+                except ValueError:
+                    continue  # torn last line after a crash
+                if rec.get("event") == "trained":
+                    trained[rec["round_idx"]] = rec
+                elif rec.get("event") == "committed":
+                    committed.add(rec["target_round"])
+        return [{**rec, "committed": rec["target_round"] in committed} for _, rec in sorted(trained.items())]
+
+    def resume_point(self, on_chain_round: int) -> tuple[list[dict], dict | None]:
+        """(rounds confirmed on chain, next trained-but-unconfirmed round or None).
+
+        A round counts as confirmed when its target round is <= `on_chain_round`.
+        Only a contiguous prefix of local rounds is returned, so resuming never
+        skips a round.
+        """
+        done, pending = [], None
+        for i, rec in enumerate(self.rounds()):
+            if rec["round_idx"] != i:
+                break
+            if rec["target_round"] <= on_chain_round:
+                done.append(rec)
+                continue
+            if rec["target_round"] == on_chain_round + 1 and all(
+                    h in self for h in [rec["agg_hash"], *rec["opt_hashes"], *rec.get("residual_hashes", [])]):
+                pending = rec
+            break
+        return done, pending
@@ -0,0 +1,496 @@
+# src/federated/client_executor.py
+import math
+import os
+import random
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from time import monotonic
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+from .model_manager import build_client_model, evaluate_acc
+from .utils import hash_weight_list
+from .update_codec import UpdateEncoder, iter_decode_update
+from .instrumentation import Tracer, get_tracer, set_tracer
+
+def peer_seed(seed: int, round_idx: int, peer_idx: int) -> int:
+    # One seed per (round, peer): the result of a local update does not depend
+    # on where (or in which order) the peers are trained.
+    return seed + 1000 * round_idx + peer_idx
+
+def sample_clients(num_clients: int, per_round: int | float | None, seed: int, round_idx: int,
+                   exclude=()) -> list[int]:
+    """Indices of the clients taking part in a round, sorted.
+
+    `per_round` is None (every client), a count (int) or a fraction of
+    `num_clients` (float in (0, 1]). The draw is seeded by (seed, round), so
+    a rerun picks the same clients. Clients in `exclude` (e.g. still busy
+    with a late update) are not eligible.
+    """
+    skip = set(exclude)
+    eligible = [i for i in range(num_clients) if i not in skip]
+    if per_round is None:
+        return eligible
+    if isinstance(per_round, float):
+        if not 0 < per_round <= 1:
+            raise ValueError(f"client fraction must be in (0, 1], got {per_round}")
+        k = max(1, round(per_round * num_clients))
+    else:
+        k = int(per_round)
+        if k < 1:
+            raise ValueError(f"clients per round must be >= 1, got {per_round}")
+    k = min(k, len(eligible))
+    rng = np.random.default_rng([seed, round_idx])
+    return sorted(int(i) for i in rng.choice(eligible, size=k, replace=False))
+
+def get_optimizer_state(model) -> list[np.ndarray]:
+    if not model.optimizer.built:
+        model.optimizer.build(model.trainable_variables)
+    return [v.numpy() for v in model.optimizer.variables]
+
+def set_optimizer_state(model, state: list[np.ndarray]):
+    if not model.optimizer.built:
+        model.optimizer.build(model.trainable_variables)
+    for v, arr in zip(model.optimizer.variables, state):
+        v.assign(arr)
+
+def local_update(model, x, y, x_test, y_test, batch_size: int, seed: int, peer: int | None = None,
+                 encoder: UpdateEncoder | None = None):
+    """Train 1 epoch, evaluate on the peer test split and hash the weights.
+
+    With an `encoder` the weights are returned as encoded update bytes and
+    the hash is taken over the decoded weights (what the aggregator gets).
+    """
+    tracer = get_tracer()
+    # client partitions are gathered here, one peer at a time
+    x, y, x_test, y_test = (np.asarray(a) for a in (x, y, x_test, y_test))
+    keras.utils.set_random_seed(seed)
+    with tracer.phase("fit", peer):
+        model.fit(x, y, epochs=1, batch_size=batch_size, validation_split=0.1, verbose=0)
+    with tracer.phase("evaluate", peer):
+        acc = evaluate_acc(model, x_test, y_test)
+    return _finish_update(model, acc, peer, encoder)
+
+def local_update_fast(model, dataset, seed: int, peer: int | None = None, encoder: UpdateEncoder | None = None):
+    """Train 1 epoch from a ClientDatasets pipeline and hash the weights; no evaluation (acc is None)."""
+    keras.utils.set_random_seed(seed)
+    with get_tracer().phase("fit", peer):
+        model.fit(dataset, epochs=1, verbose=0)
+    return _finish_update(model, None, peer, encoder)
+
+def _finish_update(model, acc, peer, encoder):
+    tracer = get_tracer()
+    weights = model.get_weights()
+    if encoder is not None:
+        with tracer.phase("encode", peer):
+            update, weights = encoder(weights)
+    with tracer.phase("hash", peer):
+        h = hash_weight_list(weights)
+    return (weights if encoder is None else update), acc, h
+
+class ClientDatasets:
+    """Every client's training input as tf.data pipelines over tensors built once per run (fast path).
+
+    Keras' `validation_split=0.1` is applied here, once: each client keeps
+    its first 90% of rows (as Keras splits them), converted to tensors up
+    front. The held-out rows only fed a validation pass whose metrics were
+    never read, so they are not evaluated. Each round a client's pipeline
+    batches a numpy permutation seeded with its peer seed (as in
+    BatchedClients), gathers the batches from the cached tensors and
+    prefetches them; batch order therefore differs from Keras' shuffling.
+    """
+
+    validation_split = 0.1
+
+    def __init__(self, xs, ys):
+        self._x, self._y = [], []
+        for x, y in zip(xs, ys):
+            n = math.floor(len(y) * (1.0 - self.validation_split))
+            self._x.append(tf.constant(np.asarray(x)[:n], dtype=tf.float32))
+            self._y.append(tf.constant(np.asarray(y)[:n]))
+
+    def __len__(self):
+        return len(self._y)
+
+    def dataset(self, i: int, batch_size: int, seed: int) -> tf.data.Dataset:
+        x, y = self._x[i], self._y[i]
+        order = np.random.default_rng(seed).permutation(int(y.shape[0]))
+        return (tf.data.Dataset.from_tensor_slices(order).batch(batch_size)
+                .map(lambda rows: (tf.gather(x, rows), tf.gather(y, rows)), num_parallel_calls=tf.data.AUTOTUNE)
+                .prefetch(tf.data.AUTOTUNE))
+
+# ---------- client state ----------
+class ModelClients:
+    """One compiled Keras model per client (the original layout)."""
+
+    def __init__(self, models):
+        self.models = models
+
+    def __len__(self):
+        return len(self.models)
+
+    def acquire(self, i: int):
+        return self.models[i]
+
+    def release(self, i: int, model):
+        pass
+
+    def get_state(self, i: int):
+        m = self.models[i]
+        return m.get_weights(), get_optimizer_state(m)
+
+    def set_state(self, i: int, weights, opt_state):
+        # weights=None: keep the model's weights, update the optimizer state only
+        if weights is not None:
+            self.models[i].set_weights(weights)
+        set_optimizer_state(self.models[i], opt_state)
+
+    def set_global(self, weights):
+        for m in self.models:
+            m.set_weights(weights)
+
+    def global_model(self):
+        return self.models[0]
+
+
+def _weight_initializers(model) -> list | None:
+    # (initializer, variable) of every weight, in get_weights() order, which is also the order in which
+    # the layers constructed their initializers; None if some weight is not a layer's kernel or bias
+    out = []
+    for layer in model.layers:
+        for name in ("kernel", "bias"):
+            var = getattr(layer, name, None)
+            if var is not None:
+                out.append((getattr(layer, name + "_initializer"), var))
+    return out if len(out) == len(model.weights) else None
+
+def _draw_init_seeds(inits) -> list:
+    # What building the model draws: Keras gives each random initializer created without a seed a default
+    # seed from Python's `random` (constant initializers draw nothing and get None)
+    return [getattr(init.__class__.from_config(init.get_config()), "seed", None) for init, _ in inits]
+
+def _initial_weights(inits, seeds) -> list[np.ndarray]:
+    # Initializers with an int seed are stateless: the same weights as the build that drew `seeds`
+    out = []
+    for (init, var), seed in zip(inits, seeds):
+        config = init.get_config() if seed is None else {**init.get_config(), "seed": seed}
+        out.append(np.asarray(init.__class__.from_config(config)(tuple(var.shape), var.dtype)))
+    return out
+
+class SharedModelClients:
+    """All clients trained on one compiled model; per-client state is numpy.
+
+    Each client keeps its optimizer state as numpy buffers that are swapped
+    into the shared model before its local update. Initial weights match
+    `[build_fn() for _ in range(n)]` (and ModelClients) for the same seed,
+    without building those models: only each client's initializer seeds are
+    drawn, in the same order, and its weights are generated from them when
+    needed, until the first FedAvg. Models whose weights are not all Dense-style
+    kernels/biases fall back to building the n models and keeping their weights.
+
+    A client's trained weights are handed to the caller, not stored: every
+    round ends with `set_global(avg_w)`, after which all clients share the
+    global weights.
+    """
+
+    def __init__(self, num_clients: int, build_fn=build_client_model):
+        state = random.getstate()
+        self.model = build_fn()
+        self._inits = _weight_initializers(self.model)
+        random.setstate(state)
+        if self._inits is not None:
+            self._init_seeds = [_draw_init_seeds(self._inits) for _ in range(num_clients)]
+            self._init_weights = None
+            # the shared model's own build: the RNG ends where n + 1 builds leave it
+            _draw_init_seeds(self._inits)
+        else:
+            self._init_seeds = None
+            self._init_weights = [build_fn().get_weights() for _ in range(num_clients)]
+            self.model = build_fn()
+        self._fresh_opt_state = get_optimizer_state(self.model)
+        self._opt_states = [None] * num_clients
+        self._global = None
+
+    def __len__(self):
+        return len(self._opt_states)
+
+    def get_state(self, i: int):
+        if self._global is not None:
+            weights = self._global
+        elif self._init_seeds is not None:
+            weights = _initial_weights(self._inits, self._init_seeds[i])
+        else:
+            weights = self._init_weights[i]
+        opt_state = self._opt_states[i] if self._opt_states[i] is not None else self._fresh_opt_state
+        return weights, opt_state
+
+    def set_state(self, i: int, weights, opt_state):
+        self._opt_states[i] = opt_state
+
+    def acquire(self, i: int):
+        weights, opt_state = self.get_state(i)
+        self.model.set_weights(weights)
+        set_optimizer_state(self.model, opt_state)
+        return self.model
+
+    def release(self, i: int, model):
+        self._opt_states[i] = get_optimizer_state(model)
+
+    def set_global(self, weights):
+        self._global = weights
+        self._init_weights = self._init_seeds = None
+
+    def global_model(self):
+        self.model.set_weights(self._global)
+        return self.model
+
+# ---------- process pool ----------
+_worker_model = None
+
+def _init_worker(intra_op_threads: int, trace: bool = False):
+    # Runs before the worker's TF runtime is initialized
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+    if trace:
+        # in-memory only: each task's phases are shipped back to the parent
+        set_tracer(Tracer())
+
+def _run_peer_task(task):
+    global _worker_model
+    weights, opt_state, x, y, x_test, y_test, batch_size, seed, peer, encoder = task
+    tracer = get_tracer()
+    trace = tracer.begin(-1, -1)
+    if _worker_model is None:
+        _worker_model = build_client_model()
+    _worker_model.set_weights(weights)
+    set_optimizer_state(_worker_model, opt_state)
+    new_w, acc, h = local_update(_worker_model, x, y, x_test, y_test, batch_size, seed, peer, encoder)
+    residual = None if encoder is None else encoder.residual
+    return new_w, get_optimizer_state(_worker_model), acc, h, residual, trace
+
+def make_process_pool(workers: int, intra_op_threads: int | None = None, trace: bool = False) -> ProcessPoolExecutor:
+    if intra_op_threads is None:
+        intra_op_threads = max(1, (os.cpu_count() or 1) // workers)
+    # spawn: a forked TF runtime is not safe to reuse
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=mp.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(intra_op_threads, trace),
+    )
+
+def train_peers(clients, xtr_s, ytr_s, xte_s, yte_s, batch_size: int, seeds: list[int], pool=None,
+                accumulator=None, sample_counts: list[float] | None = None, on_peer=None,
+                codec=None, reference: list[np.ndarray] | None = None, residuals: list | None = None,
+                peers: list[int] | None = None, deadline_sec: float | None = None, late=None,
+                inputs: ClientDatasets | None = None):
+    """Run fit/evaluate/hash for every peer, in-process or on `pool`.
+
+    `clients` is a ModelClients or SharedModelClients. Returns
+    (weight_lists, accs, hashes) in peer order. With a pool, each peer's
+    weights and optimizer state are shipped to a worker and the updated
+    state is written back, so both paths are interchangeable round after
+    round.
+
+    With an `accumulator` (see model_manager.FedAvgAccumulator) each peer's
+    weights are folded in as soon as they are available, optionally weighted
+    by `sample_counts`, and not kept: weight_lists is then None.
+
+    `on_peer(i, weights, hash)`, if given, is called for each peer as soon as
+    its result is available (e.g. to checkpoint it).
+
+    With a `codec` (see update_codec) each peer returns its update encoded
+    against `reference` (the round's global weights) and its hash over the
+    decoded form; updates are decoded here one at a time as they arrive, and
+    the decoded weights are what is returned, accumulated and passed to
+    `on_peer` (without `on_peer`, each layer goes into the accumulator as
+    it is decoded). `residuals` (one entry per peer, None at first) carries each
+    peer's error-feedback residual across rounds and is updated in place.
+
+    `peers` restricts the round to those client indices (`seeds`,
+    `sample_counts` and `residuals` stay indexed by client). With
+    `deadline_sec`, updates that arrive later than that after the start are
+    left out: the returned lists hold None for them. They are handed to
+    `late` (a LateUpdates) to be folded into a later round, or dropped when
+    `late` is None. In-process, peers not started by the deadline are not
+    trained at all. The first update to arrive is always accepted, so a
+    round never ends empty.
+
+    Batched clients (see batched_clients.BatchedClients) train all peers in
+    one pass, in-process: `pool` must be None, and since every update
+    arrives at once a deadline never leaves one out.
+
+    With `inputs` (a ClientDatasets) peers train in-process from those
+    pipelines (`xtr_s`/`ytr_s` are not used) and are not evaluated: accs
+    are None, to be computed for all peers at once at the end of the round
+    (see batched_clients.StackedEvaluator).
+    """
+    peers = list(range(len(clients))) if peers is None else list(peers)
+    deadline = None if deadline_sec is None else monotonic() + deadline_sec
+    encoders = {i: None if codec is None else
+                UpdateEncoder(codec, reference, None if residuals is None else residuals[i]) for i in peers}
+    if inputs is not None and (pool is not None or getattr(clients, "batched", False)):
+        raise ValueError("fast inputs train Keras clients in-process only")
+    if getattr(clients, "batched", False):
+        if pool is not None:
+            raise ValueError("batched clients train in-process, not on a worker pool")
+        results = _run_batched(clients, xtr_s, ytr_s, xte_s, yte_s, batch_size, seeds, peers, encoders)
+    elif pool is None:
+        results = _run_in_process(clients, xtr_s, ytr_s, xte_s, yte_s, batch_size, seeds, peers, encoders,
+                                  deadline, late, codec, reference, inputs)
+    else:
+        tasks = {
+            i: (*clients.get_state(i), xtr_s[i], ytr_s[i], xte_s[i], yte_s[i], batch_size, seeds[i], i, encoders[i])
+            for i in peers
+        }
+        if deadline is None:
+            results = zip(peers, _write_back(clients, peers, pool.map(_run_peer_task, tasks.values()),
+                                             coded=codec is not None))
+        else:
+            results = _run_on_pool_until(clients, pool, tasks, deadline, late, codec, reference)
+
+    by_peer = {}
+    for i, (w, acc, h, residual) in results:
+        num_samples = 1.0 if sample_counts is None else sample_counts[i]
+        if accumulator is not None and on_peer is None:
+            # nothing else needs the weights: fold each layer in as it is decoded
+            w = _receive_update(i, w, residual, codec, reference, residuals, accumulator, num_samples)
+        else:
+            w = _receive_update(i, w, residual, codec, reference, residuals)
+            if on_peer is not None:
+                on_peer(i, w, h)
+            if accumulator is not None:
+                accumulator.add(w, num_samples)
+                w = None
+        by_peer[i] = (w, acc, h)
+    out = [by_peer.get(i, (None, None, None)) for i in peers]
+    weight_lists = None if accumulator is not None else [w for w, _, _ in out]
+    return weight_lists, [acc for _, acc, _ in out], [h for _, _, h in out]
+
+def _receive_update(i: int, w, residual, codec, reference, residuals, accumulator=None, num_samples=1.0):
+    # Aggregator side of one update: count its bytes and decode it if coded. With an
+    # `accumulator` the layers are folded into it as they are decoded (never held as a
+    # full list) and None is returned.
+    tracer = get_tracer()
+    if codec is None:
+        nbytes = sum(np.asarray(x).nbytes for x in w)
+        tracer.count("update_bytes", nbytes)
+        tracer.count("update_raw_bytes", nbytes)
+        if accumulator is not None:
+            accumulator.add(w, num_samples)
+            w = None
+        return w
+    tracer.count("update_bytes", len(w))
+    with tracer.phase("decode", i):
+        layers = _counted_layers(iter_decode_update(w, reference), tracer)
+        if accumulator is None:
+            w = list(layers)
+        else:
+            accumulator.add(layers, num_samples)
+            w = None
+    if residuals is not None:
+        residuals[i] = residual
+    return w
+
+def _counted_layers(layers, tracer):
+    nbytes = 0
+    for x in layers:
+        nbytes += x.nbytes
+        yield x
+    tracer.count("update_raw_bytes", nbytes)
+
+def _run_in_process(clients, xtr_s, ytr_s, xte_s, yte_s, batch_size, seeds, peers, encoders,
+                    deadline=None, late=None, codec=None, reference=None, inputs=None):
+    accepted = False
+    for i in peers:
+        if deadline is not None and accepted and monotonic() >= deadline:
+            break  # the rest would only start after the deadline
+        m = clients.acquire(i)
+        if inputs is None:
+            w, acc, h = local_update(m, xtr_s[i], ytr_s[i], xte_s[i], yte_s[i], batch_size, seeds[i], i, encoders[i])
+        else:
+            w, acc, h = local_update_fast(m, inputs.dataset(i, batch_size, seeds[i]), seeds[i], i, encoders[i])
+        clients.release(i, m)
+        result = w, acc, h, None if encoders[i] is None else encoders[i].residual
+        if deadline is not None and accepted and monotonic() > deadline:
+            if late is not None:
+                late.add(i, result, codec, reference)
+            continue
+        accepted = True
+        yield i, result
+
+def _run_batched(clients, xtr_s, ytr_s, xte_s, yte_s, batch_size, seeds, peers, encoders):
+    tracer = get_tracer()
+    with tracer.phase("fit"):
+        clients.fit(peers, [xtr_s[i] for i in peers], [ytr_s[i] for i in peers], batch_size,
+                    [seeds[i] for i in peers])
+    with tracer.phase("evaluate"):
+        accs = clients.evaluate(peers, [xte_s[i] for i in peers], [yte_s[i] for i in peers])
+    for i, acc in zip(peers, accs):
+        weights, update = clients.get_weights(i), None
+        if encoders[i] is not None:
+            with tracer.phase("encode", i):
+                update, weights = encoders[i](weights)
+        with tracer.phase("hash", i):
+            h = hash_weight_list(weights)
+        yield i, (weights if update is None else update, acc, h, None if update is None else encoders[i].residual)
+
+def _run_on_pool_until(clients, pool, tasks: dict, deadline: float, late=None, codec=None, reference=None):
+    futures = {i: pool.submit(_run_peer_task, task) for i, task in tasks.items()}
+    done, _ = wait(futures.values(), timeout=max(0.0, deadline - monotonic()))
+    if not done:
+        done, _ = wait(futures.values(), return_when=FIRST_COMPLETED)
+    on_time = [i for i in futures if futures[i] in done]
+    for i in futures:
+        if i in on_time:
+            continue
+        if late is not None:
+            late.add_future(i, futures[i], codec, reference)
+        else:
+            futures[i].cancel()  # dropped: not started -> never runs, running -> result ignored
+    yield from zip(on_time, _write_back(clients, on_time, (futures[i].result() for i in on_time),
+                                        coded=codec is not None))
+
+def _write_back(clients, peers, pool_results, coded: bool = False):
+    current = get_tracer().current()
+    for i, (w, opt_state, acc, h, residual, trace) in zip(peers, pool_results):
+        # a coded update is not weights yet: only the optimizer state is written back
+        clients.set_state(i, None if coded else w, opt_state)
+        if trace is not None and current is not None:
+            current.merge(trace)
+        yield w, acc, h, residual
+
+class LateUpdates:
+    """Updates that missed their round's deadline, to be folded into a later round.
+
+    Holds finished in-process results and still-running pool futures, each
+    with the codec and reference weights of the round it was trained in.
+    `collect` waits for the pending ones and returns them decoded, in peer
+    order, as [(peer, weights, acc, hash)].
+    """
+
+    def __init__(self):
+        self._items = {}
+
+    def __len__(self):
+        return len(self._items)
+
+    def peers(self) -> list[int]:
+        return sorted(self._items)
+
+    def add(self, i: int, result, codec=None, reference=None):
+        self._items[i] = (None, result, codec, reference)
+
+    def add_future(self, i: int, future, codec=None, reference=None):
+        self._items[i] = (future, None, codec, reference)
+
+    def collect(self, clients, residuals: list | None = None) -> list[tuple]:
+        out = []
+        for i in self.peers():
+            future, result, codec, reference = self._items.pop(i)
+            if future is not None:
+                (result,) = _write_back(clients, [i], [future.result()], coded=codec is not None)
+            w, acc, h, residual = result
+            out.append((i, _receive_update(i, w, residual, codec, reference, residuals), acc, h))
+        return out
@@ -0,0 +1,109 @@
+# src/federated/compact.py
+"""Compact on-chain encoding of round and peer records (`mintCompact`).
+
+Hashes go on chain as bytes32 and the metadata as one packed bytes32 word
+(big-endian fields, left-aligned, zero padding):
+
+    round: uint64 timestamp | uint32 duration_ms | uint16 participants | uint16 local_epochs |
+           uint32 batch_size | uint32 avg_round_accuracy * 1e6 | uint64 lr * 1e9
+    peer:  uint32 peer_id | uint32 test_accuracy * 1e6
+
+The decoders rebuild the same compact JSON the orchestrator writes in JSON
+mode, so both modes are verified and audited as strings. Floats are scaled to
+integers; `canonical_round_info`/`canonical_peer_info` snap a JSON record to
+that grid so that JSON -> word -> JSON is exact.
+"""
+import calendar, json, struct, time
+
+ENCODINGS = ("json", "compact")
+
+ACC_SCALE = 10**6       # accuracies: 6 decimals
+DURATION_SCALE = 10**3  # seconds -> milliseconds
+LR_SCALE = 10**9        # learning rate: 9 decimals
+
+_ROUND = struct.Struct(">QIHHIIQ")
+_PEER = struct.Struct(">II")
+_TS_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+_ZERO = bytes(32)
+
+def _dumps(obj: dict) -> str:
+    return json.dumps(obj, separators=(",", ":"))
+
+def _scaled(value: float, scale: int, field: str) -> int:
+    out = round(float(value) * scale)
+    if out < 0:
+        raise ValueError(f"{field}={value} cannot be encoded (negative)")
+    return out
+
+def _pack(fmt: struct.Struct, values: tuple, what: str) -> bytes:
+    try:
+        return fmt.pack(*values).ljust(32, b"\0")
+    except struct.error as e:
+        raise ValueError(f"{what} out of range for the compact encoding: {values}") from e
+
+def hash_to_bytes32(weight_hash: str) -> bytes:
+    """`hash_weight_list` hex digest (with or without 0x) -> 32 bytes."""
+    raw = bytes.fromhex(weight_hash[2:] if weight_hash.startswith("0x") else weight_hash)
+    if len(raw) != 32:
+        raise ValueError(f"expected a 32-byte hash, got {len(raw)} bytes")
+    return raw
+
+def bytes32_to_hash(raw: bytes) -> str | None:
+    """32 bytes -> hex digest in the `hash_weight_list` format; None for an unset (zero) word."""
+    raw = bytes(raw)
+    return None if raw == _ZERO else raw.hex()
+
+# ---------- round metadata ----------
+def pack_round_info(round_info: str | dict) -> bytes:
+    info = json.loads(round_info) if isinstance(round_info, str) else round_info
+    ts = calendar.timegm(time.strptime(info["timestamp"], _TS_FORMAT))
+    return _pack(_ROUND, (
+        ts,
+        _scaled(info["duration_sec"], DURATION_SCALE, "duration_sec"),
+        int(info["participants"]),
+        int(info["local_epochs"]),
+        int(info["batch_size"]),
+        _scaled(info["avg_round_accuracy"], ACC_SCALE, "avg_round_accuracy"),
+        _scaled(info["lr"], LR_SCALE, "lr"),
+    ), "round info")
+
+def unpack_round_info(meta: bytes, round_id: int) -> str | None:
+    """Packed round word -> round JSON (same keys and layout as the JSON mode); None if unset."""
+    meta = bytes(meta)
+    if meta == _ZERO:
+        return None
+    ts, dur_ms, participants, epochs, batch, acc, lr = _ROUND.unpack(meta[:_ROUND.size])
+    return _dumps({
+        "round_id": int(round_id),
+        "timestamp": time.strftime(_TS_FORMAT, time.gmtime(ts)),
+        "duration_sec": dur_ms / DURATION_SCALE,
+        "participants": participants,
+        "local_epochs": epochs,
+        "batch_size": batch,
+        "avg_round_accuracy": acc / ACC_SCALE,
+        "lr": lr / LR_SCALE,
+    })
+
+def canonical_round_info(round_info: str) -> str:
+    """`round_info` rounded to what the compact encoding stores."""
+    return unpack_round_info(pack_round_info(round_info), json.loads(round_info)["round_id"])
+
+# ---------- peer payloads ----------
+def pack_peer_info(peer_info: str | dict) -> tuple[bytes, bytes]:
+    """Peer payload -> (weight hash, packed meta) for FedPeerNFT.mintCompact."""
+    info = json.loads(peer_info) if isinstance(peer_info, str) else peer_info
+    meta = _pack(_PEER, (int(info["peer_id"]), _scaled(info["test_accuracy"], ACC_SCALE, "test_accuracy")),
+                 "peer info")
+    return hash_to_bytes32(info["weight_hash"]), meta
+
+def unpack_peer_info(weight_hash: bytes, meta: bytes, round_id: int) -> str | None:
+    """(weight hash, packed meta) -> peer JSON payload; None if the round was not minted compactly."""
+    h = bytes32_to_hash(weight_hash)
+    if h is None:
+        return None
+    peer_id, acc = _PEER.unpack(bytes(meta)[:_PEER.size])
+    return _dumps({"peer_id": peer_id, "round": int(round_id), "weight_hash": h, "test_accuracy": acc / ACC_SCALE})
+
+def canonical_peer_info(peer_info: str) -> str:
+    info = json.loads(peer_info)
+    return unpack_peer_info(*pack_peer_info(info), info["round"])
@@ -1,19 +1,149 @@
+import os
+import mmap
 import numpy as np
-from tensorflow import keras
 
-def load_mnist_normalized():
+_MNIST_FILES = ("x_train", "y_train", "x_test", "y_test")
+
+def default_cache_dir() -> str:
+    return os.getenv("FL_DATA_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "federated-web3-auditing"))
+
+def _save_npy(path: str, arr: np.ndarray):
+    # write-then-rename: an interrupted run never leaves a truncated cache file
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, arr)
+    os.replace(tmp, path)
+
+def load_mnist_normalized(cache_dir: str | None = None, memmap: bool = True):
+    """MNIST as float32 in [0, 1], cached on disk as .npy files.
+
+    The first call downloads/normalizes and writes the cache; later calls
+    open the cached arrays read-only with np.memmap (memmap=False loads them
+    into memory). Pass cache_dir="" to bypass the cache.
+    """
+    if cache_dir is None:
+        cache_dir = default_cache_dir()
+    if cache_dir:
+        root = os.path.join(cache_dir, "mnist")
+        paths = [os.path.join(root, f"{name}.npy") for name in _MNIST_FILES]
+        if all(os.path.exists(p) for p in paths):
+            x_train, y_train, x_test, y_test = (np.load(p, mmap_mode="r" if memmap else None) for p in paths)
+            return (x_train, y_train), (x_test, y_test)
+
+    from tensorflow import keras
     (x_train, y_train), (x_test, y_test) = keras.datasets.mnist.load_data()
     x_train = x_train.astype("float32") / 255.0
     x_test  = x_test.astype("float32") / 255.0
-    return (x_train, y_train), (x_test, y_test)
+    if not cache_dir:
+        return (x_train, y_train), (x_test, y_test)
+
+    os.makedirs(root, exist_ok=True)
+    for p, arr in zip(paths, (x_train, y_train, x_test, y_test)):
+        _save_npy(p, arr)
+    return load_mnist_normalized(cache_dir, memmap)
+
+# ---------- client partitions ----------
+class ClientPartition:
+    """Rows `indices` of `base`, gathered only when asked for.
+
+    Holds a reference to the (possibly memory-mapped) base array and an index
+    array, never a copy. np.asarray(part) materializes the partition;
+    part.batches(n) yields it batch by batch. A memmap-backed partition
+    pickles as (file path, indices), so worker processes reopen the file
+    instead of receiving the data.
+    """
+
+    def __init__(self, base: np.ndarray, indices: np.ndarray):
+        self.base = base
+        self.indices = np.asarray(indices, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.indices)
+
+    @property
+    def shape(self):
+        return (len(self.indices),) + self.base.shape[1:]
 
-def split_among_clients(x, y, num_clients=5):
-    n = x.shape[0]
+    @property
+    def dtype(self):
+        return self.base.dtype
+
+    def __array__(self, dtype=None, copy=None):
+        out = self.base[self.indices]
+        return out if dtype is None else out.astype(dtype, copy=False)
+
+    def __getitem__(self, key):
+        return self.base[self.indices[key]]
+
+    def batches(self, batch_size: int):
+        for start in range(0, len(self.indices), batch_size):
+            yield self.base[self.indices[start:start + batch_size]]
+
+    def __getstate__(self):
+        # only a memmap opened straight from a file (not a view of one) can be reopened by path
+        if isinstance(self.base, np.memmap) and isinstance(self.base.base, mmap.mmap):
+            return {"path": self.base.filename, "indices": self.indices}
+        return {"base": np.asarray(self.base), "indices": self.indices}
+
+    def __setstate__(self, state):
+        self.indices = state["indices"]
+        if "path" in state:
+            path = state["path"]
+            if not os.path.exists(path):
+                # unpickled on another host (socket workers): same file from the local cache
+                path = os.path.join(default_cache_dir(), "mnist", os.path.basename(path))
+            self.base = np.load(path, mmap_mode="r")
+        else:
+            self.base = state["base"]
+
+def iid_partition(y, num_clients: int) -> list[np.ndarray]:
+    # Random permutation cut into equal chunks (the remainder is dropped)
+    n = len(y)
     idx = np.random.permutation(n)
-    x, y = x[idx], y[idx]
     chunk = n // num_clients
-    xs, ys = [], []
-    for i in range(num_clients):
-        xs.append(x[i*chunk:(i+1)*chunk])
-        ys.append(y[i*chunk:(i+1)*chunk])
+    return [idx[i*chunk:(i+1)*chunk] for i in range(num_clients)]
+
+def dirichlet_partition(y, num_clients: int, alpha: float = 0.5) -> list[np.ndarray]:
+    # Per class, client proportions ~ Dir(alpha); small alpha = skewed label mix
+    y = np.asarray(y)
+    parts = [[] for _ in range(num_clients)]
+    for c in np.unique(y):
+        idx = np.random.permutation(np.flatnonzero(y == c))
+        cuts = (np.cumsum(np.random.dirichlet([alpha] * num_clients))[:-1] * len(idx)).astype(int)
+        for i, chunk in enumerate(np.split(idx, cuts)):
+            parts[i].append(chunk)
+    return [np.random.permutation(np.concatenate(p)) for p in parts]
+
+def shard_partition(y, num_clients: int, shards_per_client: int = 2) -> list[np.ndarray]:
+    # Sort by label, cut into equal shards, deal `shards_per_client` random shards to each client
+    y = np.asarray(y)
+    order = np.argsort(y, kind="stable")
+    num_shards = num_clients * shards_per_client
+    size = len(y) // num_shards
+    shards = np.random.permutation(num_shards)
+    return [
+        np.concatenate([order[s*size:(s+1)*size] for s in shards[i*shards_per_client:(i+1)*shards_per_client]])
+        for i in range(num_clients)
+    ]
+
+PARTITIONERS = {
+    "iid": iid_partition,
+    "dirichlet": dirichlet_partition,
+    "shard": shard_partition,
+}
+
+def split_among_clients(x, y, num_clients=5, partitioner="iid", **kwargs):
+    """Index-based partitions of (x, y): lists of ClientPartition, no data copied.
+
+    `partitioner` is a name in PARTITIONERS or a callable
+    (y, num_clients, **kwargs) -> list of index arrays. Randomness comes from
+    the global np.random state.
+    """
+    if isinstance(partitioner, str):
+        if partitioner not in PARTITIONERS:
+            raise ValueError(f"unknown partitioner {partitioner!r} (expected one of {sorted(PARTITIONERS)})")
+        partitioner = PARTITIONERS[partitioner]
+    parts = partitioner(y, num_clients, **kwargs)
+    xs = [ClientPartition(x, idx) for idx in parts]
+    ys = [ClientPartition(y, idx) for idx in parts]
     return xs, ys
@@ -0,0 +1,208 @@
+# src/federated/instrumentation.py
+import json, os, resource, threading
+from contextlib import nullcontext
+from time import perf_counter
+from .utils import utc_timestamp
+
+class RoundTrace:
+    """Phase durations and counters of one round.
+
+    Phases accumulate (a phase entered once per peer sums over peers); when a
+    peer index is given, the duration is also kept per peer.
+    """
+
+    def __init__(self, round_idx: int, target_round: int):
+        self.round_idx = round_idx
+        self.target_round = target_round
+        self.phases = {}
+        self.per_peer = {}
+        self.counters = {}
+
+    def add_phase(self, name: str, sec: float, peer: int | None = None):
+        p = self.phases.setdefault(name, {"sec": 0.0, "count": 0, "max_sec": 0.0})
+        p["sec"] += sec
+        p["count"] += 1
+        p["max_sec"] = max(p["max_sec"], sec)
+        if peer is not None:
+            slot = self.per_peer.setdefault(peer, {})
+            slot[name] = slot.get(name, 0.0) + sec
+
+    def count(self, name: str, n: float = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def merge(self, other: "RoundTrace"):
+        for name, p in other.phases.items():
+            mine = self.phases.setdefault(name, {"sec": 0.0, "count": 0, "max_sec": 0.0})
+            mine["sec"] += p["sec"]
+            mine["count"] += p["count"]
+            mine["max_sec"] = max(mine["max_sec"], p["max_sec"])
+        for peer, slots in other.per_peer.items():
+            mine = self.per_peer.setdefault(peer, {})
+            for name, sec in slots.items():
+                mine[name] = mine.get(name, 0.0) + sec
+        for name, n in other.counters.items():
+            self.count(name, n)
+
+class _Phase:
+    __slots__ = ("trace", "name", "peer", "t0")
+
+    def __init__(self, trace, name, peer):
+        self.trace, self.name, self.peer = trace, name, peer
+
+    def __enter__(self):
+        self.t0 = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.trace.add_phase(self.name, perf_counter() - self.t0, self.peer)
+        return False
+
+_NULL_PHASE = nullcontext()
+
+class NullTracer:
+    """Disabled tracer: every hook is a no-op (the default)."""
+    enabled = False
+
+    def current(self):
+        return None
+
+    def phase(self, name: str, peer: int | None = None):
+        return _NULL_PHASE
+
+    def count(self, name: str, n: float = 1):
+        pass
+
+    def begin(self, round_idx: int, target_round: int):
+        return None
+
+    def attach(self, trace):
+        pass
+
+    def finish(self, trace, **extra):
+        pass
+
+class Tracer(NullTracer):
+    """Per-round instrumentation written as a JSON Lines trace plus a Prometheus text file.
+
+    `begin` creates a round trace and binds it to the calling thread;
+    `phase`/`count` record into the trace bound to the current thread (a
+    background committer `attach`es the round it commits). `finish` appends
+    the round to trace.jsonl and rewrites metrics.prom with run totals.
+    Without an output directory nothing is written (traces are only kept in
+    memory, e.g. inside pool workers).
+    """
+    enabled = True
+
+    def __init__(self, out_dir: str | None = None):
+        self.out_dir = out_dir
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._totals = RoundTrace(-1, -1)
+        self._rounds = 0
+        self._last_round = 0
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+
+    def current(self):
+        return getattr(self._local, "trace", None)
+
+    def phase(self, name: str, peer: int | None = None):
+        trace = self.current()
+        return _NULL_PHASE if trace is None else _Phase(trace, name, peer)
+
+    def count(self, name: str, n: float = 1):
+        trace = self.current()
+        if trace is not None:
+            trace.count(name, n)
+
+    def begin(self, round_idx: int, target_round: int) -> RoundTrace:
+        trace = RoundTrace(round_idx, target_round)
+        self._local.trace = trace
+        return trace
+
+    def attach(self, trace):
+        self._local.trace = trace
+
+    def finish(self, trace, **extra):
+        if trace is None:
+            return
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # KiB on Linux
+        gas = trace.counters.get("gas_used", 0)
+        record = {
+            "timestamp": utc_timestamp(),
+            "round_idx": trace.round_idx,
+            "target_round": trace.target_round,
+            "phases": {k: {"sec": round(v["sec"], 6), "count": v["count"], "max_sec": round(v["max_sec"], 6)}
+                       for k, v in trace.phases.items()},
+            "per_peer": {str(k): {n: round(s, 6) for n, s in v.items()} for k, v in sorted(trace.per_peer.items())},
+            "counters": trace.counters,
+            "effective_gas_price_wei": (trace.counters.get("gas_cost_wei", 0) / gas) if gas else None,
+            "peak_rss_bytes": peak_rss,
+            **extra,
+        }
+        with self._lock:
+            self._totals.merge(trace)
+            self._rounds += 1
+            self._last_round = max(self._last_round, trace.target_round)
+            if self.out_dir:
+                with open(os.path.join(self.out_dir, "trace.jsonl"), "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, separators=(",", ":")) + "\n")
+                self._write_prometheus(peak_rss)
+
+    def _write_prometheus(self, peak_rss: int):
+        t = self._totals
+        lines = [
+            "# HELP fl_phase_seconds_total Wall time spent per phase.",
+            "# TYPE fl_phase_seconds_total counter",
+            *(f'fl_phase_seconds_total{{phase="{k}"}} {v["sec"]:.6f}' for k, v in sorted(t.phases.items())),
+            "# HELP fl_phase_calls_total Number of times each phase ran.",
+            "# TYPE fl_phase_calls_total counter",
+            *(f'fl_phase_calls_total{{phase="{k}"}} {v["count"]}' for k, v in sorted(t.phases.items())),
+        ]
+        rpc = {k[len("rpc."):]: v for k, v in t.counters.items() if k.startswith("rpc.")}
+        if rpc:
+            lines += ["# HELP fl_rpc_requests_total JSON-RPC requests by method.",
+                      "# TYPE fl_rpc_requests_total counter",
+                      *(f'fl_rpc_requests_total{{method="{k}"}} {v}' for k, v in sorted(rpc.items()))]
+        for name, help_ in (("gas_used", "Gas used by mined transactions."),
+                            ("gas_cost_wei", "gasUsed * effectiveGasPrice of mined transactions."),
+                            ("tx", "Mined transactions."),
+                            ("update_bytes", "Client update bytes received by the aggregator."),
+                            ("update_raw_bytes", "Float32 size of the decoded client updates.")):
+            lines += [f"# HELP fl_{name}_total {help_}", f"# TYPE fl_{name}_total counter",
+                      f"fl_{name}_total {t.counters.get(name, 0)}"]
+        lines += [
+            "# HELP fl_rounds_total Rounds traced.", "# TYPE fl_rounds_total counter", f"fl_rounds_total {self._rounds}",
+            "# HELP fl_last_round Last on-chain round traced.", "# TYPE fl_last_round gauge", f"fl_last_round {self._last_round}",
+            "# HELP fl_peak_rss_bytes Peak resident set size of this process.", "# TYPE fl_peak_rss_bytes gauge",
+            f"fl_peak_rss_bytes {peak_rss}",
+        ]
+        path = os.path.join(self.out_dir, "metrics.prom")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(path + ".tmp", path)
+
+_tracer = NullTracer()
+
+def get_tracer():
+    return _tracer
+
+def set_tracer(tracer):
+    """Install the process-wide tracer (None restores the no-op one); returns the previous tracer."""
+    global _tracer
+    prev, _tracer = _tracer, (tracer if tracer is not None else NullTracer())
+    return prev
+
+def rpc_counter_middleware(make_request, w3):
+    # web3 middleware: one counter per JSON-RPC method
+    def middleware(method, params):
+        _tracer.count(f"rpc.{method}")
+        return make_request(method, params)
+    return middleware
+
+async def async_rpc_counter_middleware(make_request, w3):
+    # the same counters for AsyncWeb3
+    async def middleware(method, params):
+        _tracer.count(f"rpc.{method}")
+        return await make_request(method, params)
+    return middleware
@@ -0,0 +1,84 @@
+# src/federated/merkle.py
+import json, os
+from Crypto.Hash import keccak
+
+# Keccak Merkle tree over peer payloads, compatible with OpenZeppelin MerkleProof
+# (FedAggregatorNFT.verifyPeerPayload): leaves are keccak256(keccak256(payload)),
+# parents hash the sorted pair, and an unpaired node is carried up unchanged.
+
+def _keccak(data: bytes) -> bytes:
+    k = keccak.new(digest_bits=256)
+    k.update(data)
+    return k.digest()
+
+def leaf_hash(payload: str) -> bytes:
+    return _keccak(_keccak(payload.encode("utf-8")))
+
+def _hash_pair(a: bytes, b: bytes) -> bytes:
+    return _keccak(a + b if a < b else b + a)
+
+def _to_hex(h: bytes) -> str:
+    return "0x" + h.hex()
+
+def _from_hex(h: str) -> bytes:
+    return bytes.fromhex(h[2:] if h.startswith("0x") else h)
+
+def _layers(payloads: list[str]) -> list[list[bytes]]:
+    if not payloads:
+        raise ValueError("cannot build a Merkle tree without leaves")
+    layers = [[leaf_hash(p) for p in payloads]]
+    while len(layers[-1]) > 1:
+        prev = layers[-1]
+        nxt = [_hash_pair(prev[i], prev[i + 1]) for i in range(0, len(prev) - 1, 2)]
+        if len(prev) % 2:
+            nxt.append(prev[-1])
+        layers.append(nxt)
+    return layers
+
+def merkle_root(payloads: list[str]) -> str:
+    return _to_hex(_layers(payloads)[-1][0])
+
+def _proof(layers: list[list[bytes]], index: int) -> list[str]:
+    proof = []
+    for layer in layers[:-1]:
+        sibling = index ^ 1
+        if sibling < len(layer):
+            proof.append(_to_hex(layer[sibling]))
+        index //= 2
+    return proof
+
+def merkle_proof(payloads: list[str], index: int) -> list[str]:
+    """Sibling hashes from leaf `index` up to the root."""
+    return _proof(_layers(payloads), index)
+
+def build_round_proofs(payloads: list[str]) -> tuple[str, list[list[str]]]:
+    """(root, proof of every payload) in one pass over the tree."""
+    layers = _layers(payloads)
+    return _to_hex(layers[-1][0]), [_proof(layers, i) for i in range(len(payloads))]
+
+def verify_proof(payload: str, proof: list[str], root: str) -> bool:
+    h = leaf_hash(payload)
+    for sibling in proof:
+        h = _hash_pair(h, _from_hex(sibling))
+    return h == _from_hex(root)
+
+# ---------- per-round proof files ----------
+def write_round_proofs(proof_dir: str, round_id: int, payloads: list[str]) -> tuple[str, str]:
+    """Write <proof_dir>/round_<n>.json (root + every payload with its proof); returns (root, path).
+
+    With the Merkle commitment the payloads are no longer stored on chain, so
+    this file is what peers and auditors check against getRoundPeersRoot.
+    """
+    root, proofs = build_round_proofs(payloads)
+    os.makedirs(proof_dir, exist_ok=True)
+    path = os.path.join(proof_dir, f"round_{round_id}.json")
+    doc = {"round": round_id, "root": root,
+           "leaves": [{"index": i, "payload": p, "proof": pr} for i, (p, pr) in enumerate(zip(payloads, proofs))]}
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(doc, f, indent=1)
+    os.replace(path + ".tmp", path)
+    return root, path
+
+def load_round_proofs(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
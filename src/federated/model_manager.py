@@ -1,8 +1,11 @@
+import os, tempfile
+from concurrent.futures import ThreadPoolExecutor
 from tensorflow import keras
 from tensorflow.keras import layers
 import numpy as np
 
-def build_client_model(input_shape=(28,28), n_classes=10):
+def build_client_model(input_shape=(28,28), n_classes=10, jit_compile=False):
+    # jit_compile=True: train/eval steps compiled with XLA (fast path)
     model = keras.Sequential([
         keras.Input(shape=input_shape),
         layers.Flatten(),
@@ -13,7 +16,8 @@ def build_client_model(input_shape=(28,28), n_classes=10):
     model.compile(
         loss="sparse_categorical_crossentropy",
         optimizer="adam",
-        metrics=["accuracy"]
+        metrics=["accuracy"],
+        jit_compile=jit_compile
     )
     return model
 
@@ -28,3 +32,294 @@ def average_layerwise(list_of_weight_lists: list[list[np.ndarray]]) -> list[np.n
         arrs = [w[l] for w in list_of_weight_lists]
         out.append(np.mean(arrs, axis=0))
     return out
+
+class FedAvgAccumulator:
+    """Incremental (optionally sample-weighted) FedAvg.
+
+    Folds one client's weight list at a time into preallocated per-layer
+    accumulators, so memory stays O(model size) whatever the number of
+    clients. With unit weights and the default float32 accumulator the
+    result is bit-identical to `average_layerwise`.
+    """
+
+    def __init__(self, dtype=np.float32):
+        self.dtype = np.dtype(dtype)
+        self._acc = None
+        self._total = 0.0
+        self.count = 0
+
+    def add(self, weights: list[np.ndarray], num_samples: float = 1.0):
+        """Fold in one client's layers.
+
+        `weights` may be any iterable (e.g. update_codec.iter_decode_update),
+        consumed one layer at a time; a wrong layer count is then only
+        detected after the first layers were folded in.
+        """
+        if num_samples <= 0:
+            raise ValueError("num_samples must be > 0")
+        if self._acc is not None and hasattr(weights, "__len__") and len(weights) != len(self._acc):
+            raise ValueError(f"expected {len(self._acc)} layers, got {len(weights)}")
+        first = self._acc is None
+        if first:
+            self._acc = []
+        n = 0
+        for n, w in enumerate(weights, 1):
+            if first:
+                self._acc.append(np.zeros(np.shape(w), dtype=self.dtype))
+            elif n > len(self._acc):
+                raise ValueError(f"expected {len(self._acc)} layers, got more")
+            acc = self._acc[n - 1]
+            if num_samples == 1.0:
+                np.add(acc, w, out=acc, casting="unsafe")
+            else:
+                # one layer-sized temporary at a time
+                np.add(acc, np.multiply(w, num_samples, dtype=self.dtype), out=acc)
+        if n != len(self._acc):
+            raise ValueError(f"expected {len(self._acc)} layers, got {n}")
+        self._total += float(num_samples)
+        self.count += 1
+
+    def result(self) -> list[np.ndarray]:
+        if self._acc is None:
+            raise ValueError("no client weights were added")
+        return [np.true_divide(acc, self._total).astype(np.float32, copy=False) for acc in self._acc]
+
+    def close(self):
+        """Release the accumulators (same interface as RobustAccumulator.close)."""
+        self._acc = None
+
+# ---------- robust aggregation ----------
+AGGREGATION_RULES = ("mean", "median", "trimmed_mean", "clipped_mean")
+DEFAULT_BLOCK_BYTES = 8 << 20  # per column block of the client stack
+
+def _reduce_blocks(stack, num_cols: int, reduce, block_bytes: int = DEFAULT_BLOCK_BYTES,
+                   workers: int | None = None) -> np.ndarray:
+    """Apply `reduce` ([cols, clients] float32 block -> [cols]) over column blocks of the client stack.
+
+    `stack` is a [clients, num_cols] array (a memmap is fine) or a list of
+    flat client rows. Each block is copied out transposed, so that every
+    coordinate's client values are contiguous and `reduce` may work on them
+    in place, and blocks run on a thread pool; at most `workers` blocks of
+    `block_bytes` are in memory at once.
+    """
+    n = len(stack)
+    cols = max(1, block_bytes // (4 * n))
+    out = np.empty(num_cols, dtype=np.float32)
+
+    def one(c0):
+        c1 = min(num_cols, c0 + cols)
+        block = np.empty((c1 - c0, n), dtype=np.float32)
+        for j in range(n):
+            block[:, j] = stack[j][c0:c1]
+        out[c0:c1] = reduce(block)
+
+    starts = range(0, num_cols, cols)
+    workers = workers or min(8, os.cpu_count() or 1)
+    if workers == 1 or len(starts) == 1:
+        for c0 in starts:
+            one(c0)
+    else:
+        with ThreadPoolExecutor(workers) as ex:
+            list(ex.map(one, starts))
+    return out
+
+# Both sort each block's rows in place: for the short rows here (one value per
+# client) numpy's vectorised sort is 2-3x faster than np.partition at the same
+# kth(s) (median_part / trimmed_part rows of benchmarks/bench_aggregation.py).
+def _median_block(block: np.ndarray) -> np.ndarray:
+    n = block.shape[1]
+    block.sort(axis=1)
+    if n % 2:
+        return block[:, n // 2]
+    return (block[:, n // 2 - 1] + block[:, n // 2]) / np.float32(2)
+
+def _trimmed_block(block: np.ndarray, k: int) -> np.ndarray:
+    n = block.shape[1]
+    if k:
+        block.sort(axis=1)
+    return block[:, k:n - k].mean(axis=1, dtype=np.float64)
+
+def _trim_count(n: int, trim: float) -> int:
+    if not 0 <= trim < 0.5:
+        raise ValueError(f"trim fraction must be in [0, 0.5), got {trim}")
+    return int(trim * n)
+
+def _unflatten(flat: np.ndarray, shapes: list[tuple]) -> list[np.ndarray]:
+    out, off = [], 0
+    for s in shapes:
+        size = int(np.prod(s))
+        out.append(flat[off:off + size].reshape(s))
+        off += size
+    return out
+
+def _flat(weights: list[np.ndarray]) -> np.ndarray:
+    return np.concatenate([np.asarray(w, dtype=np.float32).reshape(-1) for w in weights])
+
+def coordinate_median(list_of_weight_lists: list[list[np.ndarray]], **kw) -> list[np.ndarray]:
+    """Coordinate-wise median of the clients' weights (bounded memory, see `_reduce_blocks`)."""
+    acc = RobustAccumulator("median", **kw)
+    for w in list_of_weight_lists:
+        acc.add(w)
+    return acc.result()
+
+def trimmed_mean(list_of_weight_lists: list[list[np.ndarray]], trim: float, **kw) -> list[np.ndarray]:
+    """Coordinate-wise mean after dropping the int(trim * n) lowest and highest values."""
+    acc = RobustAccumulator("trimmed_mean", trim=trim, **kw)
+    for w in list_of_weight_lists:
+        acc.add(w)
+    return acc.result()
+
+def clipped_mean(list_of_weight_lists: list[list[np.ndarray]], reference: list[np.ndarray], max_norm: float,
+                 sample_counts: list[float] | None = None) -> list[np.ndarray]:
+    """FedAvg of the clients' updates against `reference`, each clipped to L2 norm <= max_norm."""
+    acc = ClippedFedAvgAccumulator(reference, max_norm)
+    for i, w in enumerate(list_of_weight_lists):
+        acc.add(w, 1.0 if sample_counts is None else sample_counts[i])
+    return acc.result()
+
+class ClippedFedAvgAccumulator(FedAvgAccumulator):
+    """FedAvg with norm clipping: each update `w - reference` is scaled down to L2 norm <= max_norm.
+
+    The norm is over the whole flattened update. Streams like
+    FedAvgAccumulator (O(model size) memory); `clipped` counts the updates
+    that were scaled.
+    """
+
+    def __init__(self, reference: list[np.ndarray], max_norm: float, dtype=np.float32):
+        if max_norm <= 0:
+            raise ValueError(f"max_norm must be > 0, got {max_norm}")
+        super().__init__(dtype)
+        self.reference = reference
+        self.max_norm = float(max_norm)
+        self.clipped = 0
+
+    def add(self, weights: list[np.ndarray], num_samples: float = 1.0):
+        weights = list(weights)  # the norm needs the whole update before any layer is folded in
+        deltas = [np.subtract(w, r, dtype=np.float32).reshape(-1) for w, r in zip(weights, self.reference)]
+        norm = np.sqrt(sum(float(np.dot(d, d)) for d in deltas))
+        if norm > self.max_norm:
+            scale = np.float32(self.max_norm / norm)
+            weights = [np.add(r, (d * scale).reshape(np.shape(r))) for d, r in zip(deltas, self.reference)]
+            self.clipped += 1
+        super().add(weights, num_samples)
+
+class RobustAccumulator:
+    """Coordinate-wise median / trimmed mean over the clients of a round.
+
+    Same interface as FedAvgAccumulator, but these rules need every
+    client's value of a coordinate, so `add` keeps each client's weights as
+    one flat float32 row: in memory, or appended to an anonymous file in
+    `spill_dir` that `result` memory-maps. `result` reduces the [clients,
+    params] stack in column blocks (see `_reduce_blocks`), so besides the
+    rows only `workers` blocks are in memory. Sample weights are ignored:
+    both rules are unweighted.
+    """
+
+    def __init__(self, rule: str = "median", trim: float = 0.0, spill_dir: str | None = None,
+                 block_bytes: int = DEFAULT_BLOCK_BYTES, workers: int | None = None):
+        if rule not in ("median", "trimmed_mean"):
+            raise ValueError(f"unknown robust rule {rule!r}")
+        _trim_count(1, trim)
+        self.rule, self.trim = rule, trim
+        self.block_bytes, self.workers = block_bytes, workers
+        self._spill = None if spill_dir is None else tempfile.TemporaryFile(dir=spill_dir)
+        self._rows = []
+        self._shapes = None
+        self.count = 0
+
+    def add(self, weights: list[np.ndarray], num_samples: float = 1.0):
+        weights = list(weights)  # kept as one row anyway
+        shapes = [tuple(np.shape(w)) for w in weights]
+        if self._shapes is None:
+            self._shapes = shapes
+        elif shapes != self._shapes:
+            raise ValueError(f"expected layer shapes {self._shapes}, got {shapes}")
+        row = _flat(weights)
+        if self._spill is None:
+            self._rows.append(row)
+        else:
+            row.tofile(self._spill)
+        self.count += 1
+
+    def result(self) -> list[np.ndarray]:
+        if not self.count:
+            raise ValueError("no client weights were added")
+        num_cols = sum(int(np.prod(s)) for s in self._shapes)
+        if self._spill is None:
+            stack = self._rows
+        else:
+            self._spill.flush()
+            stack = np.memmap(self._spill, dtype=np.float32, mode="r", shape=(self.count, num_cols))
+        if self.rule == "median":
+            reduce = _median_block
+        else:
+            k = _trim_count(self.count, self.trim)
+            reduce = lambda block: _trimmed_block(block, k)
+        flat = _reduce_blocks(stack, num_cols, reduce, self.block_bytes, self.workers)
+        return _unflatten(flat, self._shapes)
+
+    def close(self):
+        self._rows = []
+        if self._spill is not None:
+            self._spill.close()
+
+class AggregationRule:
+    """How a round's client weights are combined, parsed from a spec (see `parse_aggregation`).
+
+    `accumulator(reference)` returns a fresh accumulator for one round
+    (`reference` = the global weights the round started from, required by
+    "clipped_mean"); `record` is what the round info stores.
+    """
+
+    def __init__(self, name: str = "mean", param: float | None = None):
+        if name not in AGGREGATION_RULES:
+            raise ValueError(f"unknown aggregation rule {name!r} (expected one of {AGGREGATION_RULES})")
+        if name == "trimmed_mean":
+            _trim_count(1, 0.1 if param is None else param)
+        if name == "clipped_mean" and (param is None or param <= 0):
+            raise ValueError("clipped_mean needs a max norm > 0, e.g. 'clipped_mean:5'")
+        self.name = name
+        self.param = 0.1 if name == "trimmed_mean" and param is None else param
+
+    @property
+    def spec(self) -> str:
+        return self.name if self.param is None else f"{self.name}:{self.param:g}"
+
+    def __repr__(self):
+        return f"AggregationRule({self.spec!r})"
+
+    @property
+    def needs_reference(self) -> bool:
+        return self.name == "clipped_mean"
+
+    @property
+    def record(self) -> dict:
+        rec = {"rule": self.name}
+        if self.name == "trimmed_mean":
+            rec["trim"] = self.param
+        elif self.name == "clipped_mean":
+            rec["max_norm"] = self.param
+        return rec
+
+    def accumulator(self, reference: list[np.ndarray] | None = None, spill_dir: str | None = None,
+                    workers: int | None = None):
+        if self.name == "mean":
+            return FedAvgAccumulator()
+        if self.name == "clipped_mean":
+            if reference is None:
+                raise ValueError("clipped_mean needs the round's reference weights")
+            return ClippedFedAvgAccumulator(reference, self.param)
+        return RobustAccumulator(self.name, trim=self.param or 0.0, spill_dir=spill_dir, workers=workers)
+
+def parse_aggregation(spec: str | None) -> AggregationRule:
+    """"median", "trimmed_mean:0.1", "clipped_mean:5" -> AggregationRule; None/""/"mean" -> plain FedAvg."""
+    if spec is None or spec.strip().lower() in ("", "mean"):
+        return AggregationRule()
+    name, _, param = spec.strip().lower().partition(":")
+    try:
+        value = float(param) if param else None
+    except ValueError:
+        raise ValueError(f"bad parameter in aggregation rule {spec!r}") from None
+    if name == "median" and value is not None:
+        raise ValueError("median takes no parameter")
+    return AggregationRule(name, value)
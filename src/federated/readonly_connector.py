@@ -0,0 +1,223 @@
+# src/federated/readonly_connector.py
+import json, os
+import urllib.request
+from functools import lru_cache
+from Crypto.Hash import keccak
+from . import compact
+
+# Imports stay stdlib + pycryptodome: audit commands start without web3, numpy or TF.
+
+_env_loaded = False
+
+def load_env():
+    """Load .env once per process (connectors call this instead of doing it on import)."""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+
+@lru_cache(maxsize=None)
+def _load_abi_cached(path: str, mtime_ns: int) -> tuple:
+    with open(path) as f:
+        return tuple(json.load(f))
+
+def load_abi(path: str) -> list[dict]:
+    """Parsed ABI JSON, cached per process (re-read only if the file changes)."""
+    path = os.path.abspath(path)
+    return list(_load_abi_cached(path, os.stat(path).st_mtime_ns))
+
+# ---------- minimal ABI codec (view calls: static inputs, static or string/bytes outputs) ----------
+def _selector(name: str, in_types: list[str]) -> bytes:
+    k = keccak.new(digest_bits=256)
+    k.update(f"{name}({','.join(in_types)})".encode())
+    return k.digest()[:4]
+
+def _encode_word(typ: str, value) -> bytes:
+    if typ.startswith("uint"):
+        return int(value).to_bytes(32, "big")
+    if typ.startswith("int"):
+        return int(value).to_bytes(32, "big", signed=True)
+    if typ == "bool":
+        return int(bool(value)).to_bytes(32, "big")
+    if typ == "address":
+        return bytes.fromhex(value[2:] if value.startswith("0x") else value).rjust(32, b"\0")
+    if typ.startswith("bytes") and typ != "bytes":
+        raw = bytes.fromhex(value[2:]) if isinstance(value, str) else bytes(value)
+        return raw.ljust(32, b"\0")
+    raise TypeError(f"unsupported ABI input type: {typ}")
+
+def encode_call(name: str, in_types: list[str], args) -> str:
+    return "0x" + (_selector(name, in_types) + b"".join(_encode_word(t, a) for t, a in zip(in_types, args))).hex()
+
+def decode_output(out_types: list[str], data: bytes):
+    values = []
+    for i, typ in enumerate(out_types):
+        word = data[32 * i:32 * (i + 1)]
+        if typ in ("string", "bytes"):
+            start = int.from_bytes(word, "big")
+            length = int.from_bytes(data[start:start + 32], "big")
+            raw = data[start + 32:start + 32 + length]
+            values.append(raw.decode("utf-8") if typ == "string" else raw)
+        elif typ.startswith("uint"):
+            values.append(int.from_bytes(word, "big"))
+        elif typ.startswith("int"):
+            values.append(int.from_bytes(word, "big", signed=True))
+        elif typ == "bool":
+            values.append(word[-1] == 1)
+        elif typ == "address":
+            values.append("0x" + word[12:].hex())
+        elif typ.startswith("bytes"):
+            values.append(word[:int(typ[5:])])
+        else:
+            raise TypeError(f"unsupported ABI output type: {typ}")
+    return values[0] if len(values) == 1 else tuple(values)
+
+class ContractReader:
+    """View functions of one deployed contract, encoded/decoded from its ABI."""
+
+    def __init__(self, address: str, abi: list[dict]):
+        self.address = address
+        self._fns = {
+            e["name"]: ([i["type"] for i in e["inputs"]], [o["type"] for o in e["outputs"]])
+            for e in abi if e.get("type") == "function" and e.get("stateMutability") in ("view", "pure")
+        }
+
+    def call(self, name: str, *args) -> tuple[dict, list[str]]:
+        """(eth_call params, output types) for `name(*args)`."""
+        if name not in self._fns:
+            raise AttributeError(f"no view function {name!r} in ABI")
+        in_types, out_types = self._fns[name]
+        return {"to": self.address, "data": encode_call(name, in_types, args)}, out_types
+
+class RPCError(RuntimeError):
+    pass
+
+class ReadOnlyConnector:
+    """Read-only access to the aggregator and peer contracts over plain JSON-RPC.
+
+    Needs only the RPC URL, contract addresses and ABIs: no private keys, no
+    connection check at construction, and no web3 import (calls are encoded
+    from the ABI with a small codec). Every read of a command goes out as one
+    JSON-RPC batch.
+    """
+
+    def __init__(self, rpc_url: str | None = None, agg_address: str | None = None,
+                 peer_addresses: list[str] | None = None, agg_abi_path: str | None = None,
+                 client_abi_path: str | None = None, timeout: float = 10.0):
+        load_env()
+        self.rpc_url = rpc_url or os.getenv("WEB3_HTTP_PROVIDER", "http://127.0.0.1:7545")
+        self.timeout = timeout
+        agg_address = agg_address or os.getenv("AGGREGATOR_CONTRACT_ADDRESS")
+        if peer_addresses is None:
+            peer_addresses = [a.strip() for a in os.getenv("CLIENT_CONTRACT_ADDRESSES", "").split(",") if a.strip()]
+        self._agg_abi_path = agg_abi_path or os.getenv("AGGREGATOR_ABI_PATH", "src/abi/Aggregator_ABI.json")
+        self._client_abi_path = client_abi_path or os.getenv("CLIENT_ABI_PATH", "src/abi/Client_ABI.json")
+        self._agg_address = agg_address
+        self.peer_addresses = list(peer_addresses)
+        self._agg = None
+        self._next_id = 0
+
+    # ---------- contracts ----------
+    @property
+    def agg(self) -> ContractReader:
+        if self._agg is None:
+            if not self._agg_address:
+                raise ValueError("aggregator address not set (AGGREGATOR_CONTRACT_ADDRESS)")
+            self._agg = ContractReader(self._agg_address, load_abi(self._agg_abi_path))
+        return self._agg
+
+    def peer(self, peer: int | str) -> ContractReader:
+        """Peer contract by index into CLIENT_CONTRACT_ADDRESSES or by address."""
+        if isinstance(peer, int):
+            if not 0 <= peer < len(self.peer_addresses):
+                raise IndexError(f"peer index {peer} out of range ({len(self.peer_addresses)} peers)")
+            peer = self.peer_addresses[peer]
+        return ContractReader(peer, load_abi(self._client_abi_path))
+
+    def peer_count(self) -> int:
+        return len(self.peer_addresses)
+
+    # ---------- transport ----------
+    def _post(self, payload):
+        req = urllib.request.Request(self.rpc_url, data=json.dumps(payload).encode(),
+                                     headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            return json.loads(resp.read())
+
+    def call_batch(self, calls: list[tuple[dict, list[str]]], block_identifier="latest") -> list:
+        """Run `ContractReader.call(...)` specs as one JSON-RPC batch.
+
+        Returns one entry per call, in order: the decoded value, or an RPCError
+        for a call that reverted (the others are unaffected).
+        """
+        base = self._next_id
+        self._next_id += len(calls)
+        payload = [{"jsonrpc": "2.0", "id": base + i, "method": "eth_call", "params": [params, block_identifier]}
+                   for i, (params, _) in enumerate(calls)]
+        responses = self._post(payload)
+        if not isinstance(responses, list):
+            raise RPCError(f"provider does not support JSON-RPC batches: {responses}")
+        by_id = {r.get("id"): r for r in responses}
+        out = []
+        for p, (_, out_types) in zip(payload, calls):
+            resp = by_id.get(p["id"], {"error": {"message": "missing response"}})
+            if "error" in resp:
+                out.append(RPCError(resp["error"].get("message", str(resp["error"]))))
+                continue
+            try:
+                out.append(decode_output(out_types, bytes.fromhex(resp["result"][2:])))
+            except Exception as e:  # empty result (no code at address) or malformed data
+                out.append(RPCError(f"cannot decode {resp.get('result')!r}: {e}"))
+        return out
+
+    def call(self, spec: tuple[dict, list[str]]):
+        value = self.call_batch([spec])[0]
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    # ---------- reads ----------
+    def get_current_round(self) -> int:
+        return int(self.call(self.agg.call("getCurrentRound")))
+
+    def read_round(self, round_id: int) -> dict:
+        """currentRound, roundDetails, the weight hash and the peers Merkle root of
+        `round_id` in one round trip. `weight_hash` is getRoundWeight, or getRoundHash
+        when that is unreadable; `peers_root` is None unless the round was committed
+        with a Merkle root. Rounds minted with mintCompact are decoded to the same
+        fields (JSON round details, hex hash)."""
+        return self.read_rounds([round_id])[0]
+
+    def read_rounds(self, round_ids) -> list[dict]:
+        round_ids = list(round_ids)
+        calls = [self.agg.call("getCurrentRound")]
+        for r in round_ids:
+            calls += [self.agg.call("getRoundDetails", r), self.agg.call("getRoundWeight", r),
+                      self.agg.call("getRoundHash", r), self.agg.call("getRoundPeersRoot", r),
+                      self.agg.call("getRoundWeightDigest", r), self.agg.call("getRoundMeta", r)]
+        values = [None if isinstance(v, Exception) else v for v in self.call_batch(calls)]
+        cur = values[0]
+        rows = []
+        for i, r in enumerate(round_ids):
+            details, weight, h, root, digest, meta = values[1 + 6 * i:7 + 6 * i]
+            if not (weight or h) and digest and any(digest):  # compact round
+                weight, details = compact.bytes32_to_hash(digest), compact.unpack_round_info(meta or bytes(32), r)
+            rows.append({"round": r, "current_round": cur, "round_details": details,
+                         "weight_hash": weight if weight else h,
+                         "peers_root": "0x" + root.hex() if root and any(root) else None})
+        return rows
+
+    def read_peer_round(self, peer: int | str, round_id: int) -> dict:
+        """Peer payload (roundDetails, or the decoded compact record) for `round_id`
+        and the peer's lastParticipatedRound."""
+        c = self.peer(peer)
+        payload, last, digest, meta = self.call_batch([
+            c.call("roundDetails", round_id), c.call("getLastParticipatedRound"),
+            c.call("roundWeightDigests", round_id), c.call("roundMetas", round_id)])
+        if isinstance(payload, Exception) or not payload:
+            if not isinstance(digest, Exception) and not isinstance(meta, Exception):
+                payload = compact.unpack_peer_info(digest, meta, round_id) or payload
+        return {"peer": c.address, "round": round_id,
+                "payload": None if isinstance(payload, Exception) else payload,
+                "last_participated_round": None if isinstance(last, Exception) else int(last)}
@@ -0,0 +1,57 @@
+# src/federated/round_committer.py
+import queue
+import threading
+
+class RoundCommitter:
+    """Background thread that commits round proofs strictly in submission order.
+
+    `commit_fn(target_round, *args)` is called once per submitted round. The
+    first failure stops the committer: queued rounds are dropped and the error
+    is re-raised in the training thread by `submit`, `check` or `close`.
+    `max_pending` bounds how far training may run ahead of the chain.
+    """
+
+    def __init__(self, commit_fn, max_pending: int = 1):
+        self._commit_fn = commit_fn
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._error = None
+        self._last_round = None
+        self._thread = threading.Thread(target=self._run, name="round-committer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                if self._error is None:
+                    self._commit_fn(*job)
+            except BaseException as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def check(self):
+        if self._error is not None:
+            raise RuntimeError("round commit failed; pipeline stopped") from self._error
+
+    def submit(self, target_round: int, *args):
+        self.check()
+        if self._last_round is not None and target_round != self._last_round + 1:
+            raise ValueError(f"rounds must be committed in order: got {target_round} after {self._last_round}")
+        self._last_round = target_round
+        # blocks while `max_pending` rounds are already waiting
+        while True:
+            try:
+                self._queue.put((target_round, *args), timeout=0.5)
+                return
+            except queue.Full:
+                self.check()
+
+    def close(self):
+        """Wait for all submitted rounds to be committed, then stop the thread."""
+        self._queue.join()
+        self._queue.put(None)
+        self._thread.join()
+        self.check()
@@ -1,29 +1,71 @@
 # src/federated/training_orchestrator.py
-import json, random, os
+import json, random, os, sys
 import numpy as np
 from .data_handler import load_mnist_normalized, split_among_clients
-from .model_manager import build_client_model, evaluate_acc, average_layerwise
-from .utils import utc_timestamp, wall_time, hash_weights, flatten_weights
+from .model_manager import build_client_model, parse_aggregation
+from .client_executor import (train_peers, peer_seed, sample_clients, make_process_pool, ModelClients,
+                              SharedModelClients, LateUpdates, ClientDatasets)
+from .utils import utc_timestamp, wall_time, hash_weight_list
 from .blockchain_connector import Web3Connector
+from .readonly_connector import load_env
+from .round_committer import RoundCommitter
+from .checkpoint_store import CheckpointStore
+from .instrumentation import Tracer, get_tracer, set_tracer
+from .merkle import write_round_proofs
+from .compact import ENCODINGS, canonical_peer_info, canonical_round_info
+from .update_codec import parse_codec
+from .worker_pool import WorkerPool
+from .batched_clients import BatchedClients, StackedEvaluator
+from functools import partial
 import tensorflow as tf
 
+def _close_committer(committer, failed: BaseException | None):
+    # wait for the rounds still queued for commit, also when training has failed (the committer is a
+    # daemon thread: the process could otherwise exit mid-mint). A commit error is raised, or, when
+    # training already failed with `failed`, reported and attached to that error instead of replacing it
+    if failed is None:
+        committer.close()
+        return
+    try:
+        committer.close()
+    except Exception as e:
+        if e.__cause__ is not failed.__cause__:  # not the commit error `failed` already reports
+            print(f"[Commit] round commit failed as well: {e.__cause__!r}")
+            failed.add_note(f"round commit failed as well: {e.__cause__!r}")
+
+
+def _peer_sink(store, kept: dict | None):
+    # on_peer hook: checkpoint each peer's weights and/or keep them for the round's fused evaluation
+    if store is None and kept is None:
+        return None
+
+    def on_peer(i, w, h):
+        if store is not None:
+            store.put(w, h)
+        if kept is not None:
+            kept[i] = w
+    return on_peer
+
 def _safe_try(callable_fn, *args, default=None):
     try:
         return callable_fn(*args)
     except Exception:
         return default
 
-def _peer_info_json(peer_id: int, round_id: int, weight_hash: str, acc: float) -> str:
+def _peer_info_json(peer_id: int, round_id: int, weight_hash: str, acc: float, compact: bool = False) -> str:
     # Compact JSON, easy to audit/parse off-chain
-    return json.dumps({
+    # (compact=True: values rounded to what the packed on-chain encoding keeps)
+    info = json.dumps({
         "peer_id": peer_id,
         "round": round_id,
         "weight_hash": weight_hash,
         "test_accuracy": float(acc)
     }, separators=(",", ":"))
+    return canonical_peer_info(info) if compact else info
 
-def _round_info_json(round_id: int, participants: int, batch_size: int,duration_sec: float, avg_round_accuracy: float, lr: float) -> str:
-    return json.dumps({
+def _round_info_json(round_id: int, participants: int, batch_size: int,duration_sec: float, avg_round_accuracy: float, lr: float,
+                     compact: bool = False, aggregation: dict | None = None) -> str:
+    info = {
         "round_id": round_id,
         "timestamp": utc_timestamp(),
         "duration_sec": float(duration_sec),
@@ -32,7 +74,12 @@ def _round_info_json(round_id: int, participants: int, batch_size: int,duration_
         "batch_size": batch_size,
         "avg_round_accuracy": float(avg_round_accuracy),
         "lr": float(lr)
-    }, separators=(",", ":"))
+    }
+    if aggregation is not None:
+        # robust aggregation rule and its parameters (plain FedAvg rounds keep the original layout)
+        info["aggregation"] = aggregation
+    info = json.dumps(info, separators=(",", ":"))
+    return canonical_round_info(info) if compact else info
 
 def _set_seeds(seed: int = 42):
     np.random.seed(seed)
@@ -40,104 +87,415 @@ def _set_seeds(seed: int = 42):
     random.seed(seed)
     os.environ["PYTHONHASHSEED"] = str(seed)
 
-def run_federated(rounds: int = 1, num_clients: int = 5, batch_size: int = 64, lr: float = 0.001):
-    _set_seeds(42)
+def _peer_idxs(peer_infos: list[str]) -> list[int]:
+    # Payloads name their peer (peer_id = client index + 1); only the peers that took part have one
+    return [json.loads(info)["peer_id"] - 1 for info in peer_infos]
+
+def _mint_peers(w3c, target_round: int, peer_infos: list[str], defer: bool = False,
+                last_rounds: dict[int, int | None] | None = None) -> dict[int, str]:
+    # Peer mints (roundNumber = target_round) with idempotence.
+    # Returns the payloads that needed minting; with defer=True they are not sent.
+    idxs = _peer_idxs(peer_infos)
+    if last_rounds is None:
+        # every participating peer's lastParticipatedRound in one batched read
+        _, last_rounds = w3c.read_mint_state(idxs)
+    pending = {}
+    for peer_idx, info in zip(idxs, peer_infos):
+        # avoid duplicate mints if a previous attempt succeeded
+        last_r = last_rounds.get(peer_idx) or 0
+        if last_r >= target_round:
+            # already minted this round (or beyond) for this peer -> skip
+            continue
+        pending[peer_idx] = info
+        if not defer:
+            w3c.mint_peer_round(target_round, info, peer_idx)
+    return pending
+
+def _mint_aggregator(w3c, target_round: int, pending_peers: dict[int, str], h_avg: str, round_info: str, pipeline_tx: bool,
+                     peers_root: str | None = None):
+    if peers_root is not None:
+        # Merkle commitment: the aggregator mint carries the root of every peer payload, no peer txs
+        w3c.mint_aggregator_round_with_root(h_avg, round_info, peers_root)
+    elif pipeline_tx:
+        # peer mints + aggregator mint in flight together, one wait for all receipts
+        w3c.mint_round_pipelined(target_round, pending_peers, h_avg, round_info)
+    else:
+        w3c.mint_aggregator_round(h_avg, round_info)
+
+def _verify_round(w3c, target_round: int, round_info: str, h_avg: str, minted_peers: dict[int, str] | None = None,
+                  peers_root: str | None = None):
+    # On-chain verification (aggregator + peers minted this round), one batched read
+    if peers_root is None:
+        state = w3c.read_round_state(target_round, peer_idxs=list(minted_peers or {}))
+    else:
+        state = w3c.read_round_state(target_round, peer_idxs=[], peers_root=True)
+        assert state["peers_root"] == peers_root, "roundPeersRoot on-chain != local Merkle root of peer payloads"
+    cur = state["current_round"] or 0
+    assert cur == target_round, f"currentRound on-chain ({cur}) != target_round ({target_round})"
+
+    on_details = state["round_details"]
+    if on_details is not None:
+        # They must match at the JSON string level
+        assert on_details == round_info, "roundDetails on-chain != local roundInfo"
+
+    # roundWeight / roundHash are optional (depends on the contract)
+    on_w, on_h = state["round_weight"], state["round_hash"]
+    if on_w is not None:
+        assert on_w == h_avg, "roundWeight on-chain != aggregated hash"
+    elif on_h is not None:
+        assert on_h == h_avg, "roundHash on-chain != aggregated hash"
+
+    for peer_idx, info in (minted_peers or {}).items():
+        on_peer = state["peer_details"].get(peer_idx)
+        if on_peer is not None and on_peer != info:
+            print(f"[WARN] Peer {peer_idx+1} roundDetails on-chain != local peerInfo (round {target_round})")
+
+def _commit_round(w3c, pipeline_tx: bool, target_round: int, peer_infos: list[str], round_info: str, h_avg: str,
+                  peers_root: str | None = None):
+    # Background commit of a finished round: the chain must be exactly one round behind
+    tracer = get_tracer()
+    with tracer.phase("mint_peers"):
+        # with a Merkle root there are no peer mints: only currentRound is read
+        cur, last_rounds = w3c.read_mint_state(_peer_idxs(peer_infos) if peers_root is None else [])
+        cur = cur or 0
+        if cur != target_round - 1:
+            raise RuntimeError(f"currentRound on-chain ({cur}) != target_round - 1 ({target_round - 1})")
+        pending = {} if peers_root is not None else \
+            _mint_peers(w3c, target_round, peer_infos, defer=pipeline_tx, last_rounds=last_rounds)
+    with tracer.phase("mint_aggregator"):
+        _mint_aggregator(w3c, target_round, pending, h_avg, round_info, pipeline_tx, peers_root)
+    with tracer.phase("verify"):
+        _verify_round(w3c, target_round, round_info, h_avg, pending, peers_root)
+    print(f"[Round {target_round}] wrote on-chain ✓")
+
+def _checkpoint_round(store, clients, round_idx: int, target_round: int, peer_hashes: list[str], avg_w, h_avg: str,
+                      peer_infos: list[str], round_info: str, loss_glob: float, acc_glob: float,
+                      residuals: list | None = None):
+    # Peer weights are already stored (train_peers on_peer); add the aggregate, optimizer states
+    # and, with an update codec, the peers' error-feedback residuals
+    store.put(avg_w, h_avg)
+    opt_hashes = [store.put(clients.get_state(i)[1]) for i in range(len(clients))]
+    # a peer that was never sampled (or always dropped) has no residual yet: journaled as null
+    residual_hashes = None if residuals is None else [None if res is None else store.put(res) for res in residuals]
+    store.record_round(round_idx, target_round, peer_hashes, opt_hashes, h_avg, peer_infos, round_info,
+                       loss_glob, acc_glob, residual_hashes)
+
+def _resume(store, w3c, clients, pipeline_tx: bool, test_losses: list, test_accs: list,
+            proof_dir: str | None = None, residuals: list | None = None) -> int:
+    # Restore the latest round confirmed on chain from the checkpoint store, committing a
+    # trained-but-unconfirmed round first (with proof_dir: as a Merkle commitment).
+    # Returns the next local round index.
+    cur = _safe_try(w3c.get_current_round, default=0) or 0
+    done, pending = store.resume_point(cur)
+    if done:
+        last = done[-1]
+        on_chain = _safe_try(w3c.read_round_state, last["target_round"], default=None) or {}
+        on_hash = on_chain.get("round_weight") or on_chain.get("round_hash")
+        if on_hash is not None and on_hash != last["agg_hash"]:
+            print(f"[WARN] Checkpoint round {last['target_round']} does not match the chain; not resuming")
+            return 0
+    if pending is not None:
+        peers_root = None
+        if proof_dir is not None:
+            peers_root, _ = write_round_proofs(proof_dir, pending["target_round"], pending["peer_infos"])
+        _commit_round(w3c, pipeline_tx, pending["target_round"], pending["peer_infos"],
+                      pending["round_info"], pending["agg_hash"], peers_root)
+        store.mark_committed(pending["target_round"])
+        done.append(pending)
+    if not done:
+        return 0
+
+    last = done[-1]
+    if len(last["opt_hashes"]) != len(clients):
+        raise ValueError(f"checkpoint has {len(last['opt_hashes'])} clients, run has {len(clients)}")
+    avg_w = store.get(last["agg_hash"])
+    clients.set_global(avg_w)
+    for i, h in enumerate(last["opt_hashes"]):
+        clients.set_state(i, avg_w, store.get(h))
+    if residuals is not None and last.get("residual_hashes"):
+        residuals[:] = [None if h is None else store.get(h) for h in last["residual_hashes"]]
+    test_losses.extend(rec["test_loss"] for rec in done)
+    test_accs.extend(rec["test_acc"] for rec in done)
+    print(f"[Resume] restored round {last['target_round']} from {store.root}")
+    return last["round_idx"] + 1
+
+def run_federated(rounds: int = 1, num_clients: int = 5, batch_size: int = 64, lr: float = 0.001,
+                  workers: int = 0, intra_op_threads: int | None = None, pipeline_tx: bool = False,
+                  pipeline_rounds: bool = False, weighted_avg: bool = False, shared_model: bool = False,
+                  partitioner: str = "iid", checkpoint_dir: str | None = None, trace_dir: str | None = None,
+                  merkle_peers: bool = False, proof_dir: str | None = None, encoding: str | None = None,
+                  update_codec: str | None = None, clients_per_round: int | float | None = None,
+                  round_deadline: float | None = None, late_updates: str = "drop",
+                  worker_address: str | None = None, remote_workers: int = 0, batched: bool = False,
+                  aggregation: str | None = None, fast: bool = False):
+    # workers=0 trains peers in-process; workers>0 uses a process pool
+    # pipeline_tx=True sends all mints of a round without waiting in between
+    # pipeline_rounds=True commits round N in the background while round N+1 trains
+    # weighted_avg=True weights FedAvg by each peer's number of training samples
+    # shared_model=True trains every client on one compiled model (state kept as numpy)
+    # batched=True trains all clients at once as one batched model (see batched_clients; in-process only)
+    # fast=True: XLA-compiled Keras models fed from tf.data pipelines built once (client_executor.ClientDatasets),
+    #   and peer + global evaluation as one batched pass per round (StackedEvaluator); in-process only
+    # partitioner: "iid", "dirichlet" or "shard" (see data_handler.PARTITIONERS)
+    # checkpoint_dir: persist every round there and resume from it after a crash
+    # trace_dir: write per-round phase timings, gas and RPC counts there (default: $FL_TRACE_DIR)
+    # merkle_peers=True commits each round in one tx (aggregator mint + Merkle root of peer payloads);
+    #   payloads and inclusion proofs go to proof_dir/round_<n>.json (default: $FL_PROOF_DIR or ./proofs)
+    # encoding: "json" (default, or $FL_ONCHAIN_ENCODING) or "compact" (bytes32 hashes + packed metadata)
+    # update_codec: how peers send their updates (default: $FL_UPDATE_CODEC or full float32 weights), e.g.
+    #   "int8", "fp16", "topk:0.01", "int8+topk:0.01": deltas against the global weights, with error feedback;
+    #   peer weight hashes are taken over the decoded weights
+    # clients_per_round: sample that many clients (int) or that fraction of them (float) each round,
+    #   seeded per round (default: everyone); payloads, mints and round info cover only the participants
+    # round_deadline: seconds after which a round stops waiting for peer updates; late updates are
+    #   dropped (late_updates="drop") or folded into the next round ("carry")
+    # aggregation: "mean" (default, or $FL_AGGREGATION), "median", "trimmed_mean:<fraction>" or
+    #   "clipped_mean:<max norm>" (see model_manager.parse_aggregation); recorded in the round info.
+    #   Median/trimmed mean keep every update of a round; $FL_AGG_SPILL_DIR memory-maps them from there
+    # worker_address: "<host>:<port>" (default: $FL_WORKER_ADDR) to run peers on socket-connected workers
+    #   instead (see worker_pool): `workers` are spawned locally and `remote_workers` more are awaited
+    load_env()  # .env may set FL_DATA_CACHE / FL_TRACE_DIR as well as the chain settings
+    encoding = encoding or os.getenv("FL_ONCHAIN_ENCODING") or "json"
+    if encoding not in ENCODINGS:
+        raise ValueError(f"unknown on-chain encoding {encoding!r} (expected one of {ENCODINGS})")
+    compact = encoding == "compact"
+    if late_updates not in ("drop", "carry"):
+        raise ValueError(f"late_updates must be 'drop' or 'carry', got {late_updates!r}")
+    codec = parse_codec(update_codec or os.getenv("FL_UPDATE_CODEC"))
+    rule = parse_aggregation(aggregation or os.getenv("FL_AGGREGATION"))
+    agg_record = None if rule.name == "mean" else rule.record
+    if agg_record is not None and compact:
+        # the packed round word has no room for it
+        raise ValueError(f"aggregation {rule.spec!r} cannot be recorded with the compact encoding")
+    spill_dir = os.getenv("FL_AGG_SPILL_DIR") or None
+    seed = 42
+    _set_seeds(seed)
 
     (xtr, ytr), (xte, yte) = load_mnist_normalized()
-    xtr_s, ytr_s = split_among_clients(xtr, ytr, num_clients)
-    xte_s, yte_s = split_among_clients(xte, yte, num_clients)
+    xtr_s, ytr_s = split_among_clients(xtr, ytr, num_clients, partitioner)
+    xte_s, yte_s = split_among_clients(xte, yte, num_clients, partitioner)
 
-    models = [build_client_model() for _ in range(num_clients)]
-    w3c = Web3Connector()
+    if batched or fast:
+        if workers > 0 or worker_address or os.getenv("FL_WORKER_ADDR"):
+            raise ValueError("batched/fast clients train in-process: use workers=0 without a worker address")
+        if batched and fast:
+            raise ValueError("fast applies to the Keras clients, not to batched ones")
+    build = partial(build_client_model, jit_compile=True) if fast else build_client_model
+    if batched:
+        clients = BatchedClients(num_clients)
+    elif shared_model:
+        clients = SharedModelClients(num_clients, build_fn=build)
+    else:
+        clients = ModelClients([build() for _ in range(num_clients)])
+    inputs = evaluator = None
+    if fast:
+        inputs = ClientDatasets(xtr_s, ytr_s)
+        # slots 0..num_clients-1: the clients' test splits; slot num_clients: the full test set
+        evaluator = StackedEvaluator(build_client_model(), list(xte_s) + [xte], list(yte_s) + [yte])
+    w3c = Web3Connector(encoding=encoding)
 
     # Warn on low balances to avoid "insufficient funds for gas * price + value"
     try:
         min_eth = float(os.getenv("MIN_TX_ETH_BALANCE", "0.05"))
-        agg_bal = w3c.get_balance_eth(w3c.get_aggregator_account_address())
-        if agg_bal < min_eth:
+        # one JSON-RPC batch for the aggregator and every peer account
+        peers = range(min(num_clients, w3c.peer_count()))
+        agg_bal, *peer_bals = w3c.get_balances_eth([w3c.get_aggregator_account_address()]
+                                                   + [w3c.get_peer_account_address(idx) for idx in peers])
+        if not isinstance(agg_bal, Exception) and agg_bal < min_eth:
             print(f"[WARN] Aggregator balance low: {agg_bal:.4f} ETH (< {min_eth} ETH)")
-        for idx in range(min(num_clients, w3c.peer_count())):
-            bal = w3c.get_balance_eth(w3c.get_peer_account_address(idx))
-            if bal < min_eth:
+        for idx, bal in zip(peers, peer_bals):
+            if not isinstance(bal, Exception) and bal < min_eth:
                 print(f"[WARN] Peer {idx+1} balance low: {bal:.4f} ETH (< {min_eth} ETH)")
     except Exception:
         # Don't block the run if the chain isn't reachable at this stage
         pass
 
+    trace_dir = trace_dir or os.getenv("FL_TRACE_DIR") or None
+    if merkle_peers:
+        proof_dir = proof_dir or os.getenv("FL_PROOF_DIR") or "proofs"
+    else:
+        proof_dir = None
+    tracer = Tracer(trace_dir) if trace_dir else get_tracer()
+    prev_tracer = set_tracer(tracer)
+    worker_address = worker_address or os.getenv("FL_WORKER_ADDR") or None
+    if worker_address is not None:
+        pool = WorkerPool(workers, worker_address, remote_workers, intra_op_threads=intra_op_threads,
+                          trace=tracer.enabled)
+        print(f"[Workers] {len(pool.workers)} worker(s) on {pool.address}")
+    else:
+        pool = make_process_pool(workers, intra_op_threads, trace=tracer.enabled) if workers > 0 else None
+    store = CheckpointStore(checkpoint_dir) if checkpoint_dir else None
+    committer = None
+    residuals = None if codec is None else [None] * num_clients
+    late = None  # updates that missed the previous round's deadline (late_updates="carry")
     test_losses, test_accs = [], []
+    traces = {}  # target_round -> trace of a round queued for commit
+
+    def commit(target_round, *job):
+        trace = traces.pop(target_round, None)
+        tracer.attach(trace)
+        _commit_round(w3c, pipeline_tx, target_round, *job)
+        if store is not None:
+            store.mark_committed(target_round)
+        tracer.finish(trace)
+
+    try:
+        start_round = 0
+        if store is not None:
+            start_round = _resume(store, w3c, clients, pipeline_tx, test_losses, test_accs, proof_dir, residuals)
+        global_w = None
+        if codec is not None or rule.needs_reference:
+            # coded deltas and clipped updates need a reference both sides know:
+            # all clients start from client 0's initial weights
+            global_w = clients.get_state(0)[0]
+            if start_round == 0:
+                clients.set_global(global_w)
+
+        if pipeline_rounds:
+            committer = RoundCommitter(commit)
+            # training runs ahead of the chain: target rounds are assigned locally
+            next_round = (_safe_try(w3c.get_current_round, default=0) or 0) + 1
+
+        for r in range(start_round, rounds):
+            # 1) Determine target on-chain round: currentRound + 1
+            if committer is not None:
+                target_round = next_round
+                next_round += 1
+            else:
+                prev_round = _safe_try(w3c.get_current_round, default=0) or 0
+                target_round = prev_round + 1
+            trace = tracer.begin(r, target_round)
 
-    for _ in range(rounds):
-        # 1) Determine target on-chain round: currentRound + 1
-        prev_round = _safe_try(w3c.get_current_round, default=0) or 0
-        target_round = prev_round + 1
-
-        # 2) Train locally 1 epoch per peer
-        t0 = wall_time()
-        for m, xt, yt in zip(models, xtr_s, ytr_s):
-            m.fit(xt, yt, epochs=1, batch_size=batch_size, validation_split=0.1, verbose=0)
-
-        # 3) Compute hash and accuracy for each peer
-        peer_infos = []
-        peer_accs = []
-        weight_lists = []
-        for i, (m, xt_i, yt_i) in enumerate(zip(models, xte_s, yte_s), start=1):
-            acc_i = evaluate_acc(m, xt_i, yt_i)
-            peer_accs.append(acc_i)
-            wi = m.get_weights()
-            weight_lists.append(wi)
-            h_i = hash_weights(flatten_weights(wi))
-            peer_infos.append(_peer_info_json(i, target_round, h_i, acc_i))
-
-        # 4) FedAvg + global evaluation
-        avg_w = average_layerwise(weight_lists)
-        for m in models:
-            m.set_weights(avg_w)
-        loss_glob, acc_glob = models[0].evaluate(xte, yte, verbose=0)
-        test_losses.append(loss_glob); test_accs.append(acc_glob)
-
-        # 5) Peer mints (roundNumber = target_round) with idempotence
-        for peer_idx, info in enumerate(peer_infos):
-            # avoid duplicate mints if a previous attempt succeeded
-            last_r = _safe_try(w3c.peer_get_last_round, peer_idx, default=0) or 0
-            if last_r >= target_round:
-                # already minted this round (or beyond) for this peer -> skip
+            # 2) Train locally 1 epoch per peer
+            # 3) Compute hash and accuracy for each peer
+            # (each peer's weights are folded into FedAvg as soon as it finishes)
+            t0 = wall_time()
+            seeds = [peer_seed(seed, r, i) for i in range(num_clients)]
+            # peers still finishing a late update sit this round out
+            carried, late = late, (LateUpdates() if late_updates == "carry" and round_deadline is not None else None)
+            peers = sample_clients(num_clients, clients_per_round, seed, r,
+                                   exclude=carried.peers() if carried is not None else ())
+            sample_counts = [len(y) for y in ytr_s] if weighted_avg else None
+            kept = None if evaluator is None else {}
+            on_peer = _peer_sink(store, kept)
+            fedavg = rule.accumulator(global_w, spill_dir=spill_dir)
+            try:
+                with tracer.phase("train"):
+                    _, accs, hashes = train_peers(
+                        clients, xtr_s, ytr_s, xte_s, yte_s, batch_size, seeds, pool=pool,
+                        accumulator=fedavg, sample_counts=sample_counts, on_peer=on_peer,
+                        codec=codec, reference=global_w, residuals=residuals,
+                        peers=peers, deadline_sec=round_deadline, late=late, inputs=inputs
+                    )
+                took_part = {i: (acc, h) for i, acc, h in zip(peers, accs, hashes) if h is not None}
+                if carried is not None:
+                    with tracer.phase("collect_late"):
+                        for i, w, acc, h in carried.collect(clients, residuals):
+                            if on_peer is not None:
+                                on_peer(i, w, h)
+                            fedavg.add(w, 1.0 if sample_counts is None else sample_counts[i])
+                            took_part[i] = (acc, h)
+                tracer.count("participants", len(took_part))
+
+                # 4) FedAvg + global evaluation
+                with tracer.phase("aggregate"):
+                    avg_w = fedavg.result()
+                    clients.set_global(avg_w)
+                    if global_w is not None:
+                        global_w = avg_w
+                    if rule.needs_reference:
+                        tracer.count("clipped_updates", fedavg.clipped)
+            finally:
+                # robust rules keep every update (in RAM or a spill file) until closed
+                fedavg.close()
+            with tracer.phase("global_evaluate"):
+                if evaluator is None:
+                    loss_glob, acc_glob = clients.global_model().evaluate(xte, yte, verbose=0)
+                else:
+                    # participants' (decoded) weights on their test splits and the global weights on the
+                    # test set, in one pass
+                    evals = evaluator({**{i: kept[i] for i in took_part}, num_clients: avg_w})
+                    loss_glob, acc_glob = evals.pop(num_clients)
+                    took_part = {i: (evals[i][1], h) for i, (_, h) in took_part.items()}
+            peer_accs = [took_part[i][0] for i in sorted(took_part)]
+            peer_hashes = [took_part[i][1] for i in sorted(took_part)]
+            peer_infos = [_peer_info_json(i + 1, target_round, took_part[i][1], took_part[i][0], compact)
+                          for i in sorted(took_part)]
+            test_losses.append(loss_glob); test_accs.append(acc_glob)
+            with tracer.phase("hash_aggregate"):
+                h_avg = hash_weight_list(avg_w)
+
+            if committer is not None:
+                # 5-7) hand the round proof to the committer and go on training
+                round_info = _round_info_json(
+                    round_id=target_round,
+                    participants=len(peer_infos),
+                    batch_size=batch_size,
+                    duration_sec=wall_time() - t0,
+                    avg_round_accuracy=float(np.mean(peer_accs)),
+                    lr=lr,
+                    compact=compact,
+                    aggregation=agg_record
+                )
+                if store is not None:
+                    with tracer.phase("checkpoint"):
+                        _checkpoint_round(store, clients, r, target_round, peer_hashes, avg_w, h_avg,
+                                          peer_infos, round_info, loss_glob, acc_glob, residuals)
+                peers_root = None
+                if proof_dir is not None:
+                    peers_root, _ = write_round_proofs(proof_dir, target_round, peer_infos)
+                traces[target_round] = trace
+                committer.submit(target_round, peer_infos, round_info, h_avg, peers_root)
+                print(f"[Round {target_round}] acc_glob={acc_glob:.4f} | queued for commit")
                 continue
-            w3c.mint_peer_round(target_round, info, peer_idx)
-            # optional: verify stored details
-            _ = _safe_try(w3c.peer_get_round_details, peer_idx, target_round, default=None)
-
-        # 6) Aggregator mint with round info
-        duration = wall_time() - t0
-        round_info = _round_info_json(
-            round_id=target_round,
-            participants=num_clients,
-            batch_size=batch_size,
-            duration_sec=duration,
-            # average of per-peer accuracies computed on test set
-            avg_round_accuracy=float(np.mean(peer_accs)),
-            lr=lr
-        )
-        h_avg = hash_weights(flatten_weights(avg_w))
-        w3c.mint_aggregator_round(h_avg, round_info)
 
-        # 7) On-chain verification (aggregator)
-        cur = _safe_try(w3c.get_current_round, default=0) or 0
-        assert cur == target_round, f"currentRound on-chain ({cur}) != target_round ({target_round})"
-
-        on_details = _safe_try(w3c.get_round_details, target_round, default=None)
-        if on_details is not None:
-            # They must match at the JSON string level
-            assert on_details == round_info, "roundDetails on-chain != local roundInfo"
-
-        # roundWeight / roundHash are optional (depends on the contract)
-        on_w = _safe_try(w3c.get_round_weight, target_round, default=None)
-        on_h = _safe_try(w3c.get_round_hash, target_round, default=None)
-        if on_w is not None:
-            assert on_w == h_avg, "roundWeight on-chain != aggregated hash"
-        elif on_h is not None:
-            assert on_h == h_avg, "roundHash on-chain != aggregated hash"
-
-        # print progress
-        print(f"[Round {target_round}] acc_glob={acc_glob:.4f} | wrote on-chain ✓")
+            # 5) Peer mints (roundNumber = target_round) with idempotence,
+            #    or the Merkle root of the payloads (proof file written before the commit)
+            peers_root = None
+            if proof_dir is not None:
+                peers_root, _ = write_round_proofs(proof_dir, target_round, peer_infos)
+                pending_peers = {}
+            else:
+                with tracer.phase("mint_peers"):
+                    pending_peers = _mint_peers(w3c, target_round, peer_infos, defer=pipeline_tx)
+
+            # 6) Aggregator mint with round info
+            duration = wall_time() - t0
+            round_info = _round_info_json(
+                round_id=target_round,
+                participants=len(peer_infos),
+                batch_size=batch_size,
+                duration_sec=duration,
+                # average of per-peer accuracies computed on test set
+                avg_round_accuracy=float(np.mean(peer_accs)),
+                lr=lr,
+                compact=compact,
+                aggregation=agg_record
+            )
+            if store is not None:
+                with tracer.phase("checkpoint"):
+                    _checkpoint_round(store, clients, r, target_round, peer_hashes, avg_w, h_avg,
+                                      peer_infos, round_info, loss_glob, acc_glob, residuals)
+            with tracer.phase("mint_aggregator"):
+                _mint_aggregator(w3c, target_round, pending_peers, h_avg, round_info, pipeline_tx, peers_root)
+
+            # 7) On-chain verification (aggregator + peers), one batched read
+            with tracer.phase("verify"):
+                _verify_round(w3c, target_round, round_info, h_avg, pending_peers, peers_root)
+            if store is not None:
+                store.mark_committed(target_round)
+            tracer.finish(trace)
+
+            # print progress
+            print(f"[Round {target_round}] acc_glob={acc_glob:.4f} | wrote on-chain ✓")
+
+    finally:
+        try:
+            if committer is not None:
+                _close_committer(committer, sys.exc_info()[1])
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            set_tracer(prev_tracer)
 
     return test_losses, test_accs
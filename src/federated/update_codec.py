@@ -0,0 +1,186 @@
+# src/federated/update_codec.py
+"""Client update codecs: what a peer sends instead of its full float32 weights.
+
+A peer encodes the delta between its trained weights and the global weights
+the round started from (the "reference"):
+
+    fp32         float32 delta
+    fp16         float16 delta
+    int8         int8 delta, one float32 scale per layer (max |delta| / 127)
+    topk:<f>     per layer, only the fraction f of coordinates with the largest |delta|
+                 (with their indices); combines with a quantizer: "int8+topk:0.01"
+
+Whatever a codec drops (rounding, coordinates outside the top-k) stays with
+the peer as a residual that is added to its next delta (error feedback).
+
+Decoding is `reference + dequantized delta` in float32. Peer and aggregator
+compute the same decoded weights, and the peer's `weight_hash` is
+`hash_weight_list` of them, so the hash can be recomputed from the reference
+weights and the update bytes.
+
+Wire format (little-endian, self-describing):
+
+    header: b"FLU1" | uint8 quantizer (0 fp32, 1 fp16, 2 int8) | uint8 sparse | uint16 layers
+    layer:  uint8 ndim | uint32 shape[ndim] | uint32 k | float32 scale
+            | k indices (sparse only; uint16 if the layer has <= 65536 values, else uint32)
+            | k values (float32 / float16 / int8)
+"""
+import math, struct
+import numpy as np
+
+QUANTIZERS = ("fp32", "fp16", "int8")
+
+_MAGIC = b"FLU1"
+_HEADER = struct.Struct("<4sBBH")
+_COUNT = struct.Struct("<If")
+_VALUES = {"fp32": np.dtype("<f4"), "fp16": np.dtype("<f2"), "int8": np.dtype("i1")}
+
+def _index_dtype(size: int) -> np.dtype:
+    return np.dtype("<u2") if size <= 1 << 16 else np.dtype("<u4")
+
+def _dequantize(q: np.ndarray, scale: float, quant: str) -> np.ndarray:
+    if quant == "int8":
+        return q.astype(np.float32) * np.float32(scale)
+    return q.astype(np.float32)
+
+class UpdateCodec:
+    """One codec configuration (see the module docstring); stateless and picklable."""
+
+    def __init__(self, quant: str = "fp32", topk: float | None = None):
+        if quant not in QUANTIZERS:
+            raise ValueError(f"unknown quantizer {quant!r} (expected one of {QUANTIZERS})")
+        if topk is not None and not 0 < topk <= 1:
+            raise ValueError(f"topk fraction must be in (0, 1], got {topk}")
+        self.quant = quant
+        self.topk = topk
+
+    @property
+    def spec(self) -> str:
+        if self.topk is None:
+            return self.quant
+        topk = f"topk:{self.topk:g}"
+        return topk if self.quant == "fp32" else f"{self.quant}+{topk}"
+
+    def __repr__(self):
+        return f"UpdateCodec({self.spec!r})"
+
+    def _quantize(self, values: np.ndarray) -> tuple[np.ndarray, float]:
+        if self.quant != "int8":
+            return values.astype(_VALUES[self.quant]), 0.0
+        peak = float(np.max(np.abs(values))) if values.size else 0.0
+        scale = float(np.float32(peak / 127)) if peak > 0 else 1.0
+        return np.clip(np.rint(values / np.float32(scale)), -127, 127).astype(np.int8), scale
+
+    def encode(self, weights: list[np.ndarray], reference: list[np.ndarray] | None = None,
+               residual: list[np.ndarray] | None = None) -> tuple[bytes, list[np.ndarray]]:
+        """(update bytes, new residual) for `weights`; a missing reference counts as zeros."""
+        parts = [_HEADER.pack(_MAGIC, QUANTIZERS.index(self.quant), self.topk is not None, len(weights))]
+        new_residual = []
+        for l, w in enumerate(weights):
+            w = np.asarray(w, dtype=np.float32)
+            if reference is None:
+                delta = w.flatten()
+            else:
+                delta = np.subtract(w, reference[l], dtype=np.float32).reshape(-1)
+            if residual is not None:
+                delta += residual[l].reshape(-1)
+            size = delta.size
+            if self.topk is None:
+                idx, values = None, delta
+            else:
+                k = min(size, max(1, math.ceil(self.topk * size)))
+                idx = np.sort(np.argpartition(np.abs(delta), size - k)[size - k:])
+                values = delta[idx]
+            q, scale = self._quantize(values)
+            sent = _dequantize(q, scale, self.quant)
+            # residual = what the aggregator will not see
+            if idx is None:
+                delta -= sent
+            else:
+                delta[idx] -= sent
+            new_residual.append(delta.reshape(w.shape))
+            parts += [struct.pack(f"<B{w.ndim}I", w.ndim, *w.shape), _COUNT.pack(q.size, scale)]
+            if idx is not None:
+                parts.append(idx.astype(_index_dtype(size)).tobytes())
+            parts.append(q.tobytes())
+        return b"".join(parts), new_residual
+
+def parse_codec(spec: str | None) -> UpdateCodec | None:
+    """"int8", "fp16+topk:0.05", ... -> UpdateCodec; None/""/"none" -> None (full float32 weights)."""
+    if spec is None or spec.strip().lower() in ("", "none"):
+        return None
+    quant, topk = "fp32", None
+    for part in spec.strip().lower().split("+"):
+        if part.startswith("topk:"):
+            try:
+                topk = float(part[len("topk:"):])
+            except ValueError:
+                raise ValueError(f"bad top-k fraction in update codec {spec!r}") from None
+        elif part in QUANTIZERS:
+            quant = part
+        else:
+            raise ValueError(f"unknown update codec {spec!r} (e.g. 'int8', 'fp16', 'topk:0.01', 'int8+topk:0.01')")
+    return UpdateCodec(quant, topk)
+
+def iter_decode_update(update: bytes, reference: list[np.ndarray] | None = None):
+    """Decoded float32 layers of `update`, one at a time (the update bytes are not copied)."""
+    buf = memoryview(update)
+    try:
+        magic, quant_id, sparse, n_layers = _HEADER.unpack_from(buf, 0)
+    except struct.error:
+        raise ValueError("truncated client update") from None
+    if magic != _MAGIC or quant_id >= len(QUANTIZERS):
+        raise ValueError("not an encoded client update")
+    quant = QUANTIZERS[quant_id]
+    if reference is not None and len(reference) != n_layers:
+        raise ValueError(f"update has {n_layers} layers, reference has {len(reference)}")
+    off = _HEADER.size
+    try:
+        for l in range(n_layers):
+            ndim = buf[off]
+            shape = struct.unpack_from(f"<{ndim}I", buf, off + 1)
+            k, scale = _COUNT.unpack_from(buf, off + 1 + 4 * ndim)
+            off += 1 + 4 * ndim + _COUNT.size
+            size = math.prod(shape)
+            if sparse:
+                idt = _index_dtype(size)
+                idx = np.frombuffer(buf, idt, k, off)
+                off += k * idt.itemsize
+            q = np.frombuffer(buf, _VALUES[quant], k, off)
+            off += k * q.itemsize
+            if reference is None:
+                out = np.zeros(size, dtype=np.float32)
+            else:
+                if tuple(np.shape(reference[l])) != shape:
+                    raise ValueError(f"layer {l}: update shape {shape} != reference shape {np.shape(reference[l])}")
+                out = np.array(reference[l], dtype=np.float32).reshape(-1)
+            if sparse:
+                out[idx] += _dequantize(q, scale, quant)
+            else:
+                out += _dequantize(q, scale, quant)
+            yield out.reshape(shape)
+    except (struct.error, IndexError):
+        raise ValueError("truncated client update") from None
+    if off != len(buf):
+        raise ValueError(f"{len(buf) - off} trailing bytes after the last layer")
+
+def decode_update(update: bytes, reference: list[np.ndarray] | None = None) -> list[np.ndarray]:
+    return list(iter_decode_update(update, reference))
+
+class UpdateEncoder:
+    """Peer side of one round: codec, reference weights and the peer's residual.
+
+    Calling it with the trained weights returns (update bytes, decoded
+    weights) and keeps the new residual in `self.residual`. Picklable, so it
+    travels with a pool task and comes back with the result.
+    """
+
+    def __init__(self, codec: UpdateCodec, reference: list[np.ndarray] | None = None,
+                 residual: list[np.ndarray] | None = None):
+        self.codec = codec
+        self.reference = reference
+        self.residual = residual
+
+    def __call__(self, weights: list[np.ndarray]) -> tuple[bytes, list[np.ndarray]]:
+        update, self.residual = self.codec.encode(weights, self.reference, self.residual)
+        return update, decode_update(update, self.reference)
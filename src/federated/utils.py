@@ -1,17 +1,212 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from Crypto.Hash import keccak
 import numpy as np
 from time import time, gmtime, strftime
 
+# Chunked digest scheme (opt-in; the flat hash_weight_list stays the on-chain default)
+CHUNKED_SCHEME = "keccak-chunked-v1"
+DEFAULT_CHUNK_SIZE = 1 << 20  # bytes per chunk
+
 def utc_timestamp() -> str:
     return strftime("%Y-%m-%dT%H:%M:%SZ", gmtime())
 
 def wall_time() -> float:
     return time()
 
+def _byte_view(arr: np.ndarray) -> memoryview:
+    # C-order bytes of `arr` (same as arr.tobytes()); no copy if already C-contiguous
+    return memoryview(np.ascontiguousarray(arr).view(np.uint8).reshape(-1))
+
 def hash_weights(flattened: np.ndarray) -> str:
     k = keccak.new(digest_bits=256)
-    k.update(flattened.tobytes())
+    k.update(_byte_view(flattened))
+    return k.hexdigest()
+
+def hash_weight_list(weights: list[np.ndarray]) -> str:
+    """Keccak-256 of the layers fed one buffer at a time.
+
+    Byte-identical to hash_weights(flatten_weights(weights)) but never
+    materializes the concatenation. Layers are cast (one at a time) only when
+    their dtype differs from the one np.concatenate would promote to.
+    """
+    weights = [np.asarray(w) for w in weights]
+    dtype = np.result_type(*[w.dtype for w in weights]) if weights else np.float32
+    return _hash_layers(weights, dtype)
+
+def _hash_layers(weights, dtype) -> str:
+    # hash_weight_list body once the promoted dtype is known: `weights` may be any iterable
+    k = keccak.new(digest_bits=256)
+    for w in weights:
+        w = np.asarray(w)
+        k.update(_byte_view(w if w.dtype == dtype else w.astype(dtype)))
     return k.hexdigest()
 
+# ---------- chunked Merkle digest (CHUNKED_SCHEME) ----------
+# chunk leaf  = keccak(0x00 || chunk bytes)          (fixed-size chunks of each layer's C-order bytes)
+# parent      = keccak(0x01 || left || right)        (position-ordered, an unpaired node is carried up)
+# layer root  = keccak(0x02 || uint64 layer bytes || Merkle root of its chunk leaves)
+# digest      = keccak(CHUNKED_SCHEME || uint64 chunk_size || Merkle root of the layer roots)
+def _keccak(*parts) -> bytes:
+    k = keccak.new(digest_bits=256)
+    for part in parts:
+        k.update(part)
+    return k.digest()
+
+def _merkle_root(nodes: list[bytes]) -> bytes:
+    if not nodes:
+        return _keccak(b"\x01")
+    while len(nodes) > 1:
+        parents = [_keccak(b"\x01", nodes[i], nodes[i + 1]) for i in range(0, len(nodes) - 1, 2)]
+        nodes = parents + nodes[2 * len(parents):]
+    return nodes[0]
+
+def _layer_root(nbytes: int, chunk_hashes: list[bytes]) -> bytes:
+    return _keccak(b"\x02", nbytes.to_bytes(8, "big"), _merkle_root(chunk_hashes))
+
+def _chunked_root(chunk_size: int, layer_roots: list[bytes]) -> bytes:
+    return _keccak(CHUNKED_SCHEME.encode(), chunk_size.to_bytes(8, "big"), _merkle_root(layer_roots))
+
+def _chunk_leaf(chunk: memoryview) -> bytes:
+    return _keccak(b"\x00", chunk)
+
+def weight_manifest(weights, chunk_size: int = DEFAULT_CHUNK_SIZE, workers: int = 0,
+                    names: list[str] | None = None, dtype=None) -> dict:
+    """Chunked Merkle digest of a layer list plus its per-chunk manifest.
+
+    Layers are cast to the dtype np.concatenate would use (as in
+    hash_weight_list), cut into `chunk_size`-byte chunks and the chunks are
+    hashed on `workers` threads (0: one per CPU; Keccak runs without the GIL).
+    The manifest (JSON-serializable) lists every layer's shape, size, root and
+    chunk hashes; keep it next to the weights to locate a mismatch with
+    `diff_manifests` without re-hashing the reference model.
+
+    If that promoted `dtype` is known beforehand, `weights` may be any
+    iterable and is consumed one layer at a time (e.g. .npz members, which
+    are loaded on access).
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    if dtype is None:
+        weights = [np.asarray(w) for w in weights]
+        dtype = np.result_type(*[w.dtype for w in weights]) if weights else np.float32
+    dtype = np.dtype(dtype)
+    workers = workers or os.cpu_count() or 1
+    pool = ThreadPoolExecutor(workers) if workers > 1 else None
+    try:
+        layers = []
+        for i, w in enumerate(weights):
+            w = np.asarray(w)
+            buf = _byte_view(w if w.dtype == dtype else w.astype(dtype))
+            chunks = [buf[o:o + chunk_size] for o in range(0, len(buf), chunk_size)]
+            leaves = list(pool.map(_chunk_leaf, chunks)) if pool is not None and len(chunks) > 1 \
+                else [_chunk_leaf(c) for c in chunks]
+            layers.append({"name": names[i] if names else str(i), "shape": list(w.shape), "bytes": len(buf),
+                           "root": _layer_root(len(buf), leaves).hex(), "chunks": [h.hex() for h in leaves]})
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    root = _chunked_root(chunk_size, [bytes.fromhex(l["root"]) for l in layers])
+    return {"scheme": CHUNKED_SCHEME, "chunk_size": chunk_size, "dtype": dtype.str, "root": root.hex(),
+            "layers": layers}
+
+def hash_weight_list_chunked(weights: list[np.ndarray], chunk_size: int = DEFAULT_CHUNK_SIZE,
+                             workers: int = 0) -> str:
+    """CHUNKED_SCHEME digest of a layer list (hex, same format as hash_weight_list)."""
+    return weight_manifest(weights, chunk_size, workers)["root"]
+
+def manifest_root(manifest: dict) -> str:
+    """Digest recomputed from the chunk hashes of a manifest (detects an edited/corrupt manifest)."""
+    if manifest.get("scheme") != CHUNKED_SCHEME:
+        raise ValueError(f"unsupported digest scheme: {manifest.get('scheme')!r}")
+    roots = [_layer_root(l["bytes"], [bytes.fromhex(h) for h in l["chunks"]]) for l in manifest["layers"]]
+    return _chunked_root(manifest["chunk_size"], roots).hex()
+
+def diff_manifests(expected: dict, actual: dict) -> list[dict]:
+    """Layers and chunks where `actual` differs from `expected` (empty if the digests match).
+
+    Each entry has the layer index and name plus either the chunk index and
+    its byte offset within the layer, or a `reason` for layer-level changes
+    (shape/size, missing or extra layer).
+    """
+    for m in (expected, actual):
+        if m.get("scheme") != CHUNKED_SCHEME:
+            raise ValueError(f"unsupported digest scheme: {m.get('scheme')!r}")
+    if expected["chunk_size"] != actual["chunk_size"]:
+        raise ValueError(f"chunk sizes differ: {expected['chunk_size']} != {actual['chunk_size']}")
+    cs = expected["chunk_size"]
+    n_exp, n_act = len(expected["layers"]), len(actual["layers"])
+    out = []
+    for i in range(max(n_exp, n_act)):
+        if i >= n_act:
+            out.append({"layer": i, "name": expected["layers"][i]["name"], "reason": "missing"})
+            continue
+        if i >= n_exp:
+            out.append({"layer": i, "name": actual["layers"][i]["name"], "reason": "extra"})
+            continue
+        e, a = expected["layers"][i], actual["layers"][i]
+        if e["root"] == a["root"]:
+            continue
+        if e["shape"] != a["shape"] or e["bytes"] != a["bytes"]:
+            out.append({"layer": i, "name": e["name"], "reason": "shape",
+                        "expected": {"shape": e["shape"], "bytes": e["bytes"]},
+                        "actual": {"shape": a["shape"], "bytes": a["bytes"]}})
+            continue
+        out += [{"layer": i, "name": e["name"], "chunk": j, "offset": j * cs, "expected": he, "actual": ha}
+                for j, (he, ha) in enumerate(zip(e["chunks"], a["chunks"])) if he != ha]
+    return out
+
 def flatten_weights(weights: list[np.ndarray]) -> np.ndarray:
     return np.concatenate([w.flatten() for w in weights])
+
+def _npz_member_dtype(data, key: str) -> np.dtype:
+    # read only the .npy header of an .npz member, not its payload
+    member = key + ".npy" if key + ".npy" in data.zip.namelist() else key
+    with data.zip.open(member) as f:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            return np.lib.format.read_array_header_1_0(f)[2]
+        return np.lib.format.read_array_header_2_0(f)[2]
+
+@contextmanager
+def _open_weights_file(path: str, keys_order: list[str] | None):
+    """(names, layers, promoted dtype) of a .npy/.npz file.
+
+    .npz members are decompressed on access, so `layers` is a generator
+    there: hash it with the dtype instead of collecting it.
+    """
+    ext = path.lower().rsplit(".", 1)[-1]
+    if ext == "npy":
+        arr = np.load(path, mmap_mode="r", allow_pickle=False)
+        yield ["0"], [arr], arr.dtype
+    elif ext == "npz":
+        with np.load(path, allow_pickle=False) as data:
+            keys = list(data.keys())
+            ordered = [k for k in (keys_order or []) if k in keys]
+            keys = ordered + sorted(k for k in keys if k not in ordered)
+            dtype = np.result_type(*[_npz_member_dtype(data, k) for k in keys]) if keys else np.float32
+            yield keys, (data[k] for k in keys), dtype
+    else:
+        raise ValueError(f"unsupported weights file (expected .npy or .npz): {path}")
+
+def hash_weights_file(path: str, keys_order: list[str] | None = None, scheme: str = "flat",
+                      chunk_size: int = DEFAULT_CHUNK_SIZE) -> str:
+    """hash_weight_list of a .npy (memory-mapped) or .npz file (members loaded one at a time).
+
+    .npz keys are hashed in `keys_order` (unknown keys ignored, missing ones
+    appended sorted) or alphabetically, like tools/weights_hash.py.
+    scheme="chunked" gives the CHUNKED_SCHEME digest instead.
+    """
+    if scheme not in ("flat", "chunked"):
+        raise ValueError(f"unknown digest scheme {scheme!r} (expected 'flat' or 'chunked')")
+    with _open_weights_file(path, keys_order) as (names, layers, dtype):
+        if scheme == "chunked":
+            return weight_manifest(layers, chunk_size, 0, names, dtype)["root"]
+        return _hash_layers(layers, dtype)
+
+def weights_file_manifest(path: str, keys_order: list[str] | None = None,
+                          chunk_size: int = DEFAULT_CHUNK_SIZE, workers: int = 0) -> dict:
+    """weight_manifest of a .npy/.npz file (layers named by their .npz key)."""
+    with _open_weights_file(path, keys_order) as (names, layers, dtype):
+        return weight_manifest(layers, chunk_size, workers, names, dtype)
@@ -0,0 +1,328 @@
+# src/federated/worker_pool.py
+"""Coordinator/worker execution of peer tasks over a socket.
+
+`WorkerPool` is a drop-in for the process pool of `train_peers` (`submit` /
+`map` / `shutdown`): tasks go to worker processes that connect to the
+coordinator, spawned locally and/or started on other hosts with
+
+    FL_WORKER_AUTHKEY=<key> python -m federated.worker_pool --connect <host>:<port>
+
+Connections use multiprocessing.connection (HMAC challenge with the shared
+key, then length-prefixed frames). Messages are pickled with protocol 5 and
+their array buffers travel out of band:
+
+- same host (the worker can read the coordinator's probe segment in
+  /dev/shm): the sender writes the buffers into a fresh /dev/shm segment and
+  sends its name; the receiver maps it read-only, unlinks it and builds the
+  arrays as views of the mapping, so nothing goes through the socket. The
+  receiver copies nothing; the sender makes one copy, since the arrays live
+  in its private heap (a pwrite, about 2x faster than storing into a fresh
+  mapping, which page-faults on every page);
+- otherwise each buffer is sent as its own frame.
+
+Client data is not shipped: memory-mapped partitions pickle as (file path,
+indices) and workers reopen the dataset cache (see data_handler). Pickle
+runs code on load, so only bind to loopback or a trusted network, and keep
+the key secret.
+"""
+import argparse, itertools, mmap, os, pickle, secrets, socket, subprocess, sys, threading, time
+import queue
+from concurrent.futures import Future
+from multiprocessing.connection import Client, Listener
+
+_SHM_DIR = "/dev/shm"
+_ALIGN = 64
+_MAP_POPULATE = getattr(mmap, "MAP_POPULATE", 0)
+_AUTHKEY_ENV = "FL_WORKER_AUTHKEY"
+
+# ---------- framing ----------
+def parse_address(address: str) -> tuple[str, int]:
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"expected <host>:<port>, got {address!r}")
+    return host, int(port)
+
+def _shm_path(name: str) -> str:
+    return os.path.join(_SHM_DIR, name)
+
+_segment_ids = itertools.count()
+
+def send_msg(conn, obj, shm_prefix: str | None = None):
+    """Send `obj`; with `shm_prefix`, its out-of-band buffers go through a /dev/shm segment."""
+    buffers = []
+    data = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+    views = [b.raw() for b in buffers]
+    if shm_prefix is None or not views:
+        conn.send_bytes(pickle.dumps(("inline", data, len(views))))
+        for v in views:
+            conn.send_bytes(v)
+        return
+    layout, size = [], 0
+    for v in views:
+        layout.append((size, v.nbytes))
+        size += -(-v.nbytes // _ALIGN) * _ALIGN
+    name = f"{shm_prefix}-{os.getpid()}-{next(_segment_ids)}"
+    fd = os.open(_shm_path(name), os.O_CREAT | os.O_EXCL | os.O_RDWR, 0o600)
+    try:
+        os.ftruncate(fd, max(size, 1))
+        for (off, _), v in zip(layout, views):
+            # the one copy on the way (see module docstring): pwrite fills tmpfs pages without faulting
+            # them into our address space, unlike writing through a mapping of the segment
+            os.pwrite(fd, v, off)
+    except BaseException:
+        os.unlink(_shm_path(name))
+        raise
+    finally:
+        os.close(fd)
+    conn.send_bytes(pickle.dumps(("shm", data, name, layout)))
+
+def recv_msg(conn):
+    """Receive an object sent by `send_msg`; arrays from a segment are read-only views of it."""
+    kind, data, *rest = pickle.loads(conn.recv_bytes())
+    if kind == "inline":
+        buffers = [conn.recv_bytes() for _ in range(rest[0])]
+    else:
+        name, layout = rest
+        fd = os.open(_shm_path(name), os.O_RDONLY)
+        try:
+            mm = mmap.mmap(fd, 0, flags=mmap.MAP_SHARED | _MAP_POPULATE, prot=mmap.PROT_READ)
+        finally:
+            os.close(fd)
+            os.unlink(_shm_path(name))  # freed once the last array view is gone
+        view = memoryview(mm)
+        buffers = [view[off:off + n] for off, n in layout]
+    return pickle.loads(data, buffers=buffers)
+
+def _echo(*args):
+    # round-trip helper for tests and benchmarks
+    return args[0] if len(args) == 1 else args
+
+# ---------- coordinator ----------
+class WorkerPool:
+    """Runs submitted calls on socket-connected worker processes (see module docstring).
+
+    `workers` local processes are spawned and `remote_workers` more are
+    waited for (up to `connect_timeout` seconds). Each connection is served
+    by a thread that takes the next queued task, so faster workers take more
+    tasks. A worker that disconnects fails its current task; when none are
+    left, queued tasks fail too.
+    """
+
+    def __init__(self, workers: int = 0, address: str = "127.0.0.1:0", remote_workers: int = 0,
+                 authkey: str | None = None, intra_op_threads: int | None = None, trace: bool = False,
+                 shm: bool = True, connect_timeout: float = 120.0):
+        if workers + remote_workers < 1:
+            raise ValueError("a WorkerPool needs at least one worker")
+        authkey = authkey or os.getenv(_AUTHKEY_ENV)
+        if authkey is None and remote_workers:
+            raise ValueError(f"remote workers need the shared key: set {_AUTHKEY_ENV}")
+        authkey = authkey or secrets.token_hex(16)
+        if intra_op_threads is None:
+            intra_op_threads = max(1, (os.cpu_count() or 1) // max(1, workers))
+        self._listener = Listener(parse_address(address), authkey=authkey.encode())
+        self.address = "%s:%d" % self._listener.address
+        self.session = f"fl-{secrets.token_hex(4)}"
+        self._probe = f"{self.session}-probe"
+        self._token = secrets.token_hex(8)
+        if shm and os.path.isdir(_SHM_DIR):
+            with open(_shm_path(self._probe), "w", encoding="utf-8") as f:
+                f.write(self._token)
+        self._trace = trace
+        self._tasks = queue.Queue()
+        self._lock = threading.Lock()
+        self._live = 0
+        self._closed = False
+        self.workers = []  # [{"host", "pid", "shm"}] of connected workers
+        self._threads = []
+
+        src_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = {**os.environ, _AUTHKEY_ENV: authkey,
+               "PYTHONPATH": os.pathsep.join(filter(None, [src_root, os.getenv("PYTHONPATH")]))}
+        host, port = self._listener.address
+        connect = f"{'127.0.0.1' if host in ('0.0.0.0', '') else host}:{port}"
+        self._procs = [subprocess.Popen([sys.executable, "-m", "federated.worker_pool", "--connect", connect,
+                                         "--intra-op-threads", str(intra_op_threads)], env=env)
+                       for _ in range(workers)]
+        try:
+            self._accept(workers + remote_workers, connect_timeout)
+        except BaseException:
+            self.shutdown()
+            raise
+
+    def _accept(self, expected: int, timeout: float):
+        accepted = []
+
+        def loop():
+            while len(accepted) < expected:
+                try:
+                    accepted.append(self._listener.accept())
+                except OSError:
+                    return  # listener closed
+                except Exception:
+                    continue  # failed handshake (wrong key): keep waiting
+
+        t = threading.Thread(target=loop, daemon=True)
+        t.start()
+        deadline = time.monotonic() + timeout
+        started = 0
+        while started < expected:
+            while started < len(accepted):
+                self._start(accepted[started])
+                started += 1
+            dead = [p.args for p in self._procs if p.poll() is not None]
+            if dead:
+                raise RuntimeError(f"worker process exited during startup: {dead[0]}")
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"{len(accepted)}/{expected} workers connected to {self.address}")
+            time.sleep(0.01)
+
+    def _start(self, conn):
+        conn.send({"session": self.session, "probe": self._probe, "token": self._token, "trace": self._trace})
+        info = conn.recv()
+        self.workers.append(info)
+        with self._lock:
+            self._live += 1
+        t = threading.Thread(target=self._serve, args=(conn, self.session if info["shm"] else None), daemon=True)
+        t.start()
+        self._threads.append(t)
+
+    def _serve(self, conn, shm_prefix):
+        try:
+            while True:
+                item = self._tasks.get()
+                if item is None:
+                    send_msg(conn, None)
+                    return
+                fut, fn, args = item
+                if not fut.set_running_or_notify_cancel():
+                    continue
+                try:
+                    send_msg(conn, (fn, args), shm_prefix)
+                except (pickle.PicklingError, TypeError, AttributeError) as e:
+                    # pickling fails before anything is sent: the worker is still waiting for a task
+                    fut.set_exception(e)
+                    continue
+                except (EOFError, OSError) as e:
+                    fut.set_exception(ConnectionError(f"worker disconnected: {e}"))
+                    return
+                try:
+                    ok, value = recv_msg(conn)
+                except (EOFError, OSError) as e:
+                    fut.set_exception(ConnectionError(f"worker disconnected: {e}"))
+                    return
+                if ok:
+                    fut.set_result(value)
+                else:
+                    fut.set_exception(value)
+        finally:
+            conn.close()
+            with self._lock:
+                self._live -= 1
+                last = self._live == 0 and not self._closed
+            if last:
+                self._fail_queued(ConnectionError("no workers left"))
+
+    def _fail_queued(self, exc):
+        while True:
+            try:
+                item = self._tasks.get_nowait()
+            except queue.Empty:
+                return
+            if item is not None and item[0].set_running_or_notify_cancel():
+                item[0].set_exception(exc)
+
+    def submit(self, fn, *args) -> Future:
+        if self._closed:
+            raise RuntimeError("WorkerPool is shut down")
+        fut = Future()
+        with self._lock:
+            live = self._live
+        if live == 0:
+            fut.set_exception(ConnectionError("no workers left"))
+        else:
+            self._tasks.put((fut, fn, args))
+        return fut
+
+    def map(self, fn, iterable):
+        futures = [self.submit(fn, x) for x in iterable]
+        return (f.result() for f in futures)
+
+    def shutdown(self, wait: bool = True):
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._threads:
+            self._tasks.put(None)
+        if wait:
+            for t in self._threads:
+                t.join()
+        self._listener.close()
+        for p in self._procs:
+            try:
+                p.wait(timeout=30 if wait else 0)
+            except subprocess.TimeoutExpired:
+                p.kill()
+        # segments a crashed peer never picked up
+        if os.path.isdir(_SHM_DIR):
+            for name in os.listdir(_SHM_DIR):
+                if name.startswith(self.session):
+                    try:
+                        os.unlink(_shm_path(name))
+                    except FileNotFoundError:
+                        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        return False
+
+# ---------- worker ----------
+def run_worker(address: str, authkey: str, intra_op_threads: int = 0):
+    """Serve tasks from the coordinator at `address` until it shuts the pool down."""
+    conn = Client(parse_address(address), authkey=authkey.encode())
+    hello = conn.recv()
+    try:
+        with open(_shm_path(hello["probe"]), "r", encoding="utf-8") as f:
+            same_host = f.read() == hello["token"]
+    except OSError:
+        same_host = False
+    conn.send({"host": socket.gethostname(), "pid": os.getpid(), "shm": same_host})
+    shm_prefix = hello["session"] if same_host else None
+
+    from .client_executor import _init_worker
+    _init_worker(intra_op_threads or os.cpu_count() or 1, hello["trace"])
+    while True:
+        try:
+            msg = recv_msg(conn)
+        except EOFError:
+            return
+        if msg is None:
+            return
+        fn, args = msg
+        try:
+            reply = (True, fn(*args))
+        except Exception as e:
+            reply = (False, e)
+        del msg, args  # drop the views of the task segment before training the next one
+        try:
+            send_msg(conn, reply, shm_prefix)
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            send_msg(conn, (False, RuntimeError(f"unpicklable task result: {e!r}")))
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(prog="python -m federated.worker_pool",
+                                description="Peer worker: connect to a coordinator and run its tasks")
+    p.add_argument("--connect", required=True, metavar="HOST:PORT", help="Coordinator address")
+    p.add_argument("--intra-op-threads", type=int, default=0, help="TF intra-op threads (default: CPU count)")
+    args = p.parse_args(argv)
+    authkey = os.getenv(_AUTHKEY_ENV)
+    if not authkey:
+        print(f"{_AUTHKEY_ENV} must hold the coordinator's key", file=sys.stderr)
+        return 2
+    run_worker(args.connect, authkey, args.intra_op_threads)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
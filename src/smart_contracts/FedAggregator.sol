@@ -3,11 +3,12 @@ pragma solidity ^0.8.20;
 
 import "@openzeppelin/contracts/token/ERC721/ERC721.sol";
 import "@openzeppelin/contracts/access/Ownable.sol";
+import "@openzeppelin/contracts/utils/cryptography/MerkleProof.sol";
 
 contract FedAggregatorNFT is ERC721, Ownable {
     // Public state for auditability
     string public modelHash;           // initial model hash
-    string public modelWeightHash;     // latest aggregated weights hash
+    string public modelWeightHash;     // latest aggregated weights hash (JSON rounds; "" after a compact round)
     uint256 public currentRound;       // 1-based: 0 -> before federation, 1 after first mint
     uint8   public federatedStatus;    // 0=in progress, 1=ended
     address public aggregatorAddress;  // aggregator governance address
@@ -16,8 +17,13 @@ contract FedAggregatorNFT is ERC721, Ownable {
     mapping(uint256 => string) public roundHashes;   // optional: alias/compatibility
     mapping(uint256 => string) public roundDetails;  // JSON with round metrics/metadata
     mapping(uint256 => string) public roundWeights;  // aggregated weights hash per round
+    mapping(uint256 => bytes32) public roundPeersRoots; // Merkle root of peer payloads (commitment mode)
+    mapping(uint256 => bytes32) public roundWeightDigests; // compact mode: aggregated weights hash per round
+    mapping(uint256 => bytes32) public roundMetas;         // compact mode: packed round metadata
 
     event AggregatorRoundMinted(uint256 indexed roundNumber, string modelWeightsHash, string roundInfo);
+    event AggregatorRoundCommitted(uint256 indexed roundNumber, bytes32 peersRoot);
+    event AggregatorRoundMintedCompact(uint256 indexed roundNumber, bytes32 modelWeightsHash, bytes32 roundMeta);
     event FederationEnded(uint256 finalRound);
 
     constructor(address _aggregatorAddress, string memory _modelHash)
@@ -34,16 +40,78 @@ contract FedAggregatorNFT is ERC721, Ownable {
 
     // Convenience getters
     function getAggregator() external view returns (address) { return aggregatorAddress; }
-    function getModelWeightHash() external view returns (string memory) { return modelWeightHash; }
+    /// @notice Latest aggregated weights hash as a string; reverts if the latest round was minted
+    ///         compact (its hash is a bytes32: see getLatestWeightDigest).
+    function getModelWeightHash() external view returns (string memory) {
+        require(roundWeightDigests[currentRound] == bytes32(0), "Latest round is compact: use getLatestWeightDigest");
+        return modelWeightHash;
+    }
+    /// @notice Latest aggregated weights hash of a compact round, or bytes32(0) if the latest round was JSON.
+    function getLatestWeightDigest() external view returns (bytes32) { return roundWeightDigests[currentRound]; }
     function getCurrentRound() external view returns (uint256) { return currentRound; }
     function getRoundHash(uint256 roundNumber) external view returns (string memory) { return roundHashes[roundNumber]; }
     function getRoundDetails(uint256 roundNumber) external view returns (string memory) { return roundDetails[roundNumber]; }
     function getRoundWeight(uint256 roundNumber) external view returns (string memory) { return roundWeights[roundNumber]; }
+    function getRoundPeersRoot(uint256 roundNumber) external view returns (bytes32) { return roundPeersRoots[roundNumber]; }
+    function getRoundWeightDigest(uint256 roundNumber) external view returns (bytes32) { return roundWeightDigests[roundNumber]; }
+    function getRoundMeta(uint256 roundNumber) external view returns (bytes32) { return roundMetas[roundNumber]; }
 
     /// @notice Register a new federated round (1 NFT per round, tokenId = roundNumber).
     /// @param modelWeightsHash keccak256 hash of aggregated round weights
     /// @param roundInfo JSON string with metadata (timestamp, duration, avg acc, etc.)
     function mint(string memory modelWeightsHash, string memory roundInfo) external onlyOwner {
+        _mintRound(modelWeightsHash, roundInfo);
+    }
+
+    /// @notice Register a round together with a commitment to every peer payload, in one tx
+    ///         (replaces the per-peer FedPeerNFT mints).
+    /// @param peersRoot Merkle root over keccak256(keccak256(payload)) leaves, sorted-pair hashing
+    ///        (OpenZeppelin MerkleProof); see federated.merkle
+    function mintWithPeersRoot(string memory modelWeightsHash, string memory roundInfo, bytes32 peersRoot)
+        external onlyOwner
+    {
+        require(peersRoot != bytes32(0), "Peers root cannot be empty");
+        _mintRound(modelWeightsHash, roundInfo);
+        roundPeersRoots[currentRound] = peersRoot;
+        emit AggregatorRoundCommitted(currentRound, peersRoot);
+    }
+
+    /// @notice Compact round registration: the weights hash is stored once as bytes32 (not in
+    ///         roundWeights/roundHashes/modelWeightHash, which is cleared so that it never holds an
+    ///         older round's hash) and the metadata as one packed word.
+    /// @param roundMeta big-endian, left-aligned: uint64 timestamp | uint32 duration (ms) |
+    ///        uint16 participants | uint16 local epochs | uint32 batch size |
+    ///        uint32 avg accuracy * 1e6 | uint64 lr * 1e9 (see federated.compact)
+    /// @param peersRoot Merkle root of the peer payloads, or bytes32(0) if peers mint themselves
+    function mintCompact(bytes32 modelWeightsHash, bytes32 roundMeta, bytes32 peersRoot) external onlyOwner {
+        require(federatedStatus == 0, "Federated process ended");
+        require(modelWeightsHash != bytes32(0), "Model weights hash cannot be empty");
+
+        unchecked { currentRound += 1; }
+        roundWeightDigests[currentRound] = modelWeightsHash;
+        roundMetas[currentRound] = roundMeta;
+        delete modelWeightHash;
+        if (peersRoot != bytes32(0)) {
+            roundPeersRoots[currentRound] = peersRoot;
+            emit AggregatorRoundCommitted(currentRound, peersRoot);
+        }
+
+        _safeMint(aggregatorAddress, currentRound);
+
+        emit AggregatorRoundMintedCompact(currentRound, modelWeightsHash, roundMeta);
+    }
+
+    /// @notice Check that `payload` is one of the peer payloads committed for `roundNumber`.
+    function verifyPeerPayload(uint256 roundNumber, string calldata payload, bytes32[] calldata proof)
+        external view returns (bool)
+    {
+        bytes32 root = roundPeersRoots[roundNumber];
+        if (root == bytes32(0)) return false;
+        bytes32 leaf = keccak256(bytes.concat(keccak256(bytes(payload))));
+        return MerkleProof.verifyCalldata(proof, root, leaf);
+    }
+
+    function _mintRound(string memory modelWeightsHash, string memory roundInfo) internal {
         require(federatedStatus == 0, "Federated process ended");
         require(bytes(modelWeightsHash).length > 0, "Model weights hash cannot be empty");
 
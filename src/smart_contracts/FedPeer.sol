@@ -13,9 +13,13 @@ contract FedPeerNFT is ERC721, Ownable {
 
     // Per-round auditing (JSON with peer hash/metrics for that round)
     mapping(uint256 => string) public roundDetails;
+    // Compact mode: weights hash and packed metadata per round
+    mapping(uint256 => bytes32) public roundWeightDigests;
+    mapping(uint256 => bytes32) public roundMetas;
 
     // Events
     event PeerMinted(uint256 indexed roundNumber, string payload);
+    event PeerMintedCompact(uint256 indexed roundNumber, bytes32 weightHash, bytes32 meta);
     event PeerStatusChanged(uint8 status);
 
     constructor(address _peerAddress, address _aggregatorAddress)
@@ -39,10 +43,7 @@ contract FedPeerNFT is ERC721, Ownable {
     /// @notice Register the peer participation in a round and mint the NFT (tokenId = roundNumber).
     /// @dev `payload` can be a JSON with {peer_id, round, weight_hash, test_accuracy, ...}
     function mint(uint256 roundNumber, string memory payload) external onlyOwner {
-        require(peerStatus == 0, "Peer is not active");
-        require(roundNumber > 0, "Round must be >= 1");
-        // If you want to allow gaps, use >. For strict sequence, use == lastParticipatedRound+1.
-        require(roundNumber > lastParticipatedRound, "Invalid round number");
+        _checkRound(roundNumber);
 
         // Persistence for auditing
         roundDetails[roundNumber] = payload;
@@ -54,6 +55,28 @@ contract FedPeerNFT is ERC721, Ownable {
         emit PeerMinted(roundNumber, payload);
     }
 
+    /// @notice Compact participation record: weights hash as bytes32 plus one packed word.
+    /// @param meta big-endian, left-aligned: uint32 peer id | uint32 test accuracy * 1e6 (see federated.compact)
+    function mintCompact(uint256 roundNumber, bytes32 weightHash, bytes32 meta) external onlyOwner {
+        _checkRound(roundNumber);
+        require(weightHash != bytes32(0), "Weight hash cannot be empty");
+
+        roundWeightDigests[roundNumber] = weightHash;
+        roundMetas[roundNumber] = meta;
+        lastParticipatedRound = roundNumber;
+
+        _safeMint(peerAddress, roundNumber);
+
+        emit PeerMintedCompact(roundNumber, weightHash, meta);
+    }
+
+    function _checkRound(uint256 roundNumber) internal view {
+        require(peerStatus == 0, "Peer is not active");
+        require(roundNumber > 0, "Round must be >= 1");
+        // If you want to allow gaps, use >. For strict sequence, use == lastParticipatedRound+1.
+        require(roundNumber > lastParticipatedRound, "Invalid round number");
+    }
+
     /// @notice Deactivate the peer (aggregator only).
     function stopPeer() external {
         require(msg.sender == aggregatorAddress, "Only aggregator can stop the peer");
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+import federated.training_orchestrator as to
+from federated import compact
+from federated.instrumentation import get_tracer
+
+
+class FakeChain:
+    """In-memory stand-in for Web3Connector, as run_federated uses it.
+
+    `peers` maps (peer, round) to the minted payload, `rounds` maps each
+    aggregator round to (hash, round info) and `roots` to its peer Merkle
+    root; reads answer from them. With encoding="compact" both are stored as
+    mintCompact would store them (bytes32 words) and decoded on reads. Every
+    mint is counted in `txs` and as a "tx" of the active tracer; `fail_at`
+    makes that aggregator mint raise once.
+    """
+
+    def __init__(self, encoding="json", fail_at=None):
+        self.encoding = encoding
+        self.fail_at = fail_at
+        self.current = 0
+        self.peers = {}
+        self.rounds = {}
+        self.roots = {}
+        self.txs = 0
+
+    def _tx(self):
+        self.txs += 1
+        get_tracer().count("tx")
+
+    def get_current_round(self):
+        return self.current
+
+    def read_mint_state(self, peer_idxs):
+        return self.current, {i: max([r for (p, r) in self.peers if p == i], default=0) for i in peer_idxs}
+
+    def mint_peer_round(self, round_id, info, peer_idx):
+        self._tx()
+        self.peers[(peer_idx, round_id)] = compact.pack_peer_info(info) if self.encoding == "compact" else info
+
+    def mint_aggregator_round(self, h_avg, round_info):
+        self.mint_aggregator_round_with_root(h_avg, round_info, None)
+
+    def mint_aggregator_round_with_root(self, h_avg, round_info, peers_root):
+        if self.current + 1 == self.fail_at:
+            self.fail_at = None
+            raise TimeoutError("RPC timeout")
+        self._tx()
+        self.current += 1
+        if self.encoding == "compact":
+            self.rounds[self.current] = (compact.hash_to_bytes32(h_avg), compact.pack_round_info(round_info))
+        else:
+            self.rounds[self.current] = (h_avg, round_info)
+        self.roots[self.current] = peers_root
+
+    def read_round_state(self, round_id, peer_idxs=(), peers_root=False):
+        h, info = self.rounds.get(round_id, (None, None))
+        peer_details = {i: self.peers.get((i, round_id)) for i in peer_idxs}
+        if self.encoding == "compact":
+            h = None if h is None else compact.bytes32_to_hash(h)
+            info = None if info is None else compact.unpack_round_info(info, round_id)
+            peer_details = {i: None if p is None else compact.unpack_peer_info(*p, round_id)
+                            for i, p in peer_details.items()}
+        state = {"current_round": self.current, "round_details": info, "round_weight": h,
+                 "round_hash": None, "peer_details": peer_details}
+        if peers_root:
+            state["peers_root"] = self.roots.get(round_id)
+        return state
+
+
+@pytest.fixture
+def fake_chain(monkeypatch):
+    """`fake_chain(**kw)`: a FakeChain(**kw) that run_federated connects to, in the encoding it asks for."""
+
+    def install(**kw):
+        chain = FakeChain(**kw)
+
+        def connect(encoding=None):
+            chain.encoding = encoding or "json"
+            return chain
+
+        monkeypatch.setattr(to, "Web3Connector", connect)
+        return chain
+
+    return install
+
+
+@pytest.fixture
+def small_mnist(monkeypatch):
+    """`small_mnist(n_train, n_test)`: run_federated loads that many random MNIST-shaped samples."""
+
+    def install(n_train=120, n_test=30):
+        def load(*args, **kwargs):
+            rng = np.random.default_rng(0)
+            return ((rng.random((n_train, 28, 28), dtype=np.float32), rng.integers(0, 10, n_train)),
+                    (rng.random((n_test, 28, 28), dtype=np.float32), rng.integers(0, 10, n_test)))
+
+        monkeypatch.setattr(to, "load_mnist_normalized", load)
+
+    return install
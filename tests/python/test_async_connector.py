@@ -0,0 +1,202 @@
+import asyncio
+import json
+import os
+from time import perf_counter
+
+import pytest
+import rlp
+from aiohttp import web
+from eth_account import Account
+from eth_utils import keccak
+
+from federated import compact
+from federated.async_connector import AsyncWeb3Connector, gather_limited
+
+ABI_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "src", "abi")
+AGG_ADDR = "0x" + "11" * 20
+
+
+class _Node:
+    """JSON-RPC stub over aiohttp: fixed answers after `delay`, records concurrency and client ports."""
+
+    def __init__(self, delay=0.0, known=0, calls=None):
+        self.delay = delay
+        self.known = known  # answer this many raw transactions with "already known"
+        self.calls = calls or {}  # eth_call data -> bytes32 word
+        self.inflight = self.max_inflight = 0
+        self.ports = set()
+        self.methods = []
+        self.sent = []  # (sender, nonce) of raw transactions
+
+    def answer(self, method, params):
+        if method == "web3_clientVersion":
+            return "stub/0.1"
+        if method == "eth_chainId":
+            return "0x7a69"
+        if method == "eth_getBalance":
+            return hex(10**18)
+        if method == "eth_call" and params[0]["data"] in self.calls:
+            return "0x" + self.calls[params[0]["data"]].hex()
+        if method == "eth_call":
+            value = 7 if params[0]["to"].lower() == AGG_ADDR else 3
+            return "0x" + f"{value:064x}"
+        if method == "eth_gasPrice":
+            return hex(10**9)
+        if method == "eth_getTransactionCount":
+            return "0x5"
+        if method == "eth_estimateGas":
+            return hex(100_000)
+        if method == "eth_sendRawTransaction":
+            raw = bytes.fromhex(params[0][2:])
+            self.sent.append((Account.recover_transaction(raw), int.from_bytes(rlp.decode(raw)[0], "big")))
+            return "0x" + keccak(raw).hex()
+        if method == "eth_getTransactionReceipt":
+            return {"transactionHash": params[0], "status": "0x1", "gasUsed": "0x5208", "effectiveGasPrice": "0x1",
+                    "blockNumber": "0x1", "transactionIndex": "0x0", "logs": [], "cumulativeGasUsed": "0x5208"}
+        raise AssertionError(method)
+
+    async def handle(self, request):
+        self.ports.add(request.transport.get_extra_info("peername")[1])
+        body = await request.json()
+        self.methods.append(body["method"])
+        self.inflight += 1
+        self.max_inflight = max(self.max_inflight, self.inflight)
+        await asyncio.sleep(self.delay)
+        self.inflight -= 1
+        if body["method"] == "eth_sendRawTransaction" and self.known:
+            self.known -= 1
+            self.answer(body["method"], body["params"])
+            return web.json_response({"jsonrpc": "2.0", "id": body["id"],
+                                      "error": {"code": -32000, "message": "already known"}})
+        return web.json_response({"jsonrpc": "2.0", "id": body["id"],
+                                  "result": self.answer(body["method"], body["params"])})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/", self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        return f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/"
+
+
+def _env(monkeypatch, url, peers):
+    monkeypatch.delenv("WEB3_ASYNC_PROVIDER", raising=False)
+    monkeypatch.setenv("WEB3_HTTP_PROVIDER", url)
+    monkeypatch.setenv("AGGREGATOR_PRIVATE_KEY", Account.create().key.hex())
+    monkeypatch.setenv("AGGREGATOR_CONTRACT_ADDRESS", AGG_ADDR)
+    monkeypatch.setenv("AGGREGATOR_ABI_PATH", os.path.join(ABI_DIR, "Aggregator_ABI.json"))
+    monkeypatch.setenv("CLIENT_ABI_PATH", os.path.join(ABI_DIR, "Client_ABI.json"))
+    monkeypatch.setenv("CLIENT_CONTRACT_ADDRESSES", ",".join("0x" + f"{i + 32:02x}" * 20 for i in range(peers)))
+    monkeypatch.setenv("CLIENT_PRIVATE_KEYS", ",".join(Account.create().key.hex() for _ in range(peers)))
+
+
+def test_gather_limited_keeps_order_and_errors():
+    running = []
+
+    async def job(i):
+        running.append(1)
+        assert len(running) <= 3
+        await asyncio.sleep(0.01 * (5 - i))
+        running.pop()
+        if i == 2:
+            raise ValueError(i)
+        return i
+
+    out = asyncio.run(gather_limited((job(i) for i in range(5)), limit=3))
+    assert out[:2] == [0, 1] and out[3:] == [3, 4]
+    assert isinstance(out[2], ValueError)
+
+
+def test_fan_out_reads_take_about_one_round_trip(monkeypatch):
+    node = _Node(delay=0.05)
+
+    async def main():
+        _env(monkeypatch, await node.start(), peers=20)
+        async with AsyncWeb3Connector(max_concurrency=8) as c:
+            addrs = [c.get_peer_account_address(i) for i in range(20)]
+            t = perf_counter()
+            bals = await c.get_balances_eth(addrs)
+            elapsed = perf_counter() - t
+            last = await c.peer_last_rounds(range(20))
+            state = await c.read_mint_state([0, 1])
+        await node.runner.cleanup()
+        return bals, elapsed, last, state
+
+    bals, elapsed, last, state = asyncio.run(main())
+    assert bals == [1.0] * 20
+    assert elapsed < 20 * node.delay / 2  # 3 waves of 8, not 20 sequential requests
+    assert last == {i: 3 for i in range(20)}
+    assert state == (7, {0: 3, 1: 3})
+    assert node.max_inflight == 8
+    assert len(node.ports) <= 8  # keep-alive pool, not one connection per request
+
+
+def test_concurrent_peer_mints_keep_per_account_nonces(monkeypatch):
+    node = _Node()
+
+    async def main():
+        _env(monkeypatch, await node.start(), peers=3)
+        async with AsyncWeb3Connector() as c:
+            first = await c.mint_peer_rounds(1, {i: f"payload-{i}" for i in range(3)})
+            peers, agg = await c.mint_round_pipelined(2, {i: "x" for i in range(3)}, "0xab", '{"round": 2}')
+            accounts = [c.get_peer_account_address(i) for i in range(3)] + [c.get_aggregator_account_address()]
+        await node.runner.cleanup()
+        return first, peers, agg, accounts
+
+    first, peers, agg, accounts = asyncio.run(main())
+    assert sorted(first) == [0, 1, 2] and all(r["status"] == 1 for r in first.values())
+    assert len(peers) == 3 and agg["status"] == 1
+    by_sender = {a: [n for s, n in node.sent if s == a] for a in accounts}
+    assert by_sender == {**{a: [5, 6] for a in accounts[:3]}, accounts[3]: [5]}
+    # the gas price and each account's nonce are fetched once
+    assert node.methods.count("eth_gasPrice") == 1
+    assert node.methods.count("eth_getTransactionCount") == 4
+
+
+def test_already_known_tx_is_not_signed_again(monkeypatch):
+    node = _Node(known=1)
+
+    async def main():
+        _env(monkeypatch, await node.start(), peers=1)
+        async with AsyncWeb3Connector() as c:
+            receipt = await c.mint_peer_round(1, "payload", 0)
+            again = await c.mint_peer_round(2, "payload", 0)
+        await node.runner.cleanup()
+        return receipt, again
+
+    receipt, again = asyncio.run(main())
+    assert receipt["status"] == 1 and again["status"] == 1
+    assert [n for _, n in node.sent] == [5, 6]  # one tx per mint, nonces not skipped
+
+
+def test_round_getters_decode_compact_rounds(monkeypatch):
+    round_info = compact.canonical_round_info(json.dumps(
+        {"round_id": 3, "timestamp": "2025-01-01T12:34:56Z", "duration_sec": 1.5, "participants": 1,
+         "local_epochs": 1, "batch_size": 64, "avg_round_accuracy": 0.9, "lr": 0.001}))
+    peer_info = compact.canonical_peer_info(json.dumps({"peer_id": 1, "round": 3, "weight_hash": "ab" * 32,
+                                                        "test_accuracy": 0.5}))
+    node = _Node()
+
+    async def main():
+        _env(monkeypatch, await node.start(), peers=1)
+        async with AsyncWeb3Connector(encoding="compact") as c:
+            agg, peer = c.agg_contract.functions, c.client_contracts[0]["contract"].functions
+            digest, meta = compact.pack_peer_info(peer_info)
+            for fn, word in ((agg.getRoundMeta(3), compact.pack_round_info(round_info)),
+                             (agg.getRoundWeightDigest(3), bytes.fromhex("cd" * 32)),
+                             (peer.roundWeightDigests(3), digest), (peer.roundMetas(3), meta)):
+                node.calls[fn._encode_transaction_data()] = word
+            out = (await c.get_round_details(3), await c.get_round_weight(3), await c.get_round_hash(3),
+                   await c.peer_get_round_details(0, 3))
+        await node.runner.cleanup()
+        return out
+
+    assert asyncio.run(main()) == (round_info, "cd" * 32, "cd" * 32, peer_info)
+
+
+def test_unsupported_ipc_endpoint(monkeypatch):
+    _env(monkeypatch, "http://127.0.0.1:1/", peers=1)
+    with pytest.raises(ValueError):
+        AsyncWeb3Connector(provider_uri="/tmp/anvil.ipc")
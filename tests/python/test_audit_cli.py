@@ -0,0 +1,158 @@
+import json
+import subprocess
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+from eth_abi import encode
+from web3 import Web3
+
+from federated import audit
+from federated.readonly_connector import decode_output, encode_call, load_abi
+from federated.utils import hash_weight_list
+
+AGG_ABI = "src/abi/Aggregator_ABI.json"
+CLIENT_ABI = "src/abi/Client_ABI.json"
+AGG = "0x" + "11" * 20
+PEER = "0x" + "22" * 20
+
+
+def test_codec_matches_web3():
+    c = Web3().eth.contract(address=Web3.to_checksum_address(AGG), abi=load_abi(AGG_ABI))
+    assert encode_call("getRoundDetails", ["uint256"], [7]) == c.functions.getRoundDetails(7)._encode_transaction_data()
+    assert encode_call("getCurrentRound", [], []) == c.functions.getCurrentRound()._encode_transaction_data()
+    assert decode_output(["string"], encode(["string"], ["héllo {}"])) == "héllo {}"
+    assert decode_output(["uint256"], encode(["uint256"], [2**200])) == 2**200
+    assert decode_output(["address", "bool"], encode(["address", "bool"], [PEER, True])) == (PEER, True)
+
+
+def test_audit_cli_imports_no_heavy_modules():
+    code = ("import sys, federated.audit, federated.readonly_connector; "
+            "print([m for m in ('web3', 'tensorflow', 'keras', 'numpy') if m in sys.modules])")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         env={"PYTHONPATH": "src"})
+    assert out.stdout.strip() == "[]"
+
+
+@pytest.fixture
+def fake_node():
+    """JSON-RPC batch endpoint answering eth_call from a {(to, data): abi-encoded result} table."""
+    agg = Web3().eth.contract(address=Web3.to_checksum_address(AGG), abi=load_abi(AGG_ABI)).functions
+    peer = Web3().eth.contract(address=Web3.to_checksum_address(PEER), abi=load_abi(CLIENT_ABI)).functions
+    table = {}
+
+    def answer(fn, types, values):
+        table[(fn.address.lower(), fn._encode_transaction_data())] = "0x" + encode(types, values).hex()
+
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            batch = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            requests.append(batch)
+            out = []
+            for req in batch:
+                key = (req["params"][0]["to"].lower(), req["params"][0]["data"])
+                if key in table:
+                    out.append({"jsonrpc": "2.0", "id": req["id"], "result": table[key]})
+                else:
+                    out.append({"jsonrpc": "2.0", "id": req["id"], "error": {"code": 3, "message": "execution reverted"}})
+            body = json.dumps(out).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}", agg, peer, answer, requests
+    server.shutdown()
+
+
+def test_round_peer_and_verify(fake_node, tmp_path, monkeypatch, capsys):
+    url, agg, peer, answer, requests = fake_node
+    monkeypatch.setenv("CLIENT_CONTRACT_ADDRESSES", PEER)
+    weights = [np.arange(6, dtype=np.float32), np.ones(3, dtype=np.float32)]
+    np.savez(tmp_path / "w.npz", a=weights[0], b=weights[1])
+    h = hash_weight_list(weights)
+    answer(agg.getCurrentRound(), ["uint256"], [1])
+    answer(agg.getRoundDetails(1), ["string"], ['{"round_id":1}'])
+    answer(agg.getRoundWeight(1), ["string"], [h])  # getRoundHash reverts: not needed
+    answer(peer.roundDetails(1), ["string"], [json.dumps({"peer_id": 1, "weight_hash": h})])
+    answer(peer.getLastParticipatedRound(), ["uint256"], [1])
+    base = ["--rpc-url", url, "--agg-addr", AGG]
+
+    assert audit.main(base + ["--json", "round", "1"]) == 0
+    row = json.loads(capsys.readouterr().out)
+    assert row["weight_hash"] == h and row["round_details"] == '{"round_id":1}' and row["current_round"] == 1
+    assert len(requests[-1]) == 7  # currentRound + the JSON and compact round getters in one batch
+
+    assert audit.main(base + ["verify-agg", "1", str(tmp_path / "w.npz")]) == 0
+    assert capsys.readouterr().out.strip().endswith("MATCH")
+    assert audit.main(base + ["verify-peer", "1", str(tmp_path / "w.npz"), "--peer-index", "0"]) == 0
+
+    (tmp_path / "order.txt").write_text("b\na\n")
+    assert audit.main(base + ["verify-agg", "1", str(tmp_path / "w.npz"), "--keys-order", str(tmp_path / "order.txt")]) == 1
+    assert capsys.readouterr().out.strip().endswith("MISMATCH")
+    assert audit.main(base + ["round", "2"]) == 1  # unknown round
+
+
+def test_verify_merkle_committed_round(fake_node, tmp_path, capsys):
+    from federated.merkle import write_round_proofs
+
+    url, agg, _, answer, _ = fake_node
+    np.save(tmp_path / "p1.npy", np.arange(4, dtype=np.float32))
+    h1 = hash_weight_list([np.arange(4, dtype=np.float32)])
+    payloads = [json.dumps({"peer_id": i, "weight_hash": h1 if i == 1 else "00"}) for i in (1, 2, 3)]
+    root, proof_file = write_round_proofs(str(tmp_path), 1, payloads)
+    answer(agg.getCurrentRound(), ["uint256"], [1])
+    answer(agg.getRoundPeersRoot(1), ["bytes32"], [bytes.fromhex(root[2:])])
+    base = ["--rpc-url", url, "--agg-addr", AGG]
+
+    assert audit.main(base + ["verify-proof", "1", proof_file]) == 0
+    assert capsys.readouterr().out.count("INCLUDED") == 3
+    assert audit.main(base + ["verify-peer", "1", str(tmp_path / "p1.npy"), "--peer-index", "0",
+                              "--proof-file", proof_file]) == 0
+    assert audit.main(base + ["verify-peer", "1", str(tmp_path / "p1.npy"), "--peer-index", "1",
+                              "--proof-file", proof_file]) == 1
+
+    doc = json.loads(open(proof_file).read())
+    doc["leaves"][2]["payload"] = doc["leaves"][2]["payload"].replace('"00"', '"01"')
+    open(proof_file, "w").write(json.dumps(doc))
+    assert audit.main(base + ["verify-proof", "1", proof_file]) == 1
+
+
+def test_compact_round_is_decoded(fake_node, tmp_path, monkeypatch, capsys):
+    from federated import compact
+
+    url, agg, peer, answer, _ = fake_node
+    monkeypatch.setenv("CLIENT_CONTRACT_ADDRESSES", PEER)
+    weights = [np.arange(5, dtype=np.float32)]
+    np.save(tmp_path / "w.npy", weights[0])
+    h = hash_weight_list(weights)
+    round_info = compact.canonical_round_info(json.dumps(
+        {"round_id": 1, "timestamp": "2025-01-01T00:00:00Z", "duration_sec": 1.5, "participants": 1,
+         "local_epochs": 1, "batch_size": 64, "avg_round_accuracy": 0.9, "lr": 0.001}, separators=(",", ":")))
+    peer_info = json.dumps({"peer_id": 1, "round": 1, "weight_hash": h, "test_accuracy": 0.875}, separators=(",", ":"))
+    answer(agg.getCurrentRound(), ["uint256"], [1])
+    answer(agg.getRoundWeight(1), ["string"], [""])
+    answer(agg.getRoundWeightDigest(1), ["bytes32"], [bytes.fromhex(h)])
+    answer(agg.getRoundMeta(1), ["bytes32"], [compact.pack_round_info(round_info)])
+    answer(peer.roundDetails(1), ["string"], [""])
+    answer(peer.roundWeightDigests(1), ["bytes32"], [bytes.fromhex(h)])
+    answer(peer.roundMetas(1), ["bytes32"], [compact.pack_peer_info(peer_info)[1]])
+    base = ["--rpc-url", url, "--agg-addr", AGG]
+
+    assert audit.main(base + ["--json", "round", "1"]) == 0
+    row = json.loads(capsys.readouterr().out)
+    assert row["weight_hash"] == h and row["round_details"] == round_info
+    assert audit.main(base + ["--json", "peer", "1", "--peer-index", "0"]) == 0
+    assert json.loads(capsys.readouterr().out)["payload"] == peer_info
+    assert audit.main(base + ["verify-agg", "1", str(tmp_path / "w.npy")]) == 0
+    assert audit.main(base + ["verify-peer", "1", str(tmp_path / "w.npy"), "--peer-index", "0"]) == 0
@@ -0,0 +1,118 @@
+import json
+
+import pytest
+from eth_abi import encode
+from hexbytes import HexBytes
+from web3 import Web3
+
+from federated.audit_index import AuditIndex
+
+AGG = "0x" + "aa" * 20
+PEERS = ["0x" + "b1" * 20, "0x" + "b2" * 20]
+
+
+class FakeEth:
+    """Chain of encoded logs; get_logs rejects ranges wider than `max_range`."""
+
+    def __init__(self, max_range=8):
+        self.logs = []
+        self.block_number = 0
+        self.max_range = max_range
+        self.queries = []
+
+    def emit(self, address, signature, round_number, *values, types=None):
+        self.block_number += 3
+        self.logs.append({
+            "address": address,
+            "topics": [HexBytes(Web3.keccak(text=signature)), HexBytes(round_number.to_bytes(32, "big"))],
+            "data": HexBytes(encode(types or ["string"] * len(values), list(values))),
+            "blockNumber": self.block_number,
+            "blockHash": HexBytes(b"\x00" * 32),
+            "transactionHash": HexBytes(self.block_number.to_bytes(32, "big")),
+            "transactionIndex": 0,
+            "logIndex": 0,
+        })
+
+    def get_logs(self, f):
+        self.queries.append((f["fromBlock"], f["toBlock"]))
+        if f["toBlock"] - f["fromBlock"] + 1 > self.max_range:
+            raise ValueError({"code": -32005, "message": "query exceeds max block range"})
+        return [l for l in self.logs if f["fromBlock"] <= l["blockNumber"] <= f["toBlock"]]
+
+
+def _setup():
+    w3 = Web3()
+    eth = FakeEth()
+    with open("src/abi/Aggregator_ABI.json") as f:
+        agg = w3.eth.contract(address=Web3.to_checksum_address(AGG), abi=json.load(f))
+    with open("src/abi/Client_ABI.json") as f:
+        client_abi = json.load(f)
+    peers = [w3.eth.contract(address=Web3.to_checksum_address(a), abi=client_abi) for a in PEERS]
+    w3.eth = eth
+    return w3, eth, agg, peers
+
+
+def _mint_round(eth, r):
+    for i, p in enumerate(PEERS):
+        info = json.dumps({"peer_id": i + 1, "round": r, "weight_hash": f"p{i}r{r}", "test_accuracy": 0.9})
+        eth.emit(Web3.to_checksum_address(p), "PeerMinted(uint256,string)", r, info)
+    eth.emit(Web3.to_checksum_address(AGG), "AggregatorRoundMinted(uint256,string,string)", r, f"agg{r}", f'{{"round_id":{r}}}')
+
+
+def test_sync_resumes_and_answers_queries(tmp_path):
+    w3, eth, agg, peers = _setup()
+    for r in (1, 2):
+        _mint_round(eth, r)
+    db = str(tmp_path / "index.sqlite")
+
+    index = AuditIndex(db)
+    assert index.sync(w3, agg, peers, chunk=32) == 6
+    assert index.last_block() == eth.block_number
+    assert eth.queries[0] == (0, 18) and len(eth.queries) > 1  # over-wide range was split
+    index.close()
+
+    _mint_round(eth, 3)
+    eth.queries.clear()
+    index = AuditIndex(db)
+    assert index.sync(w3, agg, peers) == 3
+    assert min(a for a, _ in eth.queries) == 19  # resumed after the last indexed block
+
+    assert [r["round"] for r in index.agg_rounds(2, 3)] == [2, 3]
+    assert index.agg_rounds(3)[0]["weight_hash"] == "agg3"
+    hist = index.peer_rounds(PEERS[1])
+    assert [(r["round"], r["weight_hash"]) for r in hist] == [(1, "p1r1"), (2, "p1r2"), (3, "p1r3")]
+    hits = index.find_hash("p0r2")
+    assert len(hits) == 1 and hits[0]["kind"] == "peer" and hits[0]["round"] == 2
+    assert index.sync(w3, agg, peers) == 0
+
+
+def test_single_block_failure_is_raised(tmp_path):
+    w3, eth, agg, peers = _setup()
+    _mint_round(eth, 1)
+    eth.max_range = 0
+    with pytest.raises(ValueError):
+        AuditIndex(str(tmp_path / "index.sqlite")).sync(w3, agg, peers)
+
+
+def test_compact_events_are_indexed_decoded(tmp_path):
+    from federated import compact
+
+    w3, eth, agg, peers = _setup()
+    h_peer, h_agg = "11" * 32, "22" * 32
+    peer_info = json.dumps({"peer_id": 1, "round": 1, "weight_hash": h_peer, "test_accuracy": 0.5}, separators=(",", ":"))
+    round_info = compact.canonical_round_info(json.dumps(
+        {"round_id": 1, "timestamp": "2025-01-01T00:00:00Z", "duration_sec": 2.0, "participants": 1,
+         "local_epochs": 1, "batch_size": 64, "avg_round_accuracy": 0.5, "lr": 0.001}, separators=(",", ":")))
+    eth.emit(Web3.to_checksum_address(PEERS[0]), "PeerMintedCompact(uint256,bytes32,bytes32)", 1,
+             *compact.pack_peer_info(peer_info), types=["bytes32", "bytes32"])
+    eth.emit(Web3.to_checksum_address(AGG), "AggregatorRoundMintedCompact(uint256,bytes32,bytes32)", 1,
+             bytes.fromhex(h_agg), compact.pack_round_info(round_info), types=["bytes32", "bytes32"])
+    _mint_round(eth, 2)
+
+    index = AuditIndex(str(tmp_path / "index.sqlite"))
+    assert index.sync(w3, agg, peers) == 5
+    row = index.agg_rounds(1, 1)[0]
+    assert row["weight_hash"] == h_agg and row["round_info"] == round_info
+    assert index.peer_rounds(PEERS[0])[0]["payload"] == peer_info
+    assert index.find_hash(h_peer)[0]["round"] == 1
+    assert index.agg_rounds(2, 2)[0]["weight_hash"] == "agg2"
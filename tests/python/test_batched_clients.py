@@ -0,0 +1,126 @@
+import random
+
+import numpy as np
+import pytest
+from tensorflow import keras
+
+from federated.batched_clients import BatchedClients
+from federated.client_executor import train_peers, peer_seed, ModelClients, SharedModelClients
+from federated.model_manager import build_client_model, average_layerwise
+from federated.utils import hash_weight_list
+
+
+def _data(n, size, seed=0):
+    rng = np.random.default_rng(seed)
+    xs = [rng.random((size, 28, 28), dtype=np.float32) for _ in range(n)]
+    ys = [rng.integers(0, 10, size) for _ in range(n)]
+    return xs, ys
+
+
+def _rounds(clients, xs, ys, rounds=2, batch_size=32):
+    out = []
+    for r in range(rounds):
+        w, accs, hashes = train_peers(clients, xs, ys, xs, ys, batch_size,
+                                      [peer_seed(42, r, i) for i in range(len(clients))])
+        assert hashes == [hash_weight_list(x) for x in w]
+        clients.set_global(average_layerwise(w))
+        out.append((w, accs))
+    return out
+
+
+def test_matches_keras_per_model_path():
+    # one batch per client and round: batch order cannot differ, only float round-off
+    xs, ys = _data(3, 20)
+    keras.utils.set_random_seed(0)
+    ref = _rounds(ModelClients([build_client_model() for _ in range(3)]), xs, ys)
+    keras.utils.set_random_seed(0)
+    batched = BatchedClients(3)
+    got = _rounds(batched, xs, ys)
+    for (w_ref, acc_ref), (w, acc) in zip(ref, got):
+        assert acc == pytest.approx(acc_ref)
+        for a, b in zip(w_ref, w):
+            for x, y in zip(a, b):
+                np.testing.assert_allclose(x, y, atol=1e-5)
+    keras.utils.set_random_seed(0)
+    shared = SharedModelClients(3)
+    _rounds(shared, xs, ys)
+    for i in range(3):
+        for x, y in zip(shared.get_state(i)[1], batched.get_state(i)[1]):
+            assert x.dtype == y.dtype
+            np.testing.assert_allclose(x, y, rtol=1e-3, atol=1e-7)
+
+
+def test_initial_weights_match_n_built_models_without_building_them():
+    keras.utils.set_random_seed(0)
+    ref = [build_client_model().get_weights() for _ in range(3)]
+    build_client_model()  # BatchedClients' own model
+    after = random.getstate()
+    keras.utils.set_random_seed(0)
+    batched = BatchedClients(3)
+    assert random.getstate() == after
+    for i in range(3):
+        for x, y in zip(ref[i], batched.get_weights(i)):
+            assert x.dtype == y.dtype
+            np.testing.assert_array_equal(x, y)
+
+
+def test_uneven_clients_train_independently():
+    (x0, x1), (y0, y1) = _data(2, 300)
+    xs, ys = [x0[:70], x1], [y0[:70], y1]
+    keras.utils.set_random_seed(0)
+    both = BatchedClients(2)
+    both.fit([0, 1], xs, ys, 32, [5, 6])
+    for i in range(2):
+        keras.utils.set_random_seed(0)
+        alone = BatchedClients(2)
+        alone.fit([i], [xs[i]], [ys[i]], 32, [5 + i])
+        for x, y in zip(alone.get_state(i)[1], both.get_state(i)[1]):
+            np.testing.assert_allclose(x, y, rtol=1e-5, atol=1e-7)
+    # steps per client: ceil(floor(n * 0.9) / 32)
+    assert [int(both.get_state(i)[1][0]) for i in range(2)] == [2, 9]
+
+
+def test_state_roundtrip_and_no_pool():
+    keras.utils.set_random_seed(0)
+    clients = BatchedClients(2)
+    xs, ys = _data(2, 40)
+    clients.fit([0, 1], xs, ys, 16, [1, 2])
+    w, opt = clients.get_state(1)
+    other = BatchedClients(2)
+    other.set_state(0, w, opt)
+    for x, y in zip(other.get_state(0)[1] + other.get_state(0)[0], opt + w):
+        np.testing.assert_array_equal(x, y)
+    with pytest.raises(ValueError):
+        train_peers(clients, xs, ys, xs, ys, 16, [1, 2], pool=object())
+
+
+def test_accuracy_close_to_per_model_path():
+    # labels from a fixed random linear teacher: learnable, unlike random labels
+    rng = np.random.default_rng(1)
+    teacher = rng.standard_normal((784, 10)).astype(np.float32)
+    xs = [rng.random((640, 28, 28), dtype=np.float32) - 0.5 for _ in range(3)]
+    ys = [np.argmax(x.reshape(len(x), -1) @ teacher, axis=1) for x in xs]
+    accs = []
+    for make in (lambda: SharedModelClients(3), lambda: BatchedClients(3)):
+        keras.utils.set_random_seed(0)
+        accs.append(_rounds(make(), xs, ys, rounds=3)[-1][1])
+    assert np.mean(accs[1]) == pytest.approx(np.mean(accs[0]), abs=0.05)
+    assert min(accs[1]) > 0.3  # chance is 0.1
+
+
+def test_stacked_evaluator_matches_keras_evaluate():
+    from federated.batched_clients import StackedEvaluator
+    rng = np.random.default_rng(3)
+    xs = [rng.random((n, 28, 28), dtype=np.float32) for n in (50, 7, 130)]
+    ys = [rng.integers(0, 10, len(x)) for x in xs]
+    keras.utils.set_random_seed(0)
+    models = [build_client_model() for _ in range(3)]
+    evaluator = StackedEvaluator(models[0], xs, ys, batch_size=32)
+    got = evaluator({0: models[0].get_weights(), 2: models[2].get_weights()})
+    assert sorted(got) == [0, 2]
+    for k in (0, 2):
+        loss, acc = models[k].evaluate(xs[k], ys[k], verbose=0)
+        assert got[k][0] == pytest.approx(loss, rel=1e-4)
+        assert got[k][1] == pytest.approx(acc)
+    # the largest slot is split into chunks, each with its own copy of the weights
+    assert evaluator({2: models[2].get_weights()})[2] == pytest.approx(got[2])
@@ -0,0 +1,40 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+
+def run_suite(args):
+    cmd = [sys.executable, str(Path("benchmarks") / "suite.py")] + args
+    env = {**os.environ, "PYTHONPATH": "src"}
+    return subprocess.run(cmd, capture_output=True, text=True, env=env)
+
+
+def _results(**medians):
+    return {"environment": {"node": "n"},
+            "results": {k: {"median_sec": v, "min_sec": v, "max_sec": v, "repeat": 1} for k, v in medians.items()}}
+
+
+def test_run_writes_results(tmp_path: Path):
+    out = tmp_path / "b.json"
+    res = run_suite(["run", "--quick", "--only", "flatten_weights,hash_weights", "--repeat", "1", "--out", str(out)])
+    assert res.returncode == 0, res.stderr
+    data = json.loads(out.read_text())
+    assert set(data["results"]) == {"flatten_weights[model_mb=1]", "hash_weights[model_mb=1]"}
+    assert data["results"]["hash_weights[model_mb=1]"]["median_sec"] > 0
+
+
+def test_compare_flags_slowdowns_beyond_threshold(tmp_path: Path):
+    base, cur = tmp_path / "base.json", tmp_path / "cur.json"
+    base.write_text(json.dumps(_results(a=1.0, b=1.0, c=0.0001, gone=1.0)))
+    cur.write_text(json.dumps(_results(a=1.1, b=1.5, c=0.0005)))
+
+    res = run_suite(["compare", str(base), str(cur), "--threshold", "0.2", "--json"])
+    assert res.returncode == 1
+    status = {r["case"]: r["status"] for r in json.loads(res.stdout)["rows"]}
+    # c is 5x slower but below the absolute noise floor
+    assert status == {"a": "ok", "b": "SLOWER", "c": "ok", "gone": "missing"}
+
+    res = run_suite(["compare", str(base), str(cur), "--threshold", "0.6"])
+    assert res.returncode == 0
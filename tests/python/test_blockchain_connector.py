@@ -0,0 +1,172 @@
+import json
+
+import pytest
+from eth_account import Account
+from hexbytes import HexBytes
+
+from federated import blockchain_connector
+from federated.blockchain_connector import Web3Connector
+
+
+class _RPCError(Exception):
+    """Shaped like web3 v7's Web3RPCError: not a ValueError, response in `rpc_response`."""
+
+    def __init__(self, response):
+        super().__init__(response["error"]["message"])
+        self.rpc_response = response
+
+
+class FakeEth:
+    account = Account
+
+    def __init__(self, reject_nonces=(), known=False):
+        self.sent = []
+        self.known = known  # first send: the node already has the tx
+        self.raw = []
+        self.calls = {"get_transaction_count": 0, "gas_price": 0, "chain_id": 0}
+        self.reject_nonces = set(reject_nonces)
+        self.chain_nonce = 3
+
+    def get_transaction_count(self, address, block_identifier=None):
+        self.calls["get_transaction_count"] += 1
+        return self.chain_nonce
+
+    @property
+    def gas_price(self):
+        self.calls["gas_price"] += 1
+        return 1_000_000_000
+
+    @property
+    def chain_id(self):
+        self.calls["chain_id"] += 1
+        return 31337
+
+    def send_raw_transaction(self, raw):
+        self.raw.append(raw)
+        nonce = self._last_nonce
+        if self.known:
+            self.known = False
+            self.sent.append(nonce)
+            raise _RPCError({"jsonrpc": "2.0", "id": 1, "error": {"code": -32000, "message": "already known"}})
+        if nonce in self.reject_nonces:
+            self.reject_nonces.discard(nonce)
+            self.chain_nonce = nonce + 1  # someone else used it
+            raise ValueError({"code": -32000, "message": "nonce too low"})
+        self.sent.append(nonce)
+        return HexBytes(bytes([len(self.sent)]) * 32)
+
+    def wait_for_transaction_receipt(self, tx_hash):
+        return {"status": 1, "transactionHash": tx_hash}
+
+
+class FakeFn:
+    def __init__(self, eth):
+        self.eth = eth
+
+    def estimate_gas(self, tx):
+        return 100_000
+
+    def build_transaction(self, tx):
+        self.eth._last_nonce = tx["nonce"]
+        return {**tx, "to": "0x" + "11" * 20, "data": "0x", "value": 0}
+
+
+def _connector(eth):
+    c = object.__new__(Web3Connector)
+    c.w3 = type("W3", (), {"eth": eth})()
+    c._init_tx_state()
+    c.gas_price_ttl = 60.0
+    return c
+
+
+def test_local_nonces_and_cached_chain_params():
+    eth = FakeEth()
+    c = _connector(eth)
+    acct = Account.create()
+    hashes = [c._submit_tx(acct, FakeFn(eth)) for _ in range(4)]
+    c._wait_receipts(hashes)
+    assert eth.sent == [3, 4, 5, 6]
+    assert eth.calls == {"get_transaction_count": 1, "gas_price": 1, "chain_id": 1}
+
+
+def test_nonce_rejection_resyncs_and_retries():
+    eth = FakeEth(reject_nonces={4})
+    c = _connector(eth)
+    acct = Account.create()
+    c._submit_tx(acct, FakeFn(eth))
+    c._submit_tx(acct, FakeFn(eth))
+    c._submit_tx(acct, FakeFn(eth))
+    assert eth.sent == [3, 5, 6]
+
+
+def test_already_known_tx_is_not_signed_again():
+    from web3 import Web3
+    eth = FakeEth(known=True)
+    c = _connector(eth)
+    acct = Account.create()
+    tx_hash = c._submit_tx(acct, FakeFn(eth))
+    assert eth.sent == [3] and len(eth.raw) == 1
+    assert tx_hash == Web3.keccak(eth.raw[0])
+    c._submit_tx(acct, FakeFn(eth))
+    assert eth.sent == [3, 4]
+
+
+def test_reverted_receipt_raises():
+    eth = FakeEth()
+    eth.wait_for_transaction_receipt = lambda h: {"status": 0, "transactionHash": HexBytes(h)}
+    c = _connector(eth)
+    with pytest.raises(RuntimeError):
+        c._wait_receipts([HexBytes(b"\x01" * 32)])
+
+
+
+def _read_connector(monkeypatch, responder):
+    from web3 import Web3
+    w3 = Web3(Web3.HTTPProvider("http://127.0.0.1:1"))
+    c = object.__new__(Web3Connector)
+    c.w3 = w3
+    abi = [{"type": "function", "name": name, "stateMutability": "view", "inputs": [],
+            "outputs": [{"name": "", "type": "uint256"}]} for name in ("getCurrentRound", "getLastParticipatedRound")]
+    c.agg_contract = w3.eth.contract(address="0x" + "11" * 20, abi=abi)
+    c.client_contracts = [{"contract": w3.eth.contract(address="0x" + f"{i + 2:02x}" * 20, abi=abi)}
+                          for i in range(3)]
+    batches = []
+
+    def post(uri, data, **kwargs):
+        payload = json.loads(data)
+        batches.append(payload)
+        # responses may come back in any order
+        return json.dumps([responder(p) for p in reversed(payload)]).encode()
+
+    monkeypatch.setattr(blockchain_connector, "make_post_request", post)
+    return c, batches
+
+
+def test_read_mint_state_is_one_batch_with_per_call_errors(monkeypatch):
+    def responder(p):
+        to = p["params"][0]["to"].lower()
+        if to == "0x" + "03" * 20:
+            return {"jsonrpc": "2.0", "id": p["id"], "error": {"code": 3, "message": "execution reverted"}}
+        value = 7 if to == "0x" + "11" * 20 else 6
+        return {"jsonrpc": "2.0", "id": p["id"], "result": "0x" + f"{value:064x}"}
+
+    c, batches = _read_connector(monkeypatch, responder)
+    current, last = c.read_mint_state(range(3))
+    assert len(batches) == 1 and len(batches[0]) == 4
+    assert all(p["method"] == "eth_call" for p in batches[0])
+    assert current == 7
+    assert last == {0: 6, 1: None, 2: 6}
+
+
+def test_balances_are_one_batch(monkeypatch):
+    def responder(p):
+        if p["params"][0].endswith("03" * 20):
+            return {"jsonrpc": "2.0", "id": p["id"], "error": {"code": -32000, "message": "boom"}}
+        return {"jsonrpc": "2.0", "id": p["id"], "result": hex(3 * 10**17)}
+
+    c, batches = _read_connector(monkeypatch, responder)
+    addrs = ["0x" + f"{i + 2:02x}" * 20 for i in range(3)]
+    bals = c.get_balances_eth(addrs)
+    assert len(batches) == 1 and [p["method"] for p in batches[0]] == ["eth_getBalance"] * 3
+    assert bals[0] == bals[2] == pytest.approx(0.3)
+    assert isinstance(bals[1], Exception)
@@ -0,0 +1,73 @@
+import json
+
+import numpy as np
+import pytest
+
+import federated.training_orchestrator as to
+from federated.checkpoint_store import CheckpointStore
+from federated.utils import hash_weight_list
+
+
+def test_put_is_content_addressed_and_deduplicated(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    w = [np.arange(6, dtype=np.float32).reshape(2, 3), np.ones(3, dtype=np.float32)] + \
+        [np.full(1, i, dtype=np.float32) for i in range(11)]  # > 10 layers: key order must stay numeric
+    h = store.put(w)
+    assert h == hash_weight_list(w)
+    mtime = (tmp_path / "objects" / h[:2] / f"{h}.npz").stat().st_mtime_ns
+    assert store.put(w) == h
+    assert (tmp_path / "objects" / h[:2] / f"{h}.npz").stat().st_mtime_ns == mtime
+    for a, b in zip(store.get(h), w):
+        np.testing.assert_array_equal(a, b)
+    # the stored file is what tools/weights_hash.py --file would hash (keys in sorted order)
+    with np.load(store.path(h)) as data:
+        assert hash_weight_list([data[k] for k in sorted(data.keys())]) == h
+
+
+def test_resume_point_and_torn_journal(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    agg = store.put([np.zeros(2, np.float32)])
+    for r in range(3):
+        store.record_round(r, 10 + r, [agg], [agg], agg, ["{}"], "{}", 0.5, 0.9)
+    store.mark_committed(10)
+    with open(tmp_path / "journal.jsonl", "a") as f:
+        f.write('{"event": "trai')  # crash mid-write
+    assert [r["committed"] for r in store.rounds()] == [True, False, False]
+
+    done, pending = store.resume_point(on_chain_round=11)
+    assert [r["target_round"] for r in done] == [10, 11]
+    assert pending["target_round"] == 12
+    assert store.resume_point(on_chain_round=9)[1]["target_round"] == 10
+    assert store.resume_point(on_chain_round=5) == ([], None)  # journal belongs to other rounds
+    rows = [json.loads(ln) for ln in open(tmp_path / "manifest.jsonl")]
+    assert rows[0] == {"path": f"objects/{agg[:2]}/{agg}.npz", "payload": "{}"}
+
+
+@pytest.mark.parametrize("shared_model,update_codec,batched,per_round",
+                         [(False, None, False, None), (True, None, False, None), (True, "int8+topk:0.1", False, None),
+                          (False, None, True, None), (True, "int8", False, 1)])
+def test_crash_resume_matches_uninterrupted_run(tmp_path, monkeypatch, fake_chain, small_mnist, shared_model,
+                                                update_codec, batched, per_round):
+    small_mnist(120, 40)
+    # with an update codec, the error-feedback residuals must be restored too; with client sampling
+    # some peers have none yet
+    kw = dict(rounds=3, num_clients=2, batch_size=32, shared_model=shared_model, update_codec=update_codec,
+              batched=batched, clients_per_round=per_round)
+
+    ref_chain = fake_chain()
+    ref_losses, ref_accs = to.run_federated(**kw)
+
+    chain = fake_chain(fail_at=2)
+    with pytest.raises(TimeoutError):
+        to.run_federated(checkpoint_dir=str(tmp_path), **kw)
+    assert chain.current == 1
+
+    trained = []
+    real_train_peers = to.train_peers
+    monkeypatch.setattr(to, "train_peers", lambda *a, **k: trained.append(1) or real_train_peers(*a, **k))
+    losses, accs = to.run_federated(checkpoint_dir=str(tmp_path), **kw)
+
+    assert len(trained) == 1  # round 2 was committed from the journal, only round 3 was trained
+    assert chain.current == 3
+    assert [chain.rounds[r][0] for r in (1, 2, 3)] == [ref_chain.rounds[r][0] for r in (1, 2, 3)]
+    assert accs == pytest.approx(ref_accs) and losses == pytest.approx(ref_losses)
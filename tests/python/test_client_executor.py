@@ -0,0 +1,158 @@
+import numpy as np
+import pytest
+from tensorflow import keras
+
+from federated.model_manager import build_client_model, average_layerwise
+from federated.client_executor import (
+    train_peers, peer_seed, make_process_pool, ModelClients, SharedModelClients, ClientDatasets,
+)
+
+
+def _fresh_models(n):
+    keras.utils.set_random_seed(0)
+    return ModelClients([build_client_model() for _ in range(n)])
+
+
+def _fresh_shared(n):
+    keras.utils.set_random_seed(0)
+    return SharedModelClients(n)
+
+
+def _two_rounds(clients, data, pool=None):
+    xs, ys = data
+    out = []
+    for r in range(2):
+        seeds = [peer_seed(42, r, i) for i in range(len(clients))]
+        w, accs, hashes = train_peers(clients, xs, ys, xs, ys, 32, seeds, pool=pool)
+        clients.set_global(average_layerwise(w))
+        out.append((w, accs, hashes))
+    return out
+
+
+def _assert_same(a, b):
+    for (w_a, acc_a, h_a), (w_b, acc_b, h_b) in zip(a, b):
+        assert h_a == h_b
+        assert acc_a == acc_b
+        for wa, wb in zip(w_a, w_b):
+            for x, y in zip(wa, wb):
+                np.testing.assert_array_equal(x, y)
+
+
+def _data(n):
+    rng = np.random.default_rng(0)
+    xs = [rng.random((64, 28, 28), dtype=np.float32) for _ in range(n)]
+    ys = [rng.integers(0, 10, 64) for _ in range(n)]
+    return xs, ys
+
+
+def test_parallel_matches_serial():
+    serial = _two_rounds(_fresh_models(2), _data(2))
+    pool = make_process_pool(workers=1, intra_op_threads=1)
+    try:
+        parallel = _two_rounds(_fresh_models(2), _data(2), pool=pool)
+    finally:
+        pool.shutdown()
+    _assert_same(serial, parallel)
+
+
+def test_shared_model_matches_per_model():
+    _assert_same(_two_rounds(_fresh_models(3), _data(3)), _two_rounds(_fresh_shared(3), _data(3)))
+
+
+def test_shared_model_draws_initial_weights_without_building_models():
+    import random
+    builds = []
+
+    def build():
+        builds.append(1)
+        return build_client_model()
+
+    per_model = _fresh_models(4)
+    build_client_model()  # the shared model
+    after_per_model = random.random()
+    keras.utils.set_random_seed(0)
+    shared = SharedModelClients(4, build_fn=build)
+    assert random.random() == after_per_model  # same draws as building 4 + 1 models
+    assert len(builds) == 1
+    for i in range(4):
+        for x, y in zip(per_model.get_state(i)[0], shared.get_state(i)[0]):
+            np.testing.assert_array_equal(x, y)
+
+    def build_bn():
+        model = keras.Sequential([keras.Input((28, 28)), keras.layers.Flatten(), keras.layers.BatchNormalization(),
+                                  keras.layers.Dense(10, activation="softmax")])
+        model.compile(loss="sparse_categorical_crossentropy", optimizer="adam")
+        return model
+
+    # other layers: initial weights come from real builds
+    keras.utils.set_random_seed(0)
+    ref = [build_bn().get_weights() for _ in range(2)]
+    keras.utils.set_random_seed(0)
+    shared = SharedModelClients(2, build_fn=build_bn)
+    for i in range(2):
+        for x, y in zip(ref[i], shared.get_state(i)[0]):
+            np.testing.assert_array_equal(x, y)
+
+
+def test_coded_updates_match_across_paths_and_hash_decoded_weights():
+    from federated.update_codec import parse_codec
+    from federated.utils import hash_weight_list
+
+    codec = parse_codec("int8+topk:0.1")
+    runs = []
+    for pool in (None, make_process_pool(workers=1, intra_op_threads=1)):
+        clients = _fresh_shared(2)
+        ref = clients.get_state(0)[0]
+        clients.set_global(ref)
+        residuals = [None, None]
+        xs, ys = _data(2)
+        try:
+            w, accs, hashes = train_peers(clients, xs, ys, xs, ys, 32, [1, 2], pool=pool,
+                                          codec=codec, reference=ref, residuals=residuals)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        assert hashes == [hash_weight_list(x) for x in w]
+        assert all(res is not None for res in residuals)
+        runs.append((w, accs, hashes))
+    _assert_same([runs[0]], [runs[1]])
+
+
+def test_coded_updates_are_decoded_straight_into_the_accumulator():
+    from federated.model_manager import FedAvgAccumulator
+    from federated.update_codec import parse_codec
+
+    codec = parse_codec("int8")
+    xs, ys = _data(2)
+    runs = []
+    for accumulator in (None, FedAvgAccumulator()):
+        clients = _fresh_shared(2)
+        ref = clients.get_state(0)[0]
+        clients.set_global(ref)
+        runs.append(train_peers(clients, xs, ys, xs, ys, 32, [1, 2], accumulator=accumulator,
+                                codec=codec, reference=ref, residuals=[None, None]))
+    (w, _, hashes), (streamed, _, streamed_hashes) = runs
+    assert streamed is None and streamed_hashes == hashes
+    for x, y in zip(accumulator.result(), average_layerwise(w)):
+        np.testing.assert_array_equal(x, y)
+
+
+def test_fast_inputs_train_on_split_in_seeded_order():
+    xs, ys = _data(2)
+    inputs = ClientDatasets(xs, ys)
+    keras.utils.set_random_seed(0)
+    clients = ModelClients([build_client_model(jit_compile=True) for _ in range(2)])
+    keras.utils.set_random_seed(0)
+    ref = [build_client_model() for _ in range(2)]
+    seeds = [peer_seed(42, 0, i) for i in range(2)]
+    w, accs, hashes = train_peers(clients, None, None, None, None, 16, seeds, inputs=inputs)
+    assert accs == [None, None]
+    for i in range(2):
+        # the first 90% of rows, in the order of the peer seed's permutation, one pass without shuffling
+        order = np.random.default_rng(seeds[i]).permutation(57)
+        keras.utils.set_random_seed(seeds[i])
+        ref[i].fit(xs[i][:57][order], ys[i][:57][order], batch_size=16, shuffle=False, epochs=1, verbose=0)
+        for a, b in zip(ref[i].get_weights(), w[i]):
+            np.testing.assert_allclose(a, b, atol=1e-5)
+    with pytest.raises(ValueError):
+        train_peers(clients, None, None, None, None, 16, seeds, pool=object(), inputs=inputs)
@@ -0,0 +1,59 @@
+import json
+from itertools import count
+
+import numpy as np
+import pytest
+from tensorflow import keras
+
+import federated.client_executor as ce
+import federated.training_orchestrator as to
+from federated.client_executor import LateUpdates, SharedModelClients, sample_clients, train_peers
+from federated.model_manager import FedAvgAccumulator
+
+
+def test_sample_clients_is_seeded_and_respects_count_fraction_and_exclude():
+    picks = [sample_clients(100, 10, 42, r) for r in range(3)]
+    assert picks[0] == sample_clients(100, 10, 42, 0)
+    assert all(len(p) == 10 and p == sorted(p) for p in picks) and picks[0] != picks[1]
+    assert len(sample_clients(100, 0.05, 42, 0)) == 5 and len(sample_clients(3, 0.01, 42, 0)) == 1
+    assert sample_clients(5, None, 42, 0) == [0, 1, 2, 3, 4]
+    assert 3 not in sample_clients(5, 4, 42, 0, exclude=[3]) and len(sample_clients(5, 5, 42, 0, exclude=[3])) == 4
+    for bad in (0, 1.5, 0.0):
+        with pytest.raises(ValueError):
+            sample_clients(10, bad, 42, 0)
+
+
+def _data(n):
+    rng = np.random.default_rng(0)
+    return [rng.random((32, 28, 28), dtype=np.float32) for _ in range(n)], [rng.integers(0, 10, 32) for _ in range(n)]
+
+
+def test_deadline_carries_late_update_and_skips_unstarted_peers(monkeypatch):
+    clock = count(1)
+    monkeypatch.setattr(ce, "monotonic", lambda: float(next(clock)))
+    keras.utils.set_random_seed(0)
+    clients = SharedModelClients(4)
+    xs, ys = _data(4)
+    late, acc = LateUpdates(), FedAvgAccumulator()
+    # clock: start=1 -> deadline 2.5; peer 0 is always accepted, peer 2 starts at 2 and ends at 3 (late),
+    # peer 3 would start at 4: not trained
+    _, accs, hashes = train_peers(clients, xs, ys, xs, ys, 32, [1, 2, 3, 4], accumulator=acc,
+                                  peers=[0, 2, 3], deadline_sec=1.5, late=late)
+    assert [h is not None for h in hashes] == [True, False, False] and acc.count == 1
+    assert late.peers() == [2]
+    (i, w, acc_2, h_2), = late.collect(clients)
+    assert i == 2 and len(late) == 0 and len(w) == 6 and isinstance(h_2, str)
+
+
+def test_run_federated_mints_only_sampled_peers(fake_chain, small_mnist):
+    small_mnist(160, 40)
+    chain = fake_chain()
+    to.run_federated(rounds=2, num_clients=4, batch_size=32, shared_model=True, clients_per_round=2)
+
+    assert all(json.loads(info)["peer_id"] == p + 1 for (p, _), info in chain.peers.items())
+    for r in (1, 2):
+        minted = sorted(p for p, rr in chain.peers if rr == r)
+        assert minted == sample_clients(4, 2, 42, r - 1)
+        assert json.loads(chain.rounds[r][1])["participants"] == 2
+    with pytest.raises(ValueError):
+        to.run_federated(rounds=1, late_updates="queue")
@@ -0,0 +1,125 @@
+import json
+
+import numpy as np
+import pytest
+from eth_abi import encode
+from web3 import Web3
+from web3.providers import rpc as web3_rpc
+
+import federated.training_orchestrator as to
+from federated import blockchain_connector, compact
+from federated.blockchain_connector import Web3Connector
+from federated.readonly_connector import load_abi
+
+H = "ab" * 32
+
+
+def _round_info(**kw):
+    info = {"round_id": 3, "timestamp": "2025-01-01T12:34:56Z", "duration_sec": 12.3456789, "participants": 5,
+            "local_epochs": 1, "batch_size": 64, "avg_round_accuracy": 0.912345678, "lr": 0.001}
+    info.update(kw)
+    return json.dumps(info, separators=(",", ":"))
+
+
+def test_round_info_roundtrip_is_exact_after_canonicalization():
+    canon = compact.canonical_round_info(_round_info())
+    assert json.loads(canon) == {"round_id": 3, "timestamp": "2025-01-01T12:34:56Z", "duration_sec": 12.346,
+                                 "participants": 5, "local_epochs": 1, "batch_size": 64,
+                                 "avg_round_accuracy": 0.912346, "lr": 0.001}
+    word = compact.pack_round_info(canon)
+    assert len(word) == 32 and compact.unpack_round_info(word, 3) == canon
+    assert compact.canonical_round_info(canon) == canon
+
+
+def test_packed_words_roundtrip():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        meta = (int(rng.integers(0, 2**33)), int(rng.integers(0, 2**32)), int(rng.integers(0, 2**16)),
+                int(rng.integers(0, 2**16)), int(rng.integers(0, 2**32)), int(rng.integers(0, 10**6 + 1)),
+                int(rng.integers(0, 10**10)))
+        word = compact._ROUND.pack(*meta)
+        assert compact.pack_round_info(compact.unpack_round_info(word, 1)) == word
+        h, peer_meta = rng.bytes(32), compact._PEER.pack(int(rng.integers(1, 2**32)), int(rng.integers(0, 10**6 + 1)))
+        payload = compact.unpack_peer_info(h, peer_meta + bytes(24), 7)
+        assert compact.pack_peer_info(payload) == (h, peer_meta + bytes(24))
+
+
+def test_peer_info_and_unset_words():
+    info = json.dumps({"peer_id": 2, "round": 4, "weight_hash": H, "test_accuracy": 0.98765432}, separators=(",", ":"))
+    canon = compact.canonical_peer_info(info)
+    assert json.loads(canon)["test_accuracy"] == 0.987654 and json.loads(canon)["weight_hash"] == H
+    assert compact.unpack_peer_info(bytes(32), bytes(32), 4) is None
+    assert compact.unpack_round_info(bytes(32), 4) is None
+    with pytest.raises(ValueError):
+        compact.pack_round_info(_round_info(participants=70_000))
+    with pytest.raises(ValueError):
+        compact.pack_peer_info(json.loads(info) | {"weight_hash": "ab"})
+
+
+def _connector(monkeypatch, table):
+    """Compact-mode connector whose eth_calls are answered from {(to, data): result}."""
+    w3 = Web3(Web3.HTTPProvider("http://127.0.0.1:1"))
+    c = object.__new__(Web3Connector)
+    c.w3, c.encoding = w3, "compact"
+    c.agg_contract = w3.eth.contract(address="0x" + "11" * 20, abi=load_abi("src/abi/Aggregator_ABI.json"))
+    c.client_contracts = [{"contract": w3.eth.contract(address="0x" + "22" * 20,
+                                                      abi=load_abi("src/abi/Client_ABI.json"))}]
+
+    def answer(p):
+        if p["method"] != "eth_call":
+            return {"jsonrpc": "2.0", "id": p["id"], "result": "0x1"}  # eth_chainId
+        return {"jsonrpc": "2.0", "id": p["id"],
+                "result": table.get((p["params"][0]["to"].lower(), p["params"][0]["data"]), "0x" + "00" * 32)}
+
+    def post(uri, data, **kwargs):
+        req = json.loads(data)
+        return json.dumps(answer(req) if isinstance(req, dict) else [answer(p) for p in req]).encode()
+
+    monkeypatch.setattr(blockchain_connector, "make_post_request", post)
+    monkeypatch.setattr(web3_rpc, "make_post_request", post)  # single eth_calls
+    return c
+
+
+def test_connector_compact_mint_and_read(monkeypatch):
+    round_info = compact.canonical_round_info(_round_info())
+    peer_info = compact.canonical_peer_info(json.dumps({"peer_id": 1, "round": 3, "weight_hash": H, "test_accuracy": 0.5}))
+    table = {}
+    c = _connector(monkeypatch, table)
+
+    fn = c._agg_mint_fn("cd" * 32, round_info)
+    assert fn.fn_name == "mintCompact"
+    assert fn.args == (bytes.fromhex("cd" * 32), compact.pack_round_info(round_info), bytes(32))
+    peer_fn = c._peer_mint_fn(0, 3, peer_info)
+    assert peer_fn.fn_name == "mintCompact" and peer_fn.args == (3, *compact.pack_peer_info(peer_info))
+
+    agg, peer = c.agg_contract.functions, c.client_contracts[0]["contract"].functions
+    for call, value in ((agg.getCurrentRound(), (3).to_bytes(32, "big")),
+                        (agg.getRoundMeta(3), compact.pack_round_info(round_info)),
+                        (agg.getRoundWeightDigest(3), bytes.fromhex("cd" * 32)),
+                        (peer.roundWeightDigests(3), bytes.fromhex(H)),
+                        (peer.roundMetas(3), compact.pack_peer_info(peer_info)[1])):
+        table[(call.address.lower(), call._encode_transaction_data())] = "0x" + encode(["bytes32"], [value]).hex()
+    state = c.read_round_state(3, peer_idxs=[0])
+    assert state == {"current_round": 3, "round_details": round_info, "round_weight": "cd" * 32,
+                     "round_hash": None, "peer_details": {0: peer_info}}
+    # the single-record getters decode the same compact words
+    assert c.get_round_details(3) == round_info and c.peer_get_round_details(0, 3) == peer_info
+    assert c.get_round_weight(3) == c.get_round_hash(3) == "cd" * 32
+    # unminted round: empty like JSON mode, so the post-mint checks fail
+    assert c.read_round_state(4, peer_idxs=[0])["round_details"] == ""
+    assert c.get_round_details(4) == c.get_round_weight(4) == c.peer_get_round_details(0, 4) == ""
+
+    c.encoding = "json"
+    assert c._agg_mint_fn("cd" * 32, round_info).fn_name == "mint"
+
+
+def test_run_federated_compact_encoding_verifies_exactly(fake_chain, small_mnist):
+    small_mnist(90, 30)
+    chain = fake_chain()
+    to.run_federated(rounds=2, num_clients=3, batch_size=32, shared_model=True, encoding="compact")
+
+    assert chain.encoding == "compact" and chain.current == 2 and len(chain.peers) == 6
+    info = json.loads(compact.unpack_round_info(chain.rounds[2][1], 2))
+    assert info["round_id"] == 2 and info["participants"] == 3 and info["lr"] == 0.001
+    with pytest.raises(ValueError):
+        to.run_federated(rounds=1, encoding="rlp")
@@ -1,6 +1,9 @@
+import pickle
+
 import numpy as np
+import pytest
 
-from federated.data_handler import split_among_clients
+from federated.data_handler import split_among_clients, load_mnist_normalized
 
 
 def test_split_among_clients_equal_chunks():
@@ -18,3 +21,48 @@ def test_split_among_clients_equal_chunks():
     covered = sum(xi.shape[0] for xi in xs)
     assert covered == chunk * num_clients <= n
 
+
+
+def test_iid_split_matches_permute_then_slice():
+    n, k = 100, 7
+    x = np.arange(n*4, dtype=np.float32).reshape(n, 2, 2)
+    y = np.arange(n, dtype=np.int64)
+    np.random.seed(0)
+    idx = np.random.permutation(n)
+    np.random.seed(0)
+    xs, ys = split_among_clients(x, y, num_clients=k)
+    chunk = n // k
+    for i in range(k):
+        np.testing.assert_array_equal(np.asarray(xs[i]), x[idx][i*chunk:(i+1)*chunk])
+        np.testing.assert_array_equal(np.asarray(ys[i]), y[idx][i*chunk:(i+1)*chunk])
+        assert xs[i].base is x
+
+
+def test_partitioners_are_disjoint():
+    y = np.repeat(np.arange(10), 20)
+    x = np.zeros((len(y), 3), dtype=np.float32)
+    for name, kwargs in [("dirichlet", {"alpha": 0.3}), ("shard", {"shards_per_client": 2})]:
+        np.random.seed(0)
+        _, ys = split_among_clients(x, y, 5, name, **kwargs)
+        idx = np.concatenate([p.indices for p in ys])
+        assert len(np.unique(idx)) == len(idx)
+    np.random.seed(0)
+    _, ys = split_among_clients(x, y, 5, "shard", shards_per_client=2)
+    assert all(len(np.unique(np.asarray(p))) <= 2 for p in ys)
+
+
+def test_mnist_cache_roundtrip_memmap(tmp_path, monkeypatch):
+    from tensorflow import keras
+    raw = ((np.full((4, 28, 28), 255, np.uint8), np.arange(4)), (np.zeros((2, 28, 28), np.uint8), np.arange(2)))
+    monkeypatch.setattr(keras.datasets.mnist, "load_data", lambda: raw)
+    first = load_mnist_normalized(cache_dir=str(tmp_path))
+    monkeypatch.setattr(keras.datasets.mnist, "load_data", lambda: pytest.fail("cache not used"))
+    (xtr, ytr), (xte, _) = load_mnist_normalized(cache_dir=str(tmp_path))
+    assert isinstance(xtr, np.memmap) and xtr.dtype == np.float32
+    np.testing.assert_array_equal(xtr, first[0][0])
+    assert float(xtr.max()) == 1.0 and xte.shape == (2, 28, 28)
+
+    xs, _ = split_among_clients(xtr, ytr, 2)
+    clone = pickle.loads(pickle.dumps(xs[0]))
+    assert isinstance(clone.base, np.memmap)
+    np.testing.assert_array_equal(np.asarray(clone), np.asarray(xs[0]))
@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+import federated.training_orchestrator as to
+from federated.instrumentation import NullTracer, Tracer, get_tracer, rpc_counter_middleware, set_tracer
+
+
+def test_null_tracer_is_a_noop():
+    tracer = NullTracer()
+    assert tracer.begin(0, 1) is None
+    with tracer.phase("fit", 0):
+        tracer.count("tx")
+    tracer.finish(None)
+    assert tracer.current() is None
+
+
+def test_round_trace_jsonl_and_prometheus(tmp_path):
+    tracer = Tracer(str(tmp_path))
+    trace = tracer.begin(0, 7)
+    for peer in range(2):
+        with tracer.phase("fit", peer):
+            pass
+    with tracer.phase("verify"):
+        pass
+    tracer.count("gas_used", 100)
+    tracer.count("gas_cost_wei", 250)
+    tracer.count("rpc.eth_call", 3)
+    tracer.finish(trace)
+
+    rec = json.loads((tmp_path / "trace.jsonl").read_text())
+    assert rec["round_idx"] == 0 and rec["target_round"] == 7
+    assert rec["phases"]["fit"]["count"] == 2 and rec["phases"]["verify"]["count"] == 1
+    assert set(rec["per_peer"]) == {"0", "1"}
+    assert rec["effective_gas_price_wei"] == 2.5
+    assert rec["peak_rss_bytes"] > 0
+
+    prom = (tmp_path / "metrics.prom").read_text()
+    assert 'fl_phase_calls_total{phase="fit"} 2' in prom
+    assert 'fl_rpc_requests_total{method="eth_call"} 3' in prom
+    assert "fl_gas_used_total 100" in prom
+    assert "fl_rounds_total 1" in prom and "fl_last_round 7" in prom
+
+
+def test_rpc_counter_middleware_counts_per_method():
+    tracer = Tracer()
+    prev = set_tracer(tracer)
+    try:
+        trace = tracer.begin(0, 1)
+        mw = rpc_counter_middleware(lambda method, params: {"result": method}, None)
+        mw("eth_call", [])
+        mw("eth_call", [])
+        mw("eth_chainId", [])
+    finally:
+        set_tracer(prev)
+    assert trace.counters == {"rpc.eth_call": 2, "rpc.eth_chainId": 1}
+
+
+@pytest.mark.parametrize("pipeline_rounds", [False, True])
+def test_run_federated_writes_one_trace_per_round(tmp_path, fake_chain, small_mnist, pipeline_rounds):
+    small_mnist(80, 20)
+    fake_chain()
+    to.run_federated(rounds=2, num_clients=2, batch_size=32, shared_model=True,
+                     pipeline_rounds=pipeline_rounds, trace_dir=str(tmp_path))
+
+    recs = [json.loads(ln) for ln in open(tmp_path / "trace.jsonl")]
+    assert [r["target_round"] for r in recs] == [1, 2]
+    for rec in recs:
+        assert {"train", "aggregate", "global_evaluate", "mint_peers", "mint_aggregator", "verify"} <= set(rec["phases"])
+        assert rec["phases"]["fit"]["count"] == 2
+        assert set(rec["per_peer"]) == {"0", "1"}
+        assert rec["counters"]["tx"] == 3  # committer thread records into the round it commits
+    assert isinstance(get_tracer(), NullTracer)
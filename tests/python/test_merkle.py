@@ -0,0 +1,67 @@
+import json
+
+import pytest
+from Crypto.Hash import keccak
+
+import federated.training_orchestrator as to
+from federated.merkle import (build_round_proofs, leaf_hash, load_round_proofs, merkle_proof, merkle_root,
+                              verify_proof, write_round_proofs)
+
+
+def _k(data: bytes) -> bytes:
+    k = keccak.new(digest_bits=256)
+    k.update(data)
+    return k.digest()
+
+
+def test_leaf_and_root_match_openzeppelin_conventions():
+    payloads = ['{"peer_id":1}', '{"peer_id":2}', '{"peer_id":3}']
+    leaves = [_k(_k(p.encode())) for p in payloads]
+    assert leaf_hash(payloads[0]) == leaves[0]
+    pair = lambda a, b: _k(min(a, b) + max(a, b))  # commutative keccak (MerkleProof._hashPair)
+    assert merkle_root(payloads) == "0x" + pair(pair(leaves[0], leaves[1]), leaves[2]).hex()
+    assert merkle_root(payloads[:1]) == "0x" + leaves[0].hex()
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 5, 8, 13])
+def test_every_proof_verifies_and_tampering_fails(n):
+    payloads = [json.dumps({"peer_id": i + 1, "weight_hash": f"{i:064x}"}) for i in range(n)]
+    root, proofs = build_round_proofs(payloads)
+    assert root == merkle_root(payloads)
+    for i, p in enumerate(payloads):
+        assert proofs[i] == merkle_proof(payloads, i)
+        assert verify_proof(p, proofs[i], root)
+        assert not verify_proof(p.replace("peer_id", "peer_Id"), proofs[i], root)
+    if n > 1:
+        assert not verify_proof(payloads[0], proofs[1], root)
+
+
+def test_empty_tree_is_rejected():
+    with pytest.raises(ValueError):
+        merkle_root([])
+
+
+@pytest.mark.parametrize("pipeline_rounds", [False, True])
+def test_run_federated_commits_one_tx_per_round(tmp_path, fake_chain, small_mnist, pipeline_rounds):
+    small_mnist(90, 30)
+    chain = fake_chain()
+    reads, read_mint_state = [], chain.read_mint_state
+    chain.read_mint_state = lambda peer_idxs: reads.append(list(peer_idxs)) or read_mint_state(peer_idxs)
+    to.run_federated(rounds=2, num_clients=3, batch_size=32, shared_model=True, pipeline_rounds=pipeline_rounds,
+                     merkle_peers=True, proof_dir=str(tmp_path))
+
+    assert chain.txs == 2
+    assert not chain.peers and not any(reads)  # no peer mints or reads in commitment mode
+    for r in (1, 2):
+        doc = load_round_proofs(str(tmp_path / f"round_{r}.json"))
+        assert doc["root"] == chain.roots[r]
+        assert [json.loads(lf["payload"])["peer_id"] for lf in doc["leaves"]] == [1, 2, 3]
+        assert all(verify_proof(lf["payload"], lf["proof"], doc["root"]) for lf in doc["leaves"])
+
+
+def test_write_round_proofs_roundtrip(tmp_path):
+    payloads = ["a", "b", "c"]
+    root, path = write_round_proofs(str(tmp_path), 4, payloads)
+    doc = load_round_proofs(path)
+    assert doc["round"] == 4 and doc["root"] == root == merkle_root(payloads)
+    assert [lf["payload"] for lf in doc["leaves"]] == payloads
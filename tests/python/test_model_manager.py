@@ -1,6 +1,10 @@
 import numpy as np
+import pytest
 
-from federated.model_manager import build_client_model, evaluate_acc, average_layerwise
+from federated.model_manager import (
+    build_client_model, evaluate_acc, average_layerwise, FedAvgAccumulator, ClippedFedAvgAccumulator,
+    coordinate_median, trimmed_mean, clipped_mean, parse_aggregation,
+)
 
 
 def test_average_layerwise_values():
@@ -18,3 +22,93 @@ def test_build_and_evaluate_model_shape_and_metric():
     acc = evaluate_acc(model, x, y)
     assert 0.0 <= acc <= 1.0
 
+
+def test_fedavg_accumulator_matches_average_layerwise():
+    rng = np.random.default_rng(0)
+    clients = [[rng.standard_normal((4, 3)).astype(np.float32), rng.standard_normal(3).astype(np.float32)]
+               for _ in range(6)]
+    acc = FedAvgAccumulator()
+    for w in clients:
+        acc.add(w)
+    out = acc.result()
+    for a, b in zip(out, average_layerwise(clients)):
+        assert a.dtype == np.float32
+        np.testing.assert_array_equal(a, b)
+
+
+def test_fedavg_accumulator_consumes_layer_iterators():
+    clients = _clients(3)
+    acc, streamed = FedAvgAccumulator(), FedAvgAccumulator()
+    for w in clients:
+        acc.add(w, num_samples=2)
+        streamed.add(iter(w), num_samples=2)
+    for a, b in zip(acc.result(), streamed.result()):
+        np.testing.assert_array_equal(a, b)
+    with pytest.raises(ValueError, match="expected 2 layers, got 1"):
+        streamed.add(iter(clients[0][:1]))
+    with pytest.raises(ValueError, match="got more"):
+        streamed.add(iter(clients[0] * 2))
+
+
+def test_fedavg_accumulator_sample_weighted_float64():
+    w1 = [np.array([[1., 3.]], dtype=np.float32), np.array([2.], dtype=np.float32)]
+    w2 = [np.array([[3., 1.]], dtype=np.float32), np.array([4.], dtype=np.float32)]
+    acc = FedAvgAccumulator(dtype=np.float64)
+    acc.add(w1, num_samples=30)
+    acc.add(w2, num_samples=10)
+    out = acc.result()
+    assert out[0].dtype == np.float32
+    np.testing.assert_allclose(out[0], np.array([[1.5, 2.5]]))
+    np.testing.assert_allclose(out[1], np.array([2.5]))
+
+
+def _clients(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [[rng.standard_normal((5, 7)).astype(np.float32), rng.standard_normal(7).astype(np.float32)]
+            for _ in range(n)]
+
+
+@pytest.mark.parametrize("spill", [False, True])
+def test_median_and_trimmed_mean_match_naive_in_blocks(tmp_path, spill):
+    clients = _clients(9)
+    # 64-byte blocks: 1 column per block for 9 clients, reduced on 3 threads
+    kw = dict(block_bytes=64, workers=3, spill_dir=str(tmp_path) if spill else None)
+    for l, med in enumerate(coordinate_median(clients, **kw)):
+        np.testing.assert_allclose(med, np.median([c[l] for c in clients], axis=0), rtol=1e-6)
+    for l, tm in enumerate(trimmed_mean(clients, trim=0.25, **kw)):
+        stack = np.sort(np.stack([c[l] for c in clients]), axis=0)
+        np.testing.assert_allclose(tm, stack[2:7].mean(axis=0), rtol=1e-5, atol=1e-6)
+        assert tm.dtype == np.float32
+
+
+def test_robust_rules_ignore_a_byzantine_client():
+    clients = _clients(7)
+    clients[3] = [w + 1e6 for w in clients[3]]
+    honest = [c for i, c in enumerate(clients) if i != 3]
+    for out in (coordinate_median(clients), trimmed_mean(clients, trim=0.2)):
+        for l, w in enumerate(out):
+            assert np.all(w <= np.max([c[l] for c in honest], axis=0) + 1e-6)
+    ref = [np.zeros_like(w) for w in clients[0]]
+    out = clipped_mean(clients, ref, max_norm=1.0)
+    assert np.sqrt(sum(np.sum(w ** 2) for w in out)) <= 1.0 + 1e-5
+
+
+def test_clipped_mean_scales_only_large_updates():
+    ref = [np.zeros((1, 2), np.float32)]
+    small, big = [np.array([[0.3, 0.4]], np.float32)], [np.array([[3.0, 4.0]], np.float32)]
+    acc = ClippedFedAvgAccumulator(ref, max_norm=1.0)
+    acc.add(small)
+    acc.add(big)
+    assert acc.clipped == 1
+    np.testing.assert_allclose(acc.result()[0], [[0.45, 0.6]], rtol=1e-6)
+
+
+def test_parse_aggregation():
+    assert parse_aggregation(None).name == "mean" and parse_aggregation("").spec == "mean"
+    assert parse_aggregation("trimmed_mean").record == {"rule": "trimmed_mean", "trim": 0.1}
+    assert parse_aggregation("clipped_mean:5").record == {"rule": "clipped_mean", "max_norm": 5.0}
+    assert parse_aggregation("median").spec == "median"
+    assert isinstance(parse_aggregation("mean").accumulator(), FedAvgAccumulator)
+    for bad in ("mode", "trimmed_mean:0.5", "clipped_mean", "median:3", "trimmed_mean:x"):
+        with pytest.raises(ValueError):
+            parse_aggregation(bad)
@@ -0,0 +1,53 @@
+import threading
+import time
+
+import pytest
+
+from federated.round_committer import RoundCommitter
+
+
+def test_commits_in_order_and_overlaps_with_caller():
+    committed = []
+    started = threading.Event()
+
+    def commit(target_round, payload):
+        started.set()
+        time.sleep(0.05)
+        committed.append((target_round, payload))
+
+    c = RoundCommitter(commit)
+    c.submit(1, "a")
+    assert started.wait(1.0)
+    # the caller is not blocked by the in-flight commit
+    assert committed == []
+    c.submit(2, "b")
+    c.submit(3, "c")
+    c.close()
+    assert committed == [(1, "a"), (2, "b"), (3, "c")]
+
+
+def test_failed_commit_stops_pipeline():
+    committed = []
+
+    def commit(target_round):
+        if target_round == 2:
+            raise AssertionError("currentRound mismatch")
+        committed.append(target_round)
+
+    c = RoundCommitter(commit, max_pending=4)
+    c.submit(1)
+    c.submit(2)
+    c.submit(3)
+    with pytest.raises(RuntimeError):
+        c.close()
+    assert committed == [1]
+    with pytest.raises(RuntimeError):
+        c.submit(4)
+
+
+def test_out_of_order_submit_rejected():
+    c = RoundCommitter(lambda r: None)
+    c.submit(5)
+    with pytest.raises(ValueError):
+        c.submit(7)
+    c.close()
@@ -1,5 +1,5 @@
 import json
-import numpy as np
+import pytest
 import federated.training_orchestrator as to
 
 
@@ -36,3 +36,74 @@ def test_round_info_json_deterministic_structure(monkeypatch):
     assert obj["avg_round_accuracy"] == 0.8765
     assert obj["lr"] == 0.001
 
+
+
+def test_round_info_json_records_aggregation_rule():
+    kw = dict(round_id=1, participants=3, batch_size=64, duration_sec=1.0, avg_round_accuracy=0.5, lr=0.001)
+    assert "aggregation" not in json.loads(to._round_info_json(**kw))
+    obj = json.loads(to._round_info_json(**kw, aggregation={"rule": "trimmed_mean", "trim": 0.2}))
+    assert obj["aggregation"] == {"rule": "trimmed_mean", "trim": 0.2}
+
+
+def test_run_federated_robust_aggregation(monkeypatch, tmp_path, fake_chain, small_mnist):
+    from federated.model_manager import RobustAccumulator
+    closed = []
+    close = RobustAccumulator.close
+    monkeypatch.setattr(RobustAccumulator, "close", lambda self: closed.append(self._spill) or close(self))
+    small_mnist(120, 30)
+    monkeypatch.setenv("FL_AGG_SPILL_DIR", str(tmp_path))
+    for spec, record in [("trimmed_mean:0.25", {"rule": "trimmed_mean", "trim": 0.25}),
+                         ("clipped_mean:0.5", {"rule": "clipped_mean", "max_norm": 0.5})]:
+        chain = fake_chain()
+        to.run_federated(rounds=2, num_clients=4, batch_size=32, shared_model=True, aggregation=spec)
+        assert [json.loads(chain.rounds[r][1])["aggregation"] for r in (1, 2)] == [record, record]
+    # the trimmed mean's spill file is closed every round
+    assert len(closed) == 2 and all(f.closed for f in closed)
+    with pytest.raises(ValueError):
+        to.run_federated(rounds=1, aggregation="median", encoding="compact")
+
+
+def test_run_federated_fast_path(fake_chain, small_mnist):
+    small_mnist(120, 30)
+    chain = fake_chain()
+    losses, accs = to.run_federated(rounds=2, num_clients=3, batch_size=16, shared_model=True, fast=True,
+                                    clients_per_round=2)
+    assert len(losses) == len(accs) == 2 and all(0.0 <= a <= 1.0 for a in accs)
+    for r in (1, 2):
+        info = json.loads(chain.rounds[r][1])
+        assert info["participants"] == 2 and 0.0 <= info["avg_round_accuracy"] <= 1.0
+    with pytest.raises(ValueError):
+        to.run_federated(rounds=1, fast=True, workers=2)
+
+
+def test_pipelined_commit_finishes_when_training_fails(monkeypatch, fake_chain, small_mnist):
+    import time
+
+    train_peers = to.train_peers
+
+    def fail_second_round(*args, **kwargs):
+        if fail_second_round.calls == 1:
+            raise KeyError("training failed")
+        fail_second_round.calls += 1
+        return train_peers(*args, **kwargs)
+
+    small_mnist(60, 20)
+    monkeypatch.setattr(to, "train_peers", fail_second_round)
+    for commit_fails in (False, True):
+        chain = fake_chain()
+        mint = chain.mint_aggregator_round
+
+        def slow_mint(*args):
+            time.sleep(0.5)  # still minting round 1 when round 2's training fails
+            if commit_fails:
+                raise ConnectionError("node gone")
+            mint(*args)
+
+        chain.mint_aggregator_round = slow_mint
+        fail_second_round.calls = 0
+        with pytest.raises(KeyError) as exc:
+            to.run_federated(rounds=2, num_clients=2, batch_size=32, shared_model=True, pipeline_rounds=True)
+        if commit_fails:
+            assert "node gone" in " ".join(exc.value.__notes__)
+        else:
+            assert sorted(chain.rounds) == [1]  # round 1 was committed before run_federated returned
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from federated.update_codec import UpdateCodec, UpdateEncoder, decode_update, parse_codec
+from federated.utils import hash_weight_list
+
+SHAPES = [(784, 128), (128,), (128, 64), (64,), (64, 10), (10,), ()]
+
+
+def _weights(seed, scale=1.0):
+    rng = np.random.default_rng(seed)
+    return [(rng.standard_normal(s) * scale).astype(np.float32) for s in SHAPES]
+
+
+def test_parse_codec_specs():
+    assert parse_codec(None) is None and parse_codec("none") is None
+    assert parse_codec("int8").spec == "int8"
+    assert parse_codec("TOPK:0.05+fp16").spec == "fp16+topk:0.05"
+    assert parse_codec("topk:0.01").spec == "topk:0.01"
+    for bad in ("int4", "topk:abc", "topk:0", "int8+topk:1.5"):
+        with pytest.raises(ValueError):
+            parse_codec(bad)
+
+
+# ratio: wire bytes / float32 bytes (top-k: 10% of values as int8 + uint16/uint32 indices)
+@pytest.mark.parametrize("spec,ratio,tol", [("fp32", 1.0, 1e-6), ("fp16", 0.5, 1e-4), ("int8", 0.25, 1e-3),
+                                            ("int8+topk:0.1", 0.13, None)])
+def test_roundtrip_size_and_error_feedback(spec, ratio, tol):
+    codec = parse_codec(spec)
+    ref, w = _weights(0), _weights(1)
+    w = [r + 0.01 * d for r, d in zip(ref, w)]
+    update, residual = codec.encode(w, ref)
+    decoded = decode_update(update, ref)
+
+    raw = sum(x.nbytes for x in w)
+    assert len(update) <= raw * ratio + 256
+    assert [d.shape for d in decoded] == [x.shape for x in w] and all(d.dtype == np.float32 for d in decoded)
+    # error feedback: decoded + residual is the trained weights
+    for d, res, x in zip(decoded, residual, w):
+        np.testing.assert_allclose(d + res, x, atol=1e-6)
+    if tol is not None:
+        assert max(float(np.max(np.abs(d - x))) for d, x in zip(decoded, w)) <= tol
+    else:
+        changed = sum(int(np.count_nonzero(d != r)) for d, r in zip(decoded, ref))
+        assert changed <= sum(int(np.ceil(0.1 * max(1, x.size))) for x in w)
+
+
+def test_topk_residual_is_sent_later():
+    codec = parse_codec("topk:0.25")
+    ref = [np.zeros(8, np.float32)]
+    w = [np.array([8, 7, 6, 5, 4, 3, 2, 1], np.float32)]
+    update, residual = codec.encode(w, ref)
+    np.testing.assert_array_equal(decode_update(update, ref)[0], [8, 7, 0, 0, 0, 0, 0, 0])
+    # nothing new to send: the residual's largest coordinates go next
+    update, residual = codec.encode(ref, ref, residual)
+    np.testing.assert_array_equal(decode_update(update, ref)[0], [0, 0, 6, 5, 0, 0, 0, 0])
+
+
+def test_encoder_hash_is_over_decoded_form_and_deterministic():
+    ref, w = _weights(0), _weights(1)
+    enc_a, enc_b = UpdateEncoder(parse_codec("int8"), ref), UpdateEncoder(parse_codec("int8"), ref)
+    (ua, da), (ub, db) = enc_a(w), enc_b(w)
+    assert ua == ub and hash_weight_list(da) == hash_weight_list(decode_update(ub, ref))
+    assert hash_weight_list(da) != hash_weight_list(w)
+    assert enc_a.residual is not None
+
+
+def test_decode_rejects_bad_updates():
+    update, _ = UpdateCodec("fp16").encode(_weights(0))
+    with pytest.raises(ValueError):
+        decode_update(b"nope" + update[4:])
+    with pytest.raises(ValueError):
+        decode_update(update[:-3])
+    with pytest.raises(ValueError):
+        decode_update(update + b"\0")
+    with pytest.raises(ValueError):
+        decode_update(update, _weights(0)[:2])
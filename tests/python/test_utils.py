@@ -1,8 +1,10 @@
 import re
 import numpy as np
+import pytest
 from Crypto.Hash import keccak
 
-from federated.utils import utc_timestamp, flatten_weights, hash_weights
+from federated.utils import (utc_timestamp, flatten_weights, hash_weights, hash_weight_list, hash_weight_list_chunked,
+                             weight_manifest, manifest_root, diff_manifests, hash_weights_file, weights_file_manifest)
 
 
 def test_utc_timestamp_format():
@@ -28,3 +30,46 @@ def test_hash_weights_matches_manual_keccak():
     h_manual = k.hexdigest()
     assert h_lib == h_manual
 
+
+
+def test_hash_weight_list_matches_flattened_hash():
+    layers = [
+        np.arange(12, dtype=np.float32).reshape(3, 4),
+        np.arange(12, dtype=np.float32).reshape(3, 4).T,  # non-contiguous
+        np.array(7.0, dtype=np.float32),                  # 0-d
+        np.arange(5, dtype=np.float64),                   # promotes the concatenation
+    ]
+    for ws in (layers[:3], layers):
+        assert hash_weight_list(ws) == hash_weights(flatten_weights(ws))
+
+
+def test_chunked_digest_is_deterministic_and_localizes_changes():
+    rng = np.random.default_rng(0)
+    layers = [rng.random((40, 30), dtype=np.float32), rng.random(7, dtype=np.float32), np.array(1.5, dtype=np.float32)]
+    h = hash_weight_list_chunked(layers, chunk_size=256, workers=1)
+    assert h == hash_weight_list_chunked(layers, chunk_size=256, workers=4)
+    assert h != hash_weight_list_chunked(layers, chunk_size=512) != hash_weight_list(layers)
+
+    expected = weight_manifest(layers, chunk_size=256, names=["dense", "bias", "scale"])
+    assert expected["root"] == h == manifest_root(expected)
+    assert [len(l["chunks"]) for l in expected["layers"]] == [19, 1, 1]
+
+    changed = [layers[0].copy(), layers[1], layers[2]]
+    changed[0][20, 5] += 1  # byte offset (20 * 30 + 5) * 4 = 2420 -> chunk 9
+    diffs = diff_manifests(expected, weight_manifest(changed, chunk_size=256, names=["dense", "bias", "scale"]))
+    assert [(d["layer"], d["name"], d["chunk"], d["offset"]) for d in diffs] == [(0, "dense", 9, 2304)]
+    assert diff_manifests(expected, expected) == []
+
+    reshaped = weight_manifest([layers[0], layers[1][:6]], chunk_size=256)
+    assert [(d["layer"], d["reason"]) for d in diff_manifests(expected, reshaped)] == [(1, "shape"), (2, "missing")]
+    with pytest.raises(ValueError):
+        diff_manifests(expected, weight_manifest(layers, chunk_size=512))
+
+
+def test_weights_file_chunked_matches_in_memory(tmp_path):
+    a, b = np.arange(100, dtype=np.float32).reshape(10, 10), np.arange(3, dtype=np.float64)
+    np.savez(tmp_path / "w.npz", b=b, a=a)
+    path = str(tmp_path / "w.npz")
+    assert hash_weights_file(path) == hash_weight_list([a, b])
+    assert hash_weights_file(path, scheme="chunked", chunk_size=64) == hash_weight_list_chunked([a, b], chunk_size=64)
+    assert [l["name"] for l in weights_file_manifest(path, keys_order=["b", "a"])["layers"]] == ["b", "a"]
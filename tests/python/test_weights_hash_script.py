@@ -1,10 +1,11 @@
+import json
 import subprocess
 import sys
 from pathlib import Path
 
 import numpy as np
 
-from federated.utils import hash_weights
+from federated.utils import hash_weights, hash_weight_list_chunked
 
 
 def run_script(args):
@@ -37,3 +38,99 @@ def test_weights_hash_npz_with_order(tmp_path: Path):
     expected_ordered = hash_weights(np.concatenate([b.ravel(), a.ravel()]))
     assert out_ordered == expected_ordered
 
+
+
+def test_weights_hash_npz_mixed_dtypes_and_fortran_npy(tmp_path: Path):
+    a = np.arange(6, dtype=np.float32).reshape(2, 3)
+    b = np.arange(4, dtype=np.float64)
+    f = tmp_path / "mixed.npz"
+    np.savez(f, a=a, b=b)
+    assert run_script(["--file", str(f)]) == hash_weights(np.concatenate([a.ravel(), b.ravel()]))
+
+    fo = np.asfortranarray(np.arange(12, dtype=np.float32).reshape(3, 4))
+    g = tmp_path / "fortran.npy"
+    np.save(g, fo)
+    assert run_script(["--file", str(g)]) == hash_weights(fo.ravel())
+
+
+def test_weights_hash_batch_manifest_jsonl(tmp_path: Path):
+    a = np.arange(6, dtype=np.float32)
+    b = np.arange(3, dtype=np.float64)
+    np.save(tmp_path / "a.npy", a)
+    np.savez(tmp_path / "b.npz", x=b)
+    (tmp_path / "notes.txt").write_text("skip me", encoding="utf-8")
+
+    cmd = [sys.executable, str(Path("tools") / "weights_hash.py"), "--dir", str(tmp_path), "--workers", "2"]
+    res = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    rows = [json.loads(ln) for ln in res.stdout.splitlines()]
+    assert [Path(r["path"]).name for r in rows] == ["a.npy", "b.npz"]
+    assert [r["format"] for r in rows] == ["npy", "npz"]
+    assert rows[0]["hash"] == hash_weights(a) and rows[1]["hash"] == hash_weights(b)
+    assert rows[0]["bytes"] == (tmp_path / "a.npy").stat().st_size and rows[0]["ms"] >= 0
+
+    payload = json.dumps({"peer_id": 1, "round": 1, "weight_hash": hash_weights(a), "test_accuracy": 0.9})
+    manifest = tmp_path / "manifest.jsonl"
+    manifest.write_text("\n".join([
+        json.dumps({"path": "a.npy", "payload": json.dumps(payload)}),  # double-encoded, as on-chain
+        json.dumps({"path": "b.npz", "expected": "0x" + "00" * 32}),
+    ]), encoding="utf-8")
+    cmd = [sys.executable, str(Path("tools") / "weights_hash.py"), "--manifest", str(manifest), "--workers", "1"]
+    res = subprocess.run(cmd, capture_output=True, text=True)
+    rows = [json.loads(ln) for ln in res.stdout.splitlines()]
+    assert res.returncode == 1
+    assert [r["match"] for r in rows] == [True, False]
+
+
+def test_weights_hash_manifest_entry_without_hash_fails(tmp_path: Path):
+    np.save(tmp_path / "a.npy", np.arange(6, dtype=np.float32))
+    manifest = tmp_path / "manifest.jsonl"
+    manifest.write_text("\n".join([
+        json.dumps({"path": "a.npy", "payload": json.dumps({"peer_id": 1, "round": 1})}),
+        json.dumps({"path": "a.npy", "payload": "not json"}),
+        json.dumps({"path": "a.npy", "expected": ""}),
+    ]), encoding="utf-8")
+    cmd = [sys.executable, str(Path("tools") / "weights_hash.py"), "--manifest", str(manifest), "--workers", "1"]
+    res = subprocess.run(cmd, capture_output=True, text=True)
+    rows = [json.loads(ln) for ln in res.stdout.splitlines()]
+    assert res.returncode == 1
+    assert [r["error"] for r in rows] == ["payload has no weight_hash"] * 2 + ["empty expected hash"]
+
+
+def test_weights_hash_chunked_manifest_and_diff(tmp_path: Path):
+    a = np.arange(300, dtype=np.float32).reshape(30, 10)
+    b = np.arange(5, dtype=np.float32)
+    f = tmp_path / "model.npz"
+    np.savez(f, a=a, b=b)
+    out = run_script(["--file", str(f), "--scheme", "chunked", "--chunk-size", "128", "--chunks-out"])
+    assert out == hash_weight_list_chunked([a, b], chunk_size=128)
+    chunks = tmp_path / "model.npz.chunks.json"
+    assert json.loads(chunks.read_text())["root"] == out
+
+    lines = [json.loads(ln) for ln in run_script(["--file", str(f), "--diff-chunks", str(chunks)]).splitlines()]
+    assert lines == [{"expected_root": out, "actual_root": out, "match": True, "differences": 0}]
+
+    a[20, 3] = -1  # byte offset 812 -> chunk 6 of layer "a"
+    np.savez(f, a=a, b=b)
+    cmd = [sys.executable, str(Path("tools") / "weights_hash.py"), "--file", str(f), "--diff-chunks", str(chunks)]
+    res = subprocess.run(cmd, capture_output=True, text=True)
+    lines = [json.loads(ln) for ln in res.stdout.splitlines()]
+    assert res.returncode == 1
+    assert [(d["name"], d["chunk"], d["offset"]) for d in lines[:-1]] == [("a", 6, 768)]
+    assert lines[-1]["match"] is False and lines[-1]["differences"] == 1
+
+
+def test_weights_hash_chunked_root_is_the_library_digest(tmp_path: Path):
+    import os
+    # run as `make hash` does, without src/ on PYTHONPATH: the tool falls back to the checkout's src/
+    env = {k: v for k, v in os.environ.items() if k != "PYTHONPATH"}
+    rng = np.random.default_rng(0)
+    for dtypes in ((np.float32, np.float32), (np.float32, np.float64), (np.int8, np.float16)):
+        a = (rng.standard_normal((37, 11)) * 50).astype(dtypes[0])
+        b = (rng.standard_normal(301) * 50).astype(dtypes[1])
+        f = tmp_path / "model.npz"
+        np.savez(f, a=a, b=b)
+        for chunk_size in (1, 64, 1000, 1 << 20):
+            cmd = [sys.executable, str(Path("tools") / "weights_hash.py"), "--file", str(f), "--scheme", "chunked",
+                   "--chunk-size", str(chunk_size)]
+            res = subprocess.run(cmd, capture_output=True, text=True, check=True, env=env)
+            assert res.stdout.strip() == hash_weight_list_chunked([a, b], chunk_size=chunk_size)
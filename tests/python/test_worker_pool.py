@@ -0,0 +1,101 @@
+import os
+from multiprocessing import Pipe
+
+import numpy as np
+import pytest
+from tensorflow import keras
+
+from federated.client_executor import train_peers, peer_seed, SharedModelClients
+from federated.model_manager import average_layerwise
+from federated.worker_pool import WorkerPool, send_msg, recv_msg, parse_address, _echo, _SHM_DIR
+
+
+def _payload():
+    rng = np.random.default_rng(0)
+    return {"w": [rng.random((300, 7), dtype=np.float32), np.arange(5, dtype=np.int64), np.zeros(0)], "tag": "x"}
+
+
+@pytest.mark.parametrize("shm", [False, True])
+def test_framing_roundtrip(shm):
+    if shm and not os.path.isdir(_SHM_DIR):
+        pytest.skip("no /dev/shm")
+    a, b = Pipe()
+    obj = _payload()
+    send_msg(a, obj, "fl-test" if shm else None)
+    got = recv_msg(b)
+    assert got["tag"] == "x"
+    for x, y in zip(obj["w"], got["w"]):
+        np.testing.assert_array_equal(x, y)
+        assert x.dtype == y.dtype and x.shape == y.shape
+    if shm:
+        # read-only views of the (already unlinked) segment
+        assert not [n for n in os.listdir(_SHM_DIR) if n.startswith("fl-test")]
+        assert not got["w"][0].flags.owndata and not got["w"][0].flags.writeable
+
+
+def test_parse_address():
+    assert parse_address("10.0.0.2:7600") == ("10.0.0.2", 7600)
+    with pytest.raises(ValueError):
+        parse_address("7600")
+
+
+def _data(n):
+    rng = np.random.default_rng(0)
+    xs = [rng.random((64, 28, 28), dtype=np.float32) for _ in range(n)]
+    ys = [rng.integers(0, 10, 64) for _ in range(n)]
+    return xs, ys
+
+
+def _two_rounds(pool=None):
+    keras.utils.set_random_seed(0)
+    clients = SharedModelClients(3)
+    xs, ys = _data(3)
+    out = []
+    for r in range(2):
+        w, accs, hashes = train_peers(clients, xs, ys, xs, ys, 32, [peer_seed(42, r, i) for i in range(3)], pool=pool)
+        clients.set_global(average_layerwise(w))
+        out.append((hashes, accs))
+    return out
+
+
+def test_socket_workers_match_in_process():
+    with WorkerPool(workers=2, intra_op_threads=1) as pool:
+        assert len(pool.workers) == 2 and all(w["shm"] for w in pool.workers)
+        remote = _two_rounds(pool)
+        with pytest.raises(ValueError):
+            pool.submit(int, "not a number").result()
+        session = pool.session
+    assert remote == _two_rounds()
+    assert not [n for n in os.listdir(_SHM_DIR) if n.startswith(session)]
+
+
+def test_socket_transfer_without_shm():
+    obj = _payload()
+    with WorkerPool(workers=1, intra_op_threads=1, shm=False) as pool:
+        assert not pool.workers[0]["shm"]
+        got = list(pool.map(_echo, [obj, obj]))
+    for back in got:
+        for x, y in zip(obj["w"], back["w"]):
+            np.testing.assert_array_equal(x, y)
+
+
+def test_unpicklable_task_fails_its_future_and_keeps_serving():
+    import threading
+    with WorkerPool(workers=1, intra_op_threads=1, shm=False) as pool:
+        bad = pool.submit(_echo, threading.Lock())
+        with pytest.raises(TypeError):
+            bad.result(timeout=15)
+        assert pool.submit(_echo, 7).result(timeout=15) == 7
+
+
+def test_run_federated_on_socket_workers(fake_chain, small_mnist):
+    import federated.training_orchestrator as to
+
+    small_mnist(120, 30)
+    kw = dict(rounds=2, num_clients=3, batch_size=32, shared_model=True)
+    chains = [fake_chain()]
+    local = to.run_federated(**kw)
+    chains.append(fake_chain())
+    remote = to.run_federated(workers=2, worker_address="127.0.0.1:0", intra_op_threads=1, **kw)
+    assert local == remote
+    assert [h for h, _ in chains[0].rounds.values()] == [h for h, _ in chains[1].rounds.values()]
@@ -3,6 +3,7 @@ pragma solidity ^0.8.20;
 
 import "forge-std/Test.sol";
 import {FedAggregatorNFT} from "src/smart_contracts/FedAggregator.sol";
+import {FedPeerNFT} from "src/smart_contracts/FedPeer.sol";
 
 contract FedAggregatorTest is Test {
     function testMintIncrementsRound() public {
@@ -15,5 +16,139 @@ contract FedAggregatorTest is Test {
         assertEq(c.getCurrentRound(), 1);
         assertEq(c.getRoundWeight(1), "weights-1");
     }
-}
 
+    function _leaf(string memory payload) internal pure returns (bytes32) {
+        return keccak256(bytes.concat(keccak256(bytes(payload))));
+    }
+
+    function testMintWithPeersRootCommitsAndVerifiesPayloads() public {
+        address agg = address(0xA11CE);
+        FedAggregatorNFT c = new FedAggregatorNFT(agg, "init-hash");
+        bytes32 a = _leaf('{"peer_id":1}');
+        bytes32 b = _leaf('{"peer_id":2}');
+        bytes32 root = a < b ? keccak256(abi.encodePacked(a, b)) : keccak256(abi.encodePacked(b, a));
+
+        vm.prank(agg);
+        c.mintWithPeersRoot("weights-1", "{}", root);
+
+        assertEq(c.getCurrentRound(), 1);
+        assertEq(c.getRoundWeight(1), "weights-1");
+        assertEq(c.getRoundPeersRoot(1), root);
+
+        bytes32[] memory proof = new bytes32[](1);
+        proof[0] = b;
+        assertTrue(c.verifyPeerPayload(1, '{"peer_id":1}', proof));
+        assertFalse(c.verifyPeerPayload(1, '{"peer_id":3}', proof));
+        assertFalse(c.verifyPeerPayload(2, '{"peer_id":1}', proof));
+    }
+
+    function testMintWithPeersRootRejectsEmptyRoot() public {
+        address agg = address(0xA11CE);
+        FedAggregatorNFT c = new FedAggregatorNFT(agg, "init-hash");
+        vm.prank(agg);
+        vm.expectRevert(bytes("Peers root cannot be empty"));
+        c.mintWithPeersRoot("weights-1", "{}", bytes32(0));
+    }
+
+    function testMintCompactStoresDigestAndMeta() public {
+        address agg = address(0xA11CE);
+        FedAggregatorNFT c = new FedAggregatorNFT(agg, "init-hash");
+        bytes32 h = keccak256("weights-1");
+        bytes32 meta = bytes32(abi.encodePacked(uint64(1735689600), uint32(1500), uint16(5), uint16(1),
+                                                uint32(64), uint32(912346), uint64(1000000)));
+
+        vm.prank(agg);
+        c.mintCompact(h, meta, bytes32(0));
+
+        assertEq(c.getCurrentRound(), 1);
+        assertEq(c.getRoundWeightDigest(1), h);
+        assertEq(c.getRoundMeta(1), meta);
+        assertEq(c.getRoundPeersRoot(1), bytes32(0));
+        assertEq(c.getRoundWeight(1), "");
+        assertEq(c.ownerOf(1), agg);
+        assertEq(uint64(bytes8(meta)), 1735689600);
+
+        vm.prank(agg);
+        vm.expectRevert(bytes("Model weights hash cannot be empty"));
+        c.mintCompact(bytes32(0), meta, bytes32(0));
+
+        vm.prank(agg);
+        c.mintCompact(h, meta, keccak256("root"));
+        assertEq(c.getRoundPeersRoot(2), keccak256("root"));
+    }
+
+    function testLatestHashGettersFollowEncoding() public {
+        address agg = address(0xA11CE);
+        FedAggregatorNFT c = new FedAggregatorNFT(agg, "init-hash");
+        vm.prank(agg);
+        c.mint("weights-1", "{}");
+        assertEq(c.getModelWeightHash(), "weights-1");
+        assertEq(c.getLatestWeightDigest(), bytes32(0));
+
+        // a compact round leaves no stale JSON-mode hash behind
+        vm.prank(agg);
+        c.mintCompact(keccak256("weights-2"), bytes32(0), bytes32(0));
+        assertEq(c.getLatestWeightDigest(), keccak256("weights-2"));
+        assertEq(c.modelWeightHash(), "");
+        vm.expectRevert(bytes("Latest round is compact: use getLatestWeightDigest"));
+        c.getModelWeightHash();
+
+        vm.prank(agg);
+        c.mint("weights-3", "{}");
+        assertEq(c.getModelWeightHash(), "weights-3");
+        assertEq(c.getLatestWeightDigest(), bytes32(0));
+    }
+
+    /// Gas of one steady-state round (round 2: 5 peer mints + the aggregator mint) per encoding.
+    function testGasPerRoundCompactVsJson() public {
+        uint256 jsonGas = _roundGas(false);
+        uint256 compactGas = _roundGas(true);
+        emit log_named_uint("gas per round, json (5 peers)", jsonGas);
+        emit log_named_uint("gas per round, compact (5 peers)", compactGas);
+        assertLt(compactGas, jsonGas);
+    }
+
+    function _roundGas(bool compact) internal returns (uint256 used) {
+        address agg = address(0xA11CE);
+        FedAggregatorNFT c = new FedAggregatorNFT(agg, "init-hash");
+        FedPeerNFT[] memory peers = new FedPeerNFT[](5);
+        for (uint256 i = 0; i < peers.length; i++) {
+            peers[i] = new FedPeerNFT(address(uint160(0xB0B0 + i)), address(c));
+        }
+        for (uint256 r = 1; r <= 2; r++) {
+            // payloads are built before measuring: only the mint calls are counted
+            string[] memory payloads = new string[](peers.length);
+            bytes32[] memory metas = new bytes32[](peers.length);
+            for (uint256 i = 0; i < peers.length; i++) {
+                payloads[i] = string.concat('{"peer_id":', vm.toString(i + 1), ',"round":', vm.toString(r),
+                    ',"weight_hash":"', _hex(keccak256(abi.encode(i, r))), '","test_accuracy":0.912346}');
+                metas[i] = bytes32(abi.encodePacked(uint32(i + 1), uint32(912346)));
+            }
+            string memory aggHash = _hex(keccak256(abi.encode(r)));
+            string memory roundInfo = string.concat('{"round_id":', vm.toString(r),
+                ',"timestamp":"2025-01-01T00:00:00Z","duration_sec":1.5,"participants":5,"local_epochs":1,',
+                '"batch_size":64,"avg_round_accuracy":0.912346,"lr":0.001}');
+            bytes32 roundMeta = bytes32(abi.encodePacked(uint64(1735689600), uint32(1500), uint16(5), uint16(1),
+                                                         uint32(64), uint32(912346), uint64(1000000)));
+
+            uint256 start = gasleft();
+            for (uint256 i = 0; i < peers.length; i++) {
+                vm.prank(address(uint160(0xB0B0 + i)));
+                if (compact) peers[i].mintCompact(r, keccak256(abi.encode(i, r)), metas[i]);
+                else peers[i].mint(r, payloads[i]);
+            }
+            vm.prank(agg);
+            if (compact) c.mintCompact(keccak256(abi.encode(r)), roundMeta, bytes32(0));
+            else c.mint(aggHash, roundInfo);
+            used = start - gasleft();
+        }
+    }
+
+    function _hex(bytes32 h) internal pure returns (string memory) {
+        // 64 lowercase hex chars, no 0x (hash_weight_list format)
+        bytes memory s = bytes(vm.toString(h));
+        bytes memory out = new bytes(64);
+        for (uint256 i = 0; i < 64; i++) out[i] = s[i + 2];
+        return string(out);
+    }
+}
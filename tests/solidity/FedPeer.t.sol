@@ -30,6 +30,29 @@ contract FedPeerTest is Test {
         assertEq(c.balanceOf(peer), 1);
     }
 
+    function testMintCompactStoresDigestAndMeta() public {
+        FedPeerNFT c = new FedPeerNFT(peer, aggregator);
+        bytes32 h = keccak256("w");
+        bytes32 meta = bytes32(abi.encodePacked(uint32(1), uint32(987654)));
+
+        vm.prank(peer);
+        c.mintCompact(1, h, meta);
+
+        assertEq(c.getLastParticipatedRound(), 1);
+        assertEq(c.roundWeightDigests(1), h);
+        assertEq(c.roundMetas(1), meta);
+        assertEq(c.roundDetails(1), "");
+        assertEq(c.ownerOf(1), peer);
+
+        vm.prank(peer);
+        vm.expectRevert(bytes("Invalid round number"));
+        c.mintCompact(1, h, meta);
+
+        vm.prank(peer);
+        vm.expectRevert(bytes("Weight hash cannot be empty"));
+        c.mintCompact(2, bytes32(0), meta);
+    }
+
     function testMintOnlyOwner() public {
         FedPeerNFT c = new FedPeerNFT(peer, aggregator);
         vm.expectRevert();
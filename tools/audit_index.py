@@ -0,0 +1,97 @@
+import argparse
+import json
+import os
+import sys
+from time import perf_counter
+
+from web3 import Web3
+
+from federated.audit_index import AuditIndex
+from federated.readonly_connector import load_env, load_abi
+
+
+def _contracts(w3, args):
+    agg_abi = load_abi(args.agg_abi or os.getenv("AGGREGATOR_ABI_PATH", "src/abi/Aggregator_ABI.json"))
+    client_abi = load_abi(args.client_abi or os.getenv("CLIENT_ABI_PATH", "src/abi/Client_ABI.json"))
+    agg_addr = args.agg_addr or os.getenv("AGGREGATOR_CONTRACT_ADDRESS")
+    if not agg_addr:
+        raise SystemExit("Provide --agg-addr or set AGGREGATOR_CONTRACT_ADDRESS")
+    peers = [a.strip() for a in (args.peer_addrs or os.getenv("CLIENT_CONTRACT_ADDRESSES", "")).split(",") if a.strip()]
+    agg = w3.eth.contract(address=Web3.to_checksum_address(agg_addr), abi=agg_abi)
+    return agg, [w3.eth.contract(address=Web3.to_checksum_address(a), abi=client_abi) for a in peers]
+
+
+def _peer_address(args) -> str:
+    if args.peer_addr:
+        return args.peer_addr
+    peers = [a.strip() for a in os.getenv("CLIENT_CONTRACT_ADDRESSES", "").split(",") if a.strip()]
+    if args.peer_index is None or not 0 <= args.peer_index < len(peers):
+        raise SystemExit("Provide --peer-addr or a valid --peer-index (CLIENT_CONTRACT_ADDRESSES)")
+    return peers[args.peer_index]
+
+
+def _print_rows(rows, as_json: bool):
+    if as_json:
+        print(json.dumps(rows, indent=2))
+        return
+    for r in rows:
+        kind = f"[{r['kind']}] " if "kind" in r else ""
+        body = r.get("round_info") or r.get("payload")
+        print(f"{kind}round={r['round']} contract={r['contract']} hash={r['weight_hash']} block={r['block_number']} {body}")
+
+
+def main(argv: list[str]) -> int:
+    load_env()
+    p = argparse.ArgumentParser(description="Index FedAggregatorNFT/FedPeerNFT events into SQLite and query them")
+    p.add_argument("--db", default=os.getenv("AUDIT_INDEX_DB", "audit_index.sqlite"), help="SQLite index file")
+    p.add_argument("--json", action="store_true", help="Print query results as JSON")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    s = sub.add_parser("sync", help="Pull new events from the chain into the index")
+    s.add_argument("--rpc-url", default=os.getenv("WEB3_HTTP_PROVIDER", "http://127.0.0.1:7545"))
+    s.add_argument("--agg-addr")
+    s.add_argument("--peer-addrs", help="Comma-separated peer contract addresses")
+    s.add_argument("--agg-abi")
+    s.add_argument("--client-abi")
+    s.add_argument("--start-block", type=int, default=0, help="First block for contracts not indexed yet")
+    s.add_argument("--confirmations", type=int, default=0, help="Stay this many blocks behind the head")
+    s.add_argument("--chunk", type=int, default=2000, help="Initial eth_getLogs block range")
+
+    r = sub.add_parser("rounds", help="Aggregator rounds in a range")
+    r.add_argument("--from", dest="first", type=int)
+    r.add_argument("--to", dest="last", type=int)
+
+    q = sub.add_parser("peer", help="Participation history of one peer")
+    q.add_argument("--peer-addr")
+    q.add_argument("--peer-index", type=int)
+    q.add_argument("--from", dest="first", type=int)
+    q.add_argument("--to", dest="last", type=int)
+
+    h = sub.add_parser("hash", help="Rounds and participations recorded with a weight hash")
+    h.add_argument("weight_hash")
+
+    args = p.parse_args(argv)
+    index = AuditIndex(args.db)
+    try:
+        t0 = perf_counter()
+        if args.cmd == "sync":
+            w3 = Web3(Web3.HTTPProvider(args.rpc_url))
+            agg, peers = _contracts(w3, args)
+            n = index.sync(w3, agg, peers, start_block=args.start_block,
+                           confirmations=args.confirmations, chunk=args.chunk)
+            print(f"indexed {n} events up to block {index.last_block()} in {perf_counter() - t0:.2f}s")
+            return 0
+        if args.cmd == "rounds":
+            rows = index.agg_rounds(args.first, args.last)
+        elif args.cmd == "peer":
+            rows = index.peer_rounds(_peer_address(args), args.first, args.last)
+        else:
+            rows = index.find_hash(args.weight_hash)
+        _print_rows(rows, args.json)
+        return 0 if rows else 1
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -2,20 +2,23 @@ import sys
 import json
 
 
-def main() -> int:
-    s = sys.stdin.read().strip()
+def weight_hash_from_payload(s: str) -> str | None:
+    """`weight_hash` of a peer payload (JSON object, possibly JSON-encoded twice), else None."""
     try:
         obj = json.loads(s)
         if isinstance(obj, str):
             obj = json.loads(obj)
-        if isinstance(obj, dict):
-            print(obj.get("weight_hash", ""))
-            return 0
-        print("")
-        return 1
     except Exception:
-        print("")
-        return 1
+        return None
+    if isinstance(obj, dict):
+        return obj.get("weight_hash", "")
+    return None
+
+
+def main() -> int:
+    h = weight_hash_from_payload(sys.stdin.read().strip())
+    print(h or "")
+    return 0 if h is not None else 1
 
 
 if __name__ == "__main__":
@@ -1,49 +1,33 @@
 import argparse
+import glob
+import json
+import multiprocessing as mp
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
 from typing import List
 
 import numpy as np
-from Crypto.Hash import keccak
 
+try:
+    from federated.utils import (CHUNKED_SCHEME, DEFAULT_CHUNK_SIZE, hash_weight_list, hash_weights_file,
+                                 weight_manifest, weights_file_manifest, manifest_root, diff_manifests)
+except ImportError:  # run from a checkout without src/ on the path
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src"))
+    from federated.utils import (CHUNKED_SCHEME, DEFAULT_CHUNK_SIZE, hash_weight_list, hash_weights_file,
+                                 weight_manifest, weights_file_manifest, manifest_root, diff_manifests)
 
-def _keccak256_hex(data: bytes) -> str:
-    k = keccak.new(digest_bits=256)
-    k.update(data)
-    return k.hexdigest()
 
+def _keys_order(keys_order_file: str | None) -> list[str] | None:
+    # .npz keys to hash first, in this order (the rest follow sorted)
+    if not keys_order_file:
+        return None
+    with open(keys_order_file, 'r', encoding='utf-8') as f:
+        return [ln.strip() for ln in f if ln.strip()]
 
-def _flatten_and_concat(weights: List[np.ndarray]) -> np.ndarray:
-    return np.concatenate([w.ravel() for w in weights]) if weights else np.array([], dtype=np.float32)
 
-
-def _hash_from_npy(path: str) -> str:
-    arr = np.load(path, allow_pickle=False)
-    if isinstance(arr, np.ndarray):
-        flat = arr.ravel()
-        return _keccak256_hex(flat.tobytes())
-    raise ValueError("Unsupported .npy content")
-
-
-def _hash_from_npz(path: str, keys_order_file: str | None) -> str:
-    with np.load(path, allow_pickle=False) as data:
-        keys = list(data.keys())
-        if keys_order_file:
-            with open(keys_order_file, 'r', encoding='utf-8') as f:
-                desired = [ln.strip() for ln in f if ln.strip()]
-            # filter to existing keys, in given order
-            ordered = [k for k in desired if k in keys]
-            # include any remaining keys deterministically at the end
-            remaining = sorted([k for k in keys if k not in ordered])
-            keys = ordered + remaining
-        else:
-            keys.sort()
-        arrays = [data[k] for k in keys]
-        flat = _flatten_and_concat(arrays)
-        return _keccak256_hex(flat.tobytes())
-
-
-def _hash_from_keras(path: str) -> str:
+def _keras_weights(path: str) -> List[np.ndarray]:
     try:
         # Prefer TensorFlow Keras
         from tensorflow import keras as tf_keras  # type: ignore
@@ -58,16 +42,144 @@ def _hash_from_keras(path: str) -> str:
                 "Unable to load model file. Ensure TensorFlow/Keras is installed "
                 "and the file is a full model (.h5/.keras), not weights-only."
             ) from e2
-    weights = model.get_weights()
-    flat = _flatten_and_concat(weights)
-    return _keccak256_hex(flat.tobytes())
+    return model.get_weights()
+
+
+_FORMATS = {".npy": "npy", ".npz": "npz", ".h5": "keras", ".keras": "keras"}
+
+
+def _manifest_file(path: str, keys_order_file: str | None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   workers: int = 0) -> tuple[str, dict]:
+    """(format, chunked manifest) of a weights file; .npz members are loaded one at a time."""
+    fmt = _FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt in ("npy", "npz"):
+        return fmt, weights_file_manifest(path, _keys_order(keys_order_file), chunk_size, workers)
+    if fmt == "keras":
+        return fmt, weight_manifest(_keras_weights(path), chunk_size, workers)
+    raise ValueError(f"Unsupported file extension: {os.path.splitext(path)[1].lower()}")
+
+
+def _hash_file(path: str, keys_order_file: str | None, scheme: str = "flat",
+               chunk_size: int = DEFAULT_CHUNK_SIZE, workers: int = 0) -> tuple[str, str]:
+    """(format, hash) of a weights file; raises ValueError on unsupported extensions."""
+    if scheme == "chunked":
+        fmt, manifest = _manifest_file(path, keys_order_file, chunk_size, workers)
+        return fmt, manifest["root"]
+    fmt = _FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt in ("npy", "npz"):
+        return fmt, hash_weights_file(path, _keys_order(keys_order_file))
+    if fmt == "keras":
+        # TF is imported on first use and stays loaded in this (worker) process
+        return fmt, hash_weight_list(_keras_weights(path))
+    raise ValueError(f"Unsupported file extension: {os.path.splitext(path)[1].lower()}")
+
+
+# ---------- batch mode ----------
+def _collect(args) -> list[tuple[str, str | None, str | None]]:
+    """(path, expected_hash or None, error or None) for --dir, --glob or --manifest, in a stable order."""
+    if args.dir:
+        paths = [os.path.join(root, f) for root, _, files in os.walk(args.dir) for f in files]
+        return [(p, None, None) for p in sorted(paths) if os.path.splitext(p)[1].lower() in _FORMATS]
+    if args.glob:
+        paths = glob.glob(args.glob, recursive=True)
+        return [(p, None, None) for p in sorted(paths) if os.path.splitext(p)[1].lower() in _FORMATS]
+
+    # Manifest: one entry per line, either a bare path or a JSON object with "path"
+    # and "expected" (a hash) or "payload" (a peer payload, as read by extract_weight_hash.py).
+    # Relative paths are resolved against the manifest's directory.
+    from extract_weight_hash import weight_hash_from_payload
+    base = os.path.dirname(os.path.abspath(args.manifest))
+    entries = []
+    with open(args.manifest, "r", encoding="utf-8") as f:
+        for ln in f:
+            ln = ln.strip()
+            if not ln or ln.startswith("#"):
+                continue
+            if not ln.startswith("{"):
+                entries.append((os.path.join(base, ln), None, None))
+                continue
+            obj = json.loads(ln)
+            expected, error = obj.get("expected"), None
+            if expected is None and "payload" in obj:
+                payload = obj["payload"]
+                expected = weight_hash_from_payload(payload if isinstance(payload, str) else json.dumps(payload))
+                if not expected:
+                    # nothing to check against: a failure, not a silent pass
+                    error = "payload has no weight_hash"
+            elif "expected" in obj and not expected:
+                error = "empty expected hash"
+            entries.append((os.path.join(base, obj["path"]), expected or None, error))
+    return entries
+
+
+def _hash_task(task) -> dict:
+    path, expected, error, keys_order_file, scheme, chunk_size, threads = task
+    if error is not None:
+        return {"path": path, "error": error}
+    t0 = perf_counter()
+    row = {"path": path}
+    try:
+        row["format"], row["hash"] = _hash_file(path, keys_order_file, scheme, chunk_size, threads)
+        row["bytes"] = os.path.getsize(path)
+    except Exception as e:
+        row["error"] = str(e)
+    row["ms"] = round((perf_counter() - t0) * 1000, 3)
+    if expected is not None:
+        row["expected"] = expected.lower().removeprefix("0x")
+        row["match"] = row.get("hash") == row["expected"]
+    return row
+
+
+def run_batch(args) -> int:
+    entries = _collect(args)
+    if not entries:
+        print("No weight files found", file=sys.stderr)
+        return 2
+    workers = max(1, min(args.workers or os.cpu_count() or 1, len(entries)))
+    # chunked: with several worker processes each hashes its file's chunks on one thread
+    tasks = [(p, e, err, args.keys_order, args.scheme, args.chunk_size, 1 if workers > 1 else 0)
+             for p, e, err in entries]
+    if workers == 1:
+        rows = map(_hash_task, tasks)
+    else:
+        # spawn: workers start without TF and import it at most once, on their first .h5/.keras
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"))
+        rows = pool.map(_hash_task, tasks, chunksize=max(1, len(tasks) // (4 * workers)))
+    failed = 0
+    try:
+        for row in rows:
+            print(json.dumps(row), flush=True)
+            failed += "error" in row or row.get("match") is False
+    finally:
+        if workers > 1:
+            pool.shutdown()
+    return 1 if failed else 0
 
 
 def main(argv: List[str]) -> int:
     p = argparse.ArgumentParser(description="Compute keccak256 hash of model weights")
-    p.add_argument("--file", required=True, help="Path to weights: .npy (flat), .npz (arrays), .h5/.keras (model)")
+    src = p.add_mutually_exclusive_group(required=True)
+    src.add_argument("--file", help="Path to weights: .npy (flat), .npz (arrays), .h5/.keras (model)")
+    src.add_argument("--dir", help="Batch: hash every weights file under this directory (recursive)")
+    src.add_argument("--glob", help="Batch: hash every weights file matching this pattern (** allowed)")
+    src.add_argument("--manifest", help="Batch: file with one path or JSON object {path, expected|payload} per line")
     p.add_argument("--keys-order", dest="keys_order", default=None, help="Optional file listing .npz keys order (one per line)")
+    p.add_argument("--workers", type=int, default=0, help="Batch: worker processes (default: CPU count)")
+    p.add_argument("--scheme", choices=("flat", "chunked"), default="flat",
+                   help=f"flat: one Keccak over all bytes (on-chain default); chunked: {CHUNKED_SCHEME} Merkle root")
+    p.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Chunked: bytes per chunk")
+    p.add_argument("--chunks-out", nargs="?", const="", metavar="PATH",
+                   help="Chunked, --file: also write the per-chunk manifest (default: <file>.chunks.json)")
+    p.add_argument("--diff-chunks", metavar="MANIFEST",
+                   help="--file: compare with a stored chunk manifest and print the differing layers/chunks")
     args = p.parse_args(argv)
+    if args.chunk_size <= 0:
+        p.error("--chunk-size must be positive")
+
+    if args.file is None:
+        # batch: one JSON line per file (path, format, hash, bytes, ms[, expected, match | error]);
+        # non-zero exit on any error or mismatch
+        return run_batch(args)
 
     path = args.file
     if not os.path.isfile(path):
@@ -75,16 +187,20 @@ def main(argv: List[str]) -> int:
         return 2
 
     ext = os.path.splitext(path)[1].lower()
+    if ext not in _FORMATS:
+        print(f"Unsupported file extension: {ext}", file=sys.stderr)
+        return 2
+    if args.diff_chunks:
+        return run_diff(path, args)
     try:
-        if ext == ".npy":
-            h = _hash_from_npy(path)
-        elif ext == ".npz":
-            h = _hash_from_npz(path, args.keys_order)
-        elif ext in (".h5", ".keras"):
-            h = _hash_from_keras(path)
+        if args.chunks_out is not None:
+            _, manifest = _manifest_file(path, args.keys_order, args.chunk_size)
+            out = args.chunks_out or path + ".chunks.json"
+            with open(out, "w", encoding="utf-8") as f:
+                json.dump({"file": os.path.basename(path), **manifest}, f)
+            h = manifest["root"]
         else:
-            print(f"Unsupported file extension: {ext}", file=sys.stderr)
-            return 2
+            _, h = _hash_file(path, args.keys_order, args.scheme, args.chunk_size)
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
         return 1
@@ -93,6 +209,28 @@ def main(argv: List[str]) -> int:
     return 0
 
 
+def run_diff(path: str, args) -> int:
+    """One JSON line per differing layer/chunk, then a summary line; exit 1 if anything differs."""
+    with open(args.diff_chunks, "r", encoding="utf-8") as f:
+        expected = json.load(f)
+    if expected.get("scheme") != CHUNKED_SCHEME:
+        print(f"Unsupported manifest scheme: {expected.get('scheme')!r}", file=sys.stderr)
+        return 2
+    if manifest_root(expected) != expected["root"]:
+        print("Manifest chunk hashes do not add up to its root (corrupt or edited manifest)", file=sys.stderr)
+        return 2
+    try:
+        _, actual = _manifest_file(path, args.keys_order, expected["chunk_size"])
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    diffs = diff_manifests(expected, actual)
+    for d in diffs:
+        print(json.dumps(d))
+    print(json.dumps({"expected_root": expected["root"], "actual_root": actual["root"],
+                      "match": expected["root"] == actual["root"], "differences": len(diffs)}))
+    return 0 if expected["root"] == actual["root"] else 1
+
+
 if __name__ == "__main__":
     raise SystemExit(main(sys.argv[1:]))
-